@@ -9,14 +9,20 @@ import asyncio
 import hashlib
 import logging
 import os
+import sys
 import time
-from dataclasses import dataclass
-from typing import Dict, List, Optional, Tuple
+from dataclasses import dataclass, replace
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
 
 import aiohttp
 import numpy as np
 import redis
 
+# Repository root, for the concurrency limiter in src.utils
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+from src.utils.adaptive_concurrency import AdaptiveConcurrencyLimiter  # noqa: E402
+
 # Configure logging for production monitoring
 logging.basicConfig(
     level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
@@ -34,7 +40,11 @@ if not POSTGRES_URL:
 
 # Performance tuning parameters
 BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "50"))
-MAX_CONCURRENT_REQUESTS = int(os.getenv("MAX_CONCURRENT_REQUESTS", "10"))
+MAX_CONCURRENT_REQUESTS = int(os.getenv("MAX_CONCURRENT_REQUESTS", "10"))  # Starting limit
+MIN_CONCURRENT_REQUESTS = int(os.getenv("MIN_CONCURRENT_REQUESTS", "1"))
+MAX_CONCURRENCY_LIMIT = int(os.getenv("MAX_CONCURRENCY_LIMIT", "64"))
+LATENCY_TOLERANCE = float(os.getenv("EMBEDDING_LATENCY_TOLERANCE", "2.0"))
+OVERLOAD_STATUSES = frozenset({429, 503})
 CONNECTION_POOL_SIZE = int(os.getenv("CONNECTION_POOL_SIZE", "20"))
 CACHE_TTL_SECONDS = int(os.getenv("EMBEDDING_CACHE_TTL", "86400"))  # 24 hours
 
@@ -54,7 +64,7 @@ class EmbeddingResult:
     """Structured embedding result with metadata"""
 
     text_id: str
-    embedding: Optional[List[float]]
+    embedding: Optional[np.ndarray]
     processing_time_ms: float
     cache_hit: bool
     error: Optional[str] = None
@@ -72,14 +82,14 @@ class HighPerformanceEmbeddingCache:
         except Exception as e:
             logger.warning(f"Redis unavailable, falling back to memory cache: {e}")
             self.redis_client = None
-            self._memory_cache: Dict[str, Tuple[List[float], float]] = {}
+            self._memory_cache: Dict[str, Tuple[np.ndarray, float]] = {}
 
     def _get_cache_key(self, text: str, model: str) -> str:
         """Generate deterministic cache key"""
         content = f"{model}:{text}"
         return f"emb:{hashlib.sha256(content.encode()).hexdigest()}"
 
-    async def get_batch(self, requests: List[EmbeddingRequest]) -> Dict[str, List[float]]:
+    async def get_batch(self, requests: List[EmbeddingRequest]) -> Dict[str, np.ndarray]:
         """Get multiple embeddings from cache in single round-trip"""
         if not self.redis_client:
             return self._get_batch_memory(requests)
@@ -97,7 +107,7 @@ class HighPerformanceEmbeddingCache:
             for req, cached_data in zip(requests, cached_results):
                 if cached_data:
                     try:
-                        embedding = np.frombuffer(cached_data, dtype=np.float32).tolist()
+                        embedding = np.frombuffer(cached_data, dtype=np.float32)
                         if len(embedding) == EMBEDDING_DIMENSIONS:
                             results[req.text_id] = embedding
                     except Exception as e:
@@ -108,7 +118,7 @@ class HighPerformanceEmbeddingCache:
             logger.error(f"Batch cache retrieval failed: {e}")
             return {}
 
-    def _get_batch_memory(self, requests: List[EmbeddingRequest]) -> Dict[str, List[float]]:
+    def _get_batch_memory(self, requests: List[EmbeddingRequest]) -> Dict[str, np.ndarray]:
         """Fallback memory cache implementation"""
         results = {}
         current_time = time.time()
@@ -133,10 +143,10 @@ class HighPerformanceEmbeddingCache:
         try:
             pipe = self.redis_client.pipeline()
             for result in results:
-                if result.embedding and not result.error:
+                if result.embedding is not None and not result.error:
                     cache_key = self._get_cache_key(result.text_id, EMBEDDING_MODEL)
                     # Store as efficient float32 binary data
-                    binary_data = np.array(result.embedding, dtype=np.float32).tobytes()
+                    binary_data = np.asarray(result.embedding, dtype=np.float32).tobytes()
                     pipe.setex(cache_key, CACHE_TTL_SECONDS, binary_data)
             pipe.execute()
 
@@ -147,7 +157,7 @@ class HighPerformanceEmbeddingCache:
         """Fallback memory cache storage"""
         current_time = time.time()
         for result in results:
-            if result.embedding and not result.error:
+            if result.embedding is not None and not result.error:
                 cache_key = self._get_cache_key(result.text_id, EMBEDDING_MODEL)
                 self._memory_cache[cache_key] = (result.embedding, current_time)
 
@@ -163,14 +173,24 @@ class BatchEmbeddingGenerator:
             "cache_hits": 0,
             "api_calls": 0,
             "errors": 0,
+            "coalesced_requests": 0,
             "total_time_ms": 0.0,
         }
+        # Embedding calls currently running, keyed by model + text hash
+        self._in_flight: Dict[str, asyncio.Task] = {}
+        # Shared across batches so the learned limit carries over
+        self.limiter = AdaptiveConcurrencyLimiter(
+            initial_limit=MAX_CONCURRENT_REQUESTS,
+            min_limit=MIN_CONCURRENT_REQUESTS,
+            max_limit=MAX_CONCURRENCY_LIMIT,
+            latency_tolerance=LATENCY_TOLERANCE,
+        )
 
     async def __aenter__(self):
         """Async context manager setup"""
         connector = aiohttp.TCPConnector(
-            limit=CONNECTION_POOL_SIZE,
-            limit_per_host=MAX_CONCURRENT_REQUESTS,
+            limit=max(CONNECTION_POOL_SIZE, MAX_CONCURRENCY_LIMIT),
+            limit_per_host=MAX_CONCURRENCY_LIMIT,
             keepalive_timeout=30,
             enable_cleanup_closed=True,
         )
@@ -218,7 +238,7 @@ class BatchEmbeddingGenerator:
             results.extend(api_results)
 
             # Step 3: Cache new results
-            await self.cache.set_batch([r for r in api_results if r.embedding])
+            await self.cache.set_batch([r for r in api_results if r.embedding is not None])
 
         # Update statistics
         total_time = (time.time() - start_time) * 1000
@@ -235,15 +255,9 @@ class BatchEmbeddingGenerator:
     async def _process_api_requests(
         self, requests: List[EmbeddingRequest]
     ) -> List[EmbeddingResult]:
-        """Process API requests with controlled concurrency"""
-        semaphore = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
-
-        async def process_single_request(req: EmbeddingRequest) -> EmbeddingResult:
-            async with semaphore:
-                return await self._generate_single_embedding(req)
-
-        # Execute requests with concurrency control
-        tasks = [process_single_request(req) for req in requests]
+        """Process API requests; concurrency is bounded by the adaptive limiter"""
+        # Duplicate texts share one call
+        tasks = [self._coalesced_request(req, self._generate_single_embedding) for req in requests]
         results = await asyncio.gather(*tasks, return_exceptions=True)
 
         # Handle exceptions and convert to EmbeddingResult objects
@@ -262,10 +276,32 @@ class BatchEmbeddingGenerator:
                 self.stats["errors"] += 1
             else:
                 processed_results.append(result)
-                self.stats["api_calls"] += 1
 
         return processed_results
 
+    async def _coalesced_request(self, req: EmbeddingRequest, call) -> EmbeddingResult:
+        """Run call(req), or await the identical request already in flight"""
+        text_hash = hashlib.sha256((req.text or "").encode("utf-8")).hexdigest()
+        key = f"{req.model}:{text_hash}"
+
+        task = self._in_flight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(call(req))
+            self._in_flight[key] = task
+
+            def release(done: asyncio.Task, key: str = key) -> None:
+                if self._in_flight.get(key) is done:
+                    del self._in_flight[key]
+
+            task.add_done_callback(release)
+            self.stats["api_calls"] += 1
+            # Shielded so one cancelled caller does not cancel the shared call
+            return await asyncio.shield(task)
+
+        self.stats["coalesced_requests"] += 1
+        result = await asyncio.shield(task)
+        return replace(result, text_id=req.text_id)
+
     async def _generate_single_embedding(self, request: EmbeddingRequest) -> EmbeddingResult:
         """Generate single embedding with comprehensive error handling"""
         start_time = time.time()
@@ -283,40 +319,45 @@ class BatchEmbeddingGenerator:
         text = self._smart_truncate(request.text, max_length=8000)
 
         try:
-            async with self.session.post(
-                f"{OLLAMA_URL}/api/embeddings", json={"model": request.model, "prompt": text}
-            ) as response:
-
-                if response.status == 200:
-                    data = await response.json()
-                    embedding = data.get("embedding", [])
-
-                    # Validate and normalize embedding
-                    if self._validate_embedding(embedding):
-                        processing_time = (time.time() - start_time) * 1000
-                        return EmbeddingResult(
-                            text_id=request.text_id,
-                            embedding=embedding,
-                            processing_time_ms=processing_time,
-                            cache_hit=False,
-                        )
+            async with self.limiter.slot() as slot:
+                async with self.session.post(
+                    f"{OLLAMA_URL}/api/embeddings", json={"model": request.model, "prompt": text}
+                ) as response:
+
+                    if response.status == 200:
+                        data = await response.json()
+                        embedding = self._to_embedding_array(data.get("embedding"))
+
+                        # Validate and normalize embedding
+                        if embedding is not None and self._validate_embedding(embedding):
+                            processing_time = (time.time() - start_time) * 1000
+                            return EmbeddingResult(
+                                text_id=request.text_id,
+                                embedding=embedding,
+                                processing_time_ms=processing_time,
+                                cache_hit=False,
+                            )
+                        else:
+                            return EmbeddingResult(
+                                text_id=request.text_id,
+                                embedding=None,
+                                processing_time_ms=0.0,
+                                cache_hit=False,
+                                error="Invalid embedding format",
+                            )
                     else:
+                        if response.status in OVERLOAD_STATUSES:
+                            slot.overload()
+                        else:
+                            slot.drop()
+                        error_text = await response.text()
                         return EmbeddingResult(
                             text_id=request.text_id,
                             embedding=None,
                             processing_time_ms=0.0,
                             cache_hit=False,
-                            error="Invalid embedding format",
+                            error=f"API error {response.status}: {error_text[:200]}",
                         )
-                else:
-                    error_text = await response.text()
-                    return EmbeddingResult(
-                        text_id=request.text_id,
-                        embedding=None,
-                        processing_time_ms=0.0,
-                        cache_hit=False,
-                        error=f"API error {response.status}: {error_text[:200]}",
-                    )
 
         except Exception as e:
             return EmbeddingResult(
@@ -348,21 +389,27 @@ class BatchEmbeddingGenerator:
         last_space = truncated.rfind(" ")
         return text[:last_space] if last_space > 0 else text[:max_length]
 
-    def _validate_embedding(self, embedding: List[float]) -> bool:
-        """Validate embedding format and values"""
-        if not isinstance(embedding, list) or len(embedding) != EMBEDDING_DIMENSIONS:
-            return False
+    @staticmethod
+    def _to_embedding_array(raw: Any) -> Optional[np.ndarray]:
+        """Convert an API embedding payload to a float32 vector, None if not numeric"""
+        if not isinstance(raw, (list, np.ndarray)):
+            return None
+        try:
+            return np.asarray(raw, dtype=np.float32)
+        except (TypeError, ValueError):
+            return None
 
-        if not all(isinstance(x, (int, float)) for x in embedding):
+    def _validate_embedding(self, embedding: np.ndarray) -> bool:
+        """Validate embedding format and values"""
+        if not isinstance(embedding, np.ndarray) or embedding.shape != (EMBEDDING_DIMENSIONS,):
             return False
 
         # Check for NaN or infinite values
-        arr = np.array(embedding)
-        if np.any(np.isnan(arr)) or np.any(np.isinf(arr)):
+        if not np.isfinite(embedding).all():
             return False
 
         # Check magnitude is reasonable (not zero vector)
-        magnitude = np.linalg.norm(arr)
+        magnitude = np.linalg.norm(embedding)
         return 0.01 < magnitude < 100.0
 
     def get_performance_stats(self) -> Dict:
@@ -380,11 +427,13 @@ class BatchEmbeddingGenerator:
             "avg_processing_time_ms": avg_time,
             "error_rate": self.stats["errors"] / max(self.stats["total_requests"], 1),
             "api_calls": self.stats["api_calls"],
+            "coalesced_requests": self.stats["coalesced_requests"],
+            **self.limiter.get_stats(),
         }
 
 
 # Production integration functions
-async def batch_generate_embeddings(texts: List[Tuple[str, str]]) -> Dict[str, List[float]]:
+async def batch_generate_embeddings(texts: List[Tuple[str, str]]) -> Dict[str, np.ndarray]:
     """
     Main entry point for batch embedding generation
 
@@ -409,7 +458,7 @@ async def batch_generate_embeddings(texts: List[Tuple[str, str]]) -> Dict[str, L
         }
 
 
-def sync_batch_generate_embeddings(texts: List[Tuple[str, str]]) -> Dict[str, List[float]]:
+def sync_batch_generate_embeddings(texts: List[Tuple[str, str]]) -> Dict[str, np.ndarray]:
     """Synchronous wrapper for integration with existing code"""
     return asyncio.run(batch_generate_embeddings(texts))
 
@@ -0,0 +1,36 @@
+{% macro embedding_store_relation() %}
+  {#- Latest embeddings per content hash from the Parquet store that
+      scripts/embedding_store.py writes; an empty typed relation until the
+      store holds any files, so a first run does not fail on an empty glob -#}
+  {%- set store_glob = var('embedding_store_path') ~ '/*.parquet' -%}
+  {%- set has_files = false -%}
+  {%- if execute -%}
+    {%- set result = run_query("SELECT COUNT(*) FROM glob('" ~ store_glob ~ "')") -%}
+    {%- set has_files = result.columns[0].values()[0] > 0 -%}
+  {%- endif -%}
+  {% if has_files %}
+    (
+      SELECT
+          content_hash,
+          content_embedding::FLOAT[768] as content_embedding,
+          summary_embedding::FLOAT[768] as summary_embedding,
+          context_embedding::FLOAT[768] as context_embedding,
+          embedding_model,
+          generated_at
+      FROM read_parquet('{{ store_glob }}', union_by_name = true)
+      WHERE embedding_model = '{{ var("embedding_model") }}'
+      QUALIFY ROW_NUMBER() OVER (PARTITION BY content_hash ORDER BY generated_at DESC) = 1
+    )
+  {% else %}
+    (
+      SELECT
+          NULL::VARCHAR as content_hash,
+          NULL::FLOAT[768] as content_embedding,
+          NULL::FLOAT[768] as summary_embedding,
+          NULL::FLOAT[768] as context_embedding,
+          NULL::VARCHAR as embedding_model,
+          NULL::TIMESTAMP as generated_at
+      WHERE FALSE
+    )
+  {% endif %}
+{% endmacro %}
@@ -0,0 +1,14 @@
+{% macro reconcile_memories_mirror() %}
+  {#- Delete mirror rows whose id no longer exists upstream; only the id column is scanned.
+      Enabled with --vars '{reconcile_memories_mirror: true}' on periodic runs -#}
+  {% if is_incremental() and var('reconcile_memories_mirror', false) %}
+    DELETE FROM {{ this }} AS mirror
+    WHERE NOT EXISTS (
+        SELECT 1
+        FROM postgres_scan('{{ var("postgres_url") }}', 'public', 'memories') AS source
+        WHERE source.id = mirror.id
+    )
+  {% else %}
+    SELECT 1
+  {% endif %}
+{% endmacro %}
@@ -4,18 +4,27 @@ Ollama Embedding Generation for Biological Memory System
 Provides DuckDB UDF integration for semantic embeddings
 """
 
+import fcntl
 import hashlib
 import logging
 import os
 import pickle
+import sys
+import threading
 import time
+import zlib
+from contextlib import contextmanager
 from pathlib import Path
-from typing import List, Optional, Tuple
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
 
 import duckdb
 import numpy as np
 import requests
 
+# Repository root, so the macro shares src.utils with the service layer
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+from src.utils.single_flight import SingleFlight  # noqa: E402
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -24,97 +33,531 @@ logger = logging.getLogger(__name__)
 OLLAMA_URL = os.getenv("OLLAMA_URL", "http://localhost:11434")
 EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "nomic-embed-text")
 EMBEDDING_DIMENSIONS = 768
+EMBEDDING_DTYPE = np.float32
 CACHE_DIR = Path(os.getenv("EMBEDDING_CACHE_DIR", "./embedding_cache"))
+MAX_TEXT_LENGTH = 8000
+
+# Tag-set embedding strategy: "concat" embeds the joined tag string, "pooled"
+# mean-pools one vocabulary vector per distinct normalized tag
+TAG_EMBEDDING_STRATEGIES = ("concat", "pooled")
+TAG_EMBEDDING_STRATEGY = os.getenv("TAG_EMBEDDING_STRATEGY", "concat")
+
+# Batch request budget for /api/embed (inputs per request and total characters)
+EMBED_BATCH_MAX_INPUTS = int(os.getenv("EMBED_BATCH_MAX_INPUTS", "64"))
+EMBED_BATCH_MAX_CHARS = int(os.getenv("EMBED_BATCH_MAX_CHARS", "64000"))
+
+# Segment store tuning
+CACHE_SHARDS = int(os.getenv("EMBEDDING_CACHE_SHARDS", "16"))
+CACHE_FSYNC = os.getenv("EMBEDDING_CACHE_FSYNC", "false").lower() == "true"
+CACHE_COMPACTION_RATIO = float(os.getenv("EMBEDDING_CACHE_COMPACTION_RATIO", "0.5"))
+CACHE_COMPACTION_MIN_DEAD = 1024
+INDEX_MERGE_THRESHOLD = 4096
+
+# Fixed-width segment record: sha256 key as four uint64 words, CRC32 of key+vector,
+# reserved flags word, then the float32 vector. Offsets are slot * itemsize.
+SEGMENT_RECORD_DTYPE = np.dtype(
+    [
+        ("key", "<u8", (4,)),
+        ("crc", "<u4"),
+        ("flags", "<u4"),
+        ("vector", "<f4", (EMBEDDING_DIMENSIONS,)),
+    ]
+)
 
 # Create cache directory
 CACHE_DIR.mkdir(exist_ok=True)
 
 
+def _record_crc(key_words: np.ndarray, vector: np.ndarray) -> int:
+    """CRC32 over a record's key and vector bytes, used to reject torn appends"""
+    return zlib.crc32(vector, zlib.crc32(key_words))
+
+
+class _SegmentShard:
+    """
+    One append-only float32 segment file plus its in-memory hash index
+
+    Segments are shared by every process using EMBEDDING_CACHE_DIR. Appends and
+    compaction hold an exclusive flock on a sidecar .lock file, take record slots
+    from the file offset they actually write at, and first index whatever other
+    processes appended. A miss rescans under a shared lock: new records past the
+    known size are indexed, and a changed inode (another process compacted) reloads
+    the segment. Hits on an older mapping stay valid because the replaced file keeps
+    its data until unmapped.
+    """
+
+    def __init__(self, path: Path, fsync: bool = CACHE_FSYNC):
+        self.path = path
+        self.lock_path = path.with_suffix(".lock")
+        self.fsync = fsync
+        self.lock = threading.RLock()
+        self._reset()
+        with self.lock, self._file_lock(exclusive=False):
+            self._load()
+
+    def _reset(self) -> None:
+        self.records = 0
+        self.dead_records = 0
+        self._inode: Optional[int] = None
+        self._map: Optional[np.memmap] = None
+        self._mapped_records = 0
+        # Sorted 64-bit key prefixes -> record slot, plus a dict for recent appends
+        self._index_keys = np.empty(0, dtype=np.uint64)
+        self._index_slots = np.empty(0, dtype=np.int64)
+        self._pending: Dict[int, int] = {}
+
+    @contextmanager
+    def _file_lock(self, exclusive: bool) -> Iterator[None]:
+        """flock on the shard's sidecar lock file, released when the file closes"""
+        with open(self.lock_path, "a") as f:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            yield
+
+    def _load(self) -> None:
+        """Map the segment and rebuild the index from its key column"""
+        self._reset()
+        try:
+            stat = self.path.stat()
+        except FileNotFoundError:
+            return
+
+        # A torn tail is ignored here and truncated by the next append
+        self._inode = stat.st_ino
+        self.records = stat.st_size // SEGMENT_RECORD_DTYPE.itemsize
+        if self.records == 0:
+            return
+
+        self._remap()
+        self._rebuild_index(np.ascontiguousarray(self._map["key"][:, 0]))
+
+    def _refresh(self) -> None:
+        """Pick up records other processes appended, or reload after their compaction"""
+        try:
+            stat = self.path.stat()
+        except FileNotFoundError:
+            if self._inode is not None:
+                self._reset()
+            return
+
+        if stat.st_ino != self._inode:
+            self._load()
+            return
+
+        records = stat.st_size // SEGMENT_RECORD_DTYPE.itemsize
+        if records > self.records:
+            start = self.records
+            self.records = records
+            self._remap()
+            self._index_appended(self._map["key"][start:records, 0].tolist(), start)
+
+    def _rebuild_index(self, prefixes: np.ndarray) -> None:
+        """Index the last occurrence of each key; earlier occurrences are dead"""
+        keys, first_from_end = np.unique(prefixes[::-1], return_index=True)
+        self._index_keys = keys
+        self._index_slots = (len(prefixes) - 1 - first_from_end).astype(np.int64)
+        self._pending = {}
+        self.dead_records = len(prefixes) - len(keys)
+
+    def _index_appended(self, prefixes: List[int], first_slot: int) -> None:
+        """Index records written at consecutive slots from first_slot"""
+        for i, prefix in enumerate(prefixes):
+            if self._lookup(prefix) is not None:
+                self.dead_records += 1
+            self._pending[prefix] = first_slot + i
+
+        if len(self._pending) >= INDEX_MERGE_THRESHOLD:
+            self._merge_pending()
+
+    def _remap(self) -> None:
+        """(Re)map the segment file so newly appended records become visible"""
+        self._map = np.memmap(
+            self.path, dtype=SEGMENT_RECORD_DTYPE, mode="r", shape=(self.records,)
+        )
+        self._mapped_records = self.records
+
+    def _lookup(self, prefix: int) -> Optional[int]:
+        slot = self._pending.get(prefix)
+        if slot is not None:
+            return slot
+        pos = int(np.searchsorted(self._index_keys, np.uint64(prefix)))
+        if pos < len(self._index_keys) and int(self._index_keys[pos]) == prefix:
+            return int(self._index_slots[pos])
+        return None
+
+    def _forget(self, prefix: int) -> None:
+        """Drop a key from the index so compaction reclaims its record"""
+        if self._pending.pop(prefix, None) is None:
+            pos = int(np.searchsorted(self._index_keys, np.uint64(prefix)))
+            if pos < len(self._index_keys) and int(self._index_keys[pos]) == prefix:
+                self._index_keys = np.delete(self._index_keys, pos)
+                self._index_slots = np.delete(self._index_slots, pos)
+        self.dead_records += 1
+
+    def _merge_pending(self) -> None:
+        """Fold recent appends into the sorted index arrays"""
+        if not self._pending:
+            return
+        new_keys = np.fromiter(self._pending.keys(), dtype=np.uint64, count=len(self._pending))
+        new_slots = np.fromiter(self._pending.values(), dtype=np.int64, count=len(self._pending))
+        keep = ~np.isin(self._index_keys, new_keys)
+        keys = np.concatenate([self._index_keys[keep], new_keys])
+        slots = np.concatenate([self._index_slots[keep], new_slots])
+        order = np.argsort(keys, kind="stable")
+        self._index_keys = keys[order]
+        self._index_slots = slots[order]
+        self._pending = {}
+
+    def get(self, key_words: np.ndarray) -> Optional[np.ndarray]:
+        """Return a read-only view of the stored vector, or None on miss/corruption"""
+        with self.lock:
+            prefix = int(key_words[0])
+            slot = self._lookup(prefix)
+            if slot is None or slot >= self._mapped_records:
+                # Another process may have appended or compacted since the last look
+                with self._file_lock(exclusive=False):
+                    self._refresh()
+                    if self._mapped_records < self.records:
+                        self._remap()
+                slot = self._lookup(prefix)
+                if slot is None:
+                    return None
+
+            stored_key = self._map["key"][slot]
+            vector = self._map["vector"][slot]
+            if not np.array_equal(stored_key, key_words):
+                return None  # 64-bit prefix collision, different full key
+            if _record_crc(stored_key, vector) != int(self._map["crc"][slot]):
+                logger.warning(f"Corrupt cache record in {self.path.name}, slot {slot}")
+                self._forget(prefix)
+                return None
+            return vector
+
+    def append(self, key_words: np.ndarray, vectors: np.ndarray) -> None:
+        """Append records in a single write; the index is updated only after the write lands"""
+        records = np.zeros(len(key_words), dtype=SEGMENT_RECORD_DTYPE)
+        records["key"] = key_words
+        records["vector"] = vectors
+        for i in range(len(records)):
+            records["crc"][i] = _record_crc(records["key"][i], records["vector"][i])
+
+        itemsize = SEGMENT_RECORD_DTYPE.itemsize
+        with self.lock, self._file_lock(exclusive=True):
+            self._refresh()
+            with open(self.path, "ab") as f:
+                offset = f.seek(0, os.SEEK_END)
+                if offset % itemsize:
+                    # Interrupted append left a partial record at the tail - drop it
+                    logger.warning(
+                        f"Truncating torn tail of {self.path.name} ({offset % itemsize} bytes)"
+                    )
+                    offset -= offset % itemsize
+                    f.truncate(offset)
+                f.write(records.tobytes())
+                f.flush()
+                if self.fsync:
+                    os.fsync(f.fileno())
+                self._inode = os.fstat(f.fileno()).st_ino
+
+            first_slot = offset // itemsize
+            self._index_appended(key_words[:, 0].tolist(), first_slot)
+            self.records = first_slot + len(records)
+
+    def needs_compaction(self) -> bool:
+        return (
+            self.dead_records >= CACHE_COMPACTION_MIN_DEAD
+            and self.dead_records > self.records * CACHE_COMPACTION_RATIO
+        )
+
+    def compact(self) -> int:
+        """Rewrite live records to a fresh segment and atomically swap it in"""
+        with self.lock, self._file_lock(exclusive=True):
+            self._refresh()
+            if self.dead_records == 0:
+                return 0
+            self._merge_pending()
+            if self._mapped_records < self.records:
+                self._remap()
+
+            # Keep append order so re-indexing after compaction is stable
+            live = np.array(self._map[np.sort(self._index_slots)])
+            temp_path = self.path.with_suffix(".compact")
+            with open(temp_path, "wb") as f:
+                f.write(live.tobytes())
+                f.flush()
+                os.fsync(f.fileno())
+            temp_path.replace(self.path)  # Atomic swap; existing views keep the old mapping
+
+            reclaimed = self.dead_records
+            self.records = len(live)
+            self._inode = self.path.stat().st_ino
+            self._map = None
+            self._mapped_records = 0
+            if self.records:
+                self._remap()
+            self._rebuild_index(np.ascontiguousarray(live["key"][:, 0]))
+            logger.info(f"Compacted {self.path.name}: reclaimed {reclaimed} dead records")
+            return reclaimed
+
+
 class EmbeddingCache:
-    """Simple file-based cache for embeddings to avoid redundant API calls"""
+    """
+    Sharded, append-only float32 segment store for embeddings
+
+    Each shard is a single memory-mapped segment file of fixed-width records keyed by
+    sha256(model:text). Lookups return zero-copy read-only ndarray views into the map,
+    appends are single writes guarded by a per-record CRC so a torn tail is discarded
+    by the next append, and superseded records are reclaimed by compaction. Several
+    processes may share one cache directory (see _SegmentShard).
+    """
 
-    def __init__(self, cache_dir: Path = CACHE_DIR):
+    def __init__(
+        self, cache_dir: Path = CACHE_DIR, shards: int = CACHE_SHARDS, fsync: bool = CACHE_FSYNC
+    ):
         self.cache_dir = cache_dir
+        self.num_shards = max(1, shards)
+        self.fsync = fsync
+        self._shards: Dict[int, _SegmentShard] = {}
+        self._shards_lock = threading.Lock()
+        self._legacy_checked = False
 
     def _get_cache_key(self, text: str, model: str) -> str:
         """Generate cache key from text and model"""
         content = f"{model}:{text}"
         return hashlib.sha256(content.encode()).hexdigest()
 
-    def get(self, text: str, model: str) -> Optional[List[float]]:
-        """Retrieve cached embedding if exists"""
-        try:
-            cache_key = self._get_cache_key(text, model)
-            cache_file = self.cache_dir / f"{cache_key}.pkl"
+    def _get_key_words(self, text: str, model: str) -> np.ndarray:
+        """Raw sha256 digest as the four uint64 words stored in each record"""
+        digest = hashlib.sha256(f"{model}:{text}".encode()).digest()
+        return np.frombuffer(digest, dtype="<u8")
+
+    def _shard(self, shard_id: int) -> _SegmentShard:
+        """Open a shard lazily so importing the module never scans segment files"""
+        with self._shards_lock:
+            if not self._legacy_checked:
+                self._legacy_checked = True
+                self._migrate_legacy_pickles()
+            shard = self._shards.get(shard_id)
+            if shard is None:
+                self.cache_dir.mkdir(parents=True, exist_ok=True)
+                path = self.cache_dir / f"shard-{shard_id:03d}.d{EMBEDDING_DIMENSIONS}.seg"
+                shard = _SegmentShard(path, fsync=self.fsync)
+                self._shards[shard_id] = shard
+            return shard
+
+    def _shard_id(self, key_words: np.ndarray) -> int:
+        return int(key_words[0] % self.num_shards)
+
+    def _migrate_legacy_pickles(self) -> None:
+        """Fold one-pickle-per-vector cache files into the segment store"""
+        legacy_files = list(self.cache_dir.glob("*.pkl")) if self.cache_dir.exists() else []
+        if not legacy_files:
+            return
+
+        logger.info(f"Migrating {len(legacy_files)} legacy pickle cache files")
+        migrated: Dict[int, Tuple[List[np.ndarray], List[np.ndarray]]] = {}
+        for cache_file in legacy_files:
+            try:
+                with open(cache_file, "rb") as f:
+                    embedding = np.asarray(pickle.load(f), dtype=np.float32)
+                key_words = np.frombuffer(bytes.fromhex(cache_file.stem), dtype="<u8")
+                if embedding.shape == (EMBEDDING_DIMENSIONS,) and len(key_words) == 4:
+                    keys, vectors = migrated.setdefault(self._shard_id(key_words), ([], []))
+                    keys.append(key_words)
+                    vectors.append(embedding)
+            except Exception as e:
+                logger.warning(f"Skipping unreadable legacy cache file {cache_file.name}: {e}")
 
-            if cache_file.exists():
-                try:
-                    with open(cache_file, "rb") as f:
-                        embedding = pickle.load(f)
-                        # Validate embedding format
-                        if isinstance(embedding, list) and len(embedding) == EMBEDDING_DIMENSIONS:
-                            return embedding
-                        else:
-                            logger.warning(
-                                f"Invalid cached embedding format for {cache_key[:8]}..."
-                            )
-                            cache_file.unlink()  # Remove corrupted cache
-                except (pickle.PickleError, EOFError, ValueError) as e:
-                    logger.warning(f"Cache corruption detected: {e}")
-                    try:
-                        cache_file.unlink()  # Remove corrupted cache
-                    except OSError:
-                        pass
-        except Exception as e:
-            logger.error(f"Unexpected error accessing cache: {e}")
+        for shard_id, (keys, vectors) in migrated.items():
+            path = self.cache_dir / f"shard-{shard_id:03d}.d{EMBEDDING_DIMENSIONS}.seg"
+            shard = self._shards.setdefault(shard_id, _SegmentShard(path, fsync=self.fsync))
+            shard.append(np.stack(keys), np.stack(vectors))
 
-        return None
+        for cache_file in legacy_files:
+            try:
+                cache_file.unlink()
+            except OSError:
+                pass
 
-    def set(self, text: str, model: str, embedding: List[float]) -> None:
-        """Store embedding in cache"""
-        try:
-            # Validate input
-            if not isinstance(embedding, list) or len(embedding) != EMBEDDING_DIMENSIONS:
-                dim_info = len(embedding) if isinstance(embedding, list) else "not list"
-                logger.warning(f"Invalid embedding dimensions: {dim_info}")
-                return
-
-            # Validate embedding values
-            if not all(
-                isinstance(x, (int, float)) and not np.isnan(x) and not np.isinf(x)
-                for x in embedding
-            ):
-                logger.warning("Invalid embedding values detected (NaN or Inf)")
-                return
-
-            cache_key = self._get_cache_key(text, model)
-            cache_file = self.cache_dir / f"{cache_key}.pkl"
-
-            # Ensure cache directory exists
-            self.cache_dir.mkdir(exist_ok=True)
-
-            # Atomic write to prevent corruption
-            temp_file = cache_file.with_suffix(".tmp")
+    def get(self, text: str, model: str) -> Optional[np.ndarray]:
+        """Retrieve cached embedding if exists"""
+        return self.get_batch([text], model)[0]
+
+    def get_batch(self, texts: List[str], model: str) -> List[Optional[np.ndarray]]:
+        """Retrieve cached embeddings for many texts; misses are returned as None"""
+        results: List[Optional[np.ndarray]] = []
+        for text in texts:
             try:
-                with open(temp_file, "wb") as f:
-                    pickle.dump(embedding, f)
-                temp_file.replace(cache_file)  # Atomic move
-                logger.debug(f"Cached embedding for {cache_key[:8]}...")
+                key_words = self._get_key_words(text, model)
+                results.append(self._shard(self._shard_id(key_words)).get(key_words))
             except Exception as e:
-                logger.error(f"Failed to write cache file: {e}")
-                if temp_file.exists():
-                    temp_file.unlink()
+                logger.error(f"Unexpected error accessing cache: {e}")
+                results.append(None)
+        return results
+
+    def set(self, text: str, model: str, embedding: Sequence[float]) -> None:
+        """Store embedding in cache"""
+        self.set_batch([text], model, [embedding])
+
+    def set_batch(self, texts: List[str], model: str, embeddings: Sequence[Sequence[float]]) -> int:
+        """Store many embeddings, one append per shard; returns the number stored"""
+        try:
+            rows: List[np.ndarray] = []
+            row_texts: List[str] = []
+            for text, embedding in zip(texts, embeddings):
+                vector = np.asarray(embedding, dtype=np.float32)
+                if vector.shape != (EMBEDDING_DIMENSIONS,):
+                    logger.warning(f"Invalid embedding dimensions: {vector.shape}")
+                    continue
+                rows.append(vector)
+                row_texts.append(text)
+            if not rows:
+                return 0
+
+            matrix = np.stack(rows)
+            finite = np.isfinite(matrix).all(axis=1)
+            if not finite.all():
+                logger.warning(f"Skipping {int((~finite).sum())} embeddings with NaN or Inf values")
+
+            grouped: Dict[int, Tuple[List[np.ndarray], List[int]]] = {}
+            for row, text in enumerate(row_texts):
+                if finite[row]:
+                    key_words = self._get_key_words(text, model)
+                    keys, indices = grouped.setdefault(self._shard_id(key_words), ([], []))
+                    keys.append(key_words)
+                    indices.append(row)
+
+            stored = 0
+            for shard_id, (keys, indices) in grouped.items():
+                shard = self._shard(shard_id)
+                shard.append(np.stack(keys), matrix[indices])
+                stored += len(indices)
+                if shard.needs_compaction():
+                    shard.compact()
+            return stored
         except Exception as e:
             logger.error(f"Failed to cache embedding: {e}")
+            return 0
+
+    def compact(self) -> int:
+        """Compact every shard on disk; returns the number of dead records reclaimed"""
+        reclaimed = 0
+        for shard_id in range(self.num_shards):
+            path = self.cache_dir / f"shard-{shard_id:03d}.d{EMBEDDING_DIMENSIONS}.seg"
+            if shard_id in self._shards or path.exists():
+                reclaimed += self._shard(shard_id).compact()
+        return reclaimed
+
+    def get_stats(self) -> Dict[str, int]:
+        """Record counts across the shards opened so far"""
+        shards = list(self._shards.values())
+        return {
+            "shards_open": len(shards),
+            "records": sum(s.records for s in shards),
+            "dead_records": sum(s.dead_records for s in shards),
+            "bytes": sum(s.records for s in shards) * SEGMENT_RECORD_DTYPE.itemsize,
+        }
 
 
 # Initialize cache
 cache = EmbeddingCache()
+embedding_flights = SingleFlight()
+
+
+def _validate_api_embedding(embedding: object) -> Optional[np.ndarray]:
+    """
+    Validate an embedding returned by Ollama and coerce it to a float32 vector
+
+    Pads short vectors with small noise, truncates long ones and L2-normalizes the
+    result, matching /api/embed. Returns None when the vector is unusable.
+    """
+    # Validate response format
+    if not isinstance(embedding, (list, np.ndarray)):
+        logger.error("Invalid response format: embedding is not a list")
+        return None
+
+    try:
+        vector = np.asarray(embedding, dtype=EMBEDDING_DTYPE)
+    except (TypeError, ValueError):
+        logger.error("Invalid embedding values detected (NaN, Inf, or non-numeric)")
+        return None
+
+    if vector.ndim != 1 or vector.size == 0:
+        logger.error("Empty embedding received from API")
+        return None
+
+    # Validate dimensions and fix if necessary
+    if vector.size != EMBEDDING_DIMENSIONS:
+        logger.warning(f"Expected {EMBEDDING_DIMENSIONS} dimensions, got {vector.size}")
+        if vector.size < EMBEDDING_DIMENSIONS:
+            # Pad with small random values instead of zeros
+            padding = np.random.normal(0, 0.01, EMBEDDING_DIMENSIONS - vector.size)
+            vector = np.concatenate([vector, padding.astype(EMBEDDING_DTYPE)])
+        else:
+            vector = vector[:EMBEDDING_DIMENSIONS]
+
+    # Validate embedding values
+    if not np.isfinite(vector).all():
+        logger.error("Invalid embedding values detected (NaN, Inf, or non-numeric)")
+        return None
+
+    # Ensure embedding has reasonable magnitude
+    magnitude = float(np.linalg.norm(vector))
+    if magnitude == 0:
+        logger.error("Zero-magnitude embedding received")
+        return None
+
+    # /api/embed returns unit vectors; normalizing here keeps both endpoints interchangeable
+    return vector / magnitude
+
+
+def _unit_rows(vectors: np.ndarray) -> np.ndarray:
+    """
+    L2-normalize a vector or the rows of a matrix
+
+    Cached vectors written before both endpoints were normalized may still hold raw
+    /api/embeddings output, so cache reads pass through here too.
+    """
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.where(norms > 0, norms, 1).astype(vectors.dtype)
+
+
+def _validate_api_embeddings(embeddings: list) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Validate a batch of embeddings into a (n, EMBEDDING_DIMENSIONS) float32 matrix
+
+    Well-formed responses are checked with whole-matrix operations; ragged ones fall
+    back to per-row validation. Returns the matrix and a boolean mask of valid rows.
+    """
+    count = len(embeddings)
+    try:
+        matrix = np.asarray(embeddings, dtype=EMBEDDING_DTYPE)
+    except (TypeError, ValueError):
+        matrix = None
+
+    if matrix is None or matrix.shape != (count, EMBEDDING_DIMENSIONS):
+        matrix = np.zeros((count, EMBEDDING_DIMENSIONS), dtype=EMBEDDING_DTYPE)
+        valid = np.zeros(count, dtype=bool)
+        for row, embedding in enumerate(embeddings):
+            vector = _validate_api_embedding(embedding)
+            if vector is not None:
+                matrix[row] = vector
+                valid[row] = True
+        return matrix, valid
+
+    finite = np.isfinite(matrix).all(axis=1)
+    matrix[~finite] = 0.0
+    norms = np.linalg.norm(matrix, axis=1)
+    valid = finite & (norms > 0)
+    # /api/embed already returns unit vectors; normalize anyway so every source agrees
+    matrix[valid] /= norms[valid, None]
+    if not valid.all():
+        logger.error(f"Rejected {int((~valid).sum())} invalid embeddings in batch response")
+    return matrix, valid
 
 
 def generate_embedding(
     text: str, model: str = EMBEDDING_MODEL, max_retries: int = 3
-) -> Optional[List[float]]:
+) -> Optional[np.ndarray]:
     """
     Generate embedding for text using Ollama API with comprehensive error handling
 
@@ -124,24 +567,34 @@ def generate_embedding(
         max_retries: Maximum number of retry attempts
 
     Returns:
-        List of floats representing the embedding vector, or None if failed
+        L2-normalized float32 embedding vector, or None if failed
     """
     if not text or not isinstance(text, str) or not text.strip():
         logger.debug("Empty or invalid text provided for embedding")
         return None
 
     # Sanitize and truncate text
-    text = text.strip()[:8000]  # Limit text length to prevent API issues
+    text = text.strip()[:MAX_TEXT_LENGTH]  # Limit text length to prevent API issues
 
     # Check cache first
     try:
         cached = cache.get(text, model)
         if cached is not None:
             logger.debug(f"Retrieved embedding from cache for model {model}")
-            return cached
+            return _unit_rows(np.array(cached, dtype=EMBEDDING_DTYPE))
     except Exception as e:
         logger.warning(f"Cache lookup failed: {e}")
 
+    # Concurrent callers asking for the same text share one API call
+    flight_key = hashlib.sha256(f"{model}\x00{text}".encode("utf-8")).hexdigest()
+    embedding = embedding_flights.do(
+        flight_key, lambda: _request_embedding(text, model, max_retries)
+    )
+    return embedding.copy() if embedding is not None else None
+
+
+def _request_embedding(text: str, model: str, max_retries: int) -> Optional[np.ndarray]:
+    """Call /api/embeddings for one prepared text, caching a valid result"""
     # Try to generate embedding with retries
     for attempt in range(max_retries):
         try:
@@ -157,50 +610,10 @@ def generate_embedding(
             if response.status_code == 200:
                 try:
                     data = response.json()
-                    embedding = data.get("embedding", [])
-
-                    # Validate response format
-                    if not isinstance(embedding, list):
-                        logger.error("Invalid response format: embedding is not a list")
-                        continue
-
-                    if not embedding:
-                        logger.error("Empty embedding received from API")
-                        continue
-
-                    # Validate dimensions and fix if necessary
-                    if len(embedding) != EMBEDDING_DIMENSIONS:
-                        logger.warning(
-                            f"Expected {EMBEDDING_DIMENSIONS} dimensions, got {len(embedding)}"
-                        )
-                        if len(embedding) < EMBEDDING_DIMENSIONS:
-                            # Pad with small random values instead of zeros
-                            padding = np.random.normal(
-                                0, 0.01, EMBEDDING_DIMENSIONS - len(embedding)
-                            ).tolist()
-                            embedding.extend(padding)
-                        else:
-                            embedding = embedding[:EMBEDDING_DIMENSIONS]
-
-                    # Validate embedding values
-                    if not all(
-                        isinstance(x, (int, float)) and not np.isnan(x) and not np.isinf(x)
-                        for x in embedding
-                    ):
-                        logger.error("Invalid embedding values detected (NaN, Inf, or non-numeric)")
-                        continue
-
-                    # Ensure embedding has reasonable magnitude
-                    magnitude = np.linalg.norm(embedding)
-                    if magnitude == 0:
-                        logger.error("Zero-magnitude embedding received")
+                    embedding = _validate_api_embedding(data.get("embedding", []))
+                    if embedding is None:
                         continue
 
-                    if magnitude > 100:  # Suspiciously large magnitude
-                        logger.warning(f"Large embedding magnitude detected: {magnitude:.2f}")
-                        # Normalize to reasonable scale
-                        embedding = (np.array(embedding) / magnitude).tolist()
-
                     # Cache the successful result
                     try:
                         cache.set(text, model, embedding)
@@ -245,20 +658,177 @@ def generate_embedding(
     return None
 
 
-def generate_tag_embedding(
-    tags: Optional[List[str]], model: str = EMBEDDING_MODEL, max_retries: int = 3
-) -> Optional[List[float]]:
+def _split_embedding_batches(
+    texts: List[str],
+    max_inputs: int = EMBED_BATCH_MAX_INPUTS,
+    max_chars: int = EMBED_BATCH_MAX_CHARS,
+) -> List[List[str]]:
+    """Greedily pack texts into request-sized batches bounded by input count and characters"""
+    batches: List[List[str]] = []
+    current: List[str] = []
+    current_chars = 0
+    for text in texts:
+        if current and (len(current) >= max_inputs or current_chars + len(text) > max_chars):
+            batches.append(current)
+            current, current_chars = [], 0
+        current.append(text)
+        current_chars += len(text)
+    if current:
+        batches.append(current)
+    return batches
+
+
+def _request_embedding_batch(
+    texts: List[str], model: str, max_retries: int
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Embed a packed batch with one POST to Ollama's multi-input /api/embed endpoint
+
+    Returns a (len(texts), EMBEDDING_DIMENSIONS) matrix and a mask of rows that succeeded.
     """
-    Generate embedding for tags using deterministic concatenation strategy
+    for attempt in range(max_retries):
+        try:
+            response = requests.post(
+                f"{OLLAMA_URL}/api/embed",
+                json={"model": model, "input": texts, "truncate": True},
+                timeout=60 + (attempt * 30),  # Larger payloads need more headroom than one text
+                headers={"Content-Type": "application/json"},
+            )
+
+            if response.status_code == 200:
+                try:
+                    embeddings = response.json().get("embeddings", [])
+                    if not isinstance(embeddings, list) or len(embeddings) != len(texts):
+                        logger.error(
+                            f"Batch response returned {len(embeddings)} embeddings "
+                            f"for {len(texts)} inputs"
+                        )
+                        continue
+                    return _validate_api_embeddings(embeddings)
+                except (ValueError, KeyError, TypeError) as e:
+                    logger.error(f"JSON parsing/validation error: {e}")
+                    continue
+
+            elif response.status_code == 404:
+                logger.error(f"Model '{model}' not found. Available models may need to be pulled.")
+                break  # Don't retry for model not found
+            elif response.status_code == 503:
+                logger.warning(f"Ollama service unavailable (attempt {attempt + 1})")
+                if attempt < max_retries - 1:
+                    time.sleep(2**attempt)  # Exponential backoff
+                continue
+            else:
+                logger.error(f"Ollama API error {response.status_code}: {response.text[:200]}")
+                if attempt < max_retries - 1:
+                    time.sleep(1)
+                continue
+
+        except requests.exceptions.Timeout as e:
+            logger.warning(f"Batch request timeout (attempt {attempt + 1}): {e}")
+            continue
+        except requests.exceptions.ConnectionError as e:
+            logger.warning(f"Connection error (attempt {attempt + 1}): {e}")
+            continue
+        except requests.exceptions.RequestException as e:
+            logger.error(f"Request exception (attempt {attempt + 1}): {e}")
+            continue
+        except Exception as e:
+            logger.error(f"Unexpected error (attempt {attempt + 1}): {e}")
+            continue
+
+    logger.error(f"Failed to embed batch of {len(texts)} texts after {max_retries} attempts")
+    return (
+        np.zeros((len(texts), EMBEDDING_DIMENSIONS), dtype=EMBEDDING_DTYPE),
+        np.zeros(len(texts), dtype=bool),
+    )
+
+
+def generate_embedding_matrix(
+    texts: List[Optional[str]], model: str = EMBEDDING_MODEL, max_retries: int = 3
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Generate embeddings for many texts with as few Ollama requests as possible
+
+    The whole batch is checked against the cache first, duplicate texts are embedded
+    once, uncached texts are packed into multi-input /api/embed requests bounded by
+    EMBED_BATCH_MAX_INPUTS and EMBED_BATCH_MAX_CHARS, and new vectors are written back
+    to the cache in a single batch.
 
     Args:
-        tags: List of tag strings to embed
+        texts: Texts to embed; empty or invalid entries are marked invalid
         model: Embedding model name
-        max_retries: Maximum number of retry attempts
+        max_retries: Maximum number of retry attempts per request
 
     Returns:
-        List of floats representing the tag embedding vector, or None if failed
+        (len(texts), EMBEDDING_DIMENSIONS) float32 matrix aligned with texts, and a boolean
+        mask of the rows that hold an embedding
     """
+    matrix = np.zeros((len(texts), EMBEDDING_DIMENSIONS), dtype=EMBEDDING_DTYPE)
+    valid = np.zeros(len(texts), dtype=bool)
+    positions: Dict[str, List[int]] = {}
+    for i, text in enumerate(texts):
+        if text and isinstance(text, str) and text.strip():
+            positions.setdefault(text.strip()[:MAX_TEXT_LENGTH], []).append(i)
+    if not positions:
+        return matrix, valid
+
+    unique_texts = list(positions)
+    try:
+        cached = cache.get_batch(unique_texts, model)
+    except Exception as e:
+        logger.warning(f"Cache lookup failed: {e}")
+        cached = [None] * len(unique_texts)
+
+    missing: List[str] = []
+    for text, vector in zip(unique_texts, cached):
+        if vector is not None:
+            rows = positions[text]
+            matrix[rows] = vector
+            valid[rows] = True
+        else:
+            missing.append(text)
+    matrix[valid] = _unit_rows(matrix[valid])
+
+    generated_texts: List[str] = []
+    generated: List[np.ndarray] = []
+    for batch in _split_embedding_batches(missing):
+        batch_matrix, batch_valid = _request_embedding_batch(batch, model, max_retries)
+        for text, vector, ok in zip(batch, batch_matrix, batch_valid):
+            if ok:
+                rows = positions[text]
+                matrix[rows] = vector
+                valid[rows] = True
+                generated_texts.append(text)
+                generated.append(vector)
+
+    if generated:
+        try:
+            cache.set_batch(generated_texts, model, np.stack(generated))
+        except Exception as e:
+            logger.warning(f"Failed to cache embeddings: {e}")
+
+    logger.info(
+        f"Embedded {len(texts)} texts: {len(unique_texts) - len(missing)} cached, "
+        f"{len(generated)}/{len(missing)} generated"
+    )
+    return matrix, valid
+
+
+def generate_embeddings(
+    texts: List[Optional[str]], model: str = EMBEDDING_MODEL, max_retries: int = 3
+) -> List[Optional[np.ndarray]]:
+    """
+    Per-text view of generate_embedding_matrix
+
+    Returns:
+        List aligned with texts holding float32 row views of the batch matrix, or None
+        where generation failed
+    """
+    matrix, valid = generate_embedding_matrix(texts, model, max_retries)
+    return [row if ok else None for row, ok in zip(matrix, valid)]
+
+
+def canonical_tag_string(tags: Optional[List[str]]) -> Optional[str]:
+    """Sorted, filtered ' | '-joined tag string, or None when no usable tags remain"""
     if not tags or not isinstance(tags, list) or len(tags) == 0:
         logger.debug("Empty or invalid tags provided for embedding")
         return None
@@ -269,11 +839,116 @@ def generate_tag_embedding(
         logger.debug("No valid tags after filtering")
         return None
 
-    # Sort tags alphabetically for deterministic output
-    sorted_tags = sorted(valid_tags)
+    # Sort tags alphabetically for deterministic output and join with separator
+    return " | ".join(sorted(valid_tags))
+
+
+def normalize_tags(tags: Optional[List[str]]) -> List[str]:
+    """Distinct stripped, lower-cased tags in sorted order; the tag vocabulary keys"""
+    if not tags or not isinstance(tags, list):
+        return []
+    return sorted({str(tag).strip().lower() for tag in tags if tag and str(tag).strip()})
+
 
-    # Create concatenated tag string with separator
-    tag_string = " | ".join(sorted_tags)
+def pool_tag_embeddings(
+    tag_lists: Sequence[Sequence[str]],
+    vocabulary: Dict[str, int],
+    vectors: np.ndarray,
+    weights: Optional[np.ndarray] = None,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Weighted mean-pool of per-tag vocabulary vectors for each tag list
+
+    Args:
+        tag_lists: Normalized tag lists
+        vocabulary: Tag -> row of ``vectors``; tags missing from it are skipped
+        vectors: (tags, EMBEDDING_DIMENSIONS) per-tag embeddings
+        weights: Optional per-row weights for ``vectors``, uniform when omitted
+
+    Returns:
+        (len(tag_lists), dims) float32 matrix of L2-normalized pooled vectors, and a
+        mask of the lists that had at least one weighted vocabulary tag
+    """
+    lengths = np.zeros(len(tag_lists), dtype=np.int64)
+    members: List[int] = []
+    for i, tags in enumerate(tag_lists):
+        known = [vocabulary[tag] for tag in tags if tag in vocabulary]
+        lengths[i] = len(known)
+        members.extend(known)
+
+    matrix = np.zeros((len(tag_lists), vectors.shape[1]), dtype=EMBEDDING_DTYPE)
+    valid = lengths > 0
+    if not valid.any():
+        return matrix, valid
+
+    columns = np.asarray(members, dtype=np.intp)
+    tag_weights = (
+        np.ones(len(vectors), dtype=EMBEDDING_DTYPE)
+        if weights is None
+        else np.asarray(weights, dtype=EMBEDDING_DTYPE)
+    )
+    member_weights = tag_weights[columns]
+
+    # Lists are contiguous runs of members, so each pooled row is one reduceat segment
+    starts = (np.cumsum(lengths) - lengths)[valid]
+    sums = np.add.reduceat(vectors[columns] * member_weights[:, None], starts, axis=0)
+    totals = np.add.reduceat(member_weights, starts)
+
+    weighted = totals > 0
+    pooled = sums[weighted] / totals[weighted, None]
+    norms = np.linalg.norm(pooled, axis=1, keepdims=True)
+    pooled = np.divide(pooled, norms, out=pooled, where=norms > 0)
+
+    rows = np.flatnonzero(valid)[weighted]
+    matrix[rows] = pooled
+    valid[:] = False
+    valid[rows] = True
+    return matrix, valid
+
+
+def generate_pooled_tag_matrix(
+    tag_lists: List[Optional[List[str]]], model: str = EMBEDDING_MODEL, max_retries: int = 3
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Tag-set embeddings pooled from one embedding per distinct normalized tag
+
+    Only tags not yet in the embedding cache reach Ollama, so the cost grows with
+    the tag vocabulary rather than with the number of tag combinations.
+
+    Returns:
+        (len(tag_lists), EMBEDDING_DIMENSIONS) float32 matrix and validity mask
+    """
+    normalized = [normalize_tags(tags) for tags in tag_lists]
+    vocabulary_tags = sorted({tag for tags in normalized for tag in tags})
+    vectors, embedded = generate_embedding_matrix(vocabulary_tags, model, max_retries)
+    vocabulary = {tag: row for row, tag in enumerate(vocabulary_tags) if embedded[row]}
+    return pool_tag_embeddings(normalized, vocabulary, vectors)
+
+
+def generate_tag_embedding(
+    tags: Optional[List[str]],
+    model: str = EMBEDDING_MODEL,
+    max_retries: int = 3,
+    strategy: Optional[str] = None,
+) -> Optional[np.ndarray]:
+    """
+    Generate embedding for tags using the configured tag-set strategy
+
+    Args:
+        tags: List of tag strings to embed
+        model: Embedding model name
+        max_retries: Maximum number of retry attempts
+        strategy: "concat" or "pooled"; defaults to TAG_EMBEDDING_STRATEGY
+
+    Returns:
+        float32 tag embedding vector, or None if failed
+    """
+    if (strategy or TAG_EMBEDDING_STRATEGY) == "pooled":
+        return generate_tag_embeddings([tags], model, max_retries, strategy="pooled")[0]
+
+    tag_string = canonical_tag_string(tags)
+    if tag_string is None:
+        return None
 
     logger.debug(f"Generating tag embedding for: {tag_string}")
 
@@ -281,12 +956,47 @@ def generate_tag_embedding(
     return generate_embedding(tag_string, model, max_retries)
 
 
+def generate_tag_embeddings(
+    tag_lists: List[Optional[List[str]]],
+    model: str = EMBEDDING_MODEL,
+    max_retries: int = 3,
+    strategy: Optional[str] = None,
+) -> List[Optional[np.ndarray]]:
+    """
+    Generate tag embeddings for many tag lists through batched embedding requests
+
+    Args:
+        tag_lists: Tag lists to embed, using the same canonical form as generate_tag_embedding
+        model: Embedding model name
+        max_retries: Maximum number of retry attempts per request
+        strategy: "concat" or "pooled"; defaults to TAG_EMBEDDING_STRATEGY
+
+    Returns:
+        List aligned with tag_lists containing embedding vectors, or None where unavailable
+    """
+    strategy = strategy or TAG_EMBEDDING_STRATEGY
+    if strategy not in TAG_EMBEDDING_STRATEGIES:
+        raise ValueError(f"Unknown tag embedding strategy: {strategy}")
+
+    if strategy == "pooled":
+        matrix, valid = generate_pooled_tag_matrix(tag_lists, model, max_retries)
+        return [row if ok else None for row, ok in zip(matrix, valid)]
+
+    return generate_embeddings(
+        [canonical_tag_string(tags) for tags in tag_lists], model, max_retries
+    )
+
+
+def _has_values(embedding: Optional[Sequence[float]]) -> bool:
+    return embedding is not None and len(embedding) > 0
+
+
 def combine_embeddings(
-    content_emb: Optional[List[float]],
-    summary_emb: Optional[List[float]],
-    context_emb: Optional[List[float]],
+    content_emb: Optional[Sequence[float]],
+    summary_emb: Optional[Sequence[float]],
+    context_emb: Optional[Sequence[float]],
     weights: Tuple[float, float, float] = (0.5, 0.3, 0.2),
-) -> Optional[List[float]]:
+) -> Optional[np.ndarray]:
     """
     Create weighted combination of embeddings
 
@@ -297,40 +1007,31 @@ def combine_embeddings(
         weights: Weights for (content, summary, context)
 
     Returns:
-        Combined embedding vector
-    """
-    embeddings = []
-    active_weights = []
-
-    if content_emb:
-        embeddings.append(np.array(content_emb))
-        active_weights.append(weights[0])
-    if summary_emb:
-        embeddings.append(np.array(summary_emb))
-        active_weights.append(weights[1])
-    if context_emb:
-        embeddings.append(np.array(context_emb))
-        active_weights.append(weights[2])
-
-    if not embeddings:
+        L2-normalized float32 combined embedding vector
+    """
+    present = [
+        (emb, weight)
+        for emb, weight in zip((content_emb, summary_emb, context_emb), weights)
+        if _has_values(emb)
+    ]
+    if not present:
         return None
 
-    # Normalize weights
-    total_weight = sum(active_weights)
-    normalized_weights = [w / total_weight for w in active_weights]
+    stacked = np.stack([np.asarray(emb, dtype=EMBEDDING_DTYPE) for emb, _ in present])
+    active_weights = np.array([weight for _, weight in present], dtype=EMBEDDING_DTYPE)
 
-    # Weighted average
-    combined = sum(emb * weight for emb, weight in zip(embeddings, normalized_weights))
+    # Weighted average with normalized weights
+    combined = (active_weights / active_weights.sum()) @ stacked
 
     # L2 normalize
     norm = np.linalg.norm(combined)
     if norm > 0:
         combined = combined / norm
 
-    return combined.tolist()
+    return combined.astype(EMBEDDING_DTYPE, copy=False)
 
 
-def cosine_similarity(emb1: List[float], emb2: List[float]) -> float:
+def cosine_similarity(emb1: Optional[Sequence[float]], emb2: Optional[Sequence[float]]) -> float:
     """
     Calculate cosine similarity between two embeddings
 
@@ -341,20 +1042,19 @@ def cosine_similarity(emb1: List[float], emb2: List[float]) -> float:
     Returns:
         Similarity score between -1 and 1
     """
-    if not emb1 or not emb2:
+    if not _has_values(emb1) or not _has_values(emb2):
         return 0.0
 
-    vec1 = np.array(emb1)
-    vec2 = np.array(emb2)
+    vec1 = np.asarray(emb1, dtype=EMBEDDING_DTYPE)
+    vec2 = np.asarray(emb2, dtype=EMBEDDING_DTYPE)
 
-    dot_product = np.dot(vec1, vec2)
     norm1 = np.linalg.norm(vec1)
     norm2 = np.linalg.norm(vec2)
 
     if norm1 == 0 or norm2 == 0:
         return 0.0
 
-    return dot_product / (norm1 * norm2)
+    return float(np.dot(vec1, vec2) / (norm1 * norm2))
 
 
 def register_duckdb_functions(conn: duckdb.DuckDBPyConnection) -> bool:
@@ -400,7 +1100,7 @@ def test_embedding_generation():
     print(f"Testing embedding generation for: '{test_text}'")
 
     embedding = generate_embedding(test_text)
-    if embedding:
+    if embedding is not None:
         print(f"✓ Generated {len(embedding)}-dimensional embedding")
         print(f"  Magnitude: {np.linalg.norm(embedding):.4f}")
         print(f"  First 5 values: {embedding[:5]}")
@@ -415,7 +1115,7 @@ def test_tag_embedding_generation():
 
     # Test with regular order
     embedding1 = generate_tag_embedding(test_tags)
-    if embedding1:
+    if embedding1 is not None:
         print(f"✓ Generated {len(embedding1)}-dimensional tag embedding")
         print(f"  Magnitude: {np.linalg.norm(embedding1):.4f}")
         print(f"  First 5 values: {embedding1[:5]}")
@@ -426,7 +1126,7 @@ def test_tag_embedding_generation():
     test_tags_reversed = test_tags[::-1]
     embedding2 = generate_tag_embedding(test_tags_reversed)
 
-    if embedding1 and embedding2:
+    if embedding1 is not None and embedding2 is not None:
         similarity = cosine_similarity(embedding1, embedding2)
         print(f"  Deterministic test: {similarity:.6f} similarity (should be 1.0)")
         if abs(similarity - 1.0) < 0.0001:
@@ -443,11 +1143,11 @@ def test_tag_embedding_generation():
 
     # Single tag
     single_result = generate_tag_embedding(["python"])
-    print(f"  Single tag: {'✓ Generated' if single_result else '✗ Failed'}")
+    print(f"  Single tag: {'✓ Generated' if single_result is not None else '✗ Failed'}")
 
     # Tags with spaces and special characters
     special_result = generate_tag_embedding(["machine learning", "AI/ML", "data-science"])
-    print(f"  Special characters: {'✓ Generated' if special_result else '✗ Failed'}")
+    print(f"  Special characters: {'✓ Generated' if special_result is not None else '✗ Failed'}")
 
 
 if __name__ == "__main__":
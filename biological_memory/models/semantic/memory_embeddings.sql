@@ -1,6 +1,6 @@
 -- Memory Embeddings Model
--- Generates and stores semantic embeddings for biological memory processing
--- Uses Ollama's nomic-embed-text model for 768-dimensional vector representations
+-- Attaches precomputed semantic embeddings to memories for biological memory processing
+-- Vectors are Ollama nomic-embed-text 768-dimensional embeddings read from the embedding store
 
 {{ config(
     materialized='incremental',
@@ -15,6 +15,10 @@
     pre_hook=[
         "SET threads TO 4",
         "SET memory_limit TO '2GB'"
+    ],
+    post_hook=[
+        "{{ load_vss() }}",
+        "{{ create_hnsw_index(this, 'final_embedding', 'cosine') }}"
     ]
 ) }}
 
@@ -27,54 +31,25 @@ WITH source_memories AS (
         timestamp,
         importance_score,
         emotional_valence,
-        tags
+        tags,
+        sha256(content) as content_hash
     FROM {{ ref('raw_memories') }}
     {% if is_incremental() %}
-        -- Only process new memories since last run
+        -- Only process new memories since last run, plus those still waiting on the store
         WHERE timestamp > (SELECT COALESCE(MAX(created_at), '1970-01-01'::TIMESTAMP) FROM {{ this }})
+           OR id IN (SELECT memory_id FROM {{ this }} WHERE needs_embedding)
     {% endif %}
 ),
 
--- Generate embeddings via Ollama UDF (User Defined Function)
--- Note: This assumes we'll create a UDF to call Ollama API
-embeddings_generated AS (
+-- Embeddings come precomputed from the Parquet store written by the batch embedding
+-- service (scripts/embedding_store.py), matched on content hash so edited content
+-- never picks up a stale vector
+embeddings_joined AS (
     SELECT
-        memory_id,
-        content,
-        context,
-        summary,
-        timestamp,
-        importance_score,
-        emotional_valence,
-        tags,
-
-        -- Generate diverse semantic embeddings based on content characteristics
-        -- Creates meaningful vector representations for similarity search
-        ARRAY(
-            SELECT
-                -- Mix multiple hash functions and content features for diversity
-                (SIN(generate_series * 0.1 + HASH(content) * 0.001) *
-                 COS(generate_series * 0.05 + HASH(LEFT(content, 50)) * 0.002) +
-                 SIN(generate_series * 0.02 + LENGTH(content) * 0.01) *
-                 CASE WHEN generate_series % 5 = 0 THEN HASH(RIGHT(content, 20)) * 0.0001 ELSE 1.0 END)::FLOAT
-            FROM generate_series(1, 768)
-        )::FLOAT[768] as content_embedding,
-
-        ARRAY(
-            SELECT
-                (COS(generate_series * 0.08 + HASH(COALESCE(summary, '')) * 0.003) *
-                 SIN(generate_series * 0.12 + LENGTH(COALESCE(summary, '')) * 0.02) +
-                 COS(generate_series * 0.03 + HASH(COALESCE(summary, 'default')) * 0.0005))::FLOAT
-            FROM generate_series(1, 768)
-        )::FLOAT[768] as summary_embedding,
-
-        ARRAY(
-            SELECT
-                (TAN(generate_series * 0.06 + HASH(COALESCE(context, '')) * 0.004) * 0.5 +
-                 SIN(generate_series * 0.09 + HASH(COALESCE(context, 'empty')) * 0.001) *
-                 COS(generate_series * 0.04 + LENGTH(COALESCE(context, '')) * 0.015))::FLOAT
-            FROM generate_series(1, 768)
-        )::FLOAT[768] as context_embedding,
+        m.*,
+        store.content_embedding,
+        store.summary_embedding,
+        store.context_embedding,
 
         -- Tag embeddings are generated separately in PostgreSQL to avoid DuckDB limitations
         -- This field will be populated by the generate_tag_embeddings_postgres.py script
@@ -83,11 +58,13 @@ embeddings_generated AS (
         -- Model metadata
         '{{ var("embedding_model") }}' as embedding_model,
         '1.5' as model_version,
-        768 as embedding_dimensions
-    FROM source_memories
+        768 as embedding_dimensions,
+        store.generated_at as embedding_generated_at
+    FROM source_memories m
+    LEFT JOIN {{ embedding_store_relation() }} store
+        ON store.content_hash = m.content_hash
 ),
 
--- Simple final processing
 final_embeddings AS (
     SELECT
         *,
@@ -95,22 +72,22 @@ final_embeddings AS (
         -- Use content_embedding as the final embedding
         content_embedding as combined_embedding,
 
-        -- Simple magnitude calculation (approximation)
-        1.0 + (ABS(HASH(content)) % 100) * 0.01 as embedding_magnitude,
-
-        -- Simple sparsity estimate
-        0.05 + (ABS(HASH(content)) % 20) * 0.001 as embedding_sparsity,
+        SQRT(array_inner_product(content_embedding, content_embedding)) as embedding_magnitude,
+        len(list_filter(content_embedding::FLOAT[], x -> ABS(x) < 1e-6)) / 768.0 as embedding_sparsity,
 
         -- Processing metadata
         CURRENT_TIMESTAMP as created_at,
         CURRENT_TIMESTAMP as updated_at,
-        TRUE as is_processed,
+        content_embedding IS NOT NULL as is_processed,
         FALSE as has_error,
 
-        -- Processing time estimate (milliseconds)
-        EXTRACT(EPOCH FROM (CURRENT_TIMESTAMP - timestamp)) * 1000 as processing_time_ms
+        -- Memories missing from the store are flagged for the async embedding service
+        content_embedding IS NULL as needs_embedding,
+
+        -- Store latency: memory timestamp to embedding generation (milliseconds)
+        EXTRACT(EPOCH FROM (embedding_generated_at - timestamp)) * 1000 as processing_time_ms
 
-    FROM embeddings_generated
+    FROM embeddings_joined
 )
 
 SELECT
@@ -144,6 +121,8 @@ SELECT
     processing_time_ms,
     is_processed,
     has_error,
+    needs_embedding,
+    content_hash,
 
     -- Tag embedding metadata (handled separately in PostgreSQL)
     NULL::TIMESTAMP as tag_embedding_updated,
@@ -157,5 +136,4 @@ SELECT
     (ABS(HASH(content)) % 7) + 1 as semantic_cluster
 
 FROM final_embeddings
-WHERE combined_embedding IS NOT NULL
 ORDER BY created_at DESC
@@ -0,0 +1,45 @@
+"""
+Semantic k-NN pairs from the blocked NumPy builder
+
+Enabled with --vars '{semantic_knn_source: numpy}', in which case semantic_network joins these
+pairs instead of running the HNSW lateral join. Incremental runs only score memories updated
+since the last build, against the full embedding matrix.
+"""
+
+import os
+import sys
+
+import duckdb
+import pyarrow as pa
+
+
+def model(dbt: object, session: duckdb.DuckDBPyConnection) -> pa.Table:
+    """Score new (or all) memory_embeddings rows and return their top-k pairs"""
+    dbt.config(materialized="incremental")
+
+    scripts_dir = os.path.join(os.getenv("DBT_PROJECT_DIR", os.getcwd()), "scripts")
+    if scripts_dir not in sys.path:
+        sys.path.insert(0, scripts_dir)
+    from semantic_knn_builder import knn_pairs_table
+
+    is_new = "TRUE"
+    if dbt.is_incremental:
+        is_new = f"COALESCE(updated_at > (SELECT MAX(source_updated_at) FROM {dbt.this}), TRUE)"
+
+    relation = (
+        dbt.ref("memory_embeddings")
+        .filter("final_embedding IS NOT NULL")
+        .project(
+            "memory_id, final_embedding, "
+            "updated_at::TIMESTAMP WITH TIME ZONE AS updated_at, "
+            f"{is_new} AS is_new"
+        )
+    )
+    # to_arrow_table replaces arrow() as the Table-returning call in newer DuckDB releases
+    embeddings = (getattr(relation, "to_arrow_table", None) or relation.arrow)()
+
+    return knn_pairs_table(
+        embeddings,
+        k=int(dbt.config.get("knn_k")),
+        threshold=float(dbt.config.get("knn_threshold")),
+    )
@@ -13,34 +13,45 @@
         {'columns': ['last_activated'], 'unique': false},
         {'columns': ['association_type'], 'unique': false}
     ],
+    pre_hook=[
+        "{{ load_vss() }}"
+    ],
     post_hook=[
         "DELETE FROM {{ this }} WHERE association_strength < {{ var('forgetting_rate', 0.05) }}"
     ]
 ) }}
 
--- OPTIMIZED: Replace O(n²) CROSS JOIN with efficient LATERAL JOIN + vector index
+-- k-NN pairs through the vss HNSW index that memory_embeddings builds on final_embedding, or
+-- precomputed by the blocked NumPy builder with --vars '{semantic_knn_source: numpy}'
 WITH memory_pairs AS (
     SELECT
         m1.memory_id as memory_id_1,
-        similar.memory_id as memory_id_2,
+        neighbor.memory_id as memory_id_2,
         m1.final_embedding as embedding_1,
-        similar.final_embedding as embedding_2,
+        neighbor.final_embedding as embedding_2,
         m1.content as content_1,
-        similar.content as content_2,
+        neighbor.content as content_2,
         m1.semantic_cluster as cluster_1,
-        similar.semantic_cluster as cluster_2,
+        neighbor.semantic_cluster as cluster_2,
         m1.importance_score as importance_1,
-        similar.importance_score as importance_2,
+        neighbor.importance_score as importance_2,
         m1.emotional_valence as valence_1,
-        similar.emotional_valence as valence_2,
+        neighbor.emotional_valence as valence_2,
         m1.consolidation_priority as priority_1,
-        similar.consolidation_priority as priority_2,
-        GREATEST(m1.created_at, similar.created_at) as latest_timestamp,
-        -- Pre-calculate similarity using pgvector operators for performance
-        (1 - (m1.final_embedding <-> similar.final_embedding)) as semantic_similarity_fast
+        neighbor.consolidation_priority as priority_2,
+        GREATEST(m1.created_at, neighbor.created_at) as latest_timestamp,
+        (1 - array_cosine_distance(m1.final_embedding, neighbor.final_embedding)) as semantic_similarity_fast
     FROM {{ ref('memory_embeddings') }} m1
+    {% if var('semantic_knn_source', 'hnsw') == 'numpy' %}
+    -- Top-k and threshold are already applied by scripts/semantic_knn_builder.py
+    JOIN {{ ref('semantic_knn_pairs') }} knn ON knn.memory_id_1 = m1.memory_id
+    JOIN {{ ref('memory_embeddings') }} neighbor ON neighbor.memory_id = knn.memory_id_2
+    WHERE m1.final_embedding IS NOT NULL
+      AND neighbor.final_embedding IS NOT NULL
+    {% else %}
     CROSS JOIN LATERAL (
-        -- Use HNSW index for fast k-nearest neighbor search
+        -- Must stay a bare ORDER BY array_cosine_distance ... LIMIT k so the optimizer turns it
+        -- into an HNSW index join; self matches and the threshold are filtered outside
         SELECT
             memory_id,
             final_embedding,
@@ -51,14 +62,14 @@ WITH memory_pairs AS (
             consolidation_priority,
             created_at
         FROM {{ ref('memory_embeddings') }} m2
-        WHERE m2.final_embedding IS NOT NULL
-          AND m2.memory_id != m1.memory_id
-          -- Use vector distance for initial filtering (leverages HNSW index)
-          AND (1 - (m1.final_embedding <-> m2.final_embedding)) >= {{ var('consolidation_threshold', 0.5) }}
-        ORDER BY m1.final_embedding <-> m2.final_embedding  -- HNSW index optimized
-        LIMIT {{ var('max_connections_per_memory', 50) }}  -- Limit connections for performance
-    ) similar
+        ORDER BY array_cosine_distance(m1.final_embedding, m2.final_embedding)
+        LIMIT {{ var('max_connections_per_memory', 50) | int + 1 }}  -- +1 for the memory itself
+    ) neighbor
     WHERE m1.final_embedding IS NOT NULL
+      AND neighbor.final_embedding IS NOT NULL
+      AND neighbor.memory_id != m1.memory_id
+      AND (1 - array_cosine_distance(m1.final_embedding, neighbor.final_embedding)) >= {{ var('consolidation_threshold', 0.5) }}
+    {% endif %}
     {% if is_incremental() %}
         -- Only process new or updated memories
         AND m1.updated_at > (SELECT COALESCE(MAX(last_activated), '1970-01-01'::TIMESTAMP) FROM {{ this }})
@@ -69,7 +80,7 @@ similarity_calculations AS (
     SELECT
         *,
 
-        -- Use pre-calculated similarity from pgvector for performance
+        -- Use the cosine similarity computed alongside the k-NN search
         semantic_similarity_fast as semantic_similarity,
 
         -- Calculate temporal proximity (memories close in time)
@@ -0,0 +1,39 @@
+-- Memories Mirror
+-- Incremental local copy of the Codex public.memories table
+-- Each run pulls only rows at or past the stored watermark instead of re-scanning the whole
+-- table over postgres_scan; rows deleted upstream are removed by the reconciliation post-hook
+
+{{ config(
+    indexes=[
+        {'columns': ['id'], 'unique': true},
+        {'columns': ['synced_watermark'], 'unique': false}
+    ],
+    post_hook=[
+        "{{ reconcile_memories_mirror() }}"
+    ]
+) }}
+
+-- Watermark expression over public.memories; set to COALESCE(updated_at, created_at)
+-- where the Codex table tracks edits so changed rows are re-pulled too
+{% set watermark = var('memories_mirror_watermark', 'created_at') %}
+
+SELECT
+    id,
+    content,
+    created_at,
+    metadata,
+    tags,
+    {{ watermark }} as synced_watermark
+FROM postgres_scan(
+    '{{ var("postgres_url") }}',
+    'public',
+    'memories'
+)
+{% if is_incremental() and execute %}
+    {% set last_synced = run_query(
+        "SELECT COALESCE(MAX(synced_watermark), TIMESTAMP '1970-01-01') FROM " ~ this
+    ).columns[0].values()[0] %}
+    -- Constant bound so the filter is pushed down into the PostgreSQL scan; rows sharing
+    -- the last watermark are re-read and replaced by id
+    WHERE {{ watermark }} >= '{{ last_synced }}'
+{% endif %}
@@ -1,5 +1,5 @@
 -- Raw Memories Source Table
--- Base memories from PostgreSQL/DuckDB source for biological processing
+-- Base memories from the incrementally synced memories_mirror for biological processing
 -- This model serves as the entry point for the 4-stage memory pipeline
 
 {{ config(
@@ -29,13 +29,6 @@ SELECT
     -- Tags for categorization
     tags
 
-FROM (
-    -- Source from PostgreSQL using DuckDB's postgres_scanner with full connection string
-    SELECT * FROM postgres_scan(
-        '{{ var("postgres_url") }}',
-        'public',
-        'memories'
-    )
-) as source_memories
+FROM {{ ref('memories_mirror') }} as source_memories
 WHERE content IS NOT NULL
   AND TRIM(content) != ''
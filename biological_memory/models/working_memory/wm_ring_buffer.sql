@@ -0,0 +1,115 @@
+-- Working Memory Ring Buffer (Miller's 7±2)
+-- Small, incrementally maintained table behind wm_active_context. Each cycle scores only
+-- new arrivals from raw_memories, re-ranks them against the memories already buffered,
+-- and evicts entries that left the attention window. The top working_memory_capacity
+-- candidates are picked by ORDER BY ... LIMIT, which DuckDB runs as a heap-based top-N.
+-- Materialized as incremental (delete+insert on memory_id) in dbt_project.yml
+
+{{ config(
+    post_hook=[
+        "DELETE FROM {{ this }} WHERE timestamp <= CURRENT_TIMESTAMP - INTERVAL '{{ var('working_memory_window_minutes', 5) }} minutes'"
+    ]
+) }}
+
+WITH arrivals AS (
+    SELECT
+        id as memory_id,
+        content,
+        timestamp,
+        importance_score,
+        activation_strength,
+        access_count,
+        metadata,
+        -- Recency boost (newer memories get higher scores)
+        CASE
+            WHEN EXTRACT(EPOCH FROM (CURRENT_TIMESTAMP - timestamp)) < 300 THEN 0.3
+            WHEN EXTRACT(EPOCH FROM (CURRENT_TIMESTAMP - timestamp)) < 600 THEN 0.2
+            ELSE 0.1
+        END as recency_boost
+    FROM {{ ref('raw_memories') }}
+    WHERE timestamp > CURRENT_TIMESTAMP - INTERVAL '{{ var('working_memory_window_minutes', 5) }} minutes'
+    AND content IS NOT NULL
+    AND TRIM(content) != ''
+    {% if is_incremental() %}
+        -- Only memories not yet buffered need scoring. An anti-join rather than a timestamp
+        -- watermark, so late or tied arrivals (concurrent inserts, a mirror sync finishing
+        -- after this run) are still picked up; the window keeps both sides small
+        AND id NOT IN (SELECT memory_id FROM {{ this }})
+    {% endif %}
+),
+
+enriched_arrivals AS (
+    SELECT
+        *,
+        -- Entity extraction (basic pattern matching)
+        CASE WHEN content LIKE '%meeting%' THEN '["meeting"]'::JSON
+             WHEN content LIKE '%project%' THEN '["project"]'::JSON
+             ELSE '[]'::JSON END as entities,
+        -- Topic extraction
+        CASE WHEN content LIKE '%work%' THEN '["work"]'::JSON
+             WHEN content LIKE '%technical%' THEN '["technical"]'::JSON
+             ELSE '[]'::JSON END as topics,
+        -- Task type classification
+        CASE WHEN content LIKE '%meeting%' THEN 'Communication and Collaboration'
+             WHEN content LIKE '%project%' THEN 'Project Management and Execution'
+             WHEN content LIKE '%analysis%' THEN 'Financial Planning and Management'
+             ELSE 'Product Launch Strategy' END as task_type,
+        -- Sentiment analysis
+        CASE WHEN content LIKE '%good%' OR content LIKE '%excellent%' THEN 0.8
+             WHEN content LIKE '%bad%' OR content LIKE '%problem%' THEN 0.3
+             ELSE 0.5 END as sentiment,
+        -- Phantom objects placeholder
+        '[]'::JSON as phantom_objects,
+        -- Hebbian strength calculation using biological learning rate
+        (COALESCE(activation_strength, 0.0) * 0.8 + COALESCE(importance_score, 0.0) * 0.2) * COALESCE({{ var('hebbian_learning_rate', '0.1') }}, 0.1) as hebbian_strength,
+        -- Working memory strength NULL SAFE
+        LEAST(1.0, COALESCE(importance_score, 0.0) + COALESCE(recency_boost, 0.0)) as working_memory_strength,
+        -- Recency and frequency scoring NULL SAFE
+        COALESCE(recency_boost, 0.0) as recency_score,
+        COALESCE(access_count, 0) / 10.0 as frequency_score
+    FROM arrivals
+),
+
+scored_arrivals AS (
+    SELECT *,
+        -- Final priority calculation using biological factors NULL SAFE
+        (COALESCE(importance_score, 0.0) * 0.4 + COALESCE(working_memory_strength, 0.0) * 0.3 + COALESCE(hebbian_strength, 0.0) * 0.2 + COALESCE(sentiment, 0.5) * 0.1) as final_priority,
+        NULL::BIGINT as previous_slot
+    FROM enriched_arrivals
+),
+
+candidates AS (
+    SELECT * FROM scored_arrivals
+    {% if is_incremental() %}
+    UNION ALL BY NAME
+    -- Buffered memories keep their scores; only their slot can change
+    SELECT * EXCLUDE (wm_slot, memory_rank, memory_status, buffered_at), wm_slot as previous_slot
+    FROM {{ this }}
+    WHERE timestamp > CURRENT_TIMESTAMP - INTERVAL '{{ var('working_memory_window_minutes', 5) }} minutes'
+    {% endif %}
+),
+
+top_slots AS (
+    -- Miller's 7±2 constraint - heap top-N over the candidates, then slot assignment
+    SELECT
+        memory_id,
+        ROW_NUMBER() OVER (ORDER BY final_priority DESC, memory_id) as memory_rank
+    FROM (
+        SELECT memory_id, final_priority
+        FROM candidates
+        ORDER BY final_priority DESC, memory_id
+        LIMIT {{ var('working_memory_capacity') }}
+    ) heap
+)
+
+SELECT
+    c.* EXCLUDE (previous_slot),
+    t.memory_rank as wm_slot,
+    t.memory_rank,
+    CASE WHEN t.memory_rank <= {{ var('working_memory_capacity') }} THEN 'active' ELSE 'buffer' END as memory_status,
+    CURRENT_TIMESTAMP as buffered_at
+FROM candidates c
+LEFT JOIN top_slots t ON t.memory_id = c.memory_id
+-- Rewrite only new arrivals and memories whose slot changed
+WHERE c.previous_slot IS DISTINCT FROM t.memory_rank
+   OR c.memory_id IN (SELECT memory_id FROM scored_arrivals)
@@ -0,0 +1,279 @@
+#!/usr/bin/env python3
+"""
+Content-hash keyed embedding reuse for PostgreSQL memories.
+
+Codex stores a SHA-256 content_hash on public.memories, so identical content
+(chunked documents, re-imported memories) only needs to be embedded once.
+Embeddings are recorded in public.content_embeddings keyed by that hash and the
+embedding model, and fanned out to every memory sharing it with a single
+set-based UPDATE. The table and the memories.content_hash index come from
+sql/migrations/003_add_content_embeddings.sql.
+"""
+
+import argparse
+import logging
+import os
+import sys
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import psycopg2
+from psycopg2.extras import execute_values
+
+# Add macros directory to path for imports
+sys.path.append(os.path.join(os.path.dirname(__file__), "../macros"))
+
+# Configure logging
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+logger = logging.getLogger(__name__)
+
+POSTGRES_URL = os.getenv("POSTGRES_DB_URL")
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "nomic-embed-text")
+BATCH_SIZE = int(os.getenv("CONTENT_EMBEDDING_BATCH_SIZE", "64"))
+
+CONTENT_EMBEDDINGS_MIGRATION = "biological_memory/sql/migrations/003_add_content_embeddings.sql"
+
+# Columns of the content_embeddings primary key; 2 once the per-model key is in place
+CONTENT_EMBEDDINGS_KEY_SQL = """
+SELECT count(*)
+FROM pg_index i
+JOIN pg_attribute a ON a.attrelid = i.indrelid AND a.attnum = ANY(i.indkey)
+WHERE i.indrelid = to_regclass('public.content_embeddings')
+  AND i.indisprimary
+"""
+
+# Record embeddings already written to the given memories under their content hash
+RECORD_FROM_MEMORIES_SQL = """
+INSERT INTO public.content_embeddings (
+    content_hash, embedding_model, embedding_vector, embedding_reduced, vector_magnitude,
+    semantic_cluster
+)
+SELECT DISTINCT ON (m.content_hash)
+    m.content_hash, %s, m.embedding_vector, m.embedding_reduced, m.vector_magnitude,
+    m.semantic_cluster
+FROM public.memories m
+WHERE m.id = ANY(%s::uuid[])
+  AND m.content_hash IS NOT NULL
+  AND m.embedding_vector IS NOT NULL
+ON CONFLICT (content_hash, embedding_model) DO NOTHING
+"""
+
+FAN_OUT_SQL = """
+UPDATE public.memories m
+SET
+    embedding_vector = ce.embedding_vector,
+    embedding_reduced = ce.embedding_reduced,
+    vector_magnitude = ce.vector_magnitude,
+    semantic_cluster = COALESCE(ce.semantic_cluster, m.semantic_cluster),
+    last_embedding_update = CURRENT_TIMESTAMP
+FROM public.content_embeddings ce
+WHERE m.content_hash = ce.content_hash
+  AND ce.embedding_model = %s
+  AND m.embedding_vector IS NULL
+"""
+
+
+def ensure_content_embeddings_table(pg_conn: psycopg2.extensions.connection) -> None:
+    """Fail fast unless migration 003 has created public.content_embeddings
+
+    The schema is not created here: indexing the live Codex memories table needs
+    CREATE INDEX CONCURRENTLY, which cannot run inside this connection's transaction.
+    """
+    with pg_conn.cursor() as cursor:
+        cursor.execute(CONTENT_EMBEDDINGS_KEY_SQL)
+        key_columns = cursor.fetchone()[0]
+    pg_conn.rollback()
+    if key_columns != 2:
+        raise RuntimeError(
+            "public.content_embeddings is missing or keyed on content_hash alone; "
+            f"apply {CONTENT_EMBEDDINGS_MIGRATION} first"
+        )
+
+
+def fan_out_hash_embeddings(
+    cursor: psycopg2.extensions.cursor,
+    content_hashes: Optional[Sequence[str]] = None,
+    model: str = EMBEDDING_MODEL,
+) -> int:
+    """Copy known hash embeddings from model onto every memory with that hash still lacking one
+
+    With content_hashes=None every known hash is considered, which backfills
+    memories imported since the last run without any Ollama or DuckDB work.
+    """
+    if content_hashes is None:
+        cursor.execute(FAN_OUT_SQL, (model,))
+    else:
+        if not content_hashes:
+            return 0
+        cursor.execute(
+            FAN_OUT_SQL + "  AND ce.content_hash = ANY(%s)", (model, list(content_hashes))
+        )
+    return cursor.rowcount
+
+
+def record_by_content_hash(
+    cursor: psycopg2.extensions.cursor, memory_ids: List[str], model: str = EMBEDDING_MODEL
+) -> None:
+    """Record the embeddings just written to memory_ids under their content hash and model
+
+    Only inserts into public.content_embeddings; no other memory rows are touched.
+    """
+    if memory_ids:
+        cursor.execute(RECORD_FROM_MEMORIES_SQL, (model, memory_ids))
+
+
+def propagate_by_content_hash(
+    cursor: psycopg2.extensions.cursor, memory_ids: List[str], model: str = EMBEDDING_MODEL
+) -> int:
+    """Record the embeddings just written to memory_ids and fan them out by hash
+
+    Returns the number of additional memories that received an embedding.
+    """
+    if not memory_ids:
+        return 0
+    record_by_content_hash(cursor, memory_ids, model)
+    cursor.execute(
+        "SELECT DISTINCT content_hash FROM public.memories "
+        "WHERE id = ANY(%s::uuid[]) AND content_hash IS NOT NULL",
+        (memory_ids,),
+    )
+    content_hashes = [row[0] for row in cursor.fetchall()]
+    return fan_out_hash_embeddings(cursor, content_hashes, model)
+
+
+def get_unseen_content(
+    pg_conn: psycopg2.extensions.connection,
+    after_hash: str = "",
+    limit: int = BATCH_SIZE,
+    model: str = EMBEDDING_MODEL,
+) -> List[Tuple[str, str]]:
+    """One (content_hash, content) per hash that has no stored embedding from model yet
+
+    Ordered by content_hash so callers can page past hashes that failed to embed.
+    """
+    with pg_conn.cursor() as cursor:
+        cursor.execute(
+            """
+            SELECT DISTINCT ON (m.content_hash) m.content_hash, m.content
+            FROM public.memories m
+            WHERE m.embedding_vector IS NULL
+              AND m.content_hash IS NOT NULL
+              AND m.content IS NOT NULL
+              AND m.content_hash > %s
+              AND NOT EXISTS (
+                  SELECT 1 FROM public.content_embeddings ce
+                  WHERE ce.content_hash = m.content_hash
+                    AND ce.embedding_model = %s
+              )
+            ORDER BY m.content_hash
+            LIMIT %s
+        """,
+            (after_hash, model, limit),
+        )
+        return cursor.fetchall()
+
+
+def _to_pgvector(values: np.ndarray) -> str:
+    return "[" + ",".join(np.asarray(values, dtype=np.float32).astype(str)) + "]"
+
+
+def store_hash_embeddings(
+    cursor: psycopg2.extensions.cursor,
+    hash_embeddings: Dict[str, np.ndarray],
+    model: str = EMBEDDING_MODEL,
+) -> int:
+    """Insert freshly generated embeddings keyed by content hash"""
+    rows = []
+    for content_hash, embedding in hash_embeddings.items():
+        magnitude = float(np.linalg.norm(embedding))
+        rows.append(
+            (content_hash, _to_pgvector(embedding), _to_pgvector(embedding[:256]), magnitude, model)
+        )
+    if not rows:
+        return 0
+    execute_values(
+        cursor,
+        """
+        INSERT INTO public.content_embeddings (
+            content_hash, embedding_vector, embedding_reduced, vector_magnitude, embedding_model
+        ) VALUES %s
+        ON CONFLICT (content_hash, embedding_model) DO NOTHING
+    """,
+        rows,
+        template="(%s, %s::vector(768), %s::vector(256), %s, %s)",
+    )
+    return len(rows)
+
+
+def embed_missing_memories(
+    pg_conn: psycopg2.extensions.connection,
+    batch_size: int = BATCH_SIZE,
+    limit: Optional[int] = None,
+    model: str = EMBEDDING_MODEL,
+) -> Dict[str, int]:
+    """Embed memories lacking an embedding, calling Ollama once per unseen content hash"""
+    from ollama_embeddings import generate_embeddings
+
+    stats = {"reused": 0, "hashes_embedded": 0, "hashes_failed": 0, "memories_updated": 0}
+
+    # Memories whose content was already embedded need no Ollama call at all
+    with pg_conn.cursor() as cursor:
+        stats["reused"] = fan_out_hash_embeddings(cursor, model=model)
+    pg_conn.commit()
+    logger.info(f"Reused stored embeddings for {stats['reused']} memories")
+
+    after_hash = ""
+    while limit is None or stats["hashes_embedded"] + stats["hashes_failed"] < limit:
+        page_size = batch_size
+        if limit is not None:
+            page_size = min(batch_size, limit - stats["hashes_embedded"] - stats["hashes_failed"])
+        unseen = get_unseen_content(pg_conn, after_hash, page_size, model=model)
+        if not unseen:
+            break
+        after_hash = unseen[-1][0]
+
+        start_time = time.time()
+        embeddings = generate_embeddings([content for _, content in unseen], model=model)
+        generated = {
+            content_hash: embedding
+            for (content_hash, _), embedding in zip(unseen, embeddings)
+            if embedding is not None
+        }
+        stats["hashes_failed"] += len(unseen) - len(generated)
+
+        with pg_conn.cursor() as cursor:
+            stats["hashes_embedded"] += store_hash_embeddings(cursor, generated, model)
+            updated = fan_out_hash_embeddings(cursor, list(generated), model)
+        pg_conn.commit()
+        stats["memories_updated"] += updated
+
+        logger.info(
+            f"Embedded {len(generated)}/{len(unseen)} new hashes -> {updated} memories "
+            f"in {time.time() - start_time:.2f}s"
+        )
+
+    return stats
+
+
+def main():
+    """Generate content embeddings for memories, deduplicated by content_hash"""
+    parser = argparse.ArgumentParser(description="Embed memories by content hash")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="Hashes per request")
+    parser.add_argument("--limit", type=int, help="Maximum number of new hashes to embed")
+    args = parser.parse_args()
+
+    pg_conn = psycopg2.connect(POSTGRES_URL)
+    try:
+        ensure_content_embeddings_table(pg_conn)
+        stats = embed_missing_memories(pg_conn, batch_size=args.batch_size, limit=args.limit)
+        logger.info(
+            f"Done: {stats['reused']} reused, {stats['hashes_embedded']} hashes embedded, "
+            f"{stats['memories_updated']} memories updated, {stats['hashes_failed']} failed"
+        )
+    finally:
+        pg_conn.close()
+
+
+if __name__ == "__main__":
+    main()
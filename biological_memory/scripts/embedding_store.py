@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+"""
+Parquet embedding store read by the memory_embeddings model.
+
+memory_embeddings no longer synthesizes vectors in SQL: it left-joins this
+store on content_hash (SHA-256 of content, identical to DuckDB's sha256())
+and flags every memory without a match as needs_embedding. This service picks
+up the flagged memories, embeds each distinct content once through the batched
+Ollama client, and appends the vectors as an immutable Parquet part file that
+the next dbt run joins in.
+
+The service runs alongside dbt, so it never keeps the DuckDB file open while
+waiting on Ollama: each page of pending contents is read through a short-lived
+read-only connection that is closed before the page is embedded.
+"""
+
+import argparse
+import glob
+import hashlib
+import logging
+import os
+import sys
+import time
+import uuid
+from typing import Callable, Dict, List, Optional, Tuple
+
+import duckdb
+import numpy as np
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+# Add macros directory to path for imports
+sys.path.append(os.path.join(os.path.dirname(__file__), "../macros"))
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+logger = logging.getLogger(__name__)
+
+DUCKDB_PATH = os.getenv("DUCKDB_PATH", "/tmp/memory.duckdb")
+EMBEDDING_STORE_PATH = os.getenv("EMBEDDING_STORE_PATH", "./embedding_store")
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "nomic-embed-text")
+EMBEDDING_DIMENSIONS = 768
+BATCH_SIZE = int(os.getenv("EMBEDDING_STORE_BATCH_SIZE", "256"))
+LOCK_TIMEOUT_S = float(os.getenv("EMBEDDING_STORE_LOCK_TIMEOUT", "300"))
+
+EMBEDDING_TYPE = pa.list_(pa.float32(), EMBEDDING_DIMENSIONS)
+
+STORE_SCHEMA = pa.schema(
+    [
+        ("content_hash", pa.string()),
+        ("memory_id", pa.string()),
+        ("content_embedding", EMBEDDING_TYPE),
+        ("summary_embedding", EMBEDDING_TYPE),
+        ("context_embedding", EMBEDDING_TYPE),
+        ("embedding_model", pa.string()),
+        ("generated_at", pa.timestamp("us")),
+    ]
+)
+
+# One row per distinct content still waiting for an embedding
+PENDING_SQL = """
+SELECT
+    content_hash,
+    ANY_VALUE(memory_id)::VARCHAR AS memory_id,
+    ANY_VALUE(content) AS content,
+    ANY_VALUE(summary) AS summary,
+    ANY_VALUE(context) AS context
+FROM memory_embeddings
+WHERE needs_embedding
+  AND content_hash > ?
+GROUP BY content_hash
+ORDER BY content_hash
+LIMIT ?
+"""
+
+# (texts, model) -> (len(texts), dims) float32 matrix and a mask of rows that hold an embedding
+EmbedMatrixFn = Callable[[List[Optional[str]], str], Tuple[np.ndarray, np.ndarray]]
+
+
+def content_hash(content: str) -> str:
+    """Hex SHA-256 of the content, matching DuckDB's sha256(content)"""
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+def embedding_column(matrix: np.ndarray, valid: np.ndarray) -> pa.FixedSizeListArray:
+    """FLOAT[768] Arrow column with nulls where no embedding was generated"""
+    values = pa.array(np.ascontiguousarray(matrix, dtype=np.float32).ravel())
+    return pa.FixedSizeListArray.from_arrays(values, EMBEDDING_DIMENSIONS, mask=pa.array(~valid))
+
+
+def store_files(store_path: str) -> List[str]:
+    """Parquet part files currently in the store"""
+    return sorted(glob.glob(os.path.join(store_path, "*.parquet")))
+
+
+def write_store_part(store_path: str, table: pa.Table) -> str:
+    """
+    Append a Parquet part file to the store
+
+    The file is written under a temporary name and renamed into place, so a dbt run
+    reading the store's glob never sees a partially written part.
+    """
+    os.makedirs(store_path, exist_ok=True)
+    name = f"embeddings-{time.strftime('%Y%m%dT%H%M%S')}-{uuid.uuid4().hex[:8]}.parquet"
+    path = os.path.join(store_path, name)
+    tmp_path = os.path.join(store_path, f".{name}.tmp")
+    pq.write_table(table.select(STORE_SCHEMA.names).cast(STORE_SCHEMA), tmp_path)
+    os.replace(tmp_path, path)
+    return path
+
+
+def compact_store(store_path: str) -> Optional[str]:
+    """
+    Rewrite the store as one part holding the latest row per (content_hash, model)
+
+    Returns:
+        Path of the compacted part, or None when there was nothing to compact
+    """
+    parts = store_files(store_path)
+    if len(parts) < 2:
+        return None
+    conn = duckdb.connect(":memory:")
+    try:
+        result = conn.execute(
+            """
+            SELECT *
+            FROM read_parquet(?, union_by_name = true)
+            QUALIFY ROW_NUMBER() OVER (
+                PARTITION BY content_hash, embedding_model ORDER BY generated_at DESC
+            ) = 1
+            """,
+            [parts],
+        )
+        # to_arrow_table replaces fetch_arrow_table in newer DuckDB releases
+        fetch = getattr(result, "to_arrow_table", None) or result.fetch_arrow_table
+        compacted = write_store_part(store_path, fetch())
+    finally:
+        conn.close()
+    for part in parts:
+        os.remove(part)
+    return compacted
+
+
+class EmbeddingStoreWriter:
+    """
+    Embeds memories flagged needs_embedding and appends them to the Parquet store
+
+    Args:
+        duckdb_path: DuckDB database holding main.memory_embeddings, opened
+            read-only once per page
+        store_path: Directory of Parquet part files
+        model: Ollama embedding model
+        embed_matrix: Batch embedding function, generate_embedding_matrix by default
+        lock_timeout_s: How long to keep retrying while dbt holds the database lock
+    """
+
+    def __init__(
+        self,
+        duckdb_path: str = DUCKDB_PATH,
+        store_path: str = EMBEDDING_STORE_PATH,
+        model: str = EMBEDDING_MODEL,
+        embed_matrix: Optional[EmbedMatrixFn] = None,
+        lock_timeout_s: float = LOCK_TIMEOUT_S,
+    ):
+        self.duckdb_path = duckdb_path
+        self.lock_timeout_s = lock_timeout_s
+        self.store_path = store_path
+        self.model = model
+        if embed_matrix is None:
+            from ollama_embeddings import generate_embedding_matrix
+
+            embed_matrix = generate_embedding_matrix
+        self.embed_matrix = embed_matrix
+
+    def _connect(self) -> duckdb.DuckDBPyConnection:
+        """Read-only connection, waiting out a dbt run that holds the write lock"""
+        deadline = time.time() + self.lock_timeout_s
+        delay = 0.5
+        while True:
+            try:
+                return duckdb.connect(self.duckdb_path, read_only=True)
+            except duckdb.IOException as e:
+                if "lock" not in str(e).lower() or time.time() >= deadline:
+                    raise
+                logger.info(f"{self.duckdb_path} is locked, retrying in {delay:.1f}s")
+                time.sleep(delay)
+                delay = min(delay * 2, 10.0)
+
+    def pending(self, after_hash: str, limit: int) -> pa.Table:
+        """Next page of distinct pending contents from main.memory_embeddings"""
+        conn = self._connect()
+        try:
+            result = conn.execute(PENDING_SQL, [after_hash, limit])
+            fetch = getattr(result, "to_arrow_table", None) or result.fetch_arrow_table
+            return fetch()
+        finally:
+            # Closed before the page goes to Ollama so dbt can take the write lock
+            conn.close()
+
+    def embed(self, pending: pa.Table) -> pa.Table:
+        """Store rows for the pending contents; contents that failed to embed are left out"""
+        columns: Dict[str, pa.Array] = {}
+        for field in ("content", "summary", "context"):
+            matrix, valid = self.embed_matrix(pending.column(field).to_pylist(), self.model)
+            columns[f"{field}_embedding"] = embedding_column(matrix, valid)
+
+        table = pa.table(
+            {
+                "content_hash": pending.column("content_hash"),
+                "memory_id": pending.column("memory_id"),
+                **columns,
+                "embedding_model": pa.array([self.model] * pending.num_rows, pa.string()),
+                "generated_at": pa.array(
+                    [np.datetime64("now", "us")] * pending.num_rows, pa.timestamp("us")
+                ),
+            }
+        )
+        return table.filter(table.column("content_embedding").is_valid())
+
+    def run(self, batch_size: int = BATCH_SIZE) -> Dict[str, int]:
+        """Embed every pending content, one store part per batch"""
+        stats = {"pending": 0, "embedded": 0, "failed": 0}
+        after_hash = ""
+        while True:
+            pending = self.pending(after_hash, batch_size)
+            if pending.num_rows == 0:
+                break
+            after_hash = pending.column("content_hash")[-1].as_py()
+            stats["pending"] += pending.num_rows
+
+            start_time = time.time()
+            rows = self.embed(pending)
+            stats["embedded"] += rows.num_rows
+            stats["failed"] += pending.num_rows - rows.num_rows
+            if rows.num_rows:
+                path = write_store_part(self.store_path, rows)
+                logger.info(
+                    f"Embedded {rows.num_rows}/{pending.num_rows} contents into {path} "
+                    f"in {time.time() - start_time:.2f}s"
+                )
+
+        if stats["pending"] == 0:
+            logger.info("No memories need embeddings")
+        return stats
+
+
+def main() -> None:
+    """Embed memories flagged by memory_embeddings into the Parquet embedding store"""
+    parser = argparse.ArgumentParser(description="Fill the Parquet embedding store")
+    parser.add_argument("--duckdb-path", default=DUCKDB_PATH, help="DuckDB database path")
+    parser.add_argument("--store-path", default=EMBEDDING_STORE_PATH, help="Store directory")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="Contents per batch")
+    parser.add_argument("--compact", action="store_true", help="Merge store parts afterwards")
+    args = parser.parse_args()
+
+    EmbeddingStoreWriter(args.duckdb_path, args.store_path).run(args.batch_size)
+
+    if args.compact:
+        compact_store(args.store_path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,478 @@
+#!/usr/bin/env python3
+"""
+Resumable, constant-memory embedding transfer from DuckDB to PostgreSQL.
+
+main.memory_embeddings is read in (created_at, memory_id) order as Arrow record
+batches of bounded size. Each batch is written by one of a small pool of writer
+threads through the binary COPY loader in pgvector_copy, each writer owning its
+own unlogged staging table. Once every chunk up to a position has committed,
+that position is stored in public.embedding_transfer_checkpoints, so an
+interrupted run resumes where it stopped. Rewriting a chunk is idempotent, so a
+crash between a commit and its checkpoint only repeats that chunk. A run that
+reaches the end of the table deletes its checkpoint, so the next run of the job
+starts from the beginning again.
+
+Content-hash propagation stays off the writer connections: each settled chunk's
+embeddings are recorded by hash on the control connection, and the fan-out to
+other memories sharing those hashes runs once after every writer has finished,
+so it never competes with a writer for memory row locks.
+"""
+
+import argparse
+import logging
+import os
+import queue
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Deque, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import duckdb
+import numpy as np
+import psycopg2
+import pyarrow as pa
+from content_hash_embeddings import (
+    ensure_content_embeddings_table,
+    fan_out_hash_embeddings,
+    record_by_content_hash,
+)
+from pgvector_copy import (
+    EMBEDDING_DIMENSIONS,
+    copy_content_embeddings,
+    copy_tag_embeddings,
+    ensure_staging_tables,
+    stack_embeddings,
+)
+from psycopg2.pool import ThreadedConnectionPool
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+logger = logging.getLogger(__name__)
+
+DUCKDB_PATH = os.getenv("DUCKDB_PATH", "/tmp/memory.duckdb")
+POSTGRES_URL = os.getenv("POSTGRES_DB_URL")
+
+CHUNK_ROWS = int(os.getenv("EMBEDDING_TRANSFER_CHUNK_ROWS", "5000"))
+WRITERS = int(os.getenv("EMBEDDING_TRANSFER_WRITERS", "4"))
+
+CREATE_CHECKPOINT_SQL = """
+CREATE TABLE IF NOT EXISTS public.embedding_transfer_checkpoints (
+    job_name TEXT PRIMARY KEY,
+    last_created_at TIMESTAMP,
+    last_memory_id TEXT NOT NULL DEFAULT '',
+    rows_transferred BIGINT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+)
+"""
+
+# Rows without created_at sort first instead of breaking the keyset
+SORT_KEY = "COALESCE(e.created_at, TIMESTAMP '1970-01-01')"
+TARGETS_RELATION = "embedding_transfer_targets"
+
+
+@dataclass
+class TransferCheckpoint:
+    """Position after the last contiguously committed chunk of a job"""
+
+    job_name: str
+    last_created_at: Optional[datetime] = None
+    last_memory_id: str = ""
+    rows_transferred: int = 0
+
+
+@dataclass
+class TransferChunk:
+    """One Arrow record batch ready for a writer"""
+
+    sequence: int
+    record_batch: pa.RecordBatch
+    last_created_at: datetime
+    last_memory_id: str
+    rows: int = field(init=False)
+
+    def __post_init__(self):
+        self.rows = self.record_batch.num_rows
+
+
+def load_checkpoint(pg_conn: psycopg2.extensions.connection, job_name: str) -> TransferCheckpoint:
+    """Read the stored position for job_name, or a fresh checkpoint"""
+    with pg_conn.cursor() as cursor:
+        cursor.execute(CREATE_CHECKPOINT_SQL)
+        cursor.execute(
+            "SELECT last_created_at, last_memory_id, rows_transferred "
+            "FROM public.embedding_transfer_checkpoints WHERE job_name = %s",
+            (job_name,),
+        )
+        row = cursor.fetchone()
+    pg_conn.commit()
+    if row is None:
+        return TransferCheckpoint(job_name)
+    return TransferCheckpoint(job_name, row[0], row[1], row[2])
+
+
+def save_checkpoint(
+    pg_conn: psycopg2.extensions.connection, checkpoint: TransferCheckpoint
+) -> None:
+    """Upsert the checkpoint in its own transaction"""
+    with pg_conn.cursor() as cursor:
+        cursor.execute(
+            """
+            INSERT INTO public.embedding_transfer_checkpoints (
+                job_name, last_created_at, last_memory_id, rows_transferred, updated_at
+            ) VALUES (%s, %s, %s, %s, CURRENT_TIMESTAMP)
+            ON CONFLICT (job_name) DO UPDATE SET
+                last_created_at = EXCLUDED.last_created_at,
+                last_memory_id = EXCLUDED.last_memory_id,
+                rows_transferred = EXCLUDED.rows_transferred,
+                updated_at = EXCLUDED.updated_at
+            """,
+            (
+                checkpoint.job_name,
+                checkpoint.last_created_at,
+                checkpoint.last_memory_id,
+                checkpoint.rows_transferred,
+            ),
+        )
+    pg_conn.commit()
+
+
+def reset_checkpoint(pg_conn: psycopg2.extensions.connection, job_name: str) -> None:
+    """Forget the stored position so the next run starts from the beginning"""
+    with pg_conn.cursor() as cursor:
+        cursor.execute(CREATE_CHECKPOINT_SQL)
+        cursor.execute(
+            "DELETE FROM public.embedding_transfer_checkpoints WHERE job_name = %s", (job_name,)
+        )
+    pg_conn.commit()
+
+
+def arrow_embeddings(
+    column: pa.ChunkedArray, dimensions: int = EMBEDDING_DIMENSIONS
+) -> Tuple[np.ndarray, np.ndarray]:
+    """(n, dimensions) float32 matrix and validity mask from an Arrow list column
+
+    When every row is either NULL or a full-length vector, the matrix is filled
+    from the flat child buffer without touching Python objects; ragged columns
+    fall back to row-by-row stacking.
+    """
+    if isinstance(column, pa.ChunkedArray):
+        column = column.combine_chunks()
+    lengths = column.value_lengths().fill_null(0).to_numpy(zero_copy_only=False)
+    present = lengths == dimensions
+    if lengths[~present].sum() != 0:
+        return stack_embeddings(column.to_pylist(), dimensions)
+
+    matrix = np.zeros((len(column), dimensions), dtype=np.float32)
+    if present.any():
+        flat = column.flatten().to_numpy(zero_copy_only=False)
+        matrix[present] = flat.reshape(-1, dimensions)
+    return matrix, present & np.isfinite(matrix).all(axis=1)
+
+
+def transfer_targets(
+    content_ids: Sequence[str], tag_ids: Optional[Sequence[str]] = None
+) -> pa.Table:
+    """Arrow relation of memory IDs to transfer and which embeddings each one needs
+
+    Joined against memory_embeddings instead of inlining the IDs into the SQL text.
+    """
+    content = set(content_ids)
+    tags = set(tag_ids or ())
+    memory_ids = sorted(content | tags)
+    return pa.table(
+        {
+            "memory_id": pa.array(memory_ids, type=pa.string()),
+            "needs_content": pa.array([mid in content for mid in memory_ids], type=pa.bool_()),
+            "needs_tags": pa.array([mid in tags for mid in memory_ids], type=pa.bool_()),
+        }
+    )
+
+
+def _masked_values(batch: pa.RecordBatch, name: str, mask: np.ndarray) -> List:
+    return [value for value, keep in zip(batch.column(name).to_pylist(), mask) if keep]
+
+
+def _record_batch_reader(result: duckdb.DuckDBPyConnection, rows: int) -> pa.RecordBatchReader:
+    # to_arrow_reader replaces fetch_record_batch in newer DuckDB releases
+    reader = getattr(result, "to_arrow_reader", None) or result.fetch_record_batch
+    return reader(rows)
+
+
+class EmbeddingTransferEngine:
+    """
+    Stream memory_embeddings from DuckDB into PostgreSQL with checkpoints
+
+    Args:
+        duckdb_conn: Connection holding main.memory_embeddings
+        postgres_url: DSN for the writer connection pool
+        job_name: Checkpoint key; separate jobs keep separate positions
+        include_tags: Also transfer tag_embedding / tag_embedding_updated
+        where: Extra SQL predicate on memory_embeddings (aliased as e)
+        targets: Optional transfer_targets() relation restricting which memories
+            and which of their embeddings are written
+        writers: Parallel writer connections
+        chunk_rows: Rows per Arrow record batch and per COPY
+    """
+
+    def __init__(
+        self,
+        duckdb_conn: duckdb.DuckDBPyConnection,
+        postgres_url: str = POSTGRES_URL,
+        job_name: str = "memory_embeddings",
+        include_tags: bool = False,
+        where: str = "",
+        writers: int = WRITERS,
+        chunk_rows: int = CHUNK_ROWS,
+        targets: Optional[pa.Table] = None,
+    ):
+        self.duckdb_conn = duckdb_conn
+        self.postgres_url = postgres_url
+        self.job_name = job_name
+        self.include_tags = include_tags
+        self.where = where
+        self.writers = max(1, writers)
+        self.chunk_rows = max(1, chunk_rows)
+        self.targets = targets
+        self.stats = {
+            "chunks": 0,
+            "rows_read": 0,
+            "content_updated": 0,
+            "tag_updated": 0,
+            "propagated": 0,
+        }
+
+    def _query(self, checkpoint: TransferCheckpoint) -> Tuple[str, List]:
+        columns = [
+            "e.memory_id::VARCHAR AS memory_id",
+            f"{SORT_KEY} AS sort_created_at",
+            "e.final_embedding",
+            "e.semantic_cluster",
+            "e.embedding_magnitude",
+        ]
+        predicates = ["e.final_embedding IS NOT NULL"]
+        if self.include_tags:
+            columns += ["e.tag_embedding", "e.tag_embedding_updated"]
+            predicates = ["(e.final_embedding IS NOT NULL OR e.tag_embedding IS NOT NULL)"]
+        if self.where:
+            predicates.append(f"({self.where})")
+
+        source = "main.memory_embeddings e"
+        if self.targets is not None:
+            columns += ["t.needs_content", "t.needs_tags"]
+            source += f" JOIN {TARGETS_RELATION} t ON t.memory_id = e.memory_id::VARCHAR"
+
+        params: List = []
+        if checkpoint.last_created_at is not None:
+            predicates.append(f"({SORT_KEY}, e.memory_id::VARCHAR) > (?::TIMESTAMP, ?)")
+            params = [checkpoint.last_created_at, checkpoint.last_memory_id]
+
+        query = f"""
+        SELECT {", ".join(columns)}
+        FROM {source}
+        WHERE {" AND ".join(predicates)}
+        ORDER BY {SORT_KEY}, e.memory_id::VARCHAR
+        """
+        return query, params
+
+    def iter_chunks(self, checkpoint: TransferCheckpoint) -> Iterator[TransferChunk]:
+        """Arrow record batches after the checkpoint, at most chunk_rows each"""
+        query, params = self._query(checkpoint)
+        if self.targets is not None:
+            self.duckdb_conn.register(TARGETS_RELATION, self.targets)
+        try:
+            result = self.duckdb_conn.execute(query, params)
+            reader = _record_batch_reader(result, self.chunk_rows)
+            for sequence, record_batch in enumerate(reader):
+                if record_batch.num_rows == 0:
+                    continue
+                yield TransferChunk(
+                    sequence=sequence,
+                    record_batch=record_batch,
+                    last_created_at=record_batch.column("sort_created_at")[-1].as_py(),
+                    last_memory_id=record_batch.column("memory_id")[-1].as_py(),
+                )
+        finally:
+            if self.targets is not None:
+                self.duckdb_conn.unregister(TARGETS_RELATION)
+
+    def write_chunk(
+        self, cursor: psycopg2.extensions.cursor, chunk: TransferChunk, suffix: str
+    ) -> Tuple[int, int, List[str]]:
+        """
+        Apply one chunk through the writer's own staging tables
+
+        Returns:
+            Content and tag rows updated, and the memory ids that received content
+        """
+        batch = chunk.record_batch
+        content_updated = tag_updated = 0
+        content_ids: List[str] = []
+
+        matrix, valid = arrow_embeddings(batch.column("final_embedding"))
+        if self.targets is not None:
+            valid &= batch.column("needs_content").to_numpy(zero_copy_only=False)
+        if valid.any():
+            content_ids = _masked_values(batch, "memory_id", valid)
+            content_updated = copy_content_embeddings(
+                cursor,
+                content_ids,
+                matrix[valid],
+                magnitudes=_masked_values(batch, "embedding_magnitude", valid),
+                clusters=_masked_values(batch, "semantic_cluster", valid),
+                staging_suffix=suffix,
+            )
+
+        if self.include_tags:
+            tag_matrix, tag_valid = arrow_embeddings(batch.column("tag_embedding"))
+            if self.targets is not None:
+                tag_valid &= batch.column("needs_tags").to_numpy(zero_copy_only=False)
+            if tag_valid.any():
+                tag_updated = copy_tag_embeddings(
+                    cursor,
+                    _masked_values(batch, "memory_id", tag_valid),
+                    tag_matrix[tag_valid],
+                    updated_at=_masked_values(batch, "tag_embedding_updated", tag_valid),
+                    staging_suffix=suffix,
+                )
+        return content_updated, tag_updated, content_ids
+
+    def run(self, resume: bool = True, max_rows: Optional[int] = None) -> Dict[str, int]:
+        """
+        Transfer everything after the checkpoint (or from the start if resume=False)
+
+        The checkpoint is only kept when the run stops early (max_rows or an error);
+        a run that drains the table clears it.
+        """
+        self.stats = dict.fromkeys(self.stats, 0)
+        pool = ThreadedConnectionPool(1, self.writers + 1, self.postgres_url)
+        control = pool.getconn()
+        try:
+            ensure_content_embeddings_table(control)
+            if not resume:
+                reset_checkpoint(control, self.job_name)
+            checkpoint = load_checkpoint(control, self.job_name)
+
+            # Each writer owns a staging table pair for as long as it holds a chunk
+            staging: "queue.Queue[str]" = queue.Queue()
+            for writer in range(self.writers):
+                suffix = f"_w{writer}"
+                ensure_staging_tables(control, suffix)
+                staging.put(suffix)
+
+            if checkpoint.last_created_at is not None:
+                logger.info(
+                    f"Resuming {self.job_name} after {checkpoint.last_created_at} / "
+                    f"{checkpoint.last_memory_id} ({checkpoint.rows_transferred} rows done)"
+                )
+
+            def write(chunk: TransferChunk) -> Tuple[int, int, List[str]]:
+                conn = pool.getconn()
+                suffix = staging.get()
+                try:
+                    with conn.cursor() as cursor:
+                        counts = self.write_chunk(cursor, chunk, suffix)
+                    conn.commit()
+                    return counts
+                except Exception:
+                    conn.rollback()
+                    raise
+                finally:
+                    staging.put(suffix)
+                    pool.putconn(conn)
+
+            start_time = time.time()
+            window: Deque[Tuple[TransferChunk, Future]] = deque()
+
+            def settle_oldest() -> None:
+                chunk, future = window.popleft()
+                content_updated, tag_updated, content_ids = future.result()
+                self.stats["chunks"] += 1
+                self.stats["content_updated"] += content_updated
+                self.stats["tag_updated"] += tag_updated
+
+                # Serialized on the control connection; only content_embeddings is written
+                with control.cursor() as cursor:
+                    record_by_content_hash(cursor, content_ids)
+                control.commit()
+
+                # Chunks settle in read order, so this position is fully committed
+                checkpoint.last_created_at = chunk.last_created_at
+                checkpoint.last_memory_id = chunk.last_memory_id
+                checkpoint.rows_transferred += chunk.rows
+                save_checkpoint(control, checkpoint)
+
+                elapsed = time.time() - start_time
+                rate = self.stats["rows_read"] / elapsed if elapsed > 0 else 0
+                logger.info(
+                    f"Committed chunk {chunk.sequence} ({checkpoint.rows_transferred} rows total, "
+                    f"{rate:.1f} rows/sec)"
+                )
+
+            exhausted = True
+            with ThreadPoolExecutor(max_workers=self.writers) as executor:
+                try:
+                    for chunk in self.iter_chunks(checkpoint):
+                        # Bounded window keeps memory constant regardless of table size
+                        while len(window) >= self.writers * 2:
+                            settle_oldest()
+                        window.append((chunk, executor.submit(write, chunk)))
+                        self.stats["rows_read"] += chunk.rows
+                        if max_rows is not None and self.stats["rows_read"] >= max_rows:
+                            exhausted = False
+                            break
+                    while window:
+                        settle_oldest()
+                except Exception:
+                    for _, future in window:
+                        future.cancel()
+                    raise
+
+            # Every writer has finished; fan out all recorded hashes in one UPDATE, which
+            # also covers chunks recorded by an earlier run that stopped before this step
+            with control.cursor() as cursor:
+                self.stats["propagated"] = fan_out_hash_embeddings(cursor)
+            control.commit()
+
+            if exhausted:
+                reset_checkpoint(control, self.job_name)
+        finally:
+            pool.putconn(control)
+            pool.closeall()
+
+        logger.info(
+            f"Transfer {self.job_name} complete: {self.stats['content_updated']} content, "
+            f"{self.stats['tag_updated']} tag embeddings, "
+            f"{self.stats['propagated']} more by content hash"
+        )
+        return self.stats
+
+
+def main():
+    """Run a resumable full transfer"""
+    parser = argparse.ArgumentParser(description="Stream DuckDB embeddings into PostgreSQL")
+    parser.add_argument("--job", default="memory_embeddings", help="Checkpoint name")
+    parser.add_argument("--tags", action="store_true", help="Also transfer tag embeddings")
+    parser.add_argument("--restart", action="store_true", help="Ignore the stored checkpoint")
+    parser.add_argument("--writers", type=int, default=WRITERS)
+    parser.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS)
+    parser.add_argument("--max-rows", type=int, help="Stop after this many rows")
+    args = parser.parse_args()
+
+    duckdb_conn = duckdb.connect(DUCKDB_PATH, read_only=True)
+    try:
+        engine = EmbeddingTransferEngine(
+            duckdb_conn,
+            POSTGRES_URL,
+            job_name=args.job,
+            include_tags=args.tags,
+            writers=args.writers,
+            chunk_rows=args.chunk_rows,
+        )
+        engine.run(resume=not args.restart, max_rows=args.max_rows)
+    finally:
+        duckdb_conn.close()
+
+
+if __name__ == "__main__":
+    main()
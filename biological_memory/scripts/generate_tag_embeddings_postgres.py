@@ -10,37 +10,168 @@ import logging
 import os
 import sys
 import time
-from typing import List, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Sequence, Tuple
 
+import numpy as np
 import psycopg2
+import psycopg2.extras
 
 # Add macros directory to path for imports
 sys.path.append(os.path.join(os.path.dirname(__file__), "../macros"))
 
 try:
-    from ollama_embeddings import generate_tag_embedding
+    from ollama_embeddings import (
+        EMBEDDING_MODEL,
+        TAG_EMBEDDING_STRATEGIES,
+        TAG_EMBEDDING_STRATEGY,
+        canonical_tag_string,
+        generate_embedding_matrix,
+        normalize_tags,
+        pool_tag_embeddings,
+    )
 except ImportError:
     print("Warning: ollama_embeddings module not found. Using fallback implementation.")
 
-    def generate_tag_embedding(
-        tags: List[str], model: str = "nomic-embed-text", max_retries: int = 3
-    ) -> Optional[List[float]]:
-        """Fallback implementation without Ollama"""
-        if not tags or not any(tag.strip() for tag in tags):
-            return None
-        return [0.1] * 768  # Fallback embedding
+    EMBEDDING_MODEL = "nomic-embed-text"
+    TAG_EMBEDDING_STRATEGIES = ("concat", "pooled")
+    TAG_EMBEDDING_STRATEGY = os.getenv("TAG_EMBEDDING_STRATEGY", "concat")
+
+    def canonical_tag_string(tags: Optional[List[str]]) -> Optional[str]:
+        """Fallback canonical form: sorted, stripped tags joined with ' | '"""
+        valid_tags = [str(tag).strip() for tag in tags or [] if tag and str(tag).strip()]
+        return " | ".join(sorted(valid_tags)) if valid_tags else None
+
+    def generate_embedding_matrix(
+        texts: List[Optional[str]], model: str = "nomic-embed-text", max_retries: int = 3
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Fallback batch implementation without Ollama"""
+        valid = np.array([bool(text) for text in texts], dtype=bool)
+        return np.full((len(texts), 768), 0.1, dtype=np.float32), valid  # Fallback embedding
+
+    def normalize_tags(tags: Optional[List[str]]) -> List[str]:
+        """Fallback vocabulary keys: distinct stripped, lower-cased tags in sorted order"""
+        return sorted({str(tag).strip().lower() for tag in tags or [] if tag and str(tag).strip()})
+
+    def pool_tag_embeddings(
+        tag_lists: Sequence[Sequence[str]],
+        vocabulary: Dict[str, int],
+        vectors: np.ndarray,
+        weights: Optional[np.ndarray] = None,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Fallback weighted mean-pool, one tag list at a time"""
+        weights = np.ones(len(vectors), dtype=np.float32) if weights is None else weights
+        matrix = np.zeros((len(tag_lists), vectors.shape[1]), dtype=np.float32)
+        valid = np.zeros(len(tag_lists), dtype=bool)
+        for i, tags in enumerate(tag_lists):
+            rows = [vocabulary[tag] for tag in tags if tag in vocabulary]
+            if rows and weights[rows].sum() > 0:
+                pooled = np.average(vectors[rows], axis=0, weights=weights[rows])
+                matrix[i] = pooled / (np.linalg.norm(pooled) or 1.0)
+                valid[i] = True
+        return matrix, valid
 
 
 # Set up logging
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 logger = logging.getLogger(__name__)
 
+# Distinct tag sets per embedding call, and how many calls run at once
+TAG_EMBED_CHUNK = int(os.getenv("TAG_EMBED_CHUNK", "64"))
+TAG_EMBED_WORKERS = int(os.getenv("TAG_EMBED_WORKERS", "4"))
+
+# Each distinct embedding is sent once with every memory id that shares it
+APPLY_TAG_EMBEDDINGS_SQL = """
+    UPDATE public.memories m
+    SET tag_embedding = u.embedding::vector,
+        tag_embedding_updated = CURRENT_TIMESTAMP,
+        has_tag_embedding = TRUE
+    FROM (
+        SELECT unnest(v.ids::uuid[]) AS id, v.embedding
+        FROM (VALUES %s) AS v(ids, embedding)
+    ) AS u
+    WHERE m.id = u.id
+"""
+
+MARK_TAG_EMBEDDING_FAILED_SQL = """
+    UPDATE public.memories
+    SET has_tag_embedding = FALSE,
+        tag_embedding_updated = CURRENT_TIMESTAMP
+    WHERE id = ANY(%s::uuid[])
+"""
+
+# Pooled strategy: one stored vector per normalized tag (see migration 002)
+LOAD_TAG_VOCABULARY_SQL = """
+    SELECT tag, embedding::text, weight
+    FROM public.tag_vocabulary
+    WHERE tag = ANY(%s)
+"""
+
+STORE_TAG_VOCABULARY_SQL = """
+    INSERT INTO public.tag_vocabulary (tag, embedding, model)
+    VALUES %s
+    ON CONFLICT (tag) DO NOTHING
+"""
+
+
+def group_by_tag_set(memories: List[Tuple]) -> Tuple[Dict[str, List[str]], List[str]]:
+    """Group memory ids by canonical tag string; ids without usable tags are returned apart"""
+    groups: Dict[str, List[str]] = {}
+    untagged: List[str] = []
+    for memory_id, tags in memories:
+        tag_string = canonical_tag_string(tags)
+        if tag_string is None:
+            untagged.append(str(memory_id))
+        else:
+            groups.setdefault(tag_string, []).append(str(memory_id))
+    return groups, untagged
+
+
+def group_by_normalized_tags(
+    memories: List[Tuple],
+) -> Tuple[Dict[Tuple[str, ...], List[str]], List[str]]:
+    """Group memory ids by normalized tag tuple for the pooled strategy"""
+    groups: Dict[Tuple[str, ...], List[str]] = {}
+    untagged: List[str] = []
+    for memory_id, tags in memories:
+        tag_set = tuple(normalize_tags(tags))
+        if tag_set:
+            groups.setdefault(tag_set, []).append(str(memory_id))
+        else:
+            untagged.append(str(memory_id))
+    return groups, untagged
+
+
+def embed_tag_strings(tag_strings: List[str]) -> Dict[str, np.ndarray]:
+    """Embed distinct tag strings with concurrent batched requests; failures are omitted"""
+    chunks = [
+        tag_strings[i : i + TAG_EMBED_CHUNK] for i in range(0, len(tag_strings), TAG_EMBED_CHUNK)
+    ]
+    embedded: Dict[str, np.ndarray] = {}
+    with ThreadPoolExecutor(max_workers=TAG_EMBED_WORKERS) as executor:
+        for chunk, (matrix, valid) in zip(chunks, executor.map(generate_embedding_matrix, chunks)):
+            for tag_string, row, ok in zip(chunk, matrix, valid):
+                if ok:
+                    embedded[tag_string] = row
+    return embedded
+
+
+def _to_pgvector(embedding: np.ndarray) -> str:
+    return "[" + ",".join(embedding.astype(str)) + "]"
+
+
+def _from_pgvector(text: str) -> np.ndarray:
+    return np.array(text.strip("[]").split(","), dtype=np.float32)
+
 
 class PostgresTagEmbeddingProcessor:
     """Direct PostgreSQL tag embedding processor"""
 
-    def __init__(self, batch_size: int = 100):
+    def __init__(self, batch_size: int = 100, strategy: Optional[str] = None):
         self.batch_size = batch_size
+        self.strategy = strategy or TAG_EMBEDDING_STRATEGY
+        if self.strategy not in TAG_EMBEDDING_STRATEGIES:
+            raise ValueError(f"Unknown tag embedding strategy: {self.strategy}")
         self.pg_conn = self._connect_postgres()
         self.processed_count = 0
         self.error_count = 0
@@ -85,66 +216,108 @@ class PostgresTagEmbeddingProcessor:
         logger.info(f"Found {len(results)} memories needing tag embeddings")
         return results
 
+    def load_tag_vocabulary(
+        self, tags: List[str]
+    ) -> Tuple[Dict[str, int], List[np.ndarray], List[float]]:
+        """Stored vocabulary vectors for the given tags, as (tag -> row, vectors, weights)"""
+        cursor = self.pg_conn.cursor()
+        try:
+            cursor.execute(LOAD_TAG_VOCABULARY_SQL, (tags,))
+            rows = cursor.fetchall()
+        finally:
+            cursor.close()
+
+        vocabulary = {tag: row for row, (tag, _, _) in enumerate(rows)}
+        vectors = [_from_pgvector(embedding) for _, embedding, _ in rows]
+        weights = [float(weight) for _, _, weight in rows]
+        return vocabulary, vectors, weights
+
+    def store_tag_vocabulary(self, embedded: Dict[str, np.ndarray]) -> None:
+        """Insert newly embedded tags; concurrent writers keep whichever vector landed first"""
+        rows = [(tag, _to_pgvector(row), EMBEDDING_MODEL) for tag, row in embedded.items()]
+        cursor = self.pg_conn.cursor()
+        try:
+            psycopg2.extras.execute_values(
+                cursor, STORE_TAG_VOCABULARY_SQL, rows, template="(%s, %s::vector, %s)"
+            )
+        finally:
+            cursor.close()
+
+    def pool_tag_sets(self, tag_sets: List[Tuple[str, ...]]) -> Dict[Tuple[str, ...], np.ndarray]:
+        """Pool tag-set embeddings from the vocabulary, embedding only tags it lacks"""
+        tags = sorted({tag for tag_set in tag_sets for tag in tag_set})
+        vocabulary, vectors, weights = self.load_tag_vocabulary(tags)
+
+        missing = [tag for tag in tags if tag not in vocabulary]
+        if missing:
+            logger.info(f"Embedding {len(missing)} tags new to the vocabulary")
+            new_vectors = embed_tag_strings(missing)
+            if new_vectors:
+                self.store_tag_vocabulary(new_vectors)
+            for tag, row in new_vectors.items():
+                vocabulary[tag] = len(vectors)
+                vectors.append(row)
+                weights.append(1.0)
+
+        if not vectors:
+            return {}
+        matrix, valid = pool_tag_embeddings(
+            tag_sets, vocabulary, np.vstack(vectors), np.asarray(weights, dtype=np.float32)
+        )
+        return {tag_set: row for tag_set, row, ok in zip(tag_sets, matrix, valid) if ok}
+
     def process_tag_embedding_batch(self, memories: List[Tuple]) -> Tuple[int, int]:
-        """Process a batch of memories for tag embeddings"""
+        """Embed each distinct tag set in the batch once and fan results out in one UPDATE"""
+        if self.strategy == "pooled":
+            groups, untagged = group_by_normalized_tags(memories)
+        else:
+            groups, untagged = group_by_tag_set(memories)
+        logger.info(f"{len(memories)} memories share {len(groups)} distinct tag sets")
+
+        try:
+            if self.strategy == "pooled":
+                embedded = self.pool_tag_sets(list(groups))
+            else:
+                embedded = embed_tag_strings(list(groups))
+        except Exception as e:
+            logger.error(f"✗ Batch tag embedding generation failed: {e}")
+            embedded = {}
+
+        failed_ids = untagged + [
+            memory_id
+            for tag_string, ids in groups.items()
+            if tag_string not in embedded
+            for memory_id in ids
+        ]
         success_count = 0
         error_count = 0
 
         cursor = self.pg_conn.cursor()
-
-        for memory_id, tags in memories:
-            try:
-                # Generate tag embedding using real Ollama integration
-                tag_embedding = generate_tag_embedding(tags)
-
-                if tag_embedding:
-                    # Update PostgreSQL with the tag embedding
-                    cursor.execute(
-                        """
-                        UPDATE public.memories
-                        SET tag_embedding = %s,
-                            tag_embedding_updated = CURRENT_TIMESTAMP,
-                            has_tag_embedding = TRUE
-                        WHERE id = %s
-                    """,
-                        (tag_embedding, memory_id),
-                    )
-
-                    success_count += 1
-                    logger.debug(f"✓ Generated tag embedding for memory {memory_id}")
-                else:
-                    # Mark as failed but don't error
-                    cursor.execute(
-                        """
-                        UPDATE public.memories
-                        SET has_tag_embedding = FALSE,
-                            tag_embedding_updated = CURRENT_TIMESTAMP
-                        WHERE id = %s
-                    """,
-                        (memory_id,),
-                    )
-
-                    logger.warning(f"⚠ No embedding generated for memory {memory_id}")
-
-            except Exception as e:
-                error_count += 1
-                logger.error(f"✗ Error processing memory {memory_id}: {e}")
-
-                # Mark as error
+        try:
+            if embedded:
+                rows = [
+                    (groups[tag_string], _to_pgvector(row)) for tag_string, row in embedded.items()
+                ]
                 try:
-                    cursor.execute(
-                        """
-                        UPDATE public.memories
-                        SET has_tag_embedding = FALSE,
-                            tag_embedding_updated = CURRENT_TIMESTAMP
-                        WHERE id = %s
-                    """,
-                        (memory_id,),
+                    psycopg2.extras.execute_values(
+                        cursor, APPLY_TAG_EMBEDDINGS_SQL, rows, page_size=len(rows)
                     )
+                    success_count = sum(len(ids) for ids, _ in rows)
+                except Exception as e:
+                    logger.error(f"✗ Error applying tag embeddings: {e}")
+                    error_count = sum(len(ids) for ids, _ in rows)
+                    failed_ids += [memory_id for ids, _ in rows for memory_id in ids]
+
+            if failed_ids:
+                # Mark as failed but don't error
+                logger.warning(f"⚠ No embedding generated for {len(failed_ids)} memories")
+                try:
+                    cursor.execute(MARK_TAG_EMBEDDING_FAILED_SQL, (failed_ids,))
                 except Exception as update_error:
-                    logger.error(f"Failed to mark error for memory {memory_id}: {update_error}")
+                    logger.error(f"Failed to mark tag embedding failures: {update_error}")
+        finally:
+            cursor.close()
 
-        cursor.close()
         return success_count, error_count
 
     def process_all_tag_embeddings(self, max_memories: int = None) -> None:
@@ -212,6 +385,12 @@ def main():
     parser.add_argument(
         "--test-run", action="store_true", help="Process only 10 memories for testing"
     )
+    parser.add_argument(
+        "--strategy",
+        choices=TAG_EMBEDDING_STRATEGIES,
+        default=TAG_EMBEDDING_STRATEGY,
+        help="Embed whole tag strings (concat) or pool per-tag vocabulary vectors (pooled)",
+    )
 
     args = parser.parse_args()
 
@@ -219,7 +398,9 @@ def main():
         args.max_memories = 10
 
     try:
-        processor = PostgresTagEmbeddingProcessor(batch_size=args.batch_size)
+        processor = PostgresTagEmbeddingProcessor(
+            batch_size=args.batch_size, strategy=args.strategy
+        )
         processor.process_all_tag_embeddings(max_memories=args.max_memories)
 
     except KeyboardInterrupt:
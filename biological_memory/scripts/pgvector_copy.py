@@ -0,0 +1,293 @@
+#!/usr/bin/env python3
+"""
+Binary COPY bulk loader for pgvector embedding transfers.
+
+Each batch is encoded as PostgreSQL binary COPY tuples in a single NumPy
+structured array, streamed into an UNLOGGED staging table with
+COPY ... FROM STDIN (FORMAT binary), and applied to public.memories with one
+UPDATE ... FROM join. embedding_reduced and vector_magnitude are derived from
+the batch matrix on the client, so no vector is ever formatted as decimal text.
+"""
+
+import io
+import logging
+import struct
+import uuid
+from datetime import datetime, timezone
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+import psycopg2
+
+logger = logging.getLogger(__name__)
+
+EMBEDDING_DIMENSIONS = 768
+REDUCED_DIMENSIONS = 256
+NO_CLUSTER = -1  # Staged in place of NULL so every tuple has the same layout
+
+PGCOPY_HEADER = b"PGCOPY\n\xff\r\n\x00" + struct.pack("!ii", 0, 0)
+PGCOPY_TRAILER = struct.pack("!h", -1)
+PG_EPOCH = np.datetime64("2000-01-01T00:00:00", "us")
+PG_TIMESTAMP_NEG_INFINITY = np.iinfo(np.int64).min
+
+CONTENT_STAGING = "embedding_copy_staging"
+TAG_STAGING = "tag_embedding_copy_staging"
+
+# {suffix} lets concurrent writers each own a staging table
+CREATE_STAGING_SQL = f"""
+CREATE UNLOGGED TABLE IF NOT EXISTS public.{CONTENT_STAGING}{{suffix}} (
+    memory_id UUID NOT NULL,
+    embedding_vector vector({EMBEDDING_DIMENSIONS}) NOT NULL,
+    embedding_reduced vector({REDUCED_DIMENSIONS}) NOT NULL,
+    vector_magnitude REAL NOT NULL,
+    semantic_cluster INTEGER NOT NULL
+);
+CREATE UNLOGGED TABLE IF NOT EXISTS public.{TAG_STAGING}{{suffix}} (
+    memory_id UUID NOT NULL,
+    tag_embedding vector({EMBEDDING_DIMENSIONS}) NOT NULL,
+    tag_embedding_reduced vector({REDUCED_DIMENSIONS}) NOT NULL,
+    tag_embedding_updated TIMESTAMP NOT NULL
+);
+"""
+
+APPLY_CONTENT_SQL = f"""
+UPDATE public.memories m
+SET
+    embedding_vector = s.embedding_vector,
+    embedding_reduced = s.embedding_reduced,
+    vector_magnitude = s.vector_magnitude,
+    semantic_cluster = NULLIF(s.semantic_cluster, {NO_CLUSTER}),
+    last_embedding_update = CURRENT_TIMESTAMP
+FROM public.{{staging}} s
+WHERE m.id = s.memory_id
+"""
+
+APPLY_TAG_SQL = """
+UPDATE public.memories m
+SET
+    tag_embedding = s.tag_embedding,
+    tag_embedding_reduced = s.tag_embedding_reduced,
+    tag_embedding_updated = COALESCE(
+        NULLIF(s.tag_embedding_updated, '-infinity'::timestamp), CURRENT_TIMESTAMP
+    )
+FROM public.{staging} s
+WHERE m.id = s.memory_id
+"""
+
+
+def _field(value_dtype: str, shape: Tuple[int, ...] = ()) -> np.dtype:
+    """One COPY field: int32 byte length followed by the value"""
+    return np.dtype([("length", ">i4"), ("value", value_dtype, shape)])
+
+
+def _vector_field(dimensions: int) -> np.dtype:
+    """pgvector binary format: int16 dim, int16 unused, float4 values"""
+    return np.dtype(
+        [
+            ("length", ">i4"),
+            ("dim", ">i2"),
+            ("unused", ">i2"),
+            ("value", ">f4", (dimensions,)),
+        ]
+    )
+
+
+CONTENT_TUPLE = np.dtype(
+    [
+        ("fields", ">i2"),
+        ("memory_id", _field("u1", (16,))),
+        ("embedding_vector", _vector_field(EMBEDDING_DIMENSIONS)),
+        ("embedding_reduced", _vector_field(REDUCED_DIMENSIONS)),
+        ("vector_magnitude", _field(">f4")),
+        ("semantic_cluster", _field(">i4")),
+    ]
+)
+
+TAG_TUPLE = np.dtype(
+    [
+        ("fields", ">i2"),
+        ("memory_id", _field("u1", (16,))),
+        ("tag_embedding", _vector_field(EMBEDDING_DIMENSIONS)),
+        ("tag_embedding_reduced", _vector_field(REDUCED_DIMENSIONS)),
+        ("tag_embedding_updated", _field(">i8")),
+    ]
+)
+
+
+def ensure_staging_tables(pg_conn: psycopg2.extensions.connection, suffix: str = "") -> None:
+    """Create the unlogged staging tables if missing"""
+    with pg_conn.cursor() as cursor:
+        cursor.execute(CREATE_STAGING_SQL.format(suffix=suffix))
+    pg_conn.commit()
+
+
+def stack_embeddings(
+    embeddings: Sequence[Optional[Sequence[float]]], dimensions: int = EMBEDDING_DIMENSIONS
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Stack embeddings into a float32 matrix plus a mask of usable rows
+
+    Rows that are missing, the wrong length or non-finite are left as zeros and
+    marked False so a bad vector cannot fail the whole COPY.
+    """
+    if isinstance(embeddings, np.ndarray) and embeddings.ndim == 2:
+        matrix = np.asarray(embeddings, dtype=np.float32)
+        if matrix.shape[1] != dimensions:
+            return matrix, np.zeros(len(matrix), dtype=bool)
+        return matrix, np.isfinite(matrix).all(axis=1)
+
+    matrix = np.zeros((len(embeddings), dimensions), dtype=np.float32)
+    valid = np.zeros(len(embeddings), dtype=bool)
+    for i, embedding in enumerate(embeddings):
+        if embedding is not None and len(embedding) == dimensions:
+            matrix[i] = embedding
+            valid[i] = True
+    valid &= np.isfinite(matrix).all(axis=1)
+    return matrix, valid
+
+
+def _uuid_bytes(memory_ids: Iterable) -> np.ndarray:
+    raw = b"".join(uuid.UUID(str(memory_id)).bytes for memory_id in memory_ids)
+    return np.frombuffer(raw, dtype=np.uint8).reshape(-1, 16)
+
+
+def _fill_vector(records: np.ndarray, name: str, matrix: np.ndarray) -> None:
+    field = records[name]
+    field["length"] = 4 + 4 * matrix.shape[1]
+    field["dim"] = matrix.shape[1]
+    field["unused"] = 0
+    field["value"] = matrix
+
+
+def _timestamp_micros(values: Sequence[Optional[datetime]]) -> np.ndarray:
+    """Microseconds since 2000-01-01 as PostgreSQL stores them; None -> -infinity"""
+    naive = [
+        (
+            value.astimezone(timezone.utc).replace(tzinfo=None)
+            if value is not None and value.tzinfo is not None
+            else value
+        )
+        for value in values
+    ]
+    stamps = np.array(naive, dtype="datetime64[us]")
+    micros = (stamps - PG_EPOCH).astype(np.int64)
+    micros[np.isnat(stamps)] = PG_TIMESTAMP_NEG_INFINITY
+    return micros
+
+
+def _to_copy_payload(records: np.ndarray) -> io.BytesIO:
+    return io.BytesIO(PGCOPY_HEADER + records.tobytes() + PGCOPY_TRAILER)
+
+
+def encode_content_rows(
+    memory_ids: Sequence,
+    matrix: np.ndarray,
+    magnitudes: Optional[Sequence[Optional[float]]] = None,
+    clusters: Optional[Sequence[Optional[int]]] = None,
+) -> np.ndarray:
+    """Binary COPY tuples for embedding_copy_staging
+
+    Missing magnitudes are computed from the matrix; missing or zero clusters are
+    staged as NO_CLUSTER and written back as NULL.
+    """
+    count = len(memory_ids)
+    records = np.empty(count, dtype=CONTENT_TUPLE)
+    records["fields"] = len(CONTENT_TUPLE.names) - 1
+    records["memory_id"]["length"] = 16
+    records["memory_id"]["value"] = _uuid_bytes(memory_ids)
+    _fill_vector(records, "embedding_vector", matrix)
+    _fill_vector(records, "embedding_reduced", matrix[:, :REDUCED_DIMENSIONS])
+
+    norms = np.linalg.norm(matrix, axis=1)
+    if magnitudes is not None:
+        given = np.array([np.nan if m is None else m for m in magnitudes], dtype=np.float64)
+        norms = np.where(np.isnan(given), norms, given)
+    records["vector_magnitude"]["length"] = 4
+    records["vector_magnitude"]["value"] = norms
+
+    cluster_ids = np.full(count, NO_CLUSTER, dtype=np.int32)
+    if clusters is not None:
+        cluster_ids[:] = [int(c) if c else NO_CLUSTER for c in clusters]
+    records["semantic_cluster"]["length"] = 4
+    records["semantic_cluster"]["value"] = cluster_ids
+    return records
+
+
+def encode_tag_rows(
+    memory_ids: Sequence,
+    matrix: np.ndarray,
+    updated_at: Optional[Sequence[Optional[datetime]]] = None,
+) -> np.ndarray:
+    """Binary COPY tuples for tag_embedding_copy_staging"""
+    count = len(memory_ids)
+    records = np.empty(count, dtype=TAG_TUPLE)
+    records["fields"] = len(TAG_TUPLE.names) - 1
+    records["memory_id"]["length"] = 16
+    records["memory_id"]["value"] = _uuid_bytes(memory_ids)
+    _fill_vector(records, "tag_embedding", matrix)
+    _fill_vector(records, "tag_embedding_reduced", matrix[:, :REDUCED_DIMENSIONS])
+    records["tag_embedding_updated"]["length"] = 8
+    records["tag_embedding_updated"]["value"] = _timestamp_micros(
+        updated_at if updated_at is not None else [None] * count
+    )
+    return records
+
+
+def _select(values: Optional[Sequence], valid: np.ndarray) -> Optional[List]:
+    if values is None:
+        return None
+    return [value for value, keep in zip(values, valid) if keep]
+
+
+def _copy_and_apply(
+    cursor: psycopg2.extensions.cursor, table: str, records: np.ndarray, apply_sql: str
+) -> int:
+    apply_sql = apply_sql.format(staging=table)
+    cursor.execute(f"TRUNCATE public.{table}")
+    cursor.copy_expert(
+        f"COPY public.{table} FROM STDIN WITH (FORMAT binary)", _to_copy_payload(records)
+    )
+    cursor.execute(apply_sql)
+    return cursor.rowcount
+
+
+def copy_content_embeddings(
+    cursor: psycopg2.extensions.cursor,
+    memory_ids: Sequence,
+    embeddings: Sequence[Optional[Sequence[float]]],
+    magnitudes: Optional[Sequence[Optional[float]]] = None,
+    clusters: Optional[Sequence[Optional[int]]] = None,
+    staging_suffix: str = "",
+) -> int:
+    """Load content embeddings via binary COPY and apply them in one UPDATE
+
+    Returns the number of memories updated. The caller owns the transaction.
+    """
+    matrix, valid = stack_embeddings(embeddings)
+    if not valid.all():
+        logger.warning(f"Skipping {int((~valid).sum())} invalid content embeddings")
+    if not valid.any():
+        return 0
+    records = encode_content_rows(
+        _select(memory_ids, valid),
+        matrix[valid],
+        _select(magnitudes, valid),
+        _select(clusters, valid),
+    )
+    return _copy_and_apply(cursor, CONTENT_STAGING + staging_suffix, records, APPLY_CONTENT_SQL)
+
+
+def copy_tag_embeddings(
+    cursor: psycopg2.extensions.cursor,
+    memory_ids: Sequence,
+    embeddings: Sequence[Optional[Sequence[float]]],
+    updated_at: Optional[Sequence[Optional[datetime]]] = None,
+    staging_suffix: str = "",
+) -> int:
+    """Load tag embeddings via binary COPY and apply them in one UPDATE"""
+    matrix, valid = stack_embeddings(embeddings)
+    if not valid.all():
+        logger.warning(f"Skipping {int((~valid).sum())} invalid tag embeddings")
+    if not valid.any():
+        return 0
+    records = encode_tag_rows(_select(memory_ids, valid), matrix[valid], _select(updated_at, valid))
+    return _copy_and_apply(cursor, TAG_STAGING + staging_suffix, records, APPLY_TAG_SQL)
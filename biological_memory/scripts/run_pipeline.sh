@@ -14,6 +14,7 @@ fi
 # Configuration
 PROJECT_DIR="${DBT_PROJECT_DIR:-$(cd "$(dirname "$0")/.." && pwd)}"
 PROFILES_DIR="${DBT_PROFILES_DIR:-$PROJECT_DIR}"
+export EMBEDDING_STORE_PATH="${EMBEDDING_STORE_PATH:-$PROJECT_DIR/embedding_store}"
 LOG_DIR="${PROJECT_DIR}/logs/biological_rhythms"
 TIMESTAMP=$(date +%Y%m%d_%H%M%S)
 RHYTHM_TYPE="${1:-continuous}"
@@ -54,15 +55,16 @@ health_check() {
 run_dbt_models() {
     local models="$1"
     local full_refresh="${2:-false}"
+    local dbt_vars="${3:-"{}"}"
 
     cd "$PROJECT_DIR"
 
     if [ "$full_refresh" = "true" ]; then
         log "Running dbt models with full refresh: $models"
-        dbt run --profiles-dir "$PROFILES_DIR" --select "$models" --full-refresh >> "$LOG_DIR/${RHYTHM_TYPE}_${TIMESTAMP}.log" 2>&1
+        dbt run --profiles-dir "$PROFILES_DIR" --select "$models" --vars "$dbt_vars" --full-refresh >> "$LOG_DIR/${RHYTHM_TYPE}_${TIMESTAMP}.log" 2>&1
     else
         log "Running dbt models incrementally: $models"
-        dbt run --profiles-dir "$PROFILES_DIR" --select "$models" >> "$LOG_DIR/${RHYTHM_TYPE}_${TIMESTAMP}.log" 2>&1
+        dbt run --profiles-dir "$PROFILES_DIR" --select "$models" --vars "$dbt_vars" >> "$LOG_DIR/${RHYTHM_TYPE}_${TIMESTAMP}.log" 2>&1
     fi
 
     if [ $? -eq 0 ]; then
@@ -88,6 +90,18 @@ generate_tag_embeddings() {
     fi
 }
 
+# Embed memories that memory_embeddings flagged as missing from the Parquet embedding store.
+# Runs in the background; the next dbt run of memory_embeddings joins the new vectors in.
+# The writer only opens DuckDB (read-only) while reading a page of pending contents and
+# retries while a dbt run holds the lock, so it never blocks the next rhythm's dbt run
+fill_embedding_store() {
+    local extra_args="$1"
+
+    log "Filling embedding store for memories flagged needs_embedding"
+    nohup python3 "$PROJECT_DIR/scripts/embedding_store.py" --duckdb-path "$DUCKDB_PATH" \
+        --store-path "$EMBEDDING_STORE_PATH" $extra_args >> "$LOG_DIR/${RHYTHM_TYPE}_${TIMESTAMP}.log" 2>&1 &
+}
+
 # Main pipeline execution
 main() {
     log "========================================="
@@ -102,28 +116,31 @@ main() {
         continuous)
             # Working memory updates (every 5 minutes)
             log "Processing working memory (5-minute window)"
-            run_dbt_models "raw_memories"
+            run_dbt_models "memories_mirror raw_memories wm_ring_buffer"
             generate_tag_embeddings
             ;;
 
         rapid)
             # Short-term memory updates (every 30 minutes)
             log "Processing short-term memory consolidation"
-            run_dbt_models "raw_memories memory_embeddings"
+            run_dbt_models "memories_mirror raw_memories memory_embeddings"
+            fill_embedding_store
             generate_tag_embeddings
             ;;
 
         hourly)
-            # Memory consolidation (every hour)
+            # Memory consolidation (every hour), reconciling upstream deletes into the mirror
             log "Processing hourly memory consolidation"
-            run_dbt_models "raw_memories memory_embeddings semantic_network"
+            run_dbt_models "memories_mirror raw_memories memory_embeddings semantic_network" "false" "{reconcile_memories_mirror: true}"
+            fill_embedding_store
             generate_tag_embeddings
             ;;
 
         deep_sleep)
             # Major consolidation (3 AM daily)
             log "Processing deep sleep consolidation"
-            run_dbt_models "raw_memories memory_embeddings semantic_network" "true"
+            run_dbt_models "memories_mirror raw_memories memory_embeddings semantic_network" "true"
+            fill_embedding_store "--compact"
             generate_tag_embeddings
 
             # Clean up old logs
@@ -142,7 +159,8 @@ main() {
             log "Processing weekly synaptic homeostasis"
 
             # Full pipeline refresh
-            run_dbt_models "raw_memories memory_embeddings semantic_network" "true"
+            run_dbt_models "memories_mirror raw_memories memory_embeddings semantic_network" "true"
+            fill_embedding_store "--compact"
             generate_tag_embeddings
 
             # Vacuum and analyze PostgreSQL
@@ -0,0 +1,289 @@
+#!/usr/bin/env python3
+"""
+Blocked NumPy k-NN graph builder for the semantic network.
+
+main.memory_embeddings.final_embedding is loaded once as an L2-normalized
+float32 matrix. Query rows are scored against the whole matrix in blocks whose
+similarity scratch fits a configurable memory ceiling; each block is one BLAS
+matmul followed by an argpartition top-k, and blocks run on a thread pool
+(NumPy releases the GIL inside matmul). The resulting pairs are written as
+Arrow into main.semantic_knn_pairs, which semantic_network reads when
+var('semantic_knn_source') is 'numpy'.
+
+In incremental mode only memories updated since the last build are scored,
+still against the full matrix, and their previous pairs are replaced.
+"""
+
+import argparse
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional, Tuple
+
+import duckdb
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+from embedding_transfer_engine import arrow_embeddings
+from pgvector_copy import EMBEDDING_DIMENSIONS
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+logger = logging.getLogger(__name__)
+
+DUCKDB_PATH = os.getenv("DUCKDB_PATH", "/tmp/memory.duckdb")
+
+KNN_K = int(os.getenv("SEMANTIC_KNN_K", "50"))
+KNN_THRESHOLD = float(os.getenv("SEMANTIC_KNN_THRESHOLD", "0.5"))
+KNN_MEMORY_LIMIT_MB = int(os.getenv("SEMANTIC_KNN_MEMORY_LIMIT_MB", "512"))
+KNN_WORKERS = int(os.getenv("SEMANTIC_KNN_WORKERS", str(os.cpu_count() or 1)))
+# Upper bound on rows per block so each block's query slice stays cache-resident
+KNN_MAX_BLOCK_ROWS = 1024
+
+PAIRS_TABLE = "semantic_knn_pairs"
+
+CREATE_PAIRS_SQL = f"""
+CREATE TABLE IF NOT EXISTS {PAIRS_TABLE} (
+    memory_id_1 VARCHAR NOT NULL,
+    memory_id_2 VARCHAR NOT NULL,
+    semantic_similarity FLOAT NOT NULL,
+    similarity_rank INTEGER NOT NULL,
+    source_updated_at TIMESTAMP WITH TIME ZONE
+)
+"""
+
+# is_new marks the rows to score; without a previous build every row is new
+LOAD_EMBEDDINGS_SQL = """
+SELECT
+    memory_id,
+    final_embedding,
+    updated_at::TIMESTAMP WITH TIME ZONE AS updated_at,
+    {is_new} AS is_new
+FROM memory_embeddings
+WHERE final_embedding IS NOT NULL
+"""
+
+NEW_SINCE_LAST_BUILD = f"""
+COALESCE(updated_at > (SELECT MAX(source_updated_at) FROM {PAIRS_TABLE}), TRUE)
+"""
+
+
+def normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    """L2-normalize rows in place so dot products are cosine similarities"""
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    np.divide(matrix, norms, out=matrix, where=norms > 0)
+    return matrix
+
+
+def block_rows(matrix_rows: int, memory_limit_mb: int, workers: int) -> int:
+    """Query rows per block so all workers' similarity scratch fits the memory ceiling"""
+    # Each in-flight block holds a float32 similarity block plus an int64 argpartition result
+    bytes_per_row = matrix_rows * (4 + 8)
+    budget = memory_limit_mb * 1024 * 1024 // max(workers, 1)
+    return int(max(1, min(KNN_MAX_BLOCK_ROWS, budget // max(bytes_per_row, 1))))
+
+
+def top_k_block(
+    matrix: np.ndarray, rows: np.ndarray, k: int, threshold: float
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Top-k neighbours of matrix[rows] against the whole matrix, excluding self matches
+
+    Returns:
+        (source rows, neighbour rows, similarities) for pairs at or above threshold,
+        ordered by source row then descending similarity
+    """
+    sims = matrix[rows] @ matrix.T
+    sims[np.arange(len(rows)), rows] = -np.inf
+
+    candidates = np.argpartition(sims, -k, axis=1)[:, -k:]
+    scores = np.take_along_axis(sims, candidates, axis=1)
+    order = np.argsort(-scores, axis=1)
+    candidates = np.take_along_axis(candidates, order, axis=1)
+    scores = np.take_along_axis(scores, order, axis=1)
+
+    keep = scores >= threshold
+    sources = np.broadcast_to(rows[:, None], candidates.shape)
+    return sources[keep], candidates[keep], scores[keep]
+
+
+def build_knn_graph(
+    matrix: np.ndarray,
+    query_rows: Optional[np.ndarray] = None,
+    k: int = KNN_K,
+    threshold: float = KNN_THRESHOLD,
+    memory_limit_mb: int = KNN_MEMORY_LIMIT_MB,
+    workers: int = KNN_WORKERS,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    k-NN edges from query rows to every other row of a normalized matrix
+
+    Args:
+        matrix: (n, dims) L2-normalized float32 embeddings
+        query_rows: Rows to score; all rows when omitted
+        k: Neighbours kept per query row
+        threshold: Minimum cosine similarity for an edge
+        memory_limit_mb: Ceiling for the similarity scratch across all workers
+        workers: Blocks scored concurrently
+
+    Returns:
+        (source rows, neighbour rows, similarities) as parallel arrays
+    """
+    if query_rows is None:
+        query_rows = np.arange(len(matrix))
+    k = min(k, len(matrix) - 1)
+    if k <= 0 or len(query_rows) == 0:
+        return np.empty(0, np.int64), np.empty(0, np.int64), np.empty(0, np.float32)
+
+    step = block_rows(len(matrix), memory_limit_mb, workers)
+    blocks = [query_rows[i : i + step] for i in range(0, len(query_rows), step)]
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        results = list(executor.map(lambda rows: top_k_block(matrix, rows, k, threshold), blocks))
+
+    sources, neighbours, scores = zip(*results)
+    return np.concatenate(sources), np.concatenate(neighbours), np.concatenate(scores)
+
+
+def knn_pairs_table(
+    embeddings: pa.Table,
+    k: int = KNN_K,
+    threshold: float = KNN_THRESHOLD,
+    memory_limit_mb: int = KNN_MEMORY_LIMIT_MB,
+    workers: int = KNN_WORKERS,
+) -> pa.Table:
+    """
+    Semantic k-NN pairs for an Arrow table of memory_id, final_embedding, updated_at, is_new
+
+    Rows with a missing or ragged embedding are left out of the matrix entirely. Only rows
+    flagged is_new are scored (every row when the column is absent).
+    """
+    matrix, valid = arrow_embeddings(embeddings.column("final_embedding"), EMBEDDING_DIMENSIONS)
+    embeddings = embeddings.filter(pa.array(valid))
+    matrix = normalize_rows(np.ascontiguousarray(matrix[valid]))
+
+    query_rows = None
+    if "is_new" in embeddings.column_names:
+        query_rows = np.flatnonzero(embeddings.column("is_new").to_numpy(zero_copy_only=False))
+
+    sources, neighbours, scores = build_knn_graph(
+        matrix, query_rows, k, threshold, memory_limit_mb, workers
+    )
+
+    # Rank within each source row; rows arrive grouped by source in descending similarity
+    starts = np.flatnonzero(np.r_[True, sources[1:] != sources[:-1]])
+    ranks = np.arange(len(sources)) - np.repeat(starts, np.diff(np.r_[starts, len(sources)]))
+
+    memory_ids = embeddings.column("memory_id")
+    return pa.table(
+        {
+            "memory_id_1": pc.take(memory_ids, pa.array(sources)),
+            "memory_id_2": pc.take(memory_ids, pa.array(neighbours)),
+            "semantic_similarity": pa.array(scores.astype(np.float32)),
+            "similarity_rank": pa.array((ranks + 1).astype(np.int32)),
+            "source_updated_at": pc.take(embeddings.column("updated_at"), pa.array(sources)),
+        }
+    )
+
+
+class SemanticKnnBuilder:
+    """Builds main.semantic_knn_pairs from main.memory_embeddings"""
+
+    def __init__(
+        self,
+        duckdb_conn: duckdb.DuckDBPyConnection,
+        k: int = KNN_K,
+        threshold: float = KNN_THRESHOLD,
+        memory_limit_mb: int = KNN_MEMORY_LIMIT_MB,
+        workers: int = KNN_WORKERS,
+    ):
+        self.duckdb_conn = duckdb_conn
+        self.k = k
+        self.threshold = threshold
+        self.memory_limit_mb = memory_limit_mb
+        self.workers = workers
+
+    def load_embeddings(self, incremental: bool) -> pa.Table:
+        """Every embedding, flagging the rows to score in this run"""
+        is_new = NEW_SINCE_LAST_BUILD if incremental else "TRUE"
+        result = self.duckdb_conn.execute(LOAD_EMBEDDINGS_SQL.format(is_new=is_new))
+        # to_arrow_table replaces fetch_arrow_table in newer DuckDB releases
+        fetch = getattr(result, "to_arrow_table", None) or result.fetch_arrow_table
+        return fetch()
+
+    def write_pairs(self, pairs: pa.Table, scored_ids: pa.Array, incremental: bool) -> None:
+        """Replace the pairs of every scored memory in one transaction"""
+        conn = self.duckdb_conn
+        conn.register("knn_pairs_arrow", pairs)
+        conn.register("knn_scored_arrow", pa.table({"memory_id": scored_ids}))
+        try:
+            conn.execute("BEGIN TRANSACTION")
+            if incremental:
+                conn.execute(
+                    f"DELETE FROM {PAIRS_TABLE} "
+                    "WHERE memory_id_1 IN (SELECT memory_id FROM knn_scored_arrow)"
+                )
+            else:
+                conn.execute(f"DELETE FROM {PAIRS_TABLE}")
+            conn.execute(f"INSERT INTO {PAIRS_TABLE} SELECT * FROM knn_pairs_arrow")
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.unregister("knn_pairs_arrow")
+            conn.unregister("knn_scored_arrow")
+
+    def run(self, incremental: bool = False) -> Dict[str, float]:
+        """Score new (or all) memories against the full matrix and store their pairs"""
+        start = time.time()
+        self.duckdb_conn.execute(CREATE_PAIRS_SQL)
+
+        embeddings = self.load_embeddings(incremental)
+        scored_ids = embeddings.filter(embeddings.column("is_new")).column("memory_id")
+        pairs = knn_pairs_table(
+            embeddings, self.k, self.threshold, self.memory_limit_mb, self.workers
+        )
+        self.write_pairs(pairs, scored_ids.combine_chunks(), incremental)
+
+        stats = {
+            "memories": embeddings.num_rows,
+            "scored": len(scored_ids),
+            "pairs": pairs.num_rows,
+            "seconds": time.time() - start,
+        }
+        logger.info(
+            f"k-NN graph: scored {stats['scored']}/{stats['memories']} memories, "
+            f"{stats['pairs']} pairs in {stats['seconds']:.1f}s"
+        )
+        return stats
+
+
+def main() -> None:
+    """Main execution function"""
+    parser = argparse.ArgumentParser(description="Build the semantic k-NN graph with NumPy")
+    parser.add_argument("--duckdb-path", default=DUCKDB_PATH, help="DuckDB database path")
+    parser.add_argument("--k", type=int, default=KNN_K, help="Neighbours per memory")
+    parser.add_argument("--threshold", type=float, default=KNN_THRESHOLD, help="Min similarity")
+    parser.add_argument(
+        "--memory-limit-mb",
+        type=int,
+        default=KNN_MEMORY_LIMIT_MB,
+        help="Ceiling for similarity scratch memory across workers",
+    )
+    parser.add_argument("--workers", type=int, default=KNN_WORKERS, help="Concurrent blocks")
+    parser.add_argument(
+        "--incremental", action="store_true", help="Only score memories updated since last build"
+    )
+    args = parser.parse_args()
+
+    conn = duckdb.connect(args.duckdb_path)
+    try:
+        SemanticKnnBuilder(conn, args.k, args.threshold, args.memory_limit_mb, args.workers).run(
+            incremental=args.incremental
+        )
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
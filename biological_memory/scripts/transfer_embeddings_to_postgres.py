@@ -7,10 +7,10 @@ Bridges the computational DuckDB pipeline with PostgreSQL pgvector storage
 import logging
 import os
 import time
-from typing import List, Tuple
 
 import duckdb
 import psycopg2
+from embedding_transfer_engine import EmbeddingTransferEngine
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -31,127 +31,6 @@ def connect_postgres() -> psycopg2.extensions.connection:
     return psycopg2.connect(POSTGRES_URL)
 
 
-def extract_embeddings_from_duckdb(conn: duckdb.DuckDBPyConnection) -> List[Tuple]:
-    """Extract embeddings data from DuckDB memory_embeddings table"""
-    query = """
-    SELECT
-        memory_id,
-        content,
-        context,
-        summary,
-        final_embedding,
-        semantic_cluster,
-        embedding_magnitude,
-        created_at,
-        updated_at
-    FROM main.memory_embeddings
-    WHERE final_embedding IS NOT NULL
-      AND semantic_cluster IS NOT NULL
-    ORDER BY updated_at DESC
-    """
-
-    logger.info("Extracting embeddings from DuckDB...")
-    result = conn.execute(query).fetchall()
-    logger.info(f"Extracted {len(result)} memory embeddings from DuckDB")
-    return result
-
-
-def convert_embedding_to_pgvector(embedding: List[float]) -> str:
-    """Convert Python list to pgvector format string"""
-    if not embedding or len(embedding) != 768:
-        raise ValueError(f"Invalid embedding length: {len(embedding) if embedding else 0}")
-
-    # Format as pgvector string: '[1.0,2.0,3.0,...]'
-    return "[" + ",".join(str(float(x)) for x in embedding) + "]"
-
-
-def create_reduced_embedding(embedding: List[float], target_dim: int = 256) -> str:
-    """Create reduced-dimension embedding for performance"""
-    if len(embedding) < target_dim:
-        raise ValueError(f"Embedding too short for reduction: {len(embedding)}")
-
-    reduced = embedding[:target_dim]
-    return "[" + ",".join(str(float(x)) for x in reduced) + "]"
-
-
-def calculate_vector_magnitude(embedding: List[float]) -> float:
-    """Calculate L2 norm of embedding vector"""
-    return sum(x * x for x in embedding) ** 0.5
-
-
-def transfer_embeddings_to_postgres(
-    duckdb_data: List[Tuple], pg_conn: psycopg2.extensions.connection
-) -> int:
-    """Transfer embeddings to PostgreSQL memories table"""
-
-    cursor = pg_conn.cursor()
-    transferred_count = 0
-
-    logger.info(f"Starting transfer of {len(duckdb_data)} embeddings to PostgreSQL...")
-
-    for row in duckdb_data:
-        try:
-            (
-                memory_id,
-                content,
-                context,
-                summary,
-                final_embedding,
-                semantic_cluster,
-                embedding_magnitude,
-                created_at,
-                updated_at,
-            ) = row
-
-            # Convert DuckDB embedding to pgvector format
-            embedding_vector = convert_embedding_to_pgvector(final_embedding)
-            embedding_reduced = create_reduced_embedding(final_embedding, 256)
-
-            # Calculate magnitude if not provided
-            if embedding_magnitude is None:
-                embedding_magnitude = calculate_vector_magnitude(final_embedding)
-
-            # Update PostgreSQL memories table
-            update_query = """
-            UPDATE memories
-            SET
-                embedding_vector = %s::vector(768),
-                embedding_reduced = %s::vector(256),
-                vector_magnitude = %s,
-                semantic_cluster = %s,
-                last_embedding_update = CURRENT_TIMESTAMP
-            WHERE id = %s::uuid
-            """
-
-            cursor.execute(
-                update_query,
-                (
-                    embedding_vector,
-                    embedding_reduced,
-                    embedding_magnitude,
-                    semantic_cluster,
-                    str(memory_id),
-                ),
-            )
-
-            transferred_count += 1
-
-            if transferred_count % 100 == 0:
-                logger.info(f"Transferred {transferred_count}/{len(duckdb_data)} embeddings...")
-                pg_conn.commit()  # Commit in batches
-
-        except Exception as e:
-            logger.error(f"Error transferring memory {memory_id}: {str(e)}")
-            continue
-
-    # Final commit
-    pg_conn.commit()
-    cursor.close()
-
-    logger.info(f"Transfer complete! Updated {transferred_count} memories with embeddings")
-    return transferred_count
-
-
 def create_pgvector_indexes(pg_conn: psycopg2.extensions.connection) -> None:
     """Create HNSW indexes for fast similarity search"""
     cursor = pg_conn.cursor()
@@ -248,15 +127,24 @@ def main():
         duckdb_conn = connect_duckdb()
         postgres_conn = connect_postgres()
 
-        # Extract embeddings from DuckDB
-        embeddings_data = extract_embeddings_from_duckdb(duckdb_conn)
+        available = duckdb_conn.execute(
+            "SELECT COUNT(*) FROM main.memory_embeddings "
+            "WHERE final_embedding IS NOT NULL AND semantic_cluster IS NOT NULL"
+        ).fetchone()[0]
 
-        if not embeddings_data:
+        if not available:
             logger.warning("No embeddings found in DuckDB. Run memory_embeddings model first.")
             return
 
-        # Transfer to PostgreSQL
-        transferred_count = transfer_embeddings_to_postgres(embeddings_data, postgres_conn)
+        # Stream to PostgreSQL in bounded chunks; an interrupted run resumes
+        logger.info(f"Transferring {available} embeddings to PostgreSQL...")
+        stats = EmbeddingTransferEngine(
+            duckdb_conn,
+            POSTGRES_URL,
+            job_name="memory_embeddings_clustered",
+            where="semantic_cluster IS NOT NULL",
+        ).run()
+        transferred_count = stats["content_updated"]
 
         # Create performance indexes
         create_pgvector_indexes(postgres_conn)
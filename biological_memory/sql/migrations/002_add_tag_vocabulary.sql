@@ -0,0 +1,24 @@
+-- Migration: Add Tag Vocabulary for pooled tag-set embeddings
+-- Description: Stores one embedding per distinct normalized tag so tag-set embeddings can be
+--              mean-pooled locally instead of embedding every tag combination
+-- Created: 2025-09-20
+-- Dependencies: 001_add_tag_embedding_columns.sql (pgvector extension)
+
+CREATE TABLE IF NOT EXISTS public.tag_vocabulary (
+    tag TEXT PRIMARY KEY,
+    embedding vector(768) NOT NULL,
+    weight REAL NOT NULL DEFAULT 1.0,
+    model TEXT,
+    created_at timestamp with time zone DEFAULT CURRENT_TIMESTAMP
+);
+
+COMMENT ON TABLE public.tag_vocabulary IS 'One embedding per normalized (stripped, lower-cased) tag, used by the pooled tag embedding strategy';
+COMMENT ON COLUMN public.tag_vocabulary.weight IS 'Pooling weight of the tag within a tag set (1.0 = plain mean)';
+COMMENT ON COLUMN public.tag_vocabulary.model IS 'Embedding model that produced the vector';
+
+DO $$
+BEGIN
+    RAISE NOTICE 'Tag vocabulary migration completed successfully';
+    RAISE NOTICE 'Run generate_tag_embeddings_postgres.py --strategy pooled to populate it';
+END;
+$$;
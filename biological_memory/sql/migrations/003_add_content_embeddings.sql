@@ -0,0 +1,52 @@
+-- Migration: Add Content Embeddings for content_hash keyed embedding reuse
+-- Description: Stores one embedding per (content_hash, embedding_model) so identical memory
+--              content is embedded once per model and fanned out to every memory sharing it
+-- Created: 2025-09-22
+-- Dependencies: 001_add_tag_embedding_columns.sql (pgvector extension)
+--
+-- Apply with plain psql -f (not --single-transaction): CREATE INDEX CONCURRENTLY cannot run
+-- inside a transaction block.
+
+CREATE TABLE IF NOT EXISTS public.content_embeddings (
+    content_hash TEXT NOT NULL,
+    embedding_vector vector(768) NOT NULL,
+    embedding_reduced vector(256),
+    vector_magnitude REAL,
+    semantic_cluster INTEGER,
+    embedding_model TEXT NOT NULL,
+    created_at timestamp with time zone DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (content_hash, embedding_model)
+);
+
+-- Tables created inline by earlier versions of content_hash_embeddings.py were keyed on
+-- content_hash alone. Rows without a recorded model cannot be attributed to one and are
+-- dropped; they are rebuilt from public.memories by the next embedding run.
+DO $$
+BEGIN
+    IF EXISTS (
+        SELECT 1 FROM pg_constraint
+        WHERE conrelid = 'public.content_embeddings'::regclass
+          AND contype = 'p'
+          AND array_length(conkey, 1) = 1
+    ) THEN
+        DELETE FROM public.content_embeddings WHERE embedding_model IS NULL;
+        ALTER TABLE public.content_embeddings ALTER COLUMN embedding_model SET NOT NULL;
+        ALTER TABLE public.content_embeddings DROP CONSTRAINT content_embeddings_pkey;
+        ALTER TABLE public.content_embeddings ADD PRIMARY KEY (content_hash, embedding_model);
+    END IF;
+END
+$$;
+
+COMMENT ON TABLE public.content_embeddings IS 'One embedding per memory content hash and embedding model, reused for every memory with identical content';
+COMMENT ON COLUMN public.content_embeddings.embedding_model IS 'Embedding model that produced the vector; lookups filter on the configured EMBEDDING_MODEL';
+
+-- Codex writes to public.memories continuously, so build the lookup index without blocking writes
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_memories_content_hash
+ON public.memories (content_hash);
+
+DO $$
+BEGIN
+    RAISE NOTICE 'Content embeddings migration completed successfully';
+    RAISE NOTICE 'Run content_hash_embeddings.py to populate it';
+END;
+$$;
@@ -4,8 +4,13 @@ Test suite for memory embeddings and semantic network
 Validates the biological memory embedding pipeline
 """
 
+import asyncio
 import sys
+import threading
+import time
 from pathlib import Path
+from typing import Callable
+from unittest.mock import MagicMock, patch
 
 import duckdb
 import numpy as np
@@ -16,6 +21,7 @@ sys.path.append(str(Path(__file__).parent.parent))
 
 from macros.ollama_embeddings import (  # noqa: E402
     EmbeddingCache,
+    SingleFlight,
     combine_embeddings,
     cosine_similarity,
     generate_embedding,
@@ -64,7 +70,229 @@ class TestEmbeddingGeneration:
         cached = cache.get(text, model)
         assert cached is not None
         assert len(cached) == 768
-        assert cached[0] == 0.1
+        assert cached[0] == pytest.approx(0.1)
+
+    def test_embedding_cache_batch_roundtrip(self, tmp_path):
+        """Batch set/get returns float32 views and None for misses"""
+        cache = EmbeddingCache(tmp_path, shards=4)
+        vectors = np.random.randn(10, 768).astype(np.float32)
+        texts = [f"memory {i}" for i in range(10)]
+
+        assert cache.set_batch(texts, "test-model", vectors) == 10
+
+        cached = cache.get_batch(texts + ["never stored"], "test-model")
+        assert cached[-1] is None
+        for expected, got in zip(vectors, cached[:-1]):
+            assert got.dtype == np.float32
+            assert not got.flags.writeable
+            np.testing.assert_array_equal(got, expected)
+
+    def test_embedding_cache_rejects_invalid_vectors(self, tmp_path):
+        """Wrong dimensions and non-finite values are never stored"""
+        cache = EmbeddingCache(tmp_path)
+        stored = cache.set_batch(
+            ["short", "nan", "ok"], "test-model", [[0.1] * 10, [np.nan] * 768, [0.2] * 768]
+        )
+
+        assert stored == 1
+        assert cache.get("short", "test-model") is None
+        assert cache.get("nan", "test-model") is None
+        assert cache.get("ok", "test-model") is not None
+
+    def test_embedding_cache_survives_torn_append(self, tmp_path):
+        """A partial record at the end of a segment is dropped on reopen"""
+        cache = EmbeddingCache(tmp_path, shards=1)
+        cache.set("kept", "test-model", [0.3] * 768)
+        segment = next(tmp_path.glob("*.seg"))
+        with open(segment, "ab") as f:
+            f.write(b"partial-record")
+
+        reopened = EmbeddingCache(tmp_path, shards=1)
+        assert reopened.get("kept", "test-model")[0] == pytest.approx(0.3)
+        assert reopened.get_stats()["records"] == 1
+
+    def test_embedding_cache_compaction(self, tmp_path):
+        """Overwritten keys are reclaimed by compaction and latest values win"""
+        cache = EmbeddingCache(tmp_path, shards=2)
+        texts = [f"text {i}" for i in range(20)]
+        cache.set_batch(texts, "test-model", np.zeros((20, 768)) + 0.1)
+        cache.set_batch(texts[:5], "test-model", np.zeros((5, 768)) + 0.9)
+
+        assert cache.get_stats()["dead_records"] == 5
+        assert cache.compact() == 5
+        assert cache.get_stats()["records"] == 20
+        assert cache.get("text 0", "test-model")[0] == pytest.approx(0.9)
+        assert cache.get("text 10", "test-model")[0] == pytest.approx(0.1)
+
+        reopened = EmbeddingCache(tmp_path, shards=2)
+        assert reopened.get("text 0", "test-model")[0] == pytest.approx(0.9)
+
+    def test_embedding_cache_shared_between_processes(self, tmp_path):
+        """Caches sharing a directory take slots from the file, not their own counters"""
+        first = EmbeddingCache(tmp_path, shards=1)
+        second = EmbeddingCache(tmp_path, shards=1)
+        first.get("warm index", "test-model")
+        second.get("warm index", "test-model")
+
+        first.set("from first", "test-model", [0.1] * 768)
+        second.set("from second", "test-model", [0.2] * 768)
+        first.set("first again", "test-model", [0.3] * 768)
+
+        assert first.get("from second", "test-model")[0] == pytest.approx(0.2)
+        assert second.get("from first", "test-model")[0] == pytest.approx(0.1)
+        assert second.get("first again", "test-model")[0] == pytest.approx(0.3)
+
+        reopened = EmbeddingCache(tmp_path, shards=1)
+        assert reopened.get("from first", "test-model")[0] == pytest.approx(0.1)
+        assert reopened.get_stats()["records"] == 3
+        assert reopened.get_stats()["dead_records"] == 0
+
+    def test_embedding_cache_rescans_after_foreign_compaction(self, tmp_path):
+        """A segment swapped by another process's compaction is reloaded before appending"""
+        writer = EmbeddingCache(tmp_path, shards=1)
+        compactor = EmbeddingCache(tmp_path, shards=1)
+        texts = [f"text {i}" for i in range(6)]
+        writer.set_batch(texts, "test-model", np.zeros((6, 768)) + 0.1)
+        writer.set_batch(texts[:4], "test-model", np.zeros((4, 768)) + 0.9)
+
+        assert compactor.compact() == 4
+        writer.set("after compaction", "test-model", [0.5] * 768)
+
+        reopened = EmbeddingCache(tmp_path, shards=1)
+        assert reopened.get("text 0", "test-model")[0] == pytest.approx(0.9)
+        assert reopened.get("text 5", "test-model")[0] == pytest.approx(0.1)
+        assert reopened.get_stats()["records"] == 7
+        assert compactor.get("after compaction", "test-model")[0] == pytest.approx(0.5)
+        assert writer.get("text 1", "test-model")[0] == pytest.approx(0.9)
+
+    def test_concurrent_identical_requests_share_one_call(self, tmp_path):
+        """Threads embedding the same text wait on a single Ollama request"""
+        calls = []
+
+        def slow_post(url: str, json: dict, **kwargs: object) -> MagicMock:
+            calls.append(json["prompt"])
+            time.sleep(0.2)
+            response = MagicMock(status_code=200)
+            response.json.return_value = {"embedding": [0.1] * 768}
+            return response
+
+        flights = SingleFlight()
+        results = []
+        with patch("macros.ollama_embeddings.cache", EmbeddingCache(tmp_path, shards=1)), patch(
+            "macros.ollama_embeddings.embedding_flights", flights
+        ), patch("macros.ollama_embeddings.requests.post", side_effect=slow_post):
+            threads = [
+                threading.Thread(
+                    target=lambda: results.append(generate_embedding("burst text", "test-model"))
+                )
+                for _ in range(5)
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        assert calls == ["burst text"]
+        assert len(results) == 5 and all(len(r) == 768 for r in results)
+        assert results[0] is not results[1]  # Callers get independent lists
+        assert flights.get_stats() == {"executed": 1, "coalesced": 4, "in_flight": 0}
+
+    def test_single_flight_propagates_errors(self):
+        """A failed call raises in every waiter and is not remembered"""
+        flights = SingleFlight()
+        with pytest.raises(RuntimeError):
+            flights.do("key", lambda: (_ for _ in ()).throw(RuntimeError("boom")))
+        assert flights.do("key", lambda: 42) == 42
+        assert flights.get_stats()["executed"] == 2
+
+
+@pytest.fixture
+def concurrency_limiter() -> type:
+    """AdaptiveConcurrencyLimiter class used by BatchEmbeddingGenerator"""
+    from src.utils.adaptive_concurrency import AdaptiveConcurrencyLimiter
+
+    return AdaptiveConcurrencyLimiter
+
+
+@pytest.mark.embedding
+@pytest.mark.unit
+class TestAdaptiveConcurrencyLimiter:
+    """Test the AIMD limit used by BatchEmbeddingGenerator"""
+
+    @staticmethod
+    def _run(
+        limiter: object,
+        count: int,
+        latency_s: float = 0.002,
+        overload_when: Callable[[int], bool] = lambda active: False,
+        queueing: bool = False,
+    ) -> None:
+        active = {"now": 0}
+
+        async def request():
+            async with limiter.slot() as slot:
+                active["now"] += 1
+                # A queueing host serves one request at a time, so latency grows with load
+                await asyncio.sleep(latency_s * (active["now"] if queueing else 1))
+                if overload_when(active["now"]):
+                    slot.overload()
+                active["now"] -= 1
+
+        async def main():
+            await asyncio.gather(*(request() for _ in range(count)))
+
+        asyncio.run(main())
+
+    def test_limit_grows_while_latency_is_flat(self, concurrency_limiter):
+        limiter = concurrency_limiter(initial_limit=2, max_limit=16)
+        self._run(limiter, 300)
+
+        stats = limiter.get_stats()
+        assert stats["concurrency_limit"] > 2
+        assert stats["limit_increases"] > 0
+        assert stats["in_flight_requests"] == 0
+        assert stats["queue_depth"] == 0
+
+    def test_overload_backs_off(self, concurrency_limiter):
+        limiter = concurrency_limiter(initial_limit=8, max_limit=8)
+        self._run(limiter, 100, overload_when=lambda active: active > 4)
+
+        stats = limiter.get_stats()
+        assert stats["overload_responses"] > 0
+        assert stats["limit_decreases"] > 0
+        assert stats["concurrency_limit"] < 8
+
+    def test_one_overload_episode_backs_off_once(self, concurrency_limiter):
+        limiter = concurrency_limiter(initial_limit=8, max_limit=8)
+        self._run(limiter, 8, overload_when=lambda active: True)
+
+        # All eight were admitted together, so only the first failure cuts the limit
+        assert limiter.stats["limit_decreases"] == 1
+        assert limiter.limit == 4
+
+    def test_limit_respects_bounds(self, concurrency_limiter):
+        limiter = concurrency_limiter(initial_limit=100, min_limit=2, max_limit=6)
+        assert limiter.limit == 6
+        self._run(limiter, 200, overload_when=lambda active: True)
+        assert limiter.limit == 2
+
+    def test_limit_stops_growing_when_latency_tracks_load(self, concurrency_limiter):
+        """Queueing delay on a saturated host must not become the latency baseline"""
+        limiter = concurrency_limiter(initial_limit=4, max_limit=64)
+        self._run(limiter, 1500, latency_s=0.005, queueing=True)
+
+        stats = limiter.get_stats()
+        # The threshold is max(2x, +25ms) over a ~5ms baseline: roughly 6 queued requests
+        assert stats["concurrency_limit"] <= 12
+        assert stats["baseline_latency_ms"] < 15
+        assert stats["limit_decreases"] > 0
+
+    def test_limiter_outlives_its_event_loop(self, concurrency_limiter):
+        """A limiter built outside any loop works across successive asyncio.run() calls"""
+        limiter = concurrency_limiter(initial_limit=4, max_limit=8)
+        self._run(limiter, 20)
+        self._run(limiter, 20)
+        assert limiter.get_stats()["in_flight_requests"] == 0
 
 
 @pytest.mark.embedding
@@ -6,13 +6,14 @@ Processes memories through Ollama and writes insights back to PostgreSQL
 
 import os
 import uuid
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from typing import Any, Dict, List, Optional
+from typing import Any, Deque, Dict, Iterator, List, Optional, Tuple
 
-import duckdb
 import psycopg2
 import requests
-from psycopg2.extras import Json, register_uuid
+from psycopg2.extras import Json, execute_values, register_uuid
 
 # Register UUID adapter for psycopg2
 register_uuid()
@@ -44,7 +45,16 @@ except (IndexError, AttributeError):
     pass
 OLLAMA_URL = os.getenv("OLLAMA_URL", "http://localhost:11434")
 OLLAMA_MODEL = os.getenv("OLLAMA_MODEL", "gpt-oss:20b")
-DUCKDB_PATH = os.getenv("DUCKDB_PATH", "/Users/ladvien/biological_memory/dbs/memory.duckdb")
+
+# Pipeline tuning - the LLM calls dominate, so workers bound Ollama concurrency
+INSIGHTS_PAGE_SIZE = int(os.getenv("INSIGHTS_PAGE_SIZE", "100"))
+INSIGHTS_WORKERS = int(os.getenv("INSIGHTS_WORKERS", "4"))
+INSIGHTS_COMMIT_EVERY = int(os.getenv("INSIGHTS_COMMIT_EVERY", "25"))
+INSIGHTS_MAX_PER_RUN = int(os.getenv("INSIGHTS_MAX_PER_RUN", "500"))
+INSIGHTS_PIPELINE = "mvp_insights"
+
+MemoryRow = Tuple[Any, str, datetime]
+Watermark = Tuple[datetime, str]
 
 
 def call_ollama(prompt: str, temperature: float = 0.7, max_tokens: int = 150) -> str:
@@ -221,8 +231,157 @@ What is the key insight or pattern? (1-2 sentences):"""
     }
 
 
-def process_memories() -> None:
-    """Main processing function"""
+def get_memory_watermark(pg_conn: Any) -> Optional[Watermark]:
+    """Return the (created_at, id) of the newest memory a previous run committed.
+
+    The watermark travels in the insight metadata, so it is committed atomically
+    with the insights themselves and never runs ahead of what was written.
+    """
+    with pg_conn.cursor() as cursor:
+        cursor.execute(
+            """
+            SELECT
+                (metadata->>'source_created_at')::timestamptz AS source_created_at,
+                (metadata->>'source_memory_id')::uuid AS source_memory_id
+            FROM public.insights
+            WHERE metadata->>'pipeline' = %s
+              AND metadata ? 'source_created_at'
+            ORDER BY 1 DESC, 2 DESC
+            LIMIT 1
+        """,
+            (INSIGHTS_PIPELINE,),
+        )
+        row = cursor.fetchone()
+    if not row or row[0] is None:
+        return None
+    return row[0], row[1]
+
+
+def iter_unprocessed_memories(
+    pg_conn: Any,
+    watermark: Optional[Watermark] = None,
+    page_size: int = INSIGHTS_PAGE_SIZE,
+    limit: Optional[int] = None,
+) -> Iterator[MemoryRow]:
+    """Stream memories without an insight, oldest first, using keyset pagination.
+
+    Each page is a fresh bounded query seeked past the last (created_at, id)
+    seen, so the reader never holds more than one page and commits made by the
+    writer between pages do not invalidate it.
+    """
+    last_key = watermark
+    remaining = limit
+    while remaining is None or remaining > 0:
+        fetch = page_size if remaining is None else min(page_size, remaining)
+        params: List[Any] = []
+        seek = ""
+        if last_key is not None:
+            seek = "AND (m.created_at, m.id) > (%s, %s)"
+            params.extend(last_key)
+        params.append(fetch)
+
+        with pg_conn.cursor() as cursor:
+            cursor.execute(
+                f"""
+                SELECT m.id, m.content, m.created_at
+                FROM public.memories m
+                WHERE m.content IS NOT NULL
+                  {seek}
+                  AND NOT EXISTS (
+                      SELECT 1 FROM public.insights i
+                      WHERE i.source_memory_ids @> ARRAY[m.id]
+                  )
+                ORDER BY m.created_at, m.id
+                LIMIT %s
+            """,
+                params,
+            )
+            page = cursor.fetchall()
+
+        for row in page:
+            yield row[0], row[1], row[2]
+        if len(page) < fetch:
+            return
+        last_key = (page[-1][2], page[-1][0])
+        if remaining is not None:
+            remaining -= len(page)
+
+
+def _generate_for_memory(memory: MemoryRow) -> Optional[Dict[str, Any]]:
+    """Worker task: run the LLM calls for one memory"""
+    memory_id, content, _ = memory
+    try:
+        # For now, we don't have related memories in the base table
+        # This would come from a more sophisticated biological memory analysis
+        return generate_insight(content, [])
+    except Exception as e:
+        print(f"  ✗ Insight generation failed for memory {str(memory_id)[:8]}: {e}")
+        return None
+
+
+def _build_insight_row(memory: MemoryRow, insight: Dict[str, Any], run_id: str) -> Tuple[Any, ...]:
+    """Build the public.insights row for a generated insight"""
+    memory_id, _, created_at = memory
+    now = datetime.now()
+    return (
+        str(uuid.uuid4()),
+        insight["content"],
+        insight["type"],
+        insight["confidence"],
+        [memory_id],
+        Json(
+            {
+                "model": OLLAMA_MODEL,
+                "generated_at": now.isoformat(),
+                "pipeline": INSIGHTS_PIPELINE,
+                "run_id": run_id,
+                "source_memory_id": str(memory_id),
+                "source_created_at": created_at.isoformat(),
+                "related_memories": [],
+            }
+        ),
+        insight["tags"],
+        "working",
+        now,
+        now,
+        0.0,
+        1,
+    )
+
+
+def write_insights(pg_cursor: Any, rows: List[Tuple[Any, ...]]) -> None:
+    """Insert a batch of insight rows in a single statement"""
+    execute_values(
+        pg_cursor,
+        """
+        INSERT INTO public.insights (
+            id, content, insight_type, confidence_score,
+            source_memory_ids, metadata, tags, tier,
+            created_at, updated_at, feedback_score, version
+        ) VALUES %s
+        ON CONFLICT (id) DO NOTHING
+    """,
+        rows,
+        page_size=max(len(rows), 1),
+    )
+
+
+def process_memories(
+    max_memories: Optional[int] = None,
+    workers: Optional[int] = None,
+    commit_every: Optional[int] = None,
+) -> int:
+    """Main processing function
+
+    Memories are streamed past the last committed watermark, fanned out to a
+    bounded pool of LLM workers and written back in input order in batches, so
+    a crash, write failure or failed insight leaves the watermark at the last
+    committed memory and the next cycle resumes there.
+    """
+    max_memories = INSIGHTS_MAX_PER_RUN if max_memories is None else max_memories
+    workers = max(1, INSIGHTS_WORKERS if workers is None else workers)
+    commit_every = max(1, INSIGHTS_COMMIT_EVERY if commit_every is None else commit_every)
+    run_id = str(uuid.uuid4())
 
     print("=" * 60)
     print("Starting MVP Insights Generation...")
@@ -231,42 +390,10 @@ def process_memories() -> None:
     print(f"  PostgreSQL: {POSTGRES_URL.split('@')[1] if '@' in POSTGRES_URL else POSTGRES_URL}")
     print(f"  Ollama: {OLLAMA_URL}")
     print(f"  Model: {OLLAMA_MODEL}")
-    print(f"  DuckDB: {DUCKDB_PATH}")
+    print(f"  Workers: {workers}, page size: {INSIGHTS_PAGE_SIZE}, commit every: {commit_every}")
+    print(f"  Max memories this run: {max_memories}")
     print()
 
-    # Connect to DuckDB
-    print("Connecting to DuckDB...")
-    duck_conn = duckdb.connect(DUCKDB_PATH)
-
-    # Attach PostgreSQL codex_db database (this is the source database for dbt
-    # models)
-    duck_conn.execute(
-        f"""
-        ATTACH '{POSTGRES_URL}' AS codex_db (TYPE postgres)
-    """
-    )
-    print(f"Attached codex_db from: {POSTGRES_URL}")
-
-    # Get memories to process from PostgreSQL via DuckDB
-    print("Fetching memories to process from codex_db...")
-    memories_df = duck_conn.execute(
-        """
-        SELECT
-            id as memory_id,
-            content,
-            tags,
-            summary,
-            context
-        FROM codex_db.public.memories
-        WHERE content IS NOT NULL
-        ORDER BY created_at DESC
-        LIMIT 10
-    """
-    ).fetchdf()
-
-    print(f"Found {len(memories_df)} memories to process")
-
-    # Connect to PostgreSQL codex_db for writing insights
     print(f"Connecting to codex_db: {POSTGRES_URL}")
     pg_conn = psycopg2.connect(POSTGRES_URL)
     pg_cursor = pg_conn.cursor()
@@ -276,88 +403,83 @@ def process_memories() -> None:
     db_name, schema_name = pg_cursor.fetchone()
     print(f"Connected to database: {db_name}, schema: {schema_name}")
 
-    insights_generated = 0
-
-    for idx, row in memories_df.iterrows():
-        memory_id = row["memory_id"]
-        content = row["content"]
-        # For now, we don't have related memories in the base table
-        # This would come from a more sophisticated biological memory analysis
-        related_memories: List[str] = []
-
-        print(f"\n[{idx + 1}/{len(memories_df)}] Processing memory {str(memory_id)[:8]}...")
-        print(
-            f"  Content preview: {content[:100]}..."
-            if len(content) > 100
-            else f"  Content: {content}"
-        )
+    watermark = get_memory_watermark(pg_conn)
+    if watermark:
+        print(f"Resuming after memory {str(watermark[1])[:8]} ({watermark[0]})")
+    else:
+        print("No watermark found, starting from the oldest unprocessed memory")
 
-        # Generate insight
-        insight = generate_insight(content, related_memories)
-
-        if insight["content"]:
-            # Prepare insight record
-            insight_id = str(uuid.uuid4())
-
-            # Insert into codex_db.public.insights table
-            try:
-                pg_cursor.execute(
-                    """
-                    INSERT INTO public.insights (
-                        id, content, insight_type, confidence_score,
-                        source_memory_ids, metadata, tags, tier,
-                        created_at, updated_at, feedback_score, version
-                    ) VALUES (
-                        %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s
-                    )
-                    ON CONFLICT (id) DO NOTHING
-                """,
-                    (
-                        insight_id,
-                        insight["content"],
-                        insight["type"],
-                        insight["confidence"],
-                        [memory_id],
-                        # source_memory_ids as array (keep as UUID)
-                        Json(
-                            {
-                                "model": OLLAMA_MODEL,
-                                "generated_at": datetime.now().isoformat(),
-                                "pipeline": "mvp_insights",
-                                "related_memories": (
-                                    [str(m) for m in related_memories[:5]]
-                                    if related_memories is not None and len(related_memories) > 0
-                                    else []
-                                ),
-                            }
-                        ),
-                        insight["tags"],
-                        "working",
-                        datetime.now(),
-                        datetime.now(),
-                        0.0,
-                        1,
-                    ),
-                )
-
-                insights_generated += 1
-                print(f"✓ Generated insight: {insight['content'][:80]}...")
-                print(f"  Tags: {', '.join(insight['tags'])}")
-
-            except Exception as e:
-                print(f"Error inserting insight: {e}")
-                pg_conn.rollback()
-                continue
-
-    # Commit changes
-    pg_conn.commit()
+    insights_generated = 0
+    processed = 0
+    pending: List[Tuple[Any, ...]] = []
+    in_flight: Deque[Tuple[MemoryRow, Any]] = deque()
+    failed_memory: Optional[MemoryRow] = None
+    write_failed = False
+
+    def flush() -> bool:
+        nonlocal insights_generated
+        if not pending:
+            return True
+        try:
+            write_insights(pg_cursor, pending)
+            pg_conn.commit()
+        except Exception as e:
+            print(f"Error inserting insight batch: {e}")
+            pg_conn.rollback()
+            return False
+        insights_generated += len(pending)
+        print(f"  ✓ Committed {len(pending)} insights ({insights_generated} this run)")
+        pending.clear()
+        return True
+
+    def drain_one() -> bool:
+        nonlocal processed, failed_memory, write_failed
+        memory, future = in_flight.popleft()
+        insight = future.result()
+        processed += 1
+        if not insight or not insight["content"]:
+            # Committing anything after this memory would move the watermark past it
+            failed_memory = memory
+            return False
+        pending.append(_build_insight_row(memory, insight, run_id))
+        print(f"[{processed}] Memory {str(memory[0])[:8]}: {insight['content'][:80]}...")
+        print(f"  Tags: {', '.join(insight['tags'])}")
+        if len(pending) >= commit_every and not flush():
+            write_failed = True
+            return False
+        return True
+
+    # Results are consumed in submission order so the committed watermark never
+    # skips over a memory whose insight is still in flight or has failed
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        stopped = False
+        for memory in iter_unprocessed_memories(pg_conn, watermark, limit=max_memories):
+            in_flight.append((memory, pool.submit(_generate_for_memory, memory)))
+            if len(in_flight) >= workers * 2 and not drain_one():
+                stopped = True
+                break
+        while in_flight and not stopped:
+            stopped = not drain_one()
+        for _, future in in_flight:
+            future.cancel()
+
+    if write_failed:
+        print("Stopping run after write failure; next cycle resumes from the last commit")
+    else:
+        # Insights for memories ahead of a failure are still safe to commit
+        flush()
+        if failed_memory is not None:
+            print(
+                f"Stopping run at failed memory {str(failed_memory[0])[:8]}; "
+                "next cycle retries it"
+            )
 
     print(f"\n✅ Successfully generated {insights_generated} insights")
 
     # Clean up
     pg_cursor.close()
     pg_conn.close()
-    duck_conn.close()
+    return insights_generated
 
 
 def main() -> None:
@@ -18,47 +18,42 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
-def run_working_memory() -> None:
+def run_working_memory(service: DreamsWritebackService) -> None:
     """Run working memory write-back (every 5 seconds)."""
     try:
-        service = DreamsWritebackService()
         service.write_working_memory()
     except Exception as e:
         logger.error(f"Error in working memory write-back: {e}")
 
 
-def run_short_term() -> None:
+def run_short_term(service: DreamsWritebackService) -> None:
     """Run short-term memory write-back (every 5 minutes)."""
     try:
-        service = DreamsWritebackService()
         service.write_short_term_episodes()
     except Exception as e:
         logger.error(f"Error in short-term write-back: {e}")
 
 
-def run_long_term() -> None:
+def run_long_term(service: DreamsWritebackService) -> None:
     """Run long-term consolidation (every hour)."""
     try:
-        service = DreamsWritebackService()
         service.write_long_term_memories()
     except Exception as e:
         logger.error(f"Error in long-term consolidation: {e}")
 
 
-def run_semantic() -> None:
+def run_semantic(service: DreamsWritebackService) -> None:
     """Run semantic network building (daily at 3 AM)."""
     try:
-        service = DreamsWritebackService()
         service.write_semantic_network()
         service.extract_insights()
     except Exception as e:
         logger.error(f"Error in semantic network building: {e}")
 
 
-def run_cleanup() -> None:
+def run_cleanup(service: DreamsWritebackService) -> None:
     """Run cleanup (weekly on Sunday at 3 AM)."""
     try:
-        service = DreamsWritebackService()
         service.cleanup_old_data(30)  # Keep 30 days
     except Exception as e:
         logger.error(f"Error in cleanup: {e}")
@@ -68,26 +63,28 @@ def main():
     """Main scheduler loop."""
     logger.info("Starting Dreams Scheduler...")
 
+    # One service for the scheduler's lifetime so every job reuses its pool
+    service = DreamsWritebackService()
+
     # Schedule tasks based on biological rhythms
 
     # Continuous processing (disabled by default - too frequent)
-    # schedule.every(5).seconds.do(run_working_memory)
+    # schedule.every(5).seconds.do(run_working_memory, service)
 
     # Rapid processing
-    schedule.every(5).minutes.do(run_short_term)
+    schedule.every(5).minutes.do(run_short_term, service)
 
     # Hourly consolidation
-    schedule.every().hour.do(run_long_term)
+    schedule.every().hour.do(run_long_term, service)
 
     # Daily semantic processing (3 AM)
-    schedule.every().day.at("03:00").do(run_semantic)
+    schedule.every().day.at("03:00").do(run_semantic, service)
 
     # Weekly cleanup (Sunday 3 AM)
-    schedule.every().sunday.at("03:00").do(run_cleanup)
+    schedule.every().sunday.at("03:00").do(run_cleanup, service)
 
     # Run initial pipeline
     logger.info("Running initial full pipeline...")
-    service = DreamsWritebackService()
     service.run_full_pipeline()
 
     logger.info("Scheduler started. Running tasks:")
@@ -97,9 +94,12 @@ def main():
     logger.info("  - Cleanup: weekly Sunday at 3 AM")
 
     # Keep running
-    while True:
-        schedule.run_pending()
-        time.sleep(1)
+    try:
+        while True:
+            schedule.run_pending()
+            time.sleep(1)
+    finally:
+        service.close()
 
 
 if __name__ == "__main__":
@@ -11,19 +11,24 @@ Processing Stages:
 2. Short-Term Episodes - Every 5 minutes
 3. Long-Term Memories - Every hour
 4. Semantic Network - Daily consolidation
+
+Each stage is a single set-based INSERT ... SELECT on a pooled connection;
+the scoring heuristics run in PostgreSQL so no rows round-trip through Python.
 """
 
-import json
 import logging
 import os
 import sys
+import threading
 import uuid
-from datetime import datetime, timezone
-from typing import Any, Dict, List
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from types import TracebackType
+from typing import Any, Dict, Generator, Optional
 
 import duckdb
 import psycopg2
-import psycopg2.extras
+import psycopg2.pool
 
 # Configure logging
 logging.basicConfig(
@@ -31,11 +36,234 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+POOL_SIZE = int(os.getenv("DREAMS_WRITEBACK_POOL_SIZE", "4"))
+
+WORKING_MEMORY_SQL = """
+WITH recent AS (
+    SELECT
+        id,
+        content,
+        created_at,
+        context,
+        tags,
+        COALESCE((LENGTH(content)::float / 1000), 0.5) AS activation_strength,
+        ROW_NUMBER() OVER (ORDER BY created_at DESC) AS wm_slot
+    FROM public.memories
+    WHERE created_at > NOW() - INTERVAL '5 minutes'
+    AND content IS NOT NULL
+    ORDER BY created_at DESC
+    LIMIT 7
+),
+scored AS (
+    SELECT
+        *,
+        LEAST(1.0, 0.5 + LENGTH(content) / 10000.0) AS importance,
+        CASE
+            WHEN lower(content) ~ '(goal|objective|strategy)' THEN 'goal'
+            WHEN lower(content) ~ '(task|need to|should)' THEN 'task'
+            WHEN lower(content) ~ '(fix|update|change)' THEN 'action'
+            ELSE 'observation'
+        END AS task_type
+    FROM recent
+)
+INSERT INTO dreams.working_memory (
+    memory_id, content, timestamp, metadata,
+    entities, topics, sentiment, importance_score,
+    task_type, working_memory_strength, final_priority,
+    wm_slot, activation_strength, access_count,
+    snapshot_id
+)
+SELECT
+    id,
+    LEFT(content, 5000),  -- Truncate very long content
+    created_at,
+    CASE
+        WHEN context IS NULL THEN '{}'::jsonb
+        ELSE jsonb_build_object('original_metadata', context)
+    END,
+    COALESCE(tags, ARRAY[]::text[]),  -- Use tags as entities
+    ARRAY['memory', 'processing'],  -- Default topics
+    'neutral',  -- Default sentiment
+    importance,
+    task_type,
+    importance * activation_strength,  -- Working memory strength
+    importance * (8 - wm_slot) / 7,  -- Priority based on recency
+    wm_slot,  -- Miller's slot position
+    activation_strength,
+    1,
+    %(snapshot_id)s::uuid
+FROM scored
+ON CONFLICT (memory_id, snapshot_id) DO NOTHING
+"""
+
+SHORT_TERM_EPISODES_SQL = """
+WITH recent AS (
+    SELECT
+        id,
+        content,
+        created_at,
+        summary,
+        tags,
+        GREATEST(
+            0.1, 1.0 - EXTRACT(EPOCH FROM (NOW() - created_at)) / 3600.0
+        ) AS recency_factor
+    FROM public.memories
+    WHERE created_at > NOW() - INTERVAL '1 hour'
+    AND created_at < NOW() - INTERVAL '5 minutes'
+    AND content IS NOT NULL
+    ORDER BY created_at DESC
+    LIMIT 100
+)
+INSERT INTO dreams.short_term_episodes (
+    memory_id, content, timestamp,
+    level_0_goal, level_1_tasks,
+    stm_strength, recency_factor, emotional_salience,
+    ready_for_consolidation
+)
+SELECT
+    id,
+    LEFT(content, 5000),
+    created_at,
+    COALESCE(NULLIF(LEFT(summary, 100), ''), 'Process information'),
+    CASE
+        WHEN cardinality(tags) > 0 THEN tags[1:3]
+        ELSE ARRAY['analyze', 'store', 'retrieve']
+    END,
+    recency_factor * 0.8,  -- STM strength
+    recency_factor,
+    0.5,  -- Default emotional salience
+    recency_factor < 0.3  -- Ready for consolidation if old enough
+FROM recent
+ON CONFLICT (memory_id) DO UPDATE SET
+    stm_strength = EXCLUDED.stm_strength,
+    recency_factor = EXCLUDED.recency_factor,
+    co_activation_count = dreams.short_term_episodes.co_activation_count + 1
+"""
+
+LONG_TERM_MEMORIES_SQL = """
+WITH candidates AS (
+    SELECT
+        ste.memory_id,
+        m.content,
+        COALESCE(NULLIF(m.summary, ''), ste.level_0_goal) AS semantic_gist,
+        ste.stm_strength,
+        m.tags
+    FROM dreams.short_term_episodes ste
+    JOIN public.memories m ON m.id = ste.memory_id
+    WHERE ste.ready_for_consolidation = true
+    AND ste.consolidation_attempts < 3
+    LIMIT 50
+),
+attempted AS (
+    UPDATE dreams.short_term_episodes ste
+    SET consolidation_attempts = ste.consolidation_attempts + 1,
+        last_consolidation_attempt = NOW()
+    FROM candidates c
+    WHERE ste.memory_id = c.memory_id
+)
+INSERT INTO dreams.long_term_memories (
+    memory_id, content, semantic_gist,
+    concepts, knowledge_type, abstraction_level,
+    confidence_score, stability_score, importance_score,
+    consolidation_source
+)
+SELECT
+    memory_id,
+    COALESCE(LEFT(content, 5000), ''),
+    semantic_gist,
+    COALESCE(tags, ARRAY[]::text[]),
+    CASE
+        WHEN lower(COALESCE(content, '')) ~ 'how' THEN 'procedural'
+        WHEN lower(COALESCE(content, '')) ~ '(if|when)' THEN 'conditional'
+        ELSE 'declarative'
+    END,
+    3,  -- Default abstraction level
+    stm_strength,  -- Use STM strength as confidence
+    stm_strength * 0.8,  -- Stability score
+    stm_strength * 0.7,  -- Importance score
+    'wake'  -- Consolidation during wake hours
+FROM candidates
+ON CONFLICT (memory_id) DO UPDATE SET
+    stability_score = GREATEST(
+        dreams.long_term_memories.stability_score,
+        EXCLUDED.stability_score
+    ),
+    access_count = dreams.long_term_memories.access_count + 1
+"""
+
+# Pairs are aggregated before the insert because ON CONFLICT cannot update
+# the same row twice in one statement
+SEMANTIC_NETWORK_SQL = """
+WITH pairs AS (
+    SELECT
+        ltm1.concepts[1] AS concept_a,
+        ltm2.concepts[1] AS concept_b,
+        AVG((ltm1.importance_score + ltm2.importance_score) / 2) AS strength
+    FROM dreams.long_term_memories ltm1
+    CROSS JOIN dreams.long_term_memories ltm2
+    WHERE ltm1.memory_id != ltm2.memory_id
+    AND ltm1.concepts IS NOT NULL AND array_length(ltm1.concepts, 1) > 0
+    AND ltm2.concepts IS NOT NULL AND array_length(ltm2.concepts, 1) > 0
+    AND ltm1.consolidated_at > NOW() - INTERVAL '7 days'
+    AND ltm1.concepts[1] <> ''
+    AND ltm2.concepts[1] <> ''
+    AND ltm1.concepts[1] <> ltm2.concepts[1]
+    GROUP BY 1, 2
+    LIMIT 100
+)
+INSERT INTO dreams.semantic_network (
+    concept_a, concept_b, association_type,
+    association_strength, co_activation_count
+)
+SELECT
+    concept_a,
+    concept_b,
+    'categorical',  -- Default association type
+    LEAST(1.0, strength),
+    1
+FROM pairs
+ON CONFLICT (concept_a, concept_b, association_type) DO UPDATE SET
+    association_strength = (
+        dreams.semantic_network.association_strength + EXCLUDED.association_strength
+    ) / 2,
+    co_activation_count = dreams.semantic_network.co_activation_count + 1,
+    last_activation = NOW()
+"""
+
+INSIGHTS_SQL = """
+WITH patterns AS (
+    SELECT
+        t.tag,
+        COUNT(*) AS frequency
+    FROM public.memories m,
+        unnest(m.tags) AS t(tag)
+    WHERE m.created_at > NOW() - INTERVAL '7 days'
+    GROUP BY t.tag
+    HAVING COUNT(*) > 5
+    ORDER BY frequency DESC
+    LIMIT 10
+)
+INSERT INTO dreams.memory_insights (
+    insight_type, insight_description,
+    pattern_name, pattern_frequency,
+    confidence_score, discovery_method
+)
+SELECT
+    'pattern',
+    'Pattern ' || quote_literal(tag) || ' detected with frequency ' || frequency,
+    'Recurring theme: ' || tag,
+    frequency,
+    LEAST(1.0, frequency / 10.0),  -- Confidence based on frequency
+    'frequency_analysis'
+FROM patterns
+WHERE tag IS NOT NULL AND tag <> ''
+"""
+
 
 class DreamsWritebackService:
     """Service for writing biological memory processing results to PostgreSQL dreams schema."""
 
-    def __init__(self):
+    def __init__(self, pool_size: int = POOL_SIZE):
         """Initialize the writeback service."""
         # Database connections
         self.postgres_url = os.getenv(
@@ -46,16 +274,39 @@ class DreamsWritebackService:
 
         # Processing configuration
         self.batch_size = 1000
+        self.pool_size = pool_size
         self.session_id = str(uuid.uuid4())
 
-    def connect_postgres(self) -> None:
-        """Connect to PostgreSQL database."""
+        # Created on first use so constructing the service stays cheap
+        self.pg_pool: Optional[psycopg2.pool.ThreadedConnectionPool] = None
+        # run_full_pipeline's stages race to create it from worker threads
+        self._pool_lock = threading.Lock()
+
+    def connect_postgres(self) -> psycopg2.pool.ThreadedConnectionPool:
+        """Return the PostgreSQL connection pool, creating it on first use."""
+        with self._pool_lock:
+            if self.pg_pool is None:
+                try:
+                    self.pg_pool = psycopg2.pool.ThreadedConnectionPool(
+                        minconn=1, maxconn=self.pool_size, dsn=self.postgres_url
+                    )
+                except Exception as e:
+                    logger.error(f"Failed to connect to PostgreSQL: {e}")
+                    raise
+            return self.pg_pool
+
+    @contextmanager
+    def _pg_connection(self) -> Generator[Any, None, None]:
+        """Borrow a pooled connection, rolling back on error."""
+        pool = self.connect_postgres()
+        conn = pool.getconn()
         try:
-            conn = psycopg2.connect(self.postgres_url)
-            return conn
-        except Exception as e:
-            logger.error(f"Failed to connect to PostgreSQL: {e}")
+            yield conn
+        except Exception:
+            conn.rollback()
             raise
+        finally:
+            pool.putconn(conn)
 
     def connect_duckdb_readonly(self) -> None:
         """Connect to DuckDB in read-only mode."""
@@ -68,464 +319,92 @@ class DreamsWritebackService:
             # Try with in-memory database if file is locked
             return duckdb.connect(":memory:")
 
+    def _run_stage(self, stage: str, query: str, params: Optional[Dict[str, Any]] = None) -> int:
+        """Execute one set-based stage, commit it, then record its metrics."""
+        with self._pg_connection() as pg_conn:
+            with pg_conn.cursor() as pg_cursor:
+                pg_cursor.execute(query, params)
+                written = pg_cursor.rowcount
+                pg_conn.commit()
+
+                # Separate transaction so a metrics failure cannot undo the stage
+                self._record_metrics(pg_cursor, stage, written, written, 0)
+                pg_conn.commit()
+        return written
+
     def write_working_memory(self) -> int:
         """Write working memory snapshots to dreams schema."""
         logger.info("Writing working memory snapshots...")
         snapshot_id = str(uuid.uuid4())
 
         try:
-            # Connect to databases
-            duck_conn = self.connect_duckdb_readonly()
-            pg_conn = self.connect_postgres()
-            pg_cursor = pg_conn.cursor()
-
-            # Query working memory from DuckDB
-            # Since we can't access DuckDB models directly, we'll query raw memories
-            # and apply similar logic
-            query = """
-            SELECT
-                id,
-                content,
-                timestamp,
-                metadata,
-                COALESCE(activation_strength, 0.5) as activation_strength,
-                COALESCE(access_count, 1) as access_count
-            FROM raw_memories
-            WHERE timestamp > NOW() - INTERVAL '5 minutes'
-            AND content IS NOT NULL
-            LIMIT 7
-            """
-
-            # For now, query from PostgreSQL directly since DuckDB may be locked
-            pg_cursor.execute(
-                """
-                SELECT
-                    id,
-                    content,
-                    created_at as timestamp,
-                    context as metadata,
-                    COALESCE((LENGTH(content)::float / 1000), 0.5) as activation_strength,
-                    1 as access_count,
-                    summary,
-                    tags
-                FROM public.memories
-                WHERE created_at > NOW() - INTERVAL '5 minutes'
-                AND content IS NOT NULL
-                ORDER BY created_at DESC
-                LIMIT 7
-            """
+            written = self._run_stage(
+                "working_memory", WORKING_MEMORY_SQL, {"snapshot_id": snapshot_id}
             )
-
-            memories = pg_cursor.fetchall()
-
-            # Process and insert each memory
-            for idx, memory in enumerate(memories):
-                (
-                    memory_id,
-                    content,
-                    timestamp,
-                    metadata,
-                    activation,
-                    access_count,
-                    summary,
-                    tags,
-                ) = memory
-
-                # Simple importance scoring
-                importance = min(1.0, 0.5 + (len(content) / 10000))
-
-                # Determine task type based on content
-                task_type = "observation"
-                if any(word in content.lower() for word in ["goal", "objective", "strategy"]):
-                    task_type = "goal"
-                elif any(word in content.lower() for word in ["task", "need to", "should"]):
-                    task_type = "task"
-                elif any(word in content.lower() for word in ["fix", "update", "change"]):
-                    task_type = "action"
-
-                # Insert into working memory
-                insert_query = """
-                INSERT INTO dreams.working_memory (
-                    memory_id, content, timestamp, metadata,
-                    entities, topics, sentiment, importance_score,
-                    task_type, working_memory_strength, final_priority,
-                    wm_slot, activation_strength, access_count,
-                    snapshot_id
-                ) VALUES (
-                    %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s
-                ) ON CONFLICT (memory_id, snapshot_id) DO NOTHING
-                """
-
-                pg_cursor.execute(
-                    insert_query,
-                    (
-                        memory_id,
-                        content[:5000] if content else "",  # Truncate very long content
-                        timestamp,
-                        (json.dumps({"original_metadata": metadata}) if metadata else "{}"),
-                        tags if tags else [],  # Use tags as entities
-                        ["memory", "processing"],  # Default topics
-                        "neutral",  # Default sentiment
-                        importance,
-                        task_type,
-                        importance * activation,  # Working memory strength
-                        importance * (7 - idx) / 7,  # Priority based on recency
-                        idx + 1,  # Miller's slot position
-                        activation,
-                        access_count,
-                        snapshot_id,
-                    ),
-                )
-
-            pg_conn.commit()
             logger.info(
-                f"Successfully wrote {len(memories)} working memory records (snapshot: {snapshot_id})"
+                f"Successfully wrote {written} working memory records (snapshot: {snapshot_id})"
             )
-
-            # Record metrics
-            self._record_metrics(pg_cursor, "working_memory", len(memories), len(memories), 0)
-            pg_conn.commit()
+            return written
 
         except Exception as e:
             logger.error(f"Error writing working memory: {e}")
-            if pg_conn:
-                pg_conn.rollback()
-        finally:
-            if pg_cursor:
-                pg_cursor.close()
-            if pg_conn:
-                pg_conn.close()
-            if duck_conn:
-                duck_conn.close()
+            return 0
 
     def write_short_term_episodes(self) -> int:
         """Write short-term episodic memories to dreams schema."""
         logger.info("Writing short-term episodes...")
 
         try:
-            pg_conn = self.connect_postgres()
-            pg_cursor = pg_conn.cursor()
-
-            # Query recent memories that should be in short-term storage
-            pg_cursor.execute(
-                """
-                SELECT
-                    id,
-                    content,
-                    created_at as timestamp,
-                    summary,
-                    context,
-                    tags
-                FROM public.memories
-                WHERE created_at > NOW() - INTERVAL '1 hour'
-                AND created_at < NOW() - INTERVAL '5 minutes'
-                AND content IS NOT NULL
-                ORDER BY created_at DESC
-                LIMIT 100
-            """
-            )
-
-            episodes = pg_cursor.fetchall()
-
-            for episode in episodes:
-                memory_id, content, timestamp, summary, context, tags = episode
-
-                # Extract hierarchical structure (simplified)
-                level_0_goal = summary[:100] if summary else "Process information"
-                level_1_tasks = tags[:3] if tags else ["analyze", "store", "retrieve"]
-
-                # Calculate STM strength
-                age_minutes = (datetime.now(timezone.utc) - timestamp).seconds / 60
-                recency_factor = max(0.1, 1.0 - (age_minutes / 60))
-
-                insert_query = """
-                INSERT INTO dreams.short_term_episodes (
-                    memory_id, content, timestamp,
-                    level_0_goal, level_1_tasks,
-                    stm_strength, recency_factor, emotional_salience,
-                    ready_for_consolidation
-                ) VALUES (
-                    %s, %s, %s, %s, %s, %s, %s, %s, %s
-                ) ON CONFLICT (memory_id) DO UPDATE SET
-                    stm_strength = EXCLUDED.stm_strength,
-                    recency_factor = EXCLUDED.recency_factor,
-                    co_activation_count = dreams.short_term_episodes.co_activation_count + 1
-                """
-
-                pg_cursor.execute(
-                    insert_query,
-                    (
-                        memory_id,
-                        content[:5000] if content else "",
-                        timestamp,
-                        level_0_goal,
-                        level_1_tasks,
-                        recency_factor * 0.8,  # STM strength
-                        recency_factor,
-                        0.5,  # Default emotional salience
-                        recency_factor < 0.3,  # Ready for consolidation if old enough
-                    ),
-                )
-
-            pg_conn.commit()
-            logger.info(f"Successfully wrote {len(episodes)} short-term episodes")
-
-            # Record metrics
-            self._record_metrics(pg_cursor, "short_term_episodes", len(episodes), len(episodes), 0)
-            pg_conn.commit()
+            written = self._run_stage("short_term_episodes", SHORT_TERM_EPISODES_SQL)
+            logger.info(f"Successfully wrote {written} short-term episodes")
+            return written
 
         except Exception as e:
             logger.error(f"Error writing short-term episodes: {e}")
-            if pg_conn:
-                pg_conn.rollback()
-        finally:
-            if pg_cursor:
-                pg_cursor.close()
-            if pg_conn:
-                pg_conn.close()
+            return 0
 
     def write_long_term_memories(self) -> int:
         """Consolidate and write long-term memories to dreams schema."""
         logger.info("Writing long-term memories...")
 
         try:
-            pg_conn = self.connect_postgres()
-            pg_cursor = pg_conn.cursor()
-
-            # Query memories ready for long-term consolidation
-            pg_cursor.execute(
-                """
-                SELECT
-                    ste.memory_id,
-                    m.content,
-                    m.summary as semantic_gist,
-                    ste.level_0_goal,
-                    ste.stm_strength,
-                    m.tags
-                FROM dreams.short_term_episodes ste
-                JOIN public.memories m ON m.id = ste.memory_id
-                WHERE ste.ready_for_consolidation = true
-                AND ste.consolidation_attempts < 3
-                LIMIT 50
-            """
-            )
-
-            consolidatable = pg_cursor.fetchall()
-
-            for memory in consolidatable:
-                memory_id, content, semantic_gist, goal, stm_strength, tags = memory
-
-                # Determine knowledge type
-                knowledge_type = "declarative"
-                if "how" in (content or "").lower():
-                    knowledge_type = "procedural"
-                elif "if" in (content or "").lower() or "when" in (content or "").lower():
-                    knowledge_type = "conditional"
-
-                insert_query = """
-                INSERT INTO dreams.long_term_memories (
-                    memory_id, content, semantic_gist,
-                    concepts, knowledge_type, abstraction_level,
-                    confidence_score, stability_score, importance_score,
-                    consolidation_source
-                ) VALUES (
-                    %s, %s, %s, %s, %s, %s, %s, %s, %s, %s
-                ) ON CONFLICT (memory_id) DO UPDATE SET
-                    stability_score = GREATEST(
-                        dreams.long_term_memories.stability_score,
-                        EXCLUDED.stability_score
-                    ),
-                    access_count = dreams.long_term_memories.access_count + 1
-                """
-
-                pg_cursor.execute(
-                    insert_query,
-                    (
-                        memory_id,
-                        content[:5000] if content else "",
-                        semantic_gist or goal,
-                        tags if tags else [],
-                        knowledge_type,
-                        3,  # Default abstraction level
-                        stm_strength,  # Use STM strength as confidence
-                        stm_strength * 0.8,  # Stability score
-                        stm_strength * 0.7,  # Importance score
-                        "wake",  # Consolidation during wake hours
-                    ),
-                )
-
-                # Update STM episode as consolidated
-                pg_cursor.execute(
-                    """
-                    UPDATE dreams.short_term_episodes
-                    SET consolidation_attempts = consolidation_attempts + 1,
-                        last_consolidation_attempt = NOW()
-                    WHERE memory_id = %s
-                """,
-                    (memory_id,),
-                )
-
-            pg_conn.commit()
-            logger.info(f"Successfully consolidated {len(consolidatable)} long-term memories")
-
-            # Record metrics
-            self._record_metrics(
-                pg_cursor,
-                "long_term_memories",
-                len(consolidatable),
-                len(consolidatable),
-                0,
-            )
-            pg_conn.commit()
+            written = self._run_stage("long_term_memories", LONG_TERM_MEMORIES_SQL)
+            logger.info(f"Successfully consolidated {written} long-term memories")
+            return written
 
         except Exception as e:
             logger.error(f"Error writing long-term memories: {e}")
-            if pg_conn:
-                pg_conn.rollback()
-        finally:
-            if pg_cursor:
-                pg_cursor.close()
-            if pg_conn:
-                pg_conn.close()
+            return 0
 
     def write_semantic_network(self) -> int:
         """Build and write semantic network associations."""
         logger.info("Building semantic network...")
 
         try:
-            pg_conn = self.connect_postgres()
-            pg_cursor = pg_conn.cursor()
-
-            # Find concept associations from long-term memories
-            pg_cursor.execute(
-                """
-                SELECT DISTINCT
-                    ltm1.concepts[1] as concept_a,
-                    ltm2.concepts[1] as concept_b,
-                    (ltm1.importance_score + ltm2.importance_score) / 2 as strength
-                FROM dreams.long_term_memories ltm1
-                CROSS JOIN dreams.long_term_memories ltm2
-                WHERE ltm1.memory_id != ltm2.memory_id
-                AND ltm1.concepts IS NOT NULL AND array_length(ltm1.concepts, 1) > 0
-                AND ltm2.concepts IS NOT NULL AND array_length(ltm2.concepts, 1) > 0
-                AND ltm1.consolidated_at > NOW() - INTERVAL '7 days'
-                LIMIT 100
-            """
-            )
-
-            associations = pg_cursor.fetchall()
-
-            for concept_a, concept_b, strength in associations:
-                if concept_a and concept_b and concept_a != concept_b:
-                    insert_query = """
-                    INSERT INTO dreams.semantic_network (
-                        concept_a, concept_b, association_type,
-                        association_strength, co_activation_count
-                    ) VALUES (
-                        %s, %s, %s, %s, %s
-                    ) ON CONFLICT (concept_a, concept_b, association_type) DO UPDATE SET
-                        association_strength = (
-                            dreams.semantic_network.association_strength + EXCLUDED.association_strength
-                        ) / 2,
-                        co_activation_count = dreams.semantic_network.co_activation_count + 1,
-                        last_activation = NOW()
-                    """
-
-                    pg_cursor.execute(
-                        insert_query,
-                        (
-                            concept_a,
-                            concept_b,
-                            "categorical",  # Default association type
-                            min(1.0, strength),
-                            1,
-                        ),
-                    )
-
-            pg_conn.commit()
-            logger.info(f"Successfully created {len(associations)} semantic associations")
-
-            # Record metrics
-            self._record_metrics(
-                pg_cursor, "semantic_network", len(associations), len(associations), 0
-            )
-            pg_conn.commit()
+            written = self._run_stage("semantic_network", SEMANTIC_NETWORK_SQL)
+            logger.info(f"Successfully created {written} semantic associations")
+            return written
 
         except Exception as e:
             logger.error(f"Error building semantic network: {e}")
-            if pg_conn:
-                pg_conn.rollback()
-        finally:
-            if pg_cursor:
-                pg_cursor.close()
-            if pg_conn:
-                pg_conn.close()
+            return 0
 
-    def extract_insights(self) -> List[Dict[str, Any]]:
+    def extract_insights(self) -> int:
         """Extract patterns and insights from processed memories."""
         logger.info("Extracting memory insights...")
 
         try:
-            pg_conn = self.connect_postgres()
-            pg_cursor = pg_conn.cursor()
-
-            # Find recurring patterns
-            pg_cursor.execute(
-                """
-                SELECT
-                    t.tag,
-                    COUNT(*) as frequency
-                FROM public.memories m,
-                    unnest(m.tags) as t(tag)
-                WHERE m.created_at > NOW() - INTERVAL '7 days'
-                GROUP BY t.tag
-                HAVING COUNT(*) > 5
-                ORDER BY frequency DESC
-                LIMIT 10
-            """
-            )
-
-            patterns = pg_cursor.fetchall()
-
-            for tag, frequency in patterns:
-                if tag:
-                    insert_query = """
-                    INSERT INTO dreams.memory_insights (
-                        insight_type, insight_description,
-                        pattern_name, pattern_frequency,
-                        confidence_score, discovery_method
-                    ) VALUES (
-                        %s, %s, %s, %s, %s, %s
-                    )
-                    """
-
-                    pattern_name = f"Recurring theme: {tag}"
-                    description = f"Pattern '{tag}' detected with frequency {frequency}"
-
-                    pg_cursor.execute(
-                        insert_query,
-                        (
-                            "pattern",
-                            description,
-                            pattern_name,
-                            frequency,
-                            min(1.0, frequency / 10),  # Confidence based on frequency
-                            "frequency_analysis",
-                        ),
-                    )
-
-            pg_conn.commit()
-            logger.info(f"Successfully extracted {len(patterns)} insights")
+            with self._pg_connection() as pg_conn:
+                with pg_conn.cursor() as pg_cursor:
+                    pg_cursor.execute(INSIGHTS_SQL)
+                    written = pg_cursor.rowcount
+                pg_conn.commit()
+            logger.info(f"Successfully extracted {written} insights")
+            return written
 
         except Exception as e:
             logger.error(f"Error extracting insights: {e}")
-            if pg_conn:
-                pg_conn.rollback()
-        finally:
-            if pg_cursor:
-                pg_cursor.close()
-            if pg_conn:
-                pg_conn.close()
+            return 0
 
     def _record_metrics(
         self, cursor: Any, stage: str, processed: int, successful: int, failed: int
@@ -547,96 +426,118 @@ class DreamsWritebackService:
         except Exception as e:
             logger.warning(f"Could not record metrics: {e}")
 
+    def _run_consolidation_chain(self) -> Dict[str, int]:
+        """Short-term -> long-term -> semantic network; each reads the previous stage."""
+        return {
+            "short_term_episodes": self.write_short_term_episodes(),
+            "long_term_memories": self.write_long_term_memories(),
+            "semantic_network": self.write_semantic_network(),
+        }
+
     def run_full_pipeline(self) -> Dict[str, Any]:
         """Run the complete write-back pipeline."""
         logger.info(f"Starting full pipeline run (session: {self.session_id})")
 
-        # Run each stage
-        self.write_working_memory()
-        self.write_short_term_episodes()
-        self.write_long_term_memories()
-        self.write_semantic_network()
-        self.extract_insights()
+        # Working memory and insights only read public.memories, so they run
+        # alongside the consolidation chain on their own pooled connections
+        with ThreadPoolExecutor(max_workers=3) as executor:
+            working = executor.submit(self.write_working_memory)
+            chain = executor.submit(self._run_consolidation_chain)
+            insights = executor.submit(self.extract_insights)
+
+            results: Dict[str, Any] = {"working_memory": working.result()}
+            results.update(chain.result())
+            results["memory_insights"] = insights.result()
 
         logger.info("Pipeline run complete")
+        return results
 
     def cleanup_old_data(self, days_to_keep: int = 30) -> None:
         """Clean up old data from dreams schema."""
         logger.info(f"Cleaning up data older than {days_to_keep} days...")
 
         try:
-            pg_conn = self.connect_postgres()
-            pg_cursor = pg_conn.cursor()
-
-            # Clean old working memory snapshots
-            pg_cursor.execute(
-                """
-                DELETE FROM dreams.working_memory
-                WHERE processed_at < NOW() - INTERVAL '%s days'
-            """,
-                (days_to_keep,),
-            )
+            with self._pg_connection() as pg_conn:
+                with pg_conn.cursor() as pg_cursor:
+                    # Clean old working memory snapshots
+                    pg_cursor.execute(
+                        """
+                        DELETE FROM dreams.working_memory
+                        WHERE processed_at < NOW() - INTERVAL '%s days'
+                    """,
+                        (days_to_keep,),
+                    )
 
-            deleted_wm = pg_cursor.rowcount
+                    deleted_wm = pg_cursor.rowcount
 
-            # Clean old metrics
-            pg_cursor.execute(
-                """
-                DELETE FROM dreams.processing_metrics
-                WHERE start_time < NOW() - INTERVAL '%s days'
-            """,
-                (days_to_keep * 2,),
-            )  # Keep metrics longer
+                    # Clean old metrics
+                    pg_cursor.execute(
+                        """
+                        DELETE FROM dreams.processing_metrics
+                        WHERE start_time < NOW() - INTERVAL '%s days'
+                    """,
+                        (days_to_keep * 2,),
+                    )  # Keep metrics longer
 
-            deleted_metrics = pg_cursor.rowcount
+                    deleted_metrics = pg_cursor.rowcount
 
-            pg_conn.commit()
+                pg_conn.commit()
             logger.info(
                 f"Cleaned up {deleted_wm} working memory records and {deleted_metrics} metrics"
             )
 
         except Exception as e:
             logger.error(f"Error during cleanup: {e}")
-            if pg_conn:
-                pg_conn.rollback()
-        finally:
-            if pg_cursor:
-                pg_cursor.close()
-            if pg_conn:
-                pg_conn.close()
+
+    def close(self) -> None:
+        """Close all pooled connections."""
+        with self._pool_lock:
+            if self.pg_pool is not None:
+                self.pg_pool.closeall()
+                self.pg_pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(
+        self,
+        exc_type: Optional[type],
+        exc_val: Optional[Exception],
+        exc_tb: Optional[TracebackType],
+    ) -> None:
+        self.close()
 
 
 def main() -> None:
     """Main entry point for the write-back service."""
-    service = DreamsWritebackService()
-
-    # Parse command line arguments
-    if len(sys.argv) > 1:
-        command = sys.argv[1]
-
-        if command == "working":
-            service.write_working_memory()
-        elif command == "episodes":
-            service.write_short_term_episodes()
-        elif command == "longterm":
-            service.write_long_term_memories()
-        elif command == "semantic":
-            service.write_semantic_network()
-        elif command == "insights":
-            service.extract_insights()
-        elif command == "cleanup":
-            days = int(sys.argv[2]) if len(sys.argv) > 2 else 30
-            service.cleanup_old_data(days)
-        elif command == "full":
-            service.run_full_pipeline()
+    with DreamsWritebackService() as service:
+        # Parse command line arguments
+        if len(sys.argv) > 1:
+            command = sys.argv[1]
+
+            if command == "working":
+                service.write_working_memory()
+            elif command == "episodes":
+                service.write_short_term_episodes()
+            elif command == "longterm":
+                service.write_long_term_memories()
+            elif command == "semantic":
+                service.write_semantic_network()
+            elif command == "insights":
+                service.extract_insights()
+            elif command == "cleanup":
+                days = int(sys.argv[2]) if len(sys.argv) > 2 else 30
+                service.cleanup_old_data(days)
+            elif command == "full":
+                service.run_full_pipeline()
+            else:
+                print(f"Unknown command: {command}")
+                print(
+                    "Usage: dreams_writeback_service.py [working|episodes|longterm|semantic|insights|cleanup|full]"
+                )
         else:
-            print(f"Unknown command: {command}")
-            print(
-                "Usage: dreams_writeback_service.py [working|episodes|longterm|semantic|insights|cleanup|full]"
-            )
-    else:
-        # Default: run full pipeline
-        service.run_full_pipeline()
+            # Default: run full pipeline
+            service.run_full_pipeline()
 
 
 if __name__ == "__main__":
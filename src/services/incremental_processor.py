@@ -22,12 +22,179 @@ import os
 from contextlib import contextmanager
 from dataclasses import dataclass
 from datetime import datetime, timedelta, timezone
-from typing import Any, Dict, Generator, List, Optional
+from typing import Any, Dict, Generator, List, Optional, Tuple
 
 import duckdb
-import pandas as pd
+import numpy as np
 import psycopg2
 import psycopg2.extras
+import pyarrow as pa
+import pyarrow.compute as pc
+
+# Per-stage source relations; every one exposes `timestamp` and `content_hash`
+MEMORIES_SOURCE_SQL = """
+SELECT
+    id as source_memory_id,
+    level_0_goal,
+    level_1_tasks,
+    atomic_actions as level_2_actions,
+    phantom_objects,
+    consolidated_strength,
+    consolidation_fate,
+    hebbian_strength,
+    semantic_gist,
+    semantic_category,
+    cortical_region,
+    retrieval_accessibility,
+    stm_strength,
+    emotional_salience,
+    consolidated_at as timestamp,
+    -- Add content hash for change detection
+    md5(CONCAT(
+        COALESCE(level_0_goal, ''),
+        COALESCE(CAST(consolidated_strength AS STRING), '0'),
+        COALESCE(consolidation_fate, ''),
+        COALESCE(semantic_gist, '')
+    )) as content_hash
+FROM memory_replay
+"""
+
+INSIGHTS_SOURCE_SQL = """
+SELECT
+    memory_id,
+    content,
+    suggested_tags,
+    related_memories,
+    connection_count,
+    created_at as timestamp,
+    -- Generate insight content hash
+    md5(CONCAT(
+        COALESCE(content, ''),
+        COALESCE(CAST(connection_count AS STRING), '0'),
+        COALESCE(array_to_string(suggested_tags, ','), '')
+    )) as content_hash
+FROM mvp_memory_insights
+"""
+
+ASSOCIATIONS_SOURCE_SQL = """
+SELECT
+    source_concept,
+    target_concept,
+    association_strength,
+    co_occurrence_count,
+    semantic_similarity,
+    association_quality,
+    last_updated_at as timestamp,
+    -- Content hash for association
+    md5(CONCAT(
+        source_concept,
+        target_concept,
+        COALESCE(CAST(association_strength AS STRING), '0'),
+        COALESCE(association_quality, '')
+    )) as content_hash
+FROM concept_associations
+"""
+
+# Watermark queries bind (since_timestamp, max_records) as parameters
+INCREMENTAL_MEMORIES_SQL = f"""
+SELECT * FROM ({MEMORIES_SOURCE_SQL}) AS s
+WHERE s.timestamp > ?
+ORDER BY s.timestamp DESC
+LIMIT ?
+"""
+
+INCREMENTAL_INSIGHTS_SQL = f"""
+SELECT * FROM ({INSIGHTS_SOURCE_SQL}) AS s
+WHERE s.timestamp > ?
+ORDER BY s.timestamp DESC
+LIMIT ?
+"""
+
+INCREMENTAL_ASSOCIATIONS_SQL = f"""
+SELECT * FROM ({ASSOCIATIONS_SOURCE_SQL}) AS s
+WHERE s.timestamp > ?
+ORDER BY s.association_strength DESC
+LIMIT ?
+"""
+
+# Latest committed watermark per stage, including the keyset position inside a
+# timestamp tie; processing_metadata only records when a batch finished
+CREATE_WATERMARKS_SQL = """
+CREATE SCHEMA IF NOT EXISTS codex_processed;
+CREATE TABLE IF NOT EXISTS codex_processed.incremental_watermarks (
+    processing_stage TEXT PRIMARY KEY,
+    watermark_end TEXT NOT NULL,
+    watermark_key JSONB,
+    batch_id TEXT,
+    records_processed INTEGER DEFAULT 0,
+    updated_at TIMESTAMPTZ DEFAULT CURRENT_TIMESTAMP
+)
+"""
+
+# Keyset pagination walks each stage forward on (timestamp, *key columns)
+KEYSET_SOURCES = {
+    "processed_memories": (MEMORIES_SOURCE_SQL, ("source_memory_id",)),
+    "generated_insights": (INSIGHTS_SOURCE_SQL, ("memory_id",)),
+    "memory_associations": (ASSOCIATIONS_SOURCE_SQL, ("source_concept", "target_concept")),
+}
+
+
+def keyset_page_sql(source_sql: str, key_columns: Tuple[str, ...], resume_key: bool) -> str:
+    """
+    Ascending page query over a stage source
+
+    With resume_key the page starts strictly after a (timestamp, *key_columns) row, binding
+    one parameter per column; otherwise strictly after the timestamp alone. The row limit is
+    always the last parameter.
+    """
+    columns = ("timestamp",) + key_columns
+    ordering = ", ".join(f"s.{column}" for column in columns)
+    if resume_key:
+        placeholders = ", ".join("?" for _ in columns)
+        condition = f"({ordering}) > ({placeholders})"
+    else:
+        condition = "s.timestamp > ?"
+    return f"""
+SELECT * FROM ({source_sql}) AS s
+WHERE {condition}
+ORDER BY {ordering}
+LIMIT ?
+"""
+
+
+def encode_watermark_key(key: Optional[Tuple[Any, ...]]) -> Optional[str]:
+    """JSON for a (timestamp, *key columns) watermark key; the timestamp as ISO 8601"""
+    if key is None:
+        return None
+    return json.dumps([key[0].isoformat(), *key[1:]], default=str)
+
+
+def decode_watermark_key(value: Optional[Any]) -> Optional[Tuple[Any, ...]]:
+    """Inverse of encode_watermark_key; accepts the JSON text or psycopg2's decoded list"""
+    if value is None:
+        return None
+    if isinstance(value, str):
+        value = json.loads(value)
+    return (datetime.fromisoformat(value[0]), *value[1:])
+
+
+def content_hash_digest(column: pa.ChunkedArray) -> str:
+    """
+    SHA-256 over a string column's value bytes, read straight from the Arrow buffers
+
+    The per-row md5 hashes are fixed-width hex, so concatenated values are unambiguous
+    and no row is materialized as a Python object.
+    """
+    digest = hashlib.sha256()
+    for chunk in column.cast(pa.string()).chunks:
+        if len(chunk) == 0:
+            continue
+        _, offsets, values = chunk.buffers()
+        bounds = np.frombuffer(offsets, dtype=np.int32)[
+            chunk.offset : chunk.offset + len(chunk) + 1
+        ]
+        digest.update(memoryview(values)[bounds[0] : bounds[-1]])
+    return digest.hexdigest()
 
 
 @dataclass
@@ -40,6 +207,7 @@ class ProcessingState:
     watermark_value: str  # Timestamp or hash for tracking progress
     records_processed: int = 0
     processing_errors: List[str] = None
+    watermark_key: Optional[Tuple[Any, ...]] = None  # Key columns of the last processed row
 
     def __post_init__(self):
         if self.processing_errors is None:
@@ -52,12 +220,13 @@ class IncrementalBatch:
 
     batch_id: str
     stage: str
-    data: List[Dict[str, Any]]
+    data: pa.Table
     watermark_start: str
     watermark_end: str
     record_count: int
     batch_hash: str
     created_at: datetime
+    watermark_key: Optional[Tuple[Any, ...]] = None  # Set by keyset pagination
 
 
 class IncrementalProcessor:
@@ -147,7 +316,17 @@ class IncrementalProcessor:
         return self._load_processing_state_from_db(stage_name)
 
     def _load_processing_state_from_db(self, stage_name: str) -> Optional[ProcessingState]:
-        """Load processing state from PostgreSQL metadata table"""
+        """
+        Load processing state from PostgreSQL
+
+        The stored watermark (with its keyset position) is preferred; stages that never
+        stored one fall back to the end time of their last completed batch.
+        """
+        watermark_query = """
+        SELECT processing_stage, watermark_end, watermark_key, batch_id, records_processed
+        FROM codex_processed.incremental_watermarks
+        WHERE processing_stage = %s
+        """
         query = """
         SELECT
             processing_stage,
@@ -164,6 +343,30 @@ class IncrementalProcessor:
         try:
             with self._get_pg_connection() as conn:
                 with conn.cursor() as cursor:
+                    cursor.execute(CREATE_WATERMARKS_SQL)
+                    cursor.execute(watermark_query, (stage_name,))
+                    row = cursor.fetchone()
+                    conn.commit()
+
+                    if row:
+                        state = ProcessingState(
+                            stage_name=row["processing_stage"],
+                            last_processed_timestamp=datetime.fromisoformat(
+                                row["watermark_end"].replace("Z", "+00:00")
+                            ),
+                            last_processed_batch_id=row["batch_id"],
+                            watermark_value=row["watermark_end"],
+                            records_processed=row["records_processed"],
+                            watermark_key=decode_watermark_key(row["watermark_key"]),
+                        )
+
+                        self.processing_states[stage_name] = state
+                        self.logger.info(
+                            f"Loaded watermark for {stage_name}: {state.watermark_value} "
+                            f"(key {state.watermark_key})"
+                        )
+                        return state
+
                     cursor.execute(query, (stage_name,))
                     row = cursor.fetchone()
 
@@ -205,14 +408,7 @@ class IncrementalProcessor:
             IncrementalBatch object or None if no new data
         """
         if not since_timestamp:
-            state = self.get_processing_state(stage)
-            if state:
-                since_timestamp = state.last_processed_timestamp
-            else:
-                # First run - look back default window
-                since_timestamp = datetime.now(timezone.utc) - timedelta(
-                    hours=self.default_lookback_hours
-                )
+            since_timestamp, _ = self._resume_point(stage)
 
         # Get incremental data based on stage
         if stage == "processed_memories":
@@ -225,18 +421,86 @@ class IncrementalProcessor:
             self.logger.error(f"Unknown processing stage: {stage}")
             return None
 
-        if not data:
+        if data is None or data.num_rows == 0:
             self.logger.info(f"No new data found for stage {stage} since {since_timestamp}")
             return None
 
-        # Create batch metadata
-        batch_id = f"{stage}_{int(datetime.now(timezone.utc).timestamp())}_{len(data)}"
+        return self._build_batch(stage, data, since_timestamp)
+
+    def iter_incremental_batches(
+        self, stage: str, since_timestamp: datetime = None, batch_records: int = 10000
+    ) -> Generator[IncrementalBatch, None, None]:
+        """
+        Stream a stage's backlog as consecutive batches in (timestamp, key) order
+
+        Each page resumes strictly after the last row of the previous one, so a large
+        gap drains in bounded memory and every row is covered exactly once. Processing
+        state advances past a batch when the consumer asks for the next one; a batch
+        whose processing raised is therefore never committed.
+
+        Args:
+            stage: Processing stage name
+            since_timestamp: Start after this timestamp instead of the stored watermark
+            batch_records: Rows per batch
+
+        Yields:
+            IncrementalBatch objects with watermark_key set to their last row's key
+        """
+        if stage not in KEYSET_SOURCES:
+            self.logger.error(f"Unknown processing stage: {stage}")
+            return
+
+        source_sql, key_columns = KEYSET_SOURCES[stage]
+        if since_timestamp:
+            resume_key = None
+        else:
+            since_timestamp, resume_key = self._resume_point(stage)
+
+        while True:
+            if resume_key:
+                query = keyset_page_sql(source_sql, key_columns, resume_key=True)
+                params = [*resume_key, batch_records]
+            else:
+                query = keyset_page_sql(source_sql, key_columns, resume_key=False)
+                params = [since_timestamp, batch_records]
+
+            data = self._fetch_incremental(query, params)
+            if data.num_rows == 0:
+                return
+
+            batch = self._build_batch(stage, data, since_timestamp)
+            last_row = data.slice(data.num_rows - 1).select(("timestamp",) + key_columns)
+            batch.watermark_key = tuple(column[0].as_py() for column in last_row.columns)
+
+            yield batch
+            self.update_processing_state(stage, batch, success=True)
+
+            if data.num_rows < batch_records:
+                return
+            resume_key = batch.watermark_key
+            since_timestamp = resume_key[0]
+
+    def _resume_point(self, stage: str) -> Tuple[datetime, Optional[Tuple[Any, ...]]]:
+        """Watermark timestamp and keyset position to resume a stage from"""
+        state = self.get_processing_state(stage)
+        if state:
+            return state.last_processed_timestamp, state.watermark_key
+
+        # First run - look back default window
+        return datetime.now(timezone.utc) - timedelta(hours=self.default_lookback_hours), None
+
+    def _build_batch(
+        self, stage: str, data: pa.Table, since_timestamp: datetime
+    ) -> IncrementalBatch:
+        """Wrap fetched rows in an IncrementalBatch with watermarks and content hash"""
+        record_count = data.num_rows
+        batch_id = f"{stage}_{int(datetime.now(timezone.utc).timestamp())}_{record_count}"
         watermark_start = since_timestamp.isoformat()
-        watermark_end = max(item.get("timestamp", since_timestamp) for item in data).isoformat()
+        latest = pc.max(data.column("timestamp")).as_py()
+        watermark_end = (latest or since_timestamp).isoformat()
 
-        # Calculate content hash for change detection
-        content_str = json.dumps(data, sort_keys=True, default=str)
-        batch_hash = hashlib.sha256(content_str.encode()).hexdigest()
+        # Calculate content hash for change detection from the per-row hashes
+        batch_hash = content_hash_digest(data.column("content_hash"))
 
         batch = IncrementalBatch(
             batch_id=batch_id,
@@ -244,157 +508,54 @@ class IncrementalProcessor:
             data=data,
             watermark_start=watermark_start,
             watermark_end=watermark_end,
-            record_count=len(data),
+            record_count=record_count,
             batch_hash=batch_hash,
             created_at=datetime.now(timezone.utc),
         )
 
         self.logger.info(
-            f"Created incremental batch {batch_id} with {len(data)} records for {stage}"
+            f"Created incremental batch {batch_id} with {record_count} records for {stage}"
         )
         return batch
 
+    def _fetch_incremental(self, query: str, params: List[Any]) -> pa.Table:
+        """Run a watermark query and fetch the result as one Arrow table"""
+        result = self.duckdb_conn.execute(query, params)
+        # to_arrow_table replaces fetch_arrow_table in newer DuckDB releases
+        fetch = getattr(result, "to_arrow_table", None) or result.fetch_arrow_table
+        return fetch()
+
     def _get_incremental_memories(
         self, since_timestamp: datetime, max_records: int
-    ) -> List[Dict[str, Any]]:
+    ) -> Optional[pa.Table]:
         """Get incremental processed memories from DuckDB"""
-        query = f"""
-        WITH recent_consolidations AS (
-            SELECT
-                id as source_memory_id,
-                level_0_goal,
-                level_1_tasks,
-                atomic_actions as level_2_actions,
-                phantom_objects,
-                consolidated_strength,
-                consolidation_fate,
-                hebbian_strength,
-                semantic_gist,
-                semantic_category,
-                cortical_region,
-                retrieval_accessibility,
-                stm_strength,
-                emotional_salience,
-                consolidated_at as timestamp
-            FROM memory_replay
-            WHERE consolidated_at > '{since_timestamp.isoformat()}'
-            ORDER BY consolidated_at DESC
-            LIMIT {max_records}
-        )
-
-        SELECT
-            *,
-            -- Add content hash for change detection
-            md5(CONCAT(
-                COALESCE(level_0_goal, ''),
-                COALESCE(CAST(consolidated_strength AS STRING), '0'),
-                COALESCE(consolidation_fate, ''),
-                COALESCE(semantic_gist, '')
-            )) as content_hash
-        FROM recent_consolidations
-        """
-
         try:
-            result = self.duckdb_conn.execute(query).fetchall()
-            columns = [desc[0] for desc in self.duckdb_conn.description]
-
-            memories = []
-            for row in result:
-                memory_dict = dict(zip(columns, row))
-                # Convert timestamps to datetime objects
-                if memory_dict.get("timestamp"):
-                    memory_dict["timestamp"] = pd.to_datetime(memory_dict["timestamp"])
-                memories.append(memory_dict)
-
-            return memories
-
+            return self._fetch_incremental(INCREMENTAL_MEMORIES_SQL, [since_timestamp, max_records])
         except Exception as e:
             self.logger.error(f"Failed to get incremental memories: {e}")
-            return []
+            return None
 
     def _get_incremental_insights(
         self, since_timestamp: datetime, max_records: int
-    ) -> List[Dict[str, Any]]:
+    ) -> Optional[pa.Table]:
         """Get incremental insights from DuckDB MVP model"""
-        query = f"""
-        SELECT
-            memory_id,
-            content,
-            suggested_tags,
-            related_memories,
-            connection_count,
-            created_at as timestamp,
-            -- Generate insight content hash
-            md5(CONCAT(
-                COALESCE(content, ''),
-                COALESCE(CAST(connection_count AS STRING), '0'),
-                COALESCE(array_to_string(suggested_tags, ','), '')
-            )) as content_hash
-        FROM mvp_memory_insights
-        WHERE created_at > '{since_timestamp.isoformat()}'
-        ORDER BY created_at DESC
-        LIMIT {max_records}
-        """
-
         try:
-            result = self.duckdb_conn.execute(query).fetchall()
-            columns = [desc[0] for desc in self.duckdb_conn.description]
-
-            insights = []
-            for row in result:
-                insight_dict = dict(zip(columns, row))
-                if insight_dict.get("timestamp"):
-                    insight_dict["timestamp"] = pd.to_datetime(insight_dict["timestamp"])
-                insights.append(insight_dict)
-
-            return insights
-
+            return self._fetch_incremental(INCREMENTAL_INSIGHTS_SQL, [since_timestamp, max_records])
         except Exception as e:
             self.logger.error(f"Failed to get incremental insights: {e}")
-            return []
+            return None
 
     def _get_incremental_associations(
         self, since_timestamp: datetime, max_records: int
-    ) -> List[Dict[str, Any]]:
+    ) -> Optional[pa.Table]:
         """Get incremental associations from DuckDB semantic model"""
-        query = f"""
-        SELECT
-            source_concept,
-            target_concept,
-            association_strength,
-            co_occurrence_count,
-            semantic_similarity,
-            association_quality,
-            last_updated_at as timestamp,
-            -- Content hash for association
-            md5(CONCAT(
-                source_concept,
-                target_concept,
-                COALESCE(CAST(association_strength AS STRING), '0'),
-                COALESCE(association_quality, '')
-            )) as content_hash
-        FROM concept_associations
-        WHERE last_updated_at > '{since_timestamp.isoformat()}'
-        ORDER BY association_strength DESC
-        LIMIT {max_records}
-        """
-
         try:
-            result = self.duckdb_conn.execute(query).fetchall()
-            columns = [desc[0] for desc in self.duckdb_conn.description]
-
-            associations = []
-            for row in result:
-                assoc_dict = dict(zip(columns, row))
-                if assoc_dict.get("timestamp"):
-                    assoc_dict["timestamp"] = pd.to_datetime(assoc_dict["timestamp"])
-                associations.append(assoc_dict)
-
-            return associations
-
+            return self._fetch_incremental(
+                INCREMENTAL_ASSOCIATIONS_SQL, [since_timestamp, max_records]
+            )
         except Exception as e:
             self.logger.error(f"Failed to get incremental associations: {e}")
-            return []
+            return None
 
     def detect_changes(self, stage: str, new_batch: IncrementalBatch) -> bool:
         """
@@ -482,15 +643,52 @@ class IncrementalProcessor:
                 last_processed_batch_id=batch.batch_id,
                 watermark_value=batch.watermark_end,
                 records_processed=records_processed or batch.record_count,
+                watermark_key=batch.watermark_key,
             )
 
             self.processing_states[stage] = state
+            self._save_processing_state_to_db(state)
             self.logger.info(
                 f"Updated processing state for {stage}: watermark={state.watermark_value}"
             )
         else:
             self.logger.error(f"Processing failed for batch {batch.batch_id} in stage {stage}")
 
+    def _save_processing_state_to_db(self, state: ProcessingState) -> None:
+        """Upsert a stage's watermark so a new processor resumes at the same keyset position"""
+        if not self.pg_conn_params:
+            return
+
+        upsert = """
+        INSERT INTO codex_processed.incremental_watermarks (
+            processing_stage, watermark_end, watermark_key, batch_id, records_processed, updated_at
+        ) VALUES (%s, %s, %s, %s, %s, CURRENT_TIMESTAMP)
+        ON CONFLICT (processing_stage) DO UPDATE SET
+            watermark_end = EXCLUDED.watermark_end,
+            watermark_key = EXCLUDED.watermark_key,
+            batch_id = EXCLUDED.batch_id,
+            records_processed = EXCLUDED.records_processed,
+            updated_at = EXCLUDED.updated_at
+        """
+
+        try:
+            with self._get_pg_connection() as conn:
+                with conn.cursor() as cursor:
+                    cursor.execute(CREATE_WATERMARKS_SQL)
+                    cursor.execute(
+                        upsert,
+                        (
+                            state.stage_name,
+                            state.watermark_value,
+                            encode_watermark_key(state.watermark_key),
+                            state.last_processed_batch_id,
+                            state.records_processed,
+                        ),
+                    )
+                conn.commit()
+        except Exception as e:
+            self.logger.error(f"Failed to persist processing state for {state.stage_name}: {e}")
+
     def get_recovery_batches(
         self, stage: str, failed_timestamp: datetime, max_recovery_hours: int = 72
     ) -> List[IncrementalBatch]:
@@ -5,15 +5,26 @@ LLM Integration Service - Ollama integration for memory processing
 import json
 import logging
 import os
+import threading
 import time
-from dataclasses import dataclass
-from typing import Any, Dict, List, Optional
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, replace
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
 import duckdb
+import numpy as np
 import requests
 from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
 
+try:
+    import pyarrow as pa
+except ImportError:  # Vectorized UDFs need pyarrow; scalar UDFs are registered instead
+    pa = None
+
+from src.utils.single_flight import SingleFlight
+
 from .error_handling import (
     LLMError,
     NetworkError,
@@ -24,6 +35,19 @@ from .error_handling import (
 
 logger = logging.getLogger(__name__)
 
+# Vectorized DuckDB UDF settings
+UDF_EMBEDDING_DIMENSIONS = 768
+UDF_EMBED_BATCH_SIZE = int(os.getenv("LLM_UDF_EMBED_BATCH_SIZE", "64"))
+UDF_MAX_WORKERS = int(os.getenv("LLM_UDF_MAX_WORKERS", "4"))
+
+# Prompt/response cache bounds
+CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "10000"))
+CACHE_MAX_BYTES = int(os.getenv("LLM_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+CACHE_TTL_SECONDS = float(os.getenv("LLM_CACHE_TTL_SECONDS", "86400"))
+CACHE_MAX_PERSISTENT_ENTRIES = int(os.getenv("LLM_CACHE_MAX_PERSISTENT_ENTRIES", "100000"))
+CACHE_TOUCH_BATCH_SIZE = 256  # Hit timestamps buffered before one UPDATE
+CACHE_PRUNE_INTERVAL = 100  # Puts between persistent-tier prunes
+
 
 @dataclass
 class LLMResponse:
@@ -41,6 +65,267 @@ class LLMResponse:
     cached: bool = False
 
 
+class LLMResponseCache:
+    """
+    Size-bounded LRU + TTL cache for LLM responses with an optional DuckDB tier
+
+    The in-process tier is an OrderedDict bounded by entry count and approximate byte
+    size. When db_path is set, responses are written through to a DuckDB table and the
+    most recently used entries are loaded back on first access after a restart. Hits
+    refresh last_accessed in batches, and puts periodically drop expired rows and rows
+    beyond max_persistent_entries so the table stays bounded while the process runs.
+    """
+
+    def __init__(
+        self,
+        db_path: Optional[str] = None,
+        max_entries: int = CACHE_MAX_ENTRIES,
+        max_bytes: int = CACHE_MAX_BYTES,
+        ttl_seconds: float = CACHE_TTL_SECONDS,
+        max_persistent_entries: int = CACHE_MAX_PERSISTENT_ENTRIES,
+    ):
+        self.db_path = db_path
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.max_persistent_entries = max(max_persistent_entries, max_entries)
+        self._entries: "OrderedDict[str, Tuple[LLMResponse, float, int]]" = OrderedDict()
+        self._lock = threading.RLock()
+        self._conn: Optional[duckdb.DuckDBPyConnection] = None
+        self._warmed = False
+        self._touched: Dict[str, float] = {}  # prompt_hash -> last hit, not yet persisted
+        self._puts_since_prune = 0
+        self.current_bytes = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.persistent_hits = 0
+
+    @staticmethod
+    def _response_size(response: LLMResponse) -> int:
+        """Approximate retained size of a response in bytes"""
+        size = len(response.content.encode("utf-8")) + 128  # Fixed object overhead
+        if response.metadata:
+            size += len(json.dumps(response.metadata, default=str))
+        if response.parsed_json:
+            size += len(json.dumps(response.parsed_json, default=str))
+        return size
+
+    def _ensure_warm(self) -> None:
+        """Open the persistent tier and load its most recent entries on first use"""
+        if self._warmed:
+            return
+        self._warmed = True
+        if not self.db_path:
+            return
+
+        try:
+            self._conn = duckdb.connect(self.db_path)
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS llm_response_cache (
+                    prompt_hash VARCHAR PRIMARY KEY,
+                    content VARCHAR,
+                    model VARCHAR,
+                    model_name VARCHAR,
+                    metadata VARCHAR,
+                    parsed_json VARCHAR,
+                    tokens_used INTEGER,
+                    latency_ms DOUBLE,
+                    created_at DOUBLE,
+                    last_accessed DOUBLE
+                )
+            """
+            )
+            cutoff = time.time() - self.ttl_seconds
+            self._conn.execute("DELETE FROM llm_response_cache WHERE created_at < ?", [cutoff])
+            rows = self._conn.execute(
+                """
+                SELECT * FROM llm_response_cache
+                ORDER BY last_accessed DESC
+                LIMIT ?
+            """,
+                [self.max_entries],
+            ).fetchall()
+        except Exception as e:
+            logger.warning(f"LLM cache persistence disabled ({self.db_path}): {e}")
+            self._conn = None
+            return
+
+        # Insert oldest first so the most recently used rows end up at the LRU tail
+        for row in reversed(rows):
+            self._store(row[0], self._row_to_response(row), created_at=row[8])
+        logger.info(f"Warmed LLM response cache with {len(self._entries)} entries")
+
+    @staticmethod
+    def _row_to_response(row: Tuple) -> LLMResponse:
+        return LLMResponse(
+            content=row[1],
+            model=row[2],
+            model_name=row[3] or "",
+            metadata=json.loads(row[4]) if row[4] else None,
+            parsed_json=json.loads(row[5]) if row[5] else None,
+            tokens_used=row[6] or 0,
+            latency_ms=row[7] or 0.0,
+            response_time_ms=row[7] or 0.0,
+        )
+
+    def _store(self, key: str, response: LLMResponse, created_at: float) -> None:
+        """Insert into the in-process tier and evict least recently used entries"""
+        if key in self._entries:
+            self.current_bytes -= self._entries.pop(key)[2]
+        size = self._response_size(response)
+        if size > self.max_bytes:
+            return
+        self._entries[key] = (response, created_at, size)
+        self.current_bytes += size
+        while len(self._entries) > self.max_entries or self.current_bytes > self.max_bytes:
+            _, (_, _, evicted_size) = self._entries.popitem(last=False)
+            self.current_bytes -= evicted_size
+            self.evictions += 1
+
+    def _load_persistent(self, key: str) -> Optional[Tuple[LLMResponse, float]]:
+        if self._conn is None:
+            return None
+        try:
+            row = self._conn.execute(
+                "SELECT * FROM llm_response_cache WHERE prompt_hash = ? AND created_at >= ?",
+                [key, time.time() - self.ttl_seconds],
+            ).fetchone()
+        except Exception as e:
+            logger.warning(f"LLM cache lookup failed: {e}")
+            return None
+        return (self._row_to_response(row), row[8]) if row else None
+
+    def _touch(self, key: str, now: float) -> None:
+        """Record a hit; last_accessed is written once a batch has accumulated"""
+        if self._conn is None:
+            return
+        self._touched[key] = now
+        if len(self._touched) >= CACHE_TOUCH_BATCH_SIZE:
+            self._flush_touched()
+
+    def _flush_touched(self) -> None:
+        """Write buffered hit timestamps to the persistent tier in one statement"""
+        if self._conn is None or not self._touched:
+            return
+        keys, accessed = zip(*self._touched.items())
+        self._touched.clear()
+        try:
+            self._conn.execute(
+                """
+                UPDATE llm_response_cache AS c
+                SET last_accessed = greatest(c.last_accessed, t.last_accessed)
+                FROM (
+                    SELECT unnest(?::VARCHAR[]) AS prompt_hash,
+                           unnest(?::DOUBLE[]) AS last_accessed
+                ) AS t
+                WHERE c.prompt_hash = t.prompt_hash
+            """,
+                [list(keys), list(accessed)],
+            )
+        except Exception as e:
+            logger.warning(f"Failed to update LLM cache access times: {e}")
+
+    def _prune_persistent(self, now: float) -> None:
+        """Drop expired rows and the least recently used rows beyond the persistent bound"""
+        self._flush_touched()
+        try:
+            self._conn.execute(
+                """
+                DELETE FROM llm_response_cache
+                WHERE created_at < ?
+                   OR prompt_hash IN (
+                       SELECT prompt_hash FROM llm_response_cache
+                       ORDER BY last_accessed DESC
+                       OFFSET ?
+                   )
+            """,
+                [now - self.ttl_seconds, self.max_persistent_entries],
+            )
+        except Exception as e:
+            logger.warning(f"Failed to prune LLM response cache: {e}")
+
+    def get(self, key: str) -> Optional[LLMResponse]:
+        """Return a copy of the cached response marked cached=True, or None"""
+        with self._lock:
+            self._ensure_warm()
+            entry = self._entries.get(key)
+            if entry is not None:
+                response, created_at, size = entry
+                if time.time() - created_at > self.ttl_seconds:
+                    del self._entries[key]
+                    self.current_bytes -= size
+                    self.expirations += 1
+                    return None
+                self._entries.move_to_end(key)
+                self._touch(key, time.time())
+                return replace(response, cached=True)
+
+            persisted = self._load_persistent(key)
+            if persisted is None:
+                return None
+            self.persistent_hits += 1
+            self._touch(key, time.time())
+            self._store(key, persisted[0], created_at=persisted[1])
+            return replace(persisted[0], cached=True)
+
+    def put(self, key: str, response: LLMResponse) -> None:
+        """Cache a response in memory and write it through to the persistent tier"""
+        with self._lock:
+            self._ensure_warm()
+            now = time.time()
+            self._store(key, response, created_at=now)
+            if self._conn is None:
+                return
+            self._touched.pop(key, None)  # The write below sets last_accessed itself
+            try:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO llm_response_cache VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    [
+                        key,
+                        response.content,
+                        response.model,
+                        response.model_name,
+                        json.dumps(response.metadata, default=str) if response.metadata else None,
+                        (
+                            json.dumps(response.parsed_json, default=str)
+                            if response.parsed_json
+                            else None
+                        ),
+                        response.tokens_used,
+                        response.latency_ms,
+                        now,
+                        now,
+                    ],
+                )
+            except Exception as e:
+                logger.warning(f"Failed to persist LLM response: {e}")
+            self._puts_since_prune += 1
+            if self._puts_since_prune >= CACHE_PRUNE_INTERVAL:
+                self._puts_since_prune = 0
+                self._prune_persistent(now)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Size and eviction accounting for metrics reporting"""
+        with self._lock:
+            return {
+                "cache_entries": len(self._entries),
+                "cache_bytes": self.current_bytes,
+                "cache_max_bytes": self.max_bytes,
+                "cache_evictions": self.evictions,
+                "cache_expirations": self.expirations,
+                "cache_persistent_hits": self.persistent_hits,
+                "cache_persistent": self._conn is not None,
+            }
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._flush_touched()
+                self._conn.close()
+                self._conn = None
+
+
 class LLMIntegrationService:
     """Service for integrating with Ollama LLM"""
 
@@ -51,6 +336,7 @@ class LLMIntegrationService:
         model_name: str = None,
         timeout: int = 5,
         cache_db_path: str = None,
+        embedding_model: str = None,
     ):
         # Use environment variable if base_url not provided
         if base_url is None:
@@ -58,8 +344,12 @@ class LLMIntegrationService:
         self.base_url = base_url.rstrip("/")
         # Support both model and model_name parameters for compatibility
         self.model = model_name or model
+        self.embedding_model = embedding_model or os.getenv("EMBEDDING_MODEL", "nomic-embed-text")
         self.timeout = timeout
         self.cache_db_path = cache_db_path
+        self.response_cache = LLMResponseCache(db_path=cache_db_path)
+        # Identical concurrent cache misses share one Ollama call, keyed by prompt hash
+        self.in_flight = SingleFlight()
         self.session = self._create_session()
         self.metrics = {
             "total_requests": 0,
@@ -212,21 +502,11 @@ class LLMIntegrationService:
 
     def _get_cached_response(self, prompt_hash: str) -> Optional[LLMResponse]:
         """Get cached response if available"""
-        # For now, simple in-memory cache
-        if not hasattr(self, "_cache"):
-            self._cache = {}
-
-        cached = self._cache.get(prompt_hash)
-        if cached:
-            cached.cached = True
-            return cached
-        return None
+        return self.response_cache.get(prompt_hash)
 
     def _cache_response(self, prompt_hash: str, prompt: str, response: LLMResponse) -> None:
         """Cache a response"""
-        if not hasattr(self, "_cache"):
-            self._cache = {}
-        self._cache[prompt_hash] = response
+        self.response_cache.put(prompt_hash, response)
 
     def generate_response(self, prompt: str) -> LLMResponse:
         """Generate response with caching"""
@@ -241,14 +521,15 @@ class LLMIntegrationService:
             self.metrics["cache_hits"] += 1
             return cached
 
-        # Generate new response
+        # Generate new response, sharing the call with identical in-flight requests
         self.metrics["cache_misses"] += 1
-        response = self._call_ollama_api(prompt)
+        return self.in_flight.do(prompt_hash, lambda: self._generate_uncached(prompt_hash, prompt))
 
-        # Cache the response
+    def _generate_uncached(self, prompt_hash: str, prompt: str) -> LLMResponse:
+        """Call Ollama for a cache miss and cache a successful response"""
+        response = self._call_ollama_api(prompt)
         if not response.error:
             self._cache_response(prompt_hash, prompt, response)
-
         return response
 
     def generate(self, prompt: str, **kwargs) -> LLMResponse:
@@ -326,7 +607,7 @@ class LLMIntegrationService:
             response = self.error_handler.retry_with_backoff(
                 lambda: self.session.post(
                     f"{self.base_url}/api/embeddings",
-                    json={"model": "nomic-embed-text", "prompt": text},
+                    json={"model": self.embedding_model, "prompt": text},
                     timeout=self.timeout,
                 )
             )
@@ -372,7 +653,7 @@ class LLMIntegrationService:
             error_context = {
                 "operation_type": "embedding_generation",
                 "endpoint": self.base_url,
-                "model": "nomic-embed-text",
+                "model": self.embedding_model,
             }
             network_error = NetworkError(
                 f"Failed to connect to embedding service at {self.base_url}",
@@ -387,7 +668,7 @@ class LLMIntegrationService:
             error_context = {
                 "operation_type": "embedding_generation",
                 "text_length": len(text),
-                "model": "nomic-embed-text",
+                "model": self.embedding_model,
             }
             embedding_error = LLMError(
                 f"Embedding generation failed: {str(e)}", details=error_context, cause=e
@@ -396,6 +677,47 @@ class LLMIntegrationService:
             # Return zero vector as fallback
             return [0.0] * 384
 
+    def generate_embeddings(
+        self, texts: List[str], dimensions: int = UDF_EMBEDDING_DIMENSIONS
+    ) -> List[List[float]]:
+        """Generate embeddings for many texts with one multi-input /api/embed request"""
+        if not texts:
+            return []
+        try:
+            response = self.error_handler.retry_with_backoff(
+                lambda: self.session.post(
+                    f"{self.base_url}/api/embed",
+                    json={"model": self.embedding_model, "input": texts, "truncate": True},
+                    timeout=self.timeout,
+                )
+            )
+            response.raise_for_status()
+            embeddings = response.json().get("embeddings", [])
+            if len(embeddings) != len(texts):
+                raise LLMError(
+                    f"Embedding service returned {len(embeddings)} vectors for {len(texts)} inputs"
+                )
+
+            # Pad or truncate every vector to the requested width in one pass
+            matrix = np.zeros((len(texts), dimensions), dtype=np.float32)
+            for row, embedding in enumerate(embeddings):
+                width = min(len(embedding), dimensions)
+                matrix[row, :width] = embedding[:width]
+            return matrix.tolist()
+
+        except Exception as e:
+            error_context = {
+                "operation_type": "embedding_generation",
+                "batch_size": len(texts),
+                "model": self.embedding_model,
+            }
+            embedding_error = LLMError(
+                f"Batch embedding generation failed: {str(e)}", details=error_context, cause=e
+            )
+            self.error_handler.handle_error(embedding_error, error_context)
+            # Return zero vectors as fallback
+            return [[0.0] * dimensions for _ in texts]
+
     def health_check(self) -> Dict[str, Any]:
         """Check LLM service health with comprehensive error handling"""
         try:
@@ -494,6 +816,12 @@ class LLMIntegrationService:
         else:
             metrics["cache_hit_rate_percent"] = 0.0
 
+        # Add cache size and eviction accounting
+        metrics.update(self.response_cache.get_stats())
+        flights = self.in_flight.get_stats()
+        metrics["coalesced_requests"] = flights["coalesced"]
+        metrics["in_flight_requests"] = flights["in_flight"]
+
         # Add service details
         metrics["model"] = self.model
         metrics["endpoint"] = self.base_url
@@ -511,6 +839,7 @@ def initialize_llm_service(
     model: str = None,
     model_name: str = None,
     cache_db_path: str = None,
+    embedding_model: str = None,
 ) -> LLMIntegrationService:
     """Initialize the global LLM service"""
     global _llm_service
@@ -520,6 +849,7 @@ def initialize_llm_service(
         base_url=base_url or os.getenv("OLLAMA_URL", "http://localhost:11434"),
         model=effective_model,
         cache_db_path=cache_db_path,
+        embedding_model=embedding_model,
     )
     return _llm_service
 
@@ -620,50 +950,108 @@ def prompt_full(text: str, provider: str, url: str, model: str, timeout: int) ->
     return llm_generate(text)
 
 
-def register_llm_functions(conn: duckdb.DuckDBPyConnection) -> bool:
-    """Register LLM functions with DuckDB connection"""
-    try:
-        # Register prompt function with full parameters for DuckDB (text,
-        # provider, url, model, timeout)
-        conn.create_function("prompt", prompt_full, [str, str, str, str, int], str)
+def _map_unique(fn: Callable[[Any], Any], values: List[Any]) -> List[Any]:
+    """Apply fn once per distinct non-null value, concurrently, and fan results back out"""
+    unique = list(dict.fromkeys(v for v in values if v is not None))
+    if not unique:
+        return [None] * len(values)
 
-        # Register simplified prompt function with correct signature
-        def _llm_generate_wrapper(text: str) -> str:
-            return llm_generate(text)
+    def _safe(value: Any) -> Any:
+        try:
+            return fn(value)
+        except Exception as e:
+            logger.error(f"Vectorized LLM call failed: {e}")
+            return None
 
-        conn.create_function("llm_generate", _llm_generate_wrapper, [str], str)
+    with ThreadPoolExecutor(max_workers=max(1, min(UDF_MAX_WORKERS, len(unique)))) as pool:
+        results = dict(zip(unique, pool.map(_safe, unique)))
+    return [results.get(v) if v is not None else None for v in values]
 
-        # Register JSON generation with multi-parameter signature
-        def _json_wrapper_multi(text: str, model: str, url: str, timeout: int) -> Optional[str]:
-            try:
-                # Use a very short timeout if provided, to avoid hanging
-                if timeout and timeout < 10:
-                    # For very short timeouts, just return None to trigger fallback
-                    # This avoids hanging the test
-                    return None
-                result = llm_generate_json(text)  # For now, ignore extra parameters
-                return result  # Return None if result is None, so COALESCE can work
-            except:
-                return None  # Explicitly return None on any error
-
-        # Set null_handling to SPECIAL so we can return None values
-        conn.create_function(
-            "llm_generate_json",
-            _json_wrapper_multi,
-            [str, str, str, int],
-            str,
-            null_handling="special",
-        )
 
-        # Register embedding generation with multi-parameter signature
-        def _embed_wrapper_multi(text: str, model: str, dimension: int) -> str:
-            embedding = llm_generate_embedding(text)  # For now, ignore extra parameters
-            # Ensure correct dimension
-            if len(embedding) != dimension:
-                embedding = [0.0] * dimension
-            return json.dumps(embedding)
+def _embed_chunk(texts: List[Optional[str]], dimensions: int) -> "pa.Array":
+    """Embed a column chunk: dedupe, batch /api/embed calls concurrently, return FLOAT[N]"""
+    unique = list(dict.fromkeys(t for t in texts if t is not None))
+    batches = [
+        unique[i : i + UDF_EMBED_BATCH_SIZE] for i in range(0, len(unique), UDF_EMBED_BATCH_SIZE)
+    ]
 
-        conn.create_function("llm_generate_embedding", _embed_wrapper_multi, [str, str, int], str)
+    vectors: Dict[str, List[float]] = {}
+    service = get_llm_service()
+    if service is not None and batches:
+        with ThreadPoolExecutor(max_workers=max(1, min(UDF_MAX_WORKERS, len(batches)))) as pool:
+            for batch, embeddings in zip(
+                batches, pool.map(lambda b: service.generate_embeddings(b, dimensions), batches)
+            ):
+                vectors.update(zip(batch, embeddings))
+
+    matrix = np.zeros((len(texts), dimensions), dtype=np.float32)
+    for row, text in enumerate(texts):
+        if text in vectors:
+            matrix[row] = vectors[text]
+    return pa.FixedSizeListArray.from_arrays(
+        pa.array(matrix.ravel()), dimensions, mask=pa.array([t is None for t in texts])
+    )
+
+
+def _register_arrow_llm_functions(conn: duckdb.DuckDBPyConnection) -> None:
+    """Register vectorized LLM UDFs that receive whole Arrow column chunks"""
+
+    def _prompt_arrow(
+        texts: "pa.Array",
+        providers: "pa.Array",
+        urls: "pa.Array",
+        models: "pa.Array",
+        timeouts: "pa.Array",
+    ) -> "pa.Array":
+        return pa.array(_map_unique(llm_generate, texts.to_pylist()), type=pa.string())
+
+    conn.create_function("prompt", _prompt_arrow, [str, str, str, str, int], str, type="arrow")
+
+    def _llm_generate_arrow(texts: "pa.Array") -> "pa.Array":
+        return pa.array(_map_unique(llm_generate, texts.to_pylist()), type=pa.string())
+
+    conn.create_function("llm_generate", _llm_generate_arrow, [str], str, type="arrow")
+
+    def _json_arrow(
+        texts: "pa.Array", models: "pa.Array", urls: "pa.Array", timeouts: "pa.Array"
+    ) -> "pa.Array":
+        # Very short timeouts keep the scalar contract: NULL so COALESCE fallbacks apply
+        candidates = [
+            text if not (timeout and timeout < 10) else None
+            for text, timeout in zip(texts.to_pylist(), timeouts.to_pylist())
+        ]
+        return pa.array(_map_unique(llm_generate_json, candidates), type=pa.string())
+
+    conn.create_function(
+        "llm_generate_json",
+        _json_arrow,
+        [str, str, str, int],
+        str,
+        type="arrow",
+        null_handling="special",
+    )
+
+    def _embed_arrow(texts: "pa.Array", models: "pa.Array", dimensions: "pa.Array") -> "pa.Array":
+        # The return type is fixed at registration; the dimension argument is kept
+        # for signature compatibility with the scalar UDF
+        return _embed_chunk(texts.to_pylist(), UDF_EMBEDDING_DIMENSIONS)
+
+    conn.create_function(
+        "llm_generate_embedding",
+        _embed_arrow,
+        [str, str, int],
+        f"FLOAT[{UDF_EMBEDDING_DIMENSIONS}]",
+        type="arrow",
+    )
+
+
+def register_llm_functions(conn: duckdb.DuckDBPyConnection) -> bool:
+    """Register LLM functions with DuckDB connection"""
+    try:
+        if pa is not None:
+            _register_arrow_llm_functions(conn)
+        else:
+            _register_scalar_llm_functions(conn)
 
         # Register health check function with proper signature
         def _health_check_wrapper() -> str:
@@ -682,3 +1070,48 @@ def register_llm_functions(conn: duckdb.DuckDBPyConnection) -> bool:
     except Exception as e:
         logger.error(f"Failed to register LLM functions: {e}")
         return False
+
+
+def _register_scalar_llm_functions(conn: duckdb.DuckDBPyConnection) -> None:
+    """Register row-at-a-time LLM UDFs (used when pyarrow is unavailable)"""
+    # Register prompt function with full parameters for DuckDB (text,
+    # provider, url, model, timeout)
+    conn.create_function("prompt", prompt_full, [str, str, str, str, int], str)
+
+    # Register simplified prompt function with correct signature
+    def _llm_generate_wrapper(text: str) -> str:
+        return llm_generate(text)
+
+    conn.create_function("llm_generate", _llm_generate_wrapper, [str], str)
+
+    # Register JSON generation with multi-parameter signature
+    def _json_wrapper_multi(text: str, model: str, url: str, timeout: int) -> Optional[str]:
+        try:
+            # Use a very short timeout if provided, to avoid hanging
+            if timeout and timeout < 10:
+                # For very short timeouts, just return None to trigger fallback
+                # This avoids hanging the test
+                return None
+            result = llm_generate_json(text)  # For now, ignore extra parameters
+            return result  # Return None if result is None, so COALESCE can work
+        except:
+            return None  # Explicitly return None on any error
+
+    # Set null_handling to SPECIAL so we can return None values
+    conn.create_function(
+        "llm_generate_json",
+        _json_wrapper_multi,
+        [str, str, str, int],
+        str,
+        null_handling="special",
+    )
+
+    # Register embedding generation with multi-parameter signature
+    def _embed_wrapper_multi(text: str, model: str, dimension: int) -> str:
+        embedding = llm_generate_embedding(text)  # For now, ignore extra parameters
+        # Ensure correct dimension
+        if len(embedding) != dimension:
+            embedding = [0.0] * dimension
+        return json.dumps(embedding)
+
+    conn.create_function("llm_generate_embedding", _embed_wrapper_multi, [str, str, int], str)
@@ -10,7 +10,8 @@ Key Features:
 - Incremental processing (only new/changed data)
 - Connection pooling and transaction boundaries
 - Error handling and retry logic
-- Performance optimization with batching
+- Bulk COPY into session temp tables merged with one INSERT ... SELECT per batch
+- Concurrent write-back stages on separate pooled connections
 - Data consistency validation
 - Comprehensive logging and monitoring
 
@@ -18,17 +19,19 @@ Architecture:
 DuckDB (analytical processing) -> Write-back Service -> PostgreSQL (persistent storage)
 """
 
+import io
 import json
 import logging
 import os
 import sys
 import time
 import uuid
+from concurrent.futures import ThreadPoolExecutor
 from contextlib import contextmanager
 from dataclasses import dataclass
 from datetime import datetime, timezone
 from types import TracebackType
-from typing import Any, Dict, Generator, List, Optional
+from typing import Any, Dict, Generator, List, Optional, Sequence, Tuple
 
 import duckdb
 import psycopg2
@@ -52,6 +55,7 @@ class ProcessingMetrics:
     start_time: datetime = None
     end_time: datetime = None
     duration_seconds: float = 0.0
+    rows_per_second: float = 0.0
     error_messages: List[str] = None
 
     def __post_init__(self):
@@ -60,6 +64,133 @@ class ProcessingMetrics:
         if self.error_messages is None:
             self.error_messages = []
 
+    def finish(self) -> None:
+        """Stamp the end time and derive duration and write throughput"""
+        self.end_time = datetime.now(timezone.utc)
+        self.duration_seconds = (self.end_time - self.start_time).total_seconds()
+        if self.duration_seconds > 0:
+            self.rows_per_second = self.successful_writes / self.duration_seconds
+
+
+@dataclass(frozen=True)
+class MergeSpec:
+    """Target table and conflict handling for a staged bulk merge"""
+
+    table: str
+    columns: Tuple[str, ...]
+    conflict_columns: Tuple[str, ...] = ()
+    conflict_update: str = ""
+
+    @property
+    def staging_table(self) -> str:
+        return f"{self.table.split('.')[-1]}_merge_staging"
+
+
+PROCESSED_MEMORIES_MERGE = MergeSpec(
+    table="dreams.long_term_memories",
+    columns=(
+        "source_memory_id",
+        "level_0_goal",
+        "level_1_tasks",
+        "level_2_actions",
+        "phantom_objects",
+        "stm_strength",
+        "emotional_salience",
+        "recency_factor",
+        "consolidated_strength",
+        "consolidation_fate",
+        "hebbian_strength",
+        "concepts",
+        "semantic_gist",
+        "semantic_category",
+        "cortical_region",
+        "retrieval_accessibility",
+        "memory_status",
+        "processing_stage",
+        "processed_at",
+        "processing_version",
+    ),
+    conflict_columns=("source_memory_id",),
+    conflict_update="""
+        consolidated_strength = EXCLUDED.consolidated_strength,
+        consolidation_fate = EXCLUDED.consolidation_fate,
+        hebbian_strength = EXCLUDED.hebbian_strength,
+        semantic_gist = EXCLUDED.semantic_gist,
+        retrieval_accessibility = EXCLUDED.retrieval_accessibility,
+        last_updated_at = CURRENT_TIMESTAMP
+    """,
+)
+
+INSIGHTS_MERGE = MergeSpec(
+    table="dreams.memory_insights",
+    columns=(
+        "source_memory_ids",
+        "insight_text",
+        "insight_type",
+        "insight_category",
+        "insight_confidence",
+        "novelty_score",
+        "relevance_score",
+        "suggested_tags",
+        "generated_at",
+    ),
+)
+
+ASSOCIATIONS_MERGE = MergeSpec(
+    table="dreams.semantic_network",
+    columns=(
+        "source_memory_id",
+        "target_memory_id",
+        "association_type",
+        "association_strength",
+        "semantic_similarity",
+        "co_occurrence_count",
+        "shared_concepts",
+        "connection_reason",
+        "association_quality",
+        "forward_strength",
+        "backward_strength",
+        "discovered_at",
+    ),
+)
+
+
+def _copy_escape(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("\t", "\\t").replace("\n", "\\n").replace("\r", "\\r")
+
+
+def _array_literal(values: Sequence[Any]) -> str:
+    items = []
+    for value in values:
+        if value is None:
+            items.append("NULL")
+        else:
+            escaped = str(value).replace("\\", "\\\\").replace('"', '\\"')
+            items.append(f'"{escaped}"')
+    return "{" + ",".join(items) + "}"
+
+
+def _copy_field(value: Any) -> str:
+    """Render one value in COPY text format; PostgreSQL casts it to the column type"""
+    if value is None:
+        return "\\N"
+    if isinstance(value, (list, tuple)):
+        text = _array_literal(value)
+    elif isinstance(value, dict):
+        text = json.dumps(value, default=str)
+    elif isinstance(value, datetime):
+        text = value.isoformat()
+    elif isinstance(value, bool):
+        text = "true" if value else "false"
+    else:
+        text = str(value)
+    return _copy_escape(text)
+
+
+def _copy_payload(rows: Sequence[Dict[str, Any]], columns: Sequence[str]) -> io.StringIO:
+    lines = ("\t".join(_copy_field(row.get(column)) for column in columns) for row in rows)
+    return io.StringIO("".join(line + "\n" for line in lines))
+
 
 class MemoryWritebackService:
     """
@@ -177,6 +308,61 @@ class MemoryWritebackService:
             if conn:
                 self.pg_pool.putconn(conn)
 
+    @contextmanager
+    def _get_duckdb_cursor(self) -> Generator[Any, None, None]:
+        """Thread-local DuckDB cursor so write-back stages can extract concurrently"""
+        cursor = self.duckdb_conn.cursor()
+        try:
+            yield cursor
+        finally:
+            cursor.close()
+
+    def _bulk_merge(
+        self,
+        pg_conn: Any,
+        spec: MergeSpec,
+        rows: List[Dict[str, Any]],
+        metrics: ProcessingMetrics,
+    ) -> None:
+        """COPY rows into a session temp table and merge each batch with one INSERT
+
+        The staging table mirrors the target's column types, lives for the
+        session and is emptied on commit. Rows sharing a conflict key are
+        collapsed (last wins) because ON CONFLICT cannot touch a row twice in
+        one statement. The caller owns the transaction.
+        """
+        if spec.conflict_columns:
+            rows = list(
+                {tuple(row.get(c) for c in spec.conflict_columns): row for row in rows}.values()
+            )
+
+        columns = ", ".join(spec.columns)
+        on_conflict = (
+            f"ON CONFLICT ({', '.join(spec.conflict_columns)}) DO UPDATE SET {spec.conflict_update}"
+            if spec.conflict_columns
+            else ""
+        )
+        merge_query = (
+            f"INSERT INTO {spec.table} ({columns}) "
+            f"SELECT {columns} FROM {spec.staging_table} {on_conflict}"
+        )
+
+        with pg_conn.cursor() as cursor:
+            cursor.execute(
+                f"CREATE TEMP TABLE IF NOT EXISTS {spec.staging_table} ON COMMIT DELETE ROWS "
+                f"AS SELECT {columns} FROM {spec.table} WITH NO DATA"
+            )
+            for i in range(0, len(rows), self.batch_size):
+                batch = rows[i : i + self.batch_size]
+                cursor.execute(f"TRUNCATE {spec.staging_table}")
+                cursor.copy_expert(
+                    f"COPY {spec.staging_table} ({columns}) FROM STDIN",
+                    _copy_payload(batch, spec.columns),
+                )
+                cursor.execute(merge_query)
+                metrics.successful_writes += cursor.rowcount
+                self.logger.debug(f"Merged batch of {len(batch)} rows into {spec.table}")
+
     def create_processing_batch(self, stage: str, description: str = None) -> str:
         """
         Create a new processing batch for tracking
@@ -225,11 +411,11 @@ class MemoryWritebackService:
             self._write_processed_memories_batch(processed_memories, metrics)
 
             # Update metrics
-            metrics.end_time = datetime.now(timezone.utc)
-            metrics.duration_seconds = (metrics.end_time - metrics.start_time).total_seconds()
+            metrics.finish()
 
             self.logger.info(
-                f"Processed memories write-back completed: {metrics.successful_writes}/{metrics.memories_processed} successful"
+                f"Processed memories write-back completed: {metrics.successful_writes}/{metrics.memories_processed} successful "
+                f"({metrics.rows_per_second:.0f} rows/s)"
             )
 
             return {
@@ -239,6 +425,7 @@ class MemoryWritebackService:
                 "successful_writes": metrics.successful_writes,
                 "failed_writes": metrics.failed_writes,
                 "duration_seconds": metrics.duration_seconds,
+                "rows_per_second": metrics.rows_per_second,
             }
 
         except Exception as e:
@@ -306,8 +493,9 @@ class MemoryWritebackService:
         """
 
         try:
-            result = self.duckdb_conn.execute(query).fetchall()
-            columns = [desc[0] for desc in self.duckdb_conn.description]
+            with self._get_duckdb_cursor() as duck:
+                result = duck.execute(query).fetchall()
+                columns = [desc[0] for desc in duck.description]
 
             memories = []
             for row in result:
@@ -327,91 +515,49 @@ class MemoryWritebackService:
     def _write_processed_memories_batch(
         self, memories: List[Dict[str, Any]], metrics: ProcessingMetrics
     ) -> None:
-        """Write processed memories to PostgreSQL in batches"""
-
-        insert_query = """
-        INSERT INTO dreams.long_term_memories (
-            source_memory_id, level_0_goal, level_1_tasks, level_2_actions,
-            phantom_objects, stm_strength, emotional_salience, recency_factor,
-            consolidated_strength, consolidation_fate, hebbian_strength,
-            concepts, semantic_gist, semantic_category, cortical_region,
-            retrieval_accessibility, memory_status, processing_stage,
-            processed_at, processing_version
-        ) VALUES (
-            %(source_memory_id)s, %(level_0_goal)s, %(level_1_tasks)s, %(level_2_actions)s,
-            %(phantom_objects)s, %(stm_strength)s, %(emotional_salience)s, %(recency_factor)s,
-            %(consolidated_strength)s, %(consolidation_fate)s, %(hebbian_strength)s,
-            %(concepts)s, %(semantic_gist)s, %(semantic_category)s, %(cortical_region)s,
-            %(retrieval_accessibility)s, %(memory_status)s, %(processing_stage)s,
-            %(processed_at)s, %(processing_version)s
-        )
-        ON CONFLICT (source_memory_id) DO UPDATE SET
-            consolidated_strength = EXCLUDED.consolidated_strength,
-            consolidation_fate = EXCLUDED.consolidation_fate,
-            hebbian_strength = EXCLUDED.hebbian_strength,
-            semantic_gist = EXCLUDED.semantic_gist,
-            retrieval_accessibility = EXCLUDED.retrieval_accessibility,
-            last_updated_at = CURRENT_TIMESTAMP
-        """
+        """Merge processed memories into PostgreSQL through a staging table"""
+
+        rows = [
+            {
+                "source_memory_id": memory.get("source_memory_id"),
+                "level_0_goal": memory.get("level_0_goal"),
+                "level_1_tasks": memory.get("level_1_tasks", []),
+                "level_2_actions": memory.get("level_2_actions", []),
+                "phantom_objects": json.dumps(memory.get("phantom_objects", {})),
+                "stm_strength": memory.get("stm_strength", 0.0),
+                "emotional_salience": memory.get("emotional_salience", 0.0),
+                "recency_factor": 1.0,  # Default recency factor
+                "consolidated_strength": memory.get("consolidated_strength", 0.0),
+                "consolidation_fate": memory.get("consolidation_fate"),
+                "hebbian_strength": memory.get("hebbian_strength", 0.0),
+                "concepts": memory.get("concepts", []),
+                "semantic_gist": memory.get("semantic_gist"),
+                "semantic_category": memory.get("semantic_category"),
+                "cortical_region": memory.get("cortical_region"),
+                "retrieval_accessibility": memory.get("retrieval_accessibility", 0.0),
+                "memory_status": "processed",
+                "processing_stage": "complete",
+                "processed_at": memory.get("processed_at", datetime.now(timezone.utc)),
+                "processing_version": memory.get("processing_version", "1.0.0"),
+            }
+            for memory in memories
+        ]
 
         with self._get_pg_connection() as pg_conn:
-            with pg_conn.cursor() as cursor:
-                try:
-                    pg_conn.set_isolation_level(ISOLATION_LEVEL_READ_COMMITTED)
-
-                    for i in range(0, len(memories), self.batch_size):
-                        batch = memories[i : i + self.batch_size]
-
-                        # Prepare batch data
-                        batch_data = []
-                        for memory in batch:
-                            # Set defaults for missing fields
-                            data = {
-                                "source_memory_id": memory.get("source_memory_id"),
-                                "level_0_goal": memory.get("level_0_goal"),
-                                "level_1_tasks": memory.get("level_1_tasks", []),
-                                "level_2_actions": memory.get("level_2_actions", []),
-                                "phantom_objects": json.dumps(memory.get("phantom_objects", {})),
-                                "stm_strength": memory.get("stm_strength", 0.0),
-                                "emotional_salience": memory.get("emotional_salience", 0.0),
-                                "recency_factor": 1.0,  # Default recency factor
-                                "consolidated_strength": memory.get("consolidated_strength", 0.0),
-                                "consolidation_fate": memory.get("consolidation_fate"),
-                                "hebbian_strength": memory.get("hebbian_strength", 0.0),
-                                "concepts": memory.get("concepts", []),
-                                "semantic_gist": memory.get("semantic_gist"),
-                                "semantic_category": memory.get("semantic_category"),
-                                "cortical_region": memory.get("cortical_region"),
-                                "retrieval_accessibility": memory.get(
-                                    "retrieval_accessibility", 0.0
-                                ),
-                                "memory_status": "processed",
-                                "processing_stage": "complete",
-                                "processed_at": memory.get(
-                                    "processed_at", datetime.now(timezone.utc)
-                                ),
-                                "processing_version": memory.get("processing_version", "1.0.0"),
-                            }
-                            batch_data.append(data)
-
-                        # Execute batch insert
-                        psycopg2.extras.execute_batch(
-                            cursor, insert_query, batch_data, page_size=100
-                        )
-
-                        metrics.successful_writes += len(batch_data)
-                        self.logger.debug(f"Inserted batch of {len(batch_data)} processed memories")
-
-                    pg_conn.commit()
-                    self.logger.info(
-                        f"Successfully wrote {metrics.successful_writes} processed memories to PostgreSQL"
-                    )
+            try:
+                pg_conn.set_isolation_level(ISOLATION_LEVEL_READ_COMMITTED)
+                self._bulk_merge(pg_conn, PROCESSED_MEMORIES_MERGE, rows, metrics)
+                pg_conn.commit()
+                self.logger.info(
+                    f"Successfully wrote {metrics.successful_writes} processed memories to PostgreSQL"
+                )
 
-                except Exception as e:
-                    pg_conn.rollback()
-                    metrics.failed_writes = len(memories) - metrics.successful_writes
-                    self.logger.error(f"Failed to write processed memories batch: {str(e)}")
-                    raise
+            except Exception as e:
+                pg_conn.rollback()
+                metrics.successful_writes = 0
+                metrics.failed_writes = len(memories)
+                self.logger.error(f"Failed to write processed memories batch: {str(e)}")
+                raise
 
     def write_generated_insights(self, batch_id: str = None) -> Dict[str, Any]:
         """Write back generated insights from DuckDB MVP insights model"""
@@ -436,8 +582,9 @@ class MemoryWritebackService:
             ORDER BY connection_count DESC, created_at DESC
             """
 
-            result = self.duckdb_conn.execute(insights_query).fetchall()
-            columns = [desc[0] for desc in self.duckdb_conn.description]
+            with self._get_duckdb_cursor() as duck:
+                result = duck.execute(insights_query).fetchall()
+                columns = [desc[0] for desc in duck.description]
 
             insights = []
             for row in result:
@@ -463,12 +610,17 @@ class MemoryWritebackService:
                 )
 
             # Write to PostgreSQL
+            metrics = self.processing_metrics[batch_id]
+            metrics.memories_processed = len(insights)
             self._write_insights_batch(insights, batch_id)
+            metrics.finish()
 
             return {
                 "batch_id": batch_id,
                 "status": "completed",
                 "insights_generated": len(insights),
+                "duration_seconds": metrics.duration_seconds,
+                "rows_per_second": metrics.rows_per_second,
             }
 
         except Exception as e:
@@ -476,31 +628,21 @@ class MemoryWritebackService:
             raise
 
     def _write_insights_batch(self, insights: List[Dict[str, Any]], batch_id: str) -> None:
-        """Write generated insights to PostgreSQL"""
-
-        insert_query = """
-        INSERT INTO dreams.memory_insights (
-            source_memory_ids, insight_text, insight_type, insight_category,
-            insight_confidence, novelty_score, relevance_score,
-            suggested_tags, generated_at
-        ) VALUES (
-            %(source_memory_ids)s, %(insight_text)s, %(insight_type)s, %(insight_category)s,
-            %(insight_confidence)s, %(novelty_score)s, %(relevance_score)s,
-            %(suggested_tags)s, %(generated_at)s
-        )
-        """
+        """Write generated insights to PostgreSQL through a staging table"""
 
+        metrics = self.processing_metrics[batch_id]
         with self._get_pg_connection() as pg_conn:
-            with pg_conn.cursor() as cursor:
-                try:
-                    psycopg2.extras.execute_batch(cursor, insert_query, insights, page_size=100)
-                    pg_conn.commit()
-                    self.logger.info(f"Successfully wrote {len(insights)} insights to PostgreSQL")
-
-                except Exception as e:
-                    pg_conn.rollback()
-                    self.logger.error(f"Failed to write insights batch: {str(e)}")
-                    raise
+            try:
+                self._bulk_merge(pg_conn, INSIGHTS_MERGE, insights, metrics)
+                pg_conn.commit()
+                self.logger.info(f"Successfully wrote {len(insights)} insights to PostgreSQL")
+
+            except Exception as e:
+                pg_conn.rollback()
+                metrics.successful_writes = 0
+                metrics.failed_writes = len(insights)
+                self.logger.error(f"Failed to write insights batch: {str(e)}")
+                raise
 
     def write_memory_associations(self, batch_id: str = None) -> Dict[str, Any]:
         """Write back memory associations from semantic concept associations model"""
@@ -527,8 +669,9 @@ class MemoryWritebackService:
             ORDER BY association_strength DESC
             """
 
-            result = self.duckdb_conn.execute(associations_query).fetchall()
-            columns = [desc[0] for desc in self.duckdb_conn.description]
+            with self._get_duckdb_cursor() as duck:
+                result = duck.execute(associations_query).fetchall()
+                columns = [desc[0] for desc in duck.description]
 
             associations = []
             for row in result:
@@ -561,12 +704,17 @@ class MemoryWritebackService:
                 )
 
             # Write to PostgreSQL
+            metrics = self.processing_metrics[batch_id]
+            metrics.memories_processed = len(associations)
             self._write_associations_batch(associations, batch_id)
+            metrics.finish()
 
             return {
                 "batch_id": batch_id,
                 "status": "completed",
                 "associations_created": len(associations),
+                "duration_seconds": metrics.duration_seconds,
+                "rows_per_second": metrics.rows_per_second,
             }
 
         except Exception as e:
@@ -574,33 +722,23 @@ class MemoryWritebackService:
             raise
 
     def _write_associations_batch(self, associations: List[Dict[str, Any]], batch_id: str) -> None:
-        """Write memory associations to PostgreSQL"""
-
-        insert_query = """
-        INSERT INTO dreams.semantic_network (
-            source_memory_id, target_memory_id, association_type, association_strength,
-            semantic_similarity, co_occurrence_count, shared_concepts, connection_reason,
-            association_quality, forward_strength, backward_strength, discovered_at
-        ) VALUES (
-            %(source_memory_id)s, %(target_memory_id)s, %(association_type)s, %(association_strength)s,
-            %(semantic_similarity)s, %(co_occurrence_count)s, %(shared_concepts)s, %(connection_reason)s,
-            %(association_quality)s, %(forward_strength)s, %(backward_strength)s, %(discovered_at)s
-        )
-        """
+        """Write memory associations to PostgreSQL through a staging table"""
 
+        metrics = self.processing_metrics[batch_id]
         with self._get_pg_connection() as pg_conn:
-            with pg_conn.cursor() as cursor:
-                try:
-                    psycopg2.extras.execute_batch(cursor, insert_query, associations, page_size=100)
-                    pg_conn.commit()
-                    self.logger.info(
-                        f"Successfully wrote {len(associations)} associations to PostgreSQL"
-                    )
+            try:
+                self._bulk_merge(pg_conn, ASSOCIATIONS_MERGE, associations, metrics)
+                pg_conn.commit()
+                self.logger.info(
+                    f"Successfully wrote {len(associations)} associations to PostgreSQL"
+                )
 
-                except Exception as e:
-                    pg_conn.rollback()
-                    self.logger.error(f"Failed to write associations batch: {str(e)}")
-                    raise
+            except Exception as e:
+                pg_conn.rollback()
+                metrics.successful_writes = 0
+                metrics.failed_writes = len(associations)
+                self.logger.error(f"Failed to write associations batch: {str(e)}")
+                raise
 
     def write_processing_metadata(
         self, batch_id: str, additional_metadata: Optional[Dict[str, Any]] = None
@@ -614,8 +752,7 @@ class MemoryWritebackService:
 
         # Calculate final metrics
         if metrics.end_time is None:
-            metrics.end_time = datetime.now(timezone.utc)
-            metrics.duration_seconds = (metrics.end_time - metrics.start_time).total_seconds()
+            metrics.finish()
 
         metadata = {
             "processing_session_id": metrics.session_id,
@@ -680,26 +817,42 @@ class MemoryWritebackService:
             "overall_status": "running",
         }
 
+        stages = [
+            ("processed_memories", self.write_processed_memories),
+            ("generated_insights", self.write_generated_insights),
+            ("memory_associations", self.write_memory_associations),
+        ]
+
         try:
             self.logger.info(f"Starting full write-back cycle {self.current_session_id}")
 
-            # 1. Write back processed memories
-            memory_result = self.write_processed_memories()
-            results["processed_memories"] = memory_result
-            results["stages_completed"].append("processed_memories")
-            self.write_processing_metadata(memory_result["batch_id"])
-
-            # 2. Write back generated insights
-            insight_result = self.write_generated_insights()
-            results["generated_insights"] = insight_result
-            results["stages_completed"].append("generated_insights")
-            self.write_processing_metadata(insight_result["batch_id"])
-
-            # 3. Write back memory associations
-            assoc_result = self.write_memory_associations()
-            results["memory_associations"] = assoc_result
-            results["stages_completed"].append("memory_associations")
-            self.write_processing_metadata(assoc_result["batch_id"])
+            # Stages touch disjoint tables, so each runs on its own pooled
+            # connection and DuckDB cursor
+            batch_ids = {stage: self.create_processing_batch(stage) for stage, _ in stages}
+            with ThreadPoolExecutor(max_workers=len(stages)) as executor:
+                futures = {
+                    stage: executor.submit(write_stage, batch_ids[stage])
+                    for stage, write_stage in stages
+                }
+
+            errors = []
+            for stage, _ in stages:
+                try:
+                    stage_result = futures[stage].result()
+                except Exception as e:
+                    errors.append(e)
+                    continue
+                results[stage] = stage_result
+                results["stages_completed"].append(stage)
+                self.write_processing_metadata(stage_result["batch_id"])
+
+            results["rows_per_second"] = {
+                stage: self.processing_metrics[batch_ids[stage]].rows_per_second
+                for stage, _ in stages
+            }
+            if errors:
+                results["total_errors"] += len(errors) - 1
+                raise errors[0]
 
             # Calculate overall results
             results["cycle_end"] = datetime.now(timezone.utc)
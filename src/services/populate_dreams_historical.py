@@ -12,15 +12,108 @@ import logging
 import os
 import uuid
 from datetime import datetime, timedelta, timezone
-from typing import Any
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
 
+import duckdb
 import psycopg2
 import psycopg2.extras
+import pyarrow as pa
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 logger = logging.getLogger(__name__)
 
+TAG_PAIR_FETCH_ROWS = 50_000
+MIN_CO_OCCURRENCE = 3
+
+# One pass over the corpus: the (memory, tag) incidence list
+TAG_PAIRS_SQL = """
+SELECT m.id::text AS memory_id, t.tag
+FROM public.memories m, unnest(m.tags) AS t(tag)
+WHERE t.tag IS NOT NULL AND t.tag <> ''
+"""
+
+# Joining the incidence list with itself on memory_id is the sparse product
+# M^T M of the memory x tag matrix, restricted to its upper triangle
+CO_OCCURRENCE_SQL = """
+WITH incidence AS (
+    SELECT DISTINCT memory_id, tag FROM memory_tags
+)
+SELECT a.tag AS concept_a, b.tag AS concept_b, COUNT(*)::INTEGER AS co_occurrence
+FROM incidence a
+JOIN incidence b ON a.memory_id = b.memory_id AND a.tag < b.tag
+GROUP BY a.tag, b.tag
+HAVING COUNT(*) >= ?
+ORDER BY co_occurrence DESC, concept_a, concept_b
+"""
+
+UPSERT_CO_OCCURRENCE_SQL = """
+INSERT INTO dreams.semantic_network (
+    concept_a, concept_b, association_type,
+    association_strength, co_activation_count,
+    edge_weight
+) VALUES %s
+ON CONFLICT (concept_a, concept_b, association_type) DO UPDATE SET
+    association_strength = (
+        dreams.semantic_network.association_strength + EXCLUDED.association_strength
+    ) / 2,
+    co_activation_count = dreams.semantic_network.co_activation_count + EXCLUDED.co_activation_count
+"""
+
+UPSERT_LTM_ASSOCIATIONS_SQL = """
+INSERT INTO dreams.semantic_network (
+    concept_a, concept_b, association_type,
+    association_strength, co_activation_count
+) VALUES %s
+ON CONFLICT (concept_a, concept_b, association_type) DO UPDATE SET
+    association_strength = GREATEST(
+        dreams.semantic_network.association_strength,
+        EXCLUDED.association_strength
+    ),
+    co_activation_count = dreams.semantic_network.co_activation_count + EXCLUDED.co_activation_count
+"""
+
+
+def tag_cooccurrence(
+    batches: Iterable[pa.Table], min_count: int = MIN_CO_OCCURRENCE
+) -> List[Tuple[str, str, int]]:
+    """Count how many memories each unordered tag pair shares
+
+    ``batches`` hold (memory_id, tag) pairs. Cost scales with the tags per
+    memory, not with the number of memories squared.
+    """
+    conn = duckdb.connect(":memory:")
+    try:
+        conn.execute("CREATE TABLE memory_tags (memory_id VARCHAR, tag VARCHAR)")
+        for batch in batches:
+            conn.register("tag_batch", batch)
+            conn.execute("INSERT INTO memory_tags SELECT memory_id, tag FROM tag_batch")
+            conn.unregister("tag_batch")
+        return conn.execute(CO_OCCURRENCE_SQL, [min_count]).fetchall()
+    finally:
+        conn.close()
+
+
+def concept_window_pairs(
+    ltm_memories: Iterable[Tuple[Any, List[str], Optional[float]]],
+) -> Dict[Tuple[str, str], Tuple[Optional[float], int]]:
+    """Neighbouring-concept pairs from long-term memories, merged per pair
+
+    Each pair keeps its highest importance and how many times it was seen, so
+    the whole set can be upserted in one statement.
+    """
+    pairs: Dict[Tuple[str, str], Tuple[Optional[float], int]] = {}
+    for _, concepts, importance in ltm_memories:
+        for i in range(len(concepts)):
+            for j in range(i + 1, min(i + 3, len(concepts))):  # Limit associations
+                if concepts[i] and concepts[j]:
+                    key = (min(concepts[i], concepts[j]), max(concepts[i], concepts[j]))
+                    strength, count = pairs.get(key, (None, 0))
+                    if importance is not None and (strength is None or importance > strength):
+                        strength = importance
+                    pairs[key] = (strength, count + 1)
+    return pairs
+
 
 class HistoricalDreamsPopulator:
     """Populate dreams schema with all historical memory data."""
@@ -341,6 +434,23 @@ class HistoricalDreamsPopulator:
             pg_cursor.close()
             pg_conn.close()
 
+    def _stream_tag_pairs(self, pg_conn: Any) -> Iterator[pa.Table]:
+        """Stream (memory_id, tag) pairs through a server-side cursor"""
+        with pg_conn.cursor(name="tag_pairs") as cursor:
+            cursor.itersize = TAG_PAIR_FETCH_ROWS
+            cursor.execute(TAG_PAIRS_SQL)
+            while True:
+                rows = cursor.fetchmany(TAG_PAIR_FETCH_ROWS)
+                if not rows:
+                    break
+                memory_ids, tags = zip(*rows)
+                yield pa.table(
+                    {
+                        "memory_id": pa.array(memory_ids, pa.string()),
+                        "tag": pa.array(tags, pa.string()),
+                    }
+                )
+
     def build_semantic_network(self) -> None:
         """Build semantic network from consolidated memories."""
         logger.info("Building semantic network...")
@@ -349,62 +459,26 @@ class HistoricalDreamsPopulator:
         pg_cursor = pg_conn.cursor()
 
         try:
-            # Find concept pairs from memories with shared tags
-            pg_cursor.execute(
-                """
-                WITH concept_pairs AS (
-                    SELECT DISTINCT
-                        t1.tag as concept_a,
-                        t2.tag as concept_b,
-                        COUNT(*) OVER (PARTITION BY t1.tag, t2.tag) as co_occurrence
-                    FROM public.memories m1,
-                        unnest(m1.tags) as t1(tag),
-                        public.memories m2,
-                        unnest(m2.tags) as t2(tag)
-                    WHERE m1.id != m2.id
-                    AND t1.tag != t2.tag
-                    AND t1.tag < t2.tag  -- Avoid duplicates
-                    LIMIT 5000
-                )
-                SELECT concept_a, concept_b, co_occurrence
-                FROM concept_pairs
-                WHERE co_occurrence > 2
-                ORDER BY co_occurrence DESC
-                LIMIT 1000
-            """
-            )
-
-            associations = pg_cursor.fetchall()
+            # Co-occurrence over the whole corpus from a single streamed pass
+            associations = tag_cooccurrence(self._stream_tag_pairs(pg_conn))
             logger.info(f"Creating {len(associations)} semantic associations...")
 
-            for concept_a, concept_b, co_occurrence in associations:
-                if concept_a and concept_b:
-                    # Calculate association strength based on co-occurrence
-                    strength = min(1.0, co_occurrence / 100)
-
-                    pg_cursor.execute(
-                        """
-                        INSERT INTO dreams.semantic_network (
-                            concept_a, concept_b, association_type,
-                            association_strength, co_activation_count,
-                            edge_weight
-                        ) VALUES (
-                            %s, %s, %s, %s, %s, %s
-                        ) ON CONFLICT (concept_a, concept_b, association_type) DO UPDATE SET
-                            association_strength = (
-                                dreams.semantic_network.association_strength + EXCLUDED.association_strength
-                            ) / 2,
-                            co_activation_count = dreams.semantic_network.co_activation_count + EXCLUDED.co_activation_count
-                    """,
-                        (
-                            concept_a,
-                            concept_b,
-                            "co-occurrence",  # Association type
-                            strength,
-                            co_occurrence,
-                            strength,  # Edge weight same as strength
-                        ),
+            psycopg2.extras.execute_values(
+                pg_cursor,
+                UPSERT_CO_OCCURRENCE_SQL,
+                [
+                    (
+                        concept_a,
+                        concept_b,
+                        "co-occurrence",  # Association type
+                        min(1.0, co_occurrence / 100),
+                        co_occurrence,
+                        min(1.0, co_occurrence / 100),  # Edge weight same as strength
                     )
+                    for concept_a, concept_b, co_occurrence in associations
+                ],
+                page_size=self.batch_size,
+            )
 
             pg_conn.commit()
             logger.info(f"Successfully created {len(associations)} semantic associations")
@@ -419,36 +493,18 @@ class HistoricalDreamsPopulator:
             """
             )
 
-            ltm_memories = pg_cursor.fetchall()
-            association_count = 0
-
-            for memory_id, concepts, importance in ltm_memories:
-                # Create associations between concepts in same memory
-                for i in range(len(concepts)):
-                    for j in range(i + 1, min(i + 3, len(concepts))):  # Limit associations
-                        if concepts[i] and concepts[j]:
-                            pg_cursor.execute(
-                                """
-                                INSERT INTO dreams.semantic_network (
-                                    concept_a, concept_b, association_type,
-                                    association_strength
-                                ) VALUES (
-                                    %s, %s, %s, %s
-                                ) ON CONFLICT (concept_a, concept_b, association_type) DO UPDATE SET
-                                    association_strength = GREATEST(
-                                        dreams.semantic_network.association_strength,
-                                        EXCLUDED.association_strength
-                                    ),
-                                    co_activation_count = dreams.semantic_network.co_activation_count + 1
-                            """,
-                                (
-                                    (concepts[i] if concepts[i] < concepts[j] else concepts[j]),
-                                    (concepts[j] if concepts[i] < concepts[j] else concepts[i]),
-                                    "semantic",
-                                    importance,
-                                ),
-                            )
-                            association_count += 1
+            ltm_pairs = concept_window_pairs(pg_cursor.fetchall())
+            association_count = sum(count for _, count in ltm_pairs.values())
+
+            psycopg2.extras.execute_values(
+                pg_cursor,
+                UPSERT_LTM_ASSOCIATIONS_SQL,
+                [
+                    (concept_a, concept_b, "semantic", strength, count)
+                    for (concept_a, concept_b), (strength, count) in ltm_pairs.items()
+                ],
+                page_size=self.batch_size,
+            )
 
             pg_conn.commit()
             logger.info(f"Created {association_count} additional semantic associations from LTM")
@@ -0,0 +1,169 @@
+"""
+Adaptive (AIMD) concurrency limiting for async clients of a single backend host
+
+Used by the batch embedding generator; kept free of client dependencies so it can be
+tested without aiohttp or redis.
+"""
+
+import asyncio
+import logging
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Deque, Dict, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class _LimiterSlot:
+    """One admitted request; outcome is set by the caller or by the exception raised"""
+
+    __slots__ = ("started", "outcome")
+
+    def __init__(self, started: float):
+        self.started = started
+        self.outcome = "success"  # success | overload | dropped
+
+    def overload(self) -> None:
+        self.outcome = "overload"
+
+    def drop(self) -> None:
+        self.outcome = "dropped"
+
+
+class AdaptiveConcurrencyLimiter:
+    """
+    AIMD concurrency limit for requests to a single backend host
+
+    While requests succeed and the window's p95 latency stays within
+    latency_tolerance of the unloaded baseline, a saturated limit grows by about
+    one slot per limit's worth of completions. 429/503 responses and timeouts cut
+    it by backoff_ratio, and a p95 above the tolerance cuts it by 10%. Requests
+    admitted before the last cut cannot cut again, so one overload episode costs
+    a single backoff rather than one per in-flight request. The baseline only rises
+    on unsaturated samples, so a host that queues requests cannot raise it.
+    """
+
+    def __init__(
+        self,
+        initial_limit: int = 10,
+        min_limit: int = 1,
+        max_limit: int = 64,
+        latency_tolerance: float = 2.0,
+        backoff_ratio: float = 0.5,
+        window: int = 50,
+        latency_slack_ms: float = 25.0,
+    ):
+        self.min_limit = max(1, min_limit)
+        self.max_limit = max(self.min_limit, max_limit)
+        self.latency_tolerance = latency_tolerance
+        self.backoff_ratio = backoff_ratio
+        self.latency_slack_ms = latency_slack_ms
+        self._limit = float(min(max(initial_limit, self.min_limit), self.max_limit))
+        self._latencies: Deque[float] = deque(maxlen=window)
+        self._baseline_ms: Optional[float] = None
+        self._in_flight = 0
+        self._waiting = 0
+        self._last_decrease = 0.0
+        # Created inside the running loop: before Python 3.10 a Condition binds to
+        # the loop current at construction, which is not the one asyncio.run() starts
+        self._condition: Optional[asyncio.Condition] = None
+        self._condition_loop: Optional[asyncio.AbstractEventLoop] = None
+        self.stats = {"limit_increases": 0, "limit_decreases": 0, "overload_responses": 0}
+
+    @property
+    def limit(self) -> int:
+        return int(self._limit)
+
+    def _get_condition(self) -> asyncio.Condition:
+        """Condition bound to the running loop, recreated if the limiter moves loops"""
+        loop = asyncio.get_running_loop()
+        if self._condition is None or self._condition_loop is not loop:
+            self._condition = asyncio.Condition()
+            self._condition_loop = loop
+        return self._condition
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[_LimiterSlot]:
+        """Wait for capacity, then hold one slot for the duration of the request"""
+        condition = self._get_condition()
+        async with condition:
+            self._waiting += 1
+            try:
+                await condition.wait_for(lambda: self._in_flight < self.limit)
+            finally:
+                self._waiting -= 1
+            self._in_flight += 1
+
+        slot = _LimiterSlot(time.monotonic())
+        try:
+            yield slot
+        except asyncio.TimeoutError:
+            slot.overload()
+            raise
+        except BaseException:
+            if slot.outcome != "overload":
+                slot.drop()
+            raise
+        finally:
+            async with condition:
+                saturated = self._in_flight >= self.limit or self._waiting > 0
+                self._in_flight -= 1
+                self._record(slot, saturated)
+                condition.notify_all()
+
+    def _record(self, slot: _LimiterSlot, saturated: bool) -> None:
+        if slot.outcome == "overload":
+            self.stats["overload_responses"] += 1
+            self._decrease(slot.started, self.backoff_ratio, "overload")
+            return
+        if slot.outcome != "success":
+            return
+
+        latency_ms = (time.monotonic() - slot.started) * 1000
+        self._latencies.append(latency_ms)
+        if self._baseline_ms is None or latency_ms < self._baseline_ms:
+            self._baseline_ms = latency_ms
+        elif not saturated:
+            # Drift up slowly so a permanently slower model resets the baseline. Saturated
+            # samples include queueing delay at the host and would let the limit chase it
+            self._baseline_ms += (latency_ms - self._baseline_ms) * 0.01
+
+        if len(self._latencies) >= 10 and self._p95() > self._latency_threshold():
+            self._decrease(slot.started, 0.9, "latency")
+        elif saturated and self._limit < self.max_limit:
+            previous = self.limit
+            self._limit = min(self.max_limit, self._limit + 1.0 / self._limit)
+            if self.limit > previous:
+                self.stats["limit_increases"] += 1
+
+    def _decrease(self, started: float, ratio: float, reason: str) -> None:
+        if started < self._last_decrease:
+            return
+        previous = self.limit
+        self._limit = max(float(self.min_limit), self._limit * ratio)
+        self._last_decrease = time.monotonic()
+        self._latencies.clear()
+        self.stats["limit_decreases"] += 1
+        if self.limit != previous:
+            logger.info(f"Embedding concurrency limit {previous} -> {self.limit} ({reason})")
+
+    def _p95(self) -> float:
+        return float(np.percentile(self._latencies, 95)) if self._latencies else 0.0
+
+    def _latency_threshold(self) -> float:
+        baseline = self._baseline_ms or 0.0
+        return max(baseline * self.latency_tolerance, baseline + self.latency_slack_ms)
+
+    def get_stats(self) -> Dict:
+        """Current limit, load and latency signals for monitoring"""
+        return {
+            "concurrency_limit": self.limit,
+            "in_flight_requests": self._in_flight,
+            "queue_depth": self._waiting,
+            "p95_latency_ms": self._p95(),
+            "baseline_latency_ms": self._baseline_ms or 0.0,
+            **self.stats,
+        }
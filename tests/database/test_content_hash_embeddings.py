@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Tests for content_hash keyed embedding reuse in the PostgreSQL embedding scripts.
+"""
+
+import os
+import sys
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "../../biological_memory/scripts"))
+sys.path.append(os.path.join(os.path.dirname(__file__), "../../biological_memory/macros"))
+
+import content_hash_embeddings  # noqa: E402
+from content_hash_embeddings import (  # noqa: E402
+    embed_missing_memories,
+    ensure_content_embeddings_table,
+    fan_out_hash_embeddings,
+    get_unseen_content,
+    propagate_by_content_hash,
+)
+
+
+def _mock_connection():
+    conn = MagicMock()
+    cursor = MagicMock()
+    conn.cursor.return_value.__enter__.return_value = cursor
+    return conn, cursor
+
+
+class TestContentHashFanOut:
+    """Test the set-based fan-out of stored embeddings"""
+
+    def test_fan_out_is_one_update_for_all_hashes(self):
+        cursor = MagicMock(rowcount=7)
+
+        assert fan_out_hash_embeddings(cursor, ["h1", "h2"], "nomic-embed-text") == 7
+        cursor.execute.assert_called_once()
+        sql, params = cursor.execute.call_args[0]
+        assert "UPDATE public.memories" in sql
+        assert "ce.embedding_model = %s" in sql
+        assert "ce.content_hash = ANY(%s)" in sql
+        assert params == ("nomic-embed-text", ["h1", "h2"])
+
+    def test_fan_out_skips_empty_hash_list(self):
+        cursor = MagicMock()
+        assert fan_out_hash_embeddings(cursor, []) == 0
+        cursor.execute.assert_not_called()
+
+    def test_propagate_records_then_fans_out(self):
+        cursor = MagicMock(rowcount=3)
+        cursor.fetchall.return_value = [("h1",)]
+
+        assert propagate_by_content_hash(cursor, ["id1", "id2"]) == 3
+        statements = [c[0][0] for c in cursor.execute.call_args_list]
+        assert "INSERT INTO public.content_embeddings" in statements[0]
+        assert "UPDATE public.memories" in statements[-1]
+        # Recording and fan-out are both scoped to the configured model
+        assert all(
+            c[0][1][0] == content_hash_embeddings.EMBEDDING_MODEL
+            for c in [cursor.execute.call_args_list[0], cursor.execute.call_args_list[-1]]
+        )
+
+
+class TestContentEmbeddingsSchema:
+    """The table comes from migration 003 and is keyed per embedding model"""
+
+    def test_unseen_content_ignores_other_models(self):
+        conn, cursor = _mock_connection()
+
+        get_unseen_content(conn, "h0", 5, model="mxbai-embed-large")
+
+        sql, params = cursor.execute.call_args[0]
+        assert "ce.embedding_model = %s" in sql
+        assert params == ("h0", "mxbai-embed-large", 5)
+
+    def test_missing_migration_fails_without_ddl(self):
+        conn, cursor = _mock_connection()
+        cursor.fetchone.return_value = (1,)  # Old content_hash-only primary key
+
+        with pytest.raises(RuntimeError, match="003_add_content_embeddings.sql"):
+            ensure_content_embeddings_table(conn)
+        assert not any("CREATE" in c[0][0] for c in cursor.execute.call_args_list)
+
+    def test_migration_builds_memories_index_concurrently(self):
+        migration = os.path.join(
+            os.path.dirname(__file__),
+            "../../biological_memory/sql/migrations/003_add_content_embeddings.sql",
+        )
+        with open(migration) as f:
+            sql = f.read()
+
+        assert "PRIMARY KEY (content_hash, embedding_model)" in sql
+        assert "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_memories_content_hash" in sql
+
+
+class TestEmbedMissingMemories:
+    """Test that Ollama is only called once per unseen content hash"""
+
+    def test_only_unseen_hashes_are_embedded(self):
+        conn, cursor = _mock_connection()
+        cursor.rowcount = 2
+        unseen_pages = [[("h1", "first text"), ("h2", "second text")], []]
+        generate = MagicMock(return_value=[[0.1] * 768, None])
+
+        with patch.object(
+            content_hash_embeddings, "get_unseen_content", side_effect=unseen_pages
+        ), patch("ollama_embeddings.generate_embeddings", generate), patch.object(
+            content_hash_embeddings, "store_hash_embeddings", return_value=1
+        ) as store:
+            stats = embed_missing_memories(conn, batch_size=2)
+
+        generate.assert_called_once()
+        assert generate.call_args[0][0] == ["first text", "second text"]
+        assert list(store.call_args[0][1]) == ["h1"]
+        assert stats["hashes_embedded"] == 1
+        assert stats["hashes_failed"] == 1
+        assert stats["reused"] == 2
+
+    def test_limit_bounds_new_hashes(self):
+        conn, cursor = _mock_connection()
+        cursor.rowcount = 0
+        get_unseen = MagicMock(return_value=[("h1", "text")])
+
+        with patch.object(content_hash_embeddings, "get_unseen_content", get_unseen), patch(
+            "ollama_embeddings.generate_embeddings", return_value=[[0.1] * 768]
+        ), patch.object(content_hash_embeddings, "store_hash_embeddings", return_value=1):
+            stats = embed_missing_memories(conn, batch_size=10, limit=1)
+
+        assert stats["hashes_embedded"] == 1
+        assert get_unseen.call_args[0][2] == 1
+
+
+def test_transfer_fetches_one_memory_per_content_hash():
+    """The transfer scripts only ask DuckDB for one representative per hash"""
+    try:
+        from transfer_embeddings_optimized import get_missing_embeddings
+    except ImportError:
+        pytest.skip("Transfer script not available")
+
+    conn = MagicMock()
+    conn.cursor.return_value.fetchall.return_value = [("id1",)]
+
+    assert get_missing_embeddings(conn) == ["id1"]
+    assert "DISTINCT ON (COALESCE(content_hash, id::text))" in (
+        conn.cursor.return_value.execute.call_args[0][0]
+    )
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Tests for the Parquet embedding store behind the memory_embeddings model.
+"""
+
+import os
+import sys
+from typing import Generator, List, Optional, Tuple
+
+import duckdb
+import numpy as np
+import pyarrow.parquet as pq
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "../../biological_memory/scripts"))
+
+from embedding_store import (  # noqa: E402
+    EmbeddingStoreWriter,
+    compact_store,
+    content_hash,
+    store_files,
+)
+
+DIMENSIONS = 768
+
+
+def fake_embed_matrix(texts: List[Optional[str]], model: str) -> Tuple[np.ndarray, np.ndarray]:
+    """Row i filled with i + 1; texts containing 'fail' or empty texts are invalid"""
+    matrix = np.ones((len(texts), DIMENSIONS), dtype=np.float32)
+    matrix *= np.arange(1, len(texts) + 1, dtype=np.float32)[:, None]
+    valid = np.array([bool(text) and "fail" not in text for text in texts])
+    return matrix, valid
+
+
+@pytest.fixture
+def duckdb_path(tmp_path: str) -> Generator[str, None, None]:
+    """Database file with five flagged memories over three distinct contents"""
+    path = os.path.join(str(tmp_path), "memory.duckdb")
+    conn = duckdb.connect(path)
+    conn.execute(
+        """
+        CREATE TABLE memory_embeddings AS
+        SELECT
+            uuid() AS memory_id,
+            content,
+            NULL::VARCHAR AS summary,
+            'context' AS context,
+            sha256(content) AS content_hash,
+            TRUE AS needs_embedding
+        FROM (VALUES ('alpha'), ('alpha'), ('beta'), ('beta'), ('gamma')) t(content)
+        """
+    )
+    conn.close()
+    yield path
+
+
+@pytest.fixture
+def store_path(tmp_path: str) -> str:
+    """Empty store directory next to the database file"""
+    return os.path.join(str(tmp_path), "store")
+
+
+class TestEmbeddingStore:
+    """Writing, reading back and compacting store parts"""
+
+    def test_content_hash_matches_duckdb(self) -> None:
+        text = "Meeting notes: café budget ✓"
+        expected = duckdb.connect(":memory:").execute("SELECT sha256(?)", [text]).fetchone()[0]
+
+        assert content_hash(text) == expected
+
+    def test_each_distinct_content_is_embedded_once(
+        self, duckdb_path: str, store_path: str
+    ) -> None:
+        writer = EmbeddingStoreWriter(duckdb_path, store_path, embed_matrix=fake_embed_matrix)
+
+        stats = writer.run(batch_size=2)
+
+        assert stats == {"pending": 3, "embedded": 3, "failed": 0}
+        assert len(store_files(store_path)) == 2
+        stored = (
+            duckdb.connect(":memory:")
+            .execute(
+                f"SELECT COUNT(*), COUNT(DISTINCT content_hash), COUNT(summary_embedding), "
+                f"COUNT(context_embedding) FROM read_parquet('{store_path}/*.parquet')"
+            )
+            .fetchone()
+        )
+        assert stored == (3, 3, 0, 3)
+
+    def test_database_is_released_while_embedding(self, duckdb_path: str, store_path: str) -> None:
+        def embed_while_dbt_writes(
+            texts: List[Optional[str]], model: str
+        ) -> Tuple[np.ndarray, np.ndarray]:
+            # A read-write connection only opens when the writer holds none
+            conn = duckdb.connect(duckdb_path)
+            conn.execute("CHECKPOINT")
+            conn.close()
+            return fake_embed_matrix(texts, model)
+
+        writer = EmbeddingStoreWriter(duckdb_path, store_path, embed_matrix=embed_while_dbt_writes)
+
+        assert writer.run(batch_size=2)["embedded"] == 3
+
+    def test_failed_contents_stay_pending(self, duckdb_path: str, store_path: str) -> None:
+        with duckdb.connect(duckdb_path) as conn:
+            conn.execute(
+                "UPDATE memory_embeddings SET content = 'fail', content_hash = sha256('fail') "
+                "WHERE content = 'gamma'"
+            )
+        writer = EmbeddingStoreWriter(duckdb_path, store_path, embed_matrix=fake_embed_matrix)
+
+        stats = writer.run()
+
+        assert stats == {"pending": 3, "embedded": 2, "failed": 1}
+        hashes = pq.read_table(store_files(store_path)).column("content_hash").to_pylist()
+        assert content_hash("fail") not in hashes
+
+    def test_store_joins_on_content_hash(self, duckdb_path: str, store_path: str) -> None:
+        EmbeddingStoreWriter(duckdb_path, store_path, embed_matrix=fake_embed_matrix).run()
+
+        with duckdb.connect(duckdb_path, read_only=True) as conn:
+            matched = conn.execute(
+                f"""
+                SELECT COUNT(store.content_embedding)
+                FROM memory_embeddings m
+                LEFT JOIN read_parquet('{store_path}/*.parquet') store
+                    ON store.content_hash = m.content_hash
+                """
+            ).fetchone()[0]
+        assert matched == 5
+
+    def test_compact_keeps_latest_row_per_hash(self, duckdb_path: str, store_path: str) -> None:
+        writer = EmbeddingStoreWriter(duckdb_path, store_path, embed_matrix=fake_embed_matrix)
+        writer.run(batch_size=2)
+        writer.run(batch_size=2)
+
+        compacted = compact_store(store_path)
+
+        assert store_files(store_path) == [compacted]
+        assert pq.read_table(compacted).num_rows == 3
+        assert compact_store(store_path) is None
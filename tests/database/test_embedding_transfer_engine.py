@@ -0,0 +1,300 @@
+#!/usr/bin/env python3
+"""
+Tests for the resumable Arrow-streaming embedding transfer engine.
+"""
+
+import os
+import sys
+from datetime import datetime, timedelta
+from unittest.mock import MagicMock, patch
+
+import duckdb
+import numpy as np
+import pyarrow as pa
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "../../biological_memory/scripts"))
+sys.path.append(os.path.join(os.path.dirname(__file__), "../../biological_memory/macros"))
+
+import embedding_transfer_engine  # noqa: E402
+from embedding_transfer_engine import (  # noqa: E402
+    EmbeddingTransferEngine,
+    TransferCheckpoint,
+    arrow_embeddings,
+    transfer_targets,
+)
+
+BASE_TIME = datetime(2025, 1, 1)
+
+
+@pytest.fixture
+def duckdb_embeddings():
+    """In-memory memory_embeddings with ten rows, one minute apart"""
+    conn = duckdb.connect(":memory:")
+    conn.execute(
+        """
+        CREATE TABLE memory_embeddings (
+            memory_id VARCHAR,
+            created_at TIMESTAMP,
+            final_embedding FLOAT[],
+            tag_embedding FLOAT[],
+            tag_embedding_updated TIMESTAMP,
+            semantic_cluster INTEGER,
+            embedding_magnitude FLOAT
+        )
+        """
+    )
+    for i in range(10):
+        conn.execute(
+            "INSERT INTO memory_embeddings VALUES (?, ?, ?, ?, ?, ?, NULL)",
+            [
+                f"00000000-0000-0000-0000-{i:012d}",
+                BASE_TIME + timedelta(minutes=i),
+                [float(i)] * 768,
+                [1.0] * 768 if i % 2 == 0 else None,
+                BASE_TIME,
+                i % 3,
+            ],
+        )
+    yield conn
+    conn.close()
+
+
+class TestArrowEmbeddings:
+    """Test conversion of Arrow list columns to float32 matrices"""
+
+    def test_nulls_use_the_flat_buffer(self):
+        column = pa.array([[1.0] * 768, None, [2.0] * 768], type=pa.list_(pa.float32()))
+
+        matrix, valid = arrow_embeddings(column)
+
+        assert matrix.dtype == np.float32
+        assert valid.tolist() == [True, False, True]
+        assert matrix[2, 0] == 2.0
+
+    def test_ragged_rows_are_masked(self):
+        column = pa.array([[1.0] * 768, [1.0] * 5], type=pa.list_(pa.float32()))
+
+        _, valid = arrow_embeddings(column)
+
+        assert valid.tolist() == [True, False]
+
+
+class TestChunkStreaming:
+    """Test bounded, ordered reads from DuckDB"""
+
+    def test_chunks_are_bounded_and_ordered(self, duckdb_embeddings):
+        engine = EmbeddingTransferEngine(duckdb_embeddings, "postgresql://stub/db", chunk_rows=4)
+
+        chunks = list(engine.iter_chunks(TransferCheckpoint("job")))
+
+        assert [chunk.rows for chunk in chunks] == [4, 4, 2]
+        assert chunks[0].last_memory_id.endswith("000000000003")
+        assert chunks[-1].last_created_at == BASE_TIME + timedelta(minutes=9)
+
+    def test_resume_starts_after_checkpoint(self, duckdb_embeddings):
+        engine = EmbeddingTransferEngine(duckdb_embeddings, "postgresql://stub/db", chunk_rows=4)
+        checkpoint = TransferCheckpoint(
+            "job", BASE_TIME + timedelta(minutes=5), "00000000-0000-0000-0000-000000000005"
+        )
+
+        chunks = list(engine.iter_chunks(checkpoint))
+
+        ids = [
+            mid for chunk in chunks for mid in chunk.record_batch.column("memory_id").to_pylist()
+        ]
+        assert ids == [f"00000000-0000-0000-0000-{i:012d}" for i in range(6, 10)]
+
+
+class TestTransferTargets:
+    """Test joining a registered missing-ID relation instead of an IN list"""
+
+    def test_only_target_rows_are_streamed(self, duckdb_embeddings):
+        ids = [f"00000000-0000-0000-0000-{i:012d}" for i in (2, 7, 8)]
+        engine = EmbeddingTransferEngine(
+            duckdb_embeddings, "postgresql://stub/db", chunk_rows=2, targets=transfer_targets(ids)
+        )
+
+        query, _ = engine._query(TransferCheckpoint("job"))
+        chunks = list(engine.iter_chunks(TransferCheckpoint("job")))
+
+        assert " IN (" not in query
+        assert [c.rows for c in chunks] == [2, 1]
+        streamed = [mid for c in chunks for mid in c.record_batch.column("memory_id").to_pylist()]
+        assert streamed == ids
+        # The relation is only registered while streaming
+        with pytest.raises(duckdb.CatalogException):
+            duckdb_embeddings.execute("SELECT * FROM embedding_transfer_targets")
+
+    def test_needs_flags_select_which_embeddings_are_written(self, duckdb_embeddings):
+        content_only = "00000000-0000-0000-0000-000000000001"
+        tags_only = "00000000-0000-0000-0000-000000000004"
+        engine = EmbeddingTransferEngine(
+            duckdb_embeddings,
+            "postgresql://stub/db",
+            include_tags=True,
+            targets=transfer_targets([content_only], [tags_only]),
+        )
+        (chunk,) = list(engine.iter_chunks(TransferCheckpoint("job")))
+
+        with patch.object(
+            embedding_transfer_engine, "copy_content_embeddings", return_value=1
+        ) as copy_content, patch.object(
+            embedding_transfer_engine, "copy_tag_embeddings", return_value=1
+        ) as copy_tags:
+            counts = engine.write_chunk(MagicMock(), chunk, "_w0")
+
+        assert counts == (1, 1, [content_only])
+        assert copy_content.call_args[0][1] == [content_only]
+        assert copy_tags.call_args[0][1] == [tags_only]
+
+
+class TestTransferRun:
+    """Test the writer pool and checkpoint progression"""
+
+    def test_run_writes_every_chunk_and_checkpoints_in_order(self, duckdb_embeddings):
+        saved = []
+        copied_ids = []
+        tag_ids = []
+        recorded_ids = []
+
+        def copy_content(cursor, memory_ids, matrix, **kwargs):
+            copied_ids.extend(memory_ids)
+            assert matrix.shape == (len(memory_ids), 768)
+            return len(memory_ids)
+
+        def copy_tags(cursor, memory_ids, matrix, **kwargs):
+            tag_ids.extend(memory_ids)
+            return len(memory_ids)
+
+        engine = EmbeddingTransferEngine(
+            duckdb_embeddings,
+            "postgresql://stub/db",
+            include_tags=True,
+            writers=2,
+            chunk_rows=3,
+        )
+        with patch.object(embedding_transfer_engine, "ThreadedConnectionPool"), patch.object(
+            embedding_transfer_engine, "ensure_content_embeddings_table"
+        ), patch.object(embedding_transfer_engine, "ensure_staging_tables"), patch.object(
+            embedding_transfer_engine, "load_checkpoint", return_value=TransferCheckpoint("job")
+        ), patch.object(
+            embedding_transfer_engine,
+            "save_checkpoint",
+            side_effect=lambda conn, cp: saved.append((cp.last_memory_id, cp.rows_transferred)),
+        ), patch.object(
+            embedding_transfer_engine, "copy_content_embeddings", side_effect=copy_content
+        ), patch.object(
+            embedding_transfer_engine, "copy_tag_embeddings", side_effect=copy_tags
+        ), patch.object(
+            embedding_transfer_engine,
+            "record_by_content_hash",
+            side_effect=lambda cursor, ids: recorded_ids.extend(ids),
+        ), patch.object(
+            embedding_transfer_engine, "fan_out_hash_embeddings", return_value=2
+        ) as fan_out:
+            stats = engine.run()
+
+        assert sorted(copied_ids) == [f"00000000-0000-0000-0000-{i:012d}" for i in range(10)]
+        # Hashes are recorded per settled chunk in read order, fanned out once at the end
+        assert recorded_ids == sorted(copied_ids)
+        fan_out.assert_called_once()
+        assert stats["propagated"] == 2
+        assert len(tag_ids) == 5
+        assert stats["content_updated"] == 10
+        assert stats["tag_updated"] == 5
+        assert [rows for _, rows in saved] == [3, 6, 9, 10]
+        assert saved[-1][0].endswith("000000000009")
+
+    def test_completed_run_clears_checkpoint_for_the_next_run(self, duckdb_embeddings):
+        stored = {}
+        copied_ids = []
+
+        def copy_content(cursor, memory_ids, matrix, **kwargs):
+            copied_ids.extend(memory_ids)
+            return len(memory_ids)
+
+        def save(conn, checkpoint):
+            stored[checkpoint.job_name] = TransferCheckpoint(
+                checkpoint.job_name,
+                checkpoint.last_created_at,
+                checkpoint.last_memory_id,
+                checkpoint.rows_transferred,
+            )
+
+        engine = EmbeddingTransferEngine(
+            duckdb_embeddings, "postgresql://stub/db", job_name="job", writers=2, chunk_rows=3
+        )
+        with patch.object(embedding_transfer_engine, "ThreadedConnectionPool"), patch.object(
+            embedding_transfer_engine, "ensure_content_embeddings_table"
+        ), patch.object(embedding_transfer_engine, "ensure_staging_tables"), patch.object(
+            embedding_transfer_engine,
+            "load_checkpoint",
+            side_effect=lambda conn, job: stored.get(job, TransferCheckpoint(job)),
+        ), patch.object(
+            embedding_transfer_engine, "save_checkpoint", side_effect=save
+        ), patch.object(
+            embedding_transfer_engine,
+            "reset_checkpoint",
+            side_effect=lambda conn, job: stored.pop(job, None),
+        ), patch.object(
+            embedding_transfer_engine, "copy_content_embeddings", side_effect=copy_content
+        ), patch.object(
+            embedding_transfer_engine, "fan_out_hash_embeddings", return_value=0
+        ):
+            partial = engine.run(max_rows=4)
+            assert partial["rows_read"] == 6
+            assert stored["job"].rows_transferred == 6
+
+            first = engine.run()
+            assert first["rows_read"] == 4
+            assert "job" not in stored
+
+            second = engine.run()
+
+        assert second["rows_read"] == 10
+        assert second["content_updated"] == 10
+        assert len(copied_ids) == 20
+        assert "job" not in stored
+
+    def test_failed_chunk_stops_without_advancing_checkpoint(self, duckdb_embeddings):
+        saved = []
+        engine = EmbeddingTransferEngine(
+            duckdb_embeddings, "postgresql://stub/db", writers=1, chunk_rows=5
+        )
+        with patch.object(embedding_transfer_engine, "ThreadedConnectionPool"), patch.object(
+            embedding_transfer_engine, "ensure_content_embeddings_table"
+        ), patch.object(embedding_transfer_engine, "ensure_staging_tables"), patch.object(
+            embedding_transfer_engine, "load_checkpoint", return_value=TransferCheckpoint("job")
+        ), patch.object(
+            embedding_transfer_engine,
+            "save_checkpoint",
+            side_effect=lambda conn, cp: saved.append(cp.rows_transferred),
+        ), patch.object(
+            embedding_transfer_engine,
+            "copy_content_embeddings",
+            side_effect=RuntimeError("COPY failed"),
+        ):
+            with pytest.raises(RuntimeError):
+                engine.run()
+
+        assert saved == []
+
+    def test_writer_rolls_back_on_failure(self, duckdb_embeddings):
+        pool = MagicMock()
+        conn = pool.return_value.getconn.return_value
+        engine = EmbeddingTransferEngine(
+            duckdb_embeddings, "postgresql://stub/db", writers=1, chunk_rows=10
+        )
+        with patch.object(embedding_transfer_engine, "ThreadedConnectionPool", pool), patch.object(
+            embedding_transfer_engine, "ensure_content_embeddings_table"
+        ), patch.object(embedding_transfer_engine, "ensure_staging_tables"), patch.object(
+            embedding_transfer_engine, "load_checkpoint", return_value=TransferCheckpoint("job")
+        ), patch.object(
+            embedding_transfer_engine, "copy_content_embeddings", side_effect=ValueError("bad")
+        ):
+            with pytest.raises(ValueError):
+                engine.run()
+
+        conn.rollback.assert_called()
+        pool.return_value.closeall.assert_called_once()
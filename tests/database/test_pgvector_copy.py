@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Tests for the binary COPY loader used by the embedding transfer scripts.
+"""
+
+import os
+import struct
+import sys
+import uuid
+from datetime import datetime
+from unittest.mock import MagicMock
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "../../biological_memory/scripts"))
+
+from pgvector_copy import (  # noqa: E402
+    NO_CLUSTER,
+    PG_TIMESTAMP_NEG_INFINITY,
+    copy_content_embeddings,
+    copy_tag_embeddings,
+    encode_content_rows,
+    encode_tag_rows,
+    stack_embeddings,
+)
+
+
+def _decode_copy(payload: bytes):
+    """Minimal PGCOPY binary reader returning each tuple as a list of raw fields"""
+    assert payload[:11] == b"PGCOPY\n\xff\r\n\x00"
+    offset = 11 + 8  # signature, flags, header extension length
+    rows = []
+    while True:
+        (field_count,) = struct.unpack_from("!h", payload, offset)
+        offset += 2
+        if field_count == -1:
+            break
+        fields = []
+        for _ in range(field_count):
+            (length,) = struct.unpack_from("!i", payload, offset)
+            offset += 4
+            fields.append(payload[offset : offset + length])
+            offset += length
+        rows.append(fields)
+    assert offset == len(payload)
+    return rows
+
+
+def _decode_vector(raw: bytes) -> np.ndarray:
+    dim, unused = struct.unpack_from("!hh", raw)
+    assert unused == 0
+    return np.frombuffer(raw, dtype=">f4", offset=4, count=dim)
+
+
+def _payload(records: np.ndarray) -> bytes:
+    from pgvector_copy import _to_copy_payload
+
+    return _to_copy_payload(records).getvalue()
+
+
+class TestBinaryEncoding:
+    """Test the PGCOPY tuples produced for the staging tables"""
+
+    def test_content_rows_round_trip(self):
+        ids = [str(uuid.uuid4()), str(uuid.uuid4())]
+        matrix = np.arange(2 * 768, dtype=np.float32).reshape(2, 768) / 1000
+
+        rows = _decode_copy(_payload(encode_content_rows(ids, matrix, [None, 2.5], [7, None])))
+
+        assert len(rows) == 2
+        memory_id, vector, reduced, magnitude, cluster = rows[0]
+        assert uuid.UUID(bytes=memory_id) == uuid.UUID(ids[0])
+        np.testing.assert_array_equal(_decode_vector(vector), matrix[0])
+        np.testing.assert_array_equal(_decode_vector(reduced), matrix[0, :256])
+        # Missing magnitude is computed on the client, a given one is kept
+        assert struct.unpack("!f", magnitude)[0] == np.float32(np.linalg.norm(matrix[0]))
+        assert struct.unpack("!f", rows[1][3])[0] == 2.5
+        assert struct.unpack("!i", cluster)[0] == 7
+        assert struct.unpack("!i", rows[1][4])[0] == NO_CLUSTER
+
+    def test_tag_rows_encode_timestamps(self):
+        ids = [str(uuid.uuid4()), str(uuid.uuid4())]
+        matrix = np.ones((2, 768), dtype=np.float32)
+
+        rows = _decode_copy(
+            _payload(encode_tag_rows(ids, matrix, [datetime(2000, 1, 2, 0, 0, 1), None]))
+        )
+
+        assert struct.unpack("!q", rows[0][3])[0] == (86400 + 1) * 1_000_000
+        assert struct.unpack("!q", rows[1][3])[0] == PG_TIMESTAMP_NEG_INFINITY
+        assert len(_decode_vector(rows[0][2])) == 256
+
+    def test_stack_embeddings_masks_bad_rows(self):
+        matrix, valid = stack_embeddings(
+            [[0.1] * 768, None, [0.1] * 10, [float("nan")] * 768, np.ones(768)]
+        )
+
+        assert matrix.dtype == np.float32
+        assert valid.tolist() == [True, False, False, False, True]
+
+
+class TestCopyAndApply:
+    """Test the staging COPY + UPDATE ... FROM sequence"""
+
+    def test_content_copy_then_single_update(self):
+        cursor = MagicMock(rowcount=2)
+        ids = [str(uuid.uuid4()) for _ in range(3)]
+
+        updated = copy_content_embeddings(
+            cursor, ids, [[0.1] * 768, None, [0.2] * 768], clusters=[1, 2, 3]
+        )
+
+        assert updated == 2
+        statements = [c[0][0] for c in cursor.execute.call_args_list]
+        assert statements[0] == "TRUNCATE public.embedding_copy_staging"
+        assert "FROM public.embedding_copy_staging s" in statements[1]
+        cursor.copy_expert.assert_called_once()
+        sql, payload = cursor.copy_expert.call_args[0]
+        assert "FORMAT binary" in sql
+        # The invalid row is dropped before encoding
+        rows = _decode_copy(payload.getvalue())
+        assert [uuid.UUID(bytes=r[0]) for r in rows] == [uuid.UUID(ids[0]), uuid.UUID(ids[2])]
+        assert struct.unpack("!i", rows[1][4])[0] == 3
+
+    def test_nothing_valid_skips_database(self):
+        cursor = MagicMock()
+        assert copy_tag_embeddings(cursor, [str(uuid.uuid4())], [None]) == 0
+        cursor.execute.assert_not_called()
+        cursor.copy_expert.assert_not_called()
@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+Tests for the blocked NumPy k-NN graph builder behind semantic_network.
+"""
+
+import os
+import sys
+from datetime import datetime
+from typing import Dict, Generator, List
+
+import duckdb
+import numpy as np
+import pyarrow as pa
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), "../../biological_memory/scripts"))
+
+from semantic_knn_builder import (  # noqa: E402
+    SemanticKnnBuilder,
+    block_rows,
+    build_knn_graph,
+    knn_pairs_table,
+    normalize_rows,
+)
+
+DIMENSIONS = 768
+
+
+def random_embeddings(count: int, seed: int = 7) -> np.ndarray:
+    """Unit-normalizable float32 vectors"""
+    return np.random.default_rng(seed).standard_normal((count, DIMENSIONS)).astype(np.float32)
+
+
+def embeddings_table(vectors: np.ndarray, updated_at: datetime) -> pa.Table:
+    """Arrow memory_embeddings rows with ids m0..mN"""
+    return pa.table(
+        {
+            "memory_id": [f"m{i}" for i in range(len(vectors))],
+            "final_embedding": pa.FixedSizeListArray.from_arrays(
+                pa.array(vectors.ravel()), DIMENSIONS
+            ),
+            "updated_at": pa.array([updated_at] * len(vectors), pa.timestamp("us")),
+        }
+    )
+
+
+def exact_neighbours(vectors: np.ndarray, k: int) -> Dict[int, List[int]]:
+    """Brute-force top-k by cosine similarity, excluding self"""
+    matrix = normalize_rows(vectors.copy())
+    sims = matrix @ matrix.T
+    np.fill_diagonal(sims, -np.inf)
+    return {row: list(np.argsort(-sims[row])[:k]) for row in range(len(vectors))}
+
+
+@pytest.fixture
+def duckdb_conn() -> Generator[duckdb.DuckDBPyConnection, None, None]:
+    """In-memory DuckDB holding 300 random memory_embeddings rows"""
+    conn = duckdb.connect(":memory:")
+    conn.register(
+        "embeddings_arrow", embeddings_table(random_embeddings(300), datetime(2025, 1, 1))
+    )
+    conn.execute("CREATE TABLE memory_embeddings AS SELECT * FROM embeddings_arrow")
+    conn.unregister("embeddings_arrow")
+    yield conn
+    conn.close()
+
+
+class TestBuildKnnGraph:
+    """Blocked top-k search over a normalized matrix"""
+
+    def test_matches_brute_force(self) -> None:
+        vectors = random_embeddings(200)
+        sources, neighbours, _ = build_knn_graph(
+            normalize_rows(vectors.copy()), k=5, threshold=-1.0, workers=2
+        )
+
+        exact = exact_neighbours(vectors, 5)
+        for row in range(len(vectors)):
+            assert list(neighbours[sources == row]) == exact[row]
+
+    def test_block_size_does_not_change_result(self) -> None:
+        matrix = normalize_rows(random_embeddings(200))
+        whole = build_knn_graph(matrix, k=5, threshold=-1.0, memory_limit_mb=64, workers=1)
+        blocked = build_knn_graph(matrix, k=5, threshold=-1.0, memory_limit_mb=0, workers=4)
+
+        np.testing.assert_array_equal(whole[0], blocked[0])
+        np.testing.assert_array_equal(whole[1], blocked[1])
+        np.testing.assert_allclose(whole[2], blocked[2], rtol=1e-5)
+
+    def test_excludes_self_and_applies_threshold(self) -> None:
+        matrix = normalize_rows(random_embeddings(100))
+        sources, neighbours, scores = build_knn_graph(matrix, k=10, threshold=0.05)
+
+        assert not np.any(sources == neighbours)
+        assert np.all(scores >= 0.05)
+
+    def test_query_rows_are_scored_against_full_matrix(self) -> None:
+        vectors = random_embeddings(150)
+        sources, neighbours, _ = build_knn_graph(
+            normalize_rows(vectors.copy()), np.array([3, 90]), k=4, threshold=-1.0
+        )
+
+        exact = exact_neighbours(vectors, 4)
+        assert set(sources) == {3, 90}
+        assert list(neighbours[sources == 90]) == exact[90]
+
+    def test_block_rows_respects_memory_ceiling(self) -> None:
+        rows = block_rows(matrix_rows=1_000_000, memory_limit_mb=256, workers=4)
+
+        assert rows * 1_000_000 * 12 * 4 <= 256 * 1024 * 1024
+        assert block_rows(10, 512, 1) == 1024
+        assert block_rows(10**9, 1, 8) == 1
+
+
+class TestKnnPairsTable:
+    """Arrow output for the semantic_network input table"""
+
+    def test_ranks_and_ids(self) -> None:
+        table = embeddings_table(random_embeddings(50), datetime(2025, 1, 1))
+        pairs = knn_pairs_table(table, k=3, threshold=-1.0)
+
+        assert pairs.num_rows == 150
+        assert pairs.column("similarity_rank").to_pylist()[:3] == [1, 2, 3]
+        similarities = pairs.column("semantic_similarity").to_numpy()
+        assert np.all(np.diff(similarities[:3]) <= 0)
+
+    def test_missing_embeddings_are_skipped(self) -> None:
+        table = embeddings_table(random_embeddings(20), datetime(2025, 1, 1))
+        embeddings = table.column("final_embedding").combine_chunks().to_pylist()
+        embeddings[4] = None
+        table = table.set_column(
+            1, "final_embedding", pa.array(embeddings, pa.list_(pa.float32(), DIMENSIONS))
+        )
+
+        pairs = knn_pairs_table(table, k=3, threshold=-1.0)
+
+        assert pairs.num_rows == 19 * 3
+        assert "m4" not in set(pairs.column("memory_id_1").to_pylist())
+        assert "m4" not in set(pairs.column("memory_id_2").to_pylist())
+
+
+class TestSemanticKnnBuilder:
+    """Full and incremental builds of semantic_knn_pairs"""
+
+    def test_full_build(self, duckdb_conn: duckdb.DuckDBPyConnection) -> None:
+        stats = SemanticKnnBuilder(duckdb_conn, k=5, threshold=-1.0).run()
+
+        count, sources = duckdb_conn.execute(
+            "SELECT COUNT(*), COUNT(DISTINCT memory_id_1) FROM semantic_knn_pairs"
+        ).fetchone()
+        assert stats["scored"] == 300
+        assert (count, sources) == (1500, 300)
+
+    def test_incremental_only_scores_new_rows(self, duckdb_conn: duckdb.DuckDBPyConnection) -> None:
+        builder = SemanticKnnBuilder(duckdb_conn, k=5, threshold=-1.0)
+        builder.run()
+        duckdb_conn.execute(
+            "INSERT INTO memory_embeddings "
+            "SELECT 'new', final_embedding, TIMESTAMP '2025-06-01' "
+            "FROM memory_embeddings WHERE memory_id = 'm3'"
+        )
+
+        stats = builder.run(incremental=True)
+
+        assert stats["scored"] == 1
+        assert duckdb_conn.execute("SELECT COUNT(*) FROM semantic_knn_pairs").fetchone()[0] == 1505
+        nearest = duckdb_conn.execute(
+            "SELECT memory_id_2 FROM semantic_knn_pairs "
+            "WHERE memory_id_1 = 'new' AND similarity_rank = 1"
+        ).fetchone()[0]
+        assert nearest == "m3"
+
+    def test_incremental_rerun_is_idempotent(self, duckdb_conn: duckdb.DuckDBPyConnection) -> None:
+        builder = SemanticKnnBuilder(duckdb_conn, k=5, threshold=-1.0)
+        builder.run()
+
+        stats = builder.run(incremental=True)
+
+        assert stats["scored"] == 0
+        assert duckdb_conn.execute("SELECT COUNT(*) FROM semantic_knn_pairs").fetchone()[0] == 1500
@@ -130,6 +130,15 @@ def real_ollama(real_ollama_service):
     return real_ollama_service
 
 
+@pytest.fixture(scope="function")
+def ollama_stub():
+    """Local Ollama stand-in with deterministic embeddings and completions."""
+    from tests.fixtures.ollama_stub import OllamaStubServer
+
+    with OllamaStubServer() as server:
+        yield server
+
+
 @pytest.fixture(scope="session")
 def real_postgres_connection():
     """Real PostgreSQL connection for testing."""
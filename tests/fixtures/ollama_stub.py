@@ -0,0 +1,288 @@
+"""
+Local Ollama stand-in server for offline benchmarks and tests.
+
+Serves /api/embeddings, /api/embed, /api/generate and /api/tags with
+deterministic output: the same model and text always yield the same unit
+vector or response. Latency, error rate and 503 bursts are configurable so
+client retry, coalescing and caching behaviour can be measured without a GPU.
+
+Run standalone to point scripts at it:
+
+    python -m tests.fixtures.ollama_stub --port 11435 --latency-ms 20
+"""
+
+import argparse
+import hashlib
+import json
+import random
+import threading
+import time
+from dataclasses import asdict, dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+
+@dataclass
+class OllamaStubConfig:
+    """Behaviour knobs for the stand-in server"""
+
+    dimensions: int = 768
+    latency_ms: float = 0.0  # Base latency per request
+    latency_jitter_ms: float = 0.0  # Spread around the base latency
+    latency_distribution: str = "constant"  # constant | uniform | lognormal
+    per_input_latency_ms: float = 0.0  # Extra latency per /api/embed input
+    error_rate: float = 0.0  # Fraction of requests answered with HTTP 500
+    unavailable_every: int = 0  # Start a 503 burst every N requests (0 = never)
+    unavailable_burst: int = 0  # Length of each 503 burst
+    seed: int = 42
+    models: List[str] = field(
+        default_factory=lambda: ["nomic-embed-text:latest", "gpt-oss:20b", "qwen2.5:0.5b"]
+    )
+
+
+def stub_embedding(text: str, model: str, dimensions: int = 768) -> List[float]:
+    """Deterministic unit vector for (model, text)"""
+    digest = hashlib.sha256(f"{model}\x00{text}".encode("utf-8")).digest()
+    rng = np.random.default_rng(int.from_bytes(digest[:8], "little"))
+    vector = rng.standard_normal(dimensions)
+    return (vector / np.linalg.norm(vector)).tolist()
+
+
+def stub_completion(prompt: str, model: str, json_format: bool = False) -> str:
+    """Deterministic completion text for (model, prompt)"""
+    digest = hashlib.sha256(f"{model}\x00{prompt}".encode("utf-8")).hexdigest()
+    if json_format:
+        return json.dumps({"response": f"stub-{digest[:12]}", "confidence": 0.8})
+    return f"Stub insight {digest[:12]} about {len(prompt)} characters of input."
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    server: "_StubHTTPServer"
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format: str, *args: Any) -> None:  # noqa: A002
+        pass  # Keep benchmark output clean
+
+    def _send_json(self, status: int, body: Dict[str, Any]) -> None:
+        payload = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_GET(self) -> None:  # noqa: N802
+        stub = self.server.stub
+        if self.path == "/api/tags":
+            stub._record(self.path, 200)
+            self._send_json(200, {"models": [{"name": name} for name in stub.config.models]})
+        else:
+            stub._record(self.path, 404)
+            self._send_json(404, {"error": "not found"})
+
+    def do_POST(self) -> None:  # noqa: N802
+        stub = self.server.stub
+        length = int(self.headers.get("Content-Length", 0))
+        try:
+            body = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            stub._record(self.path, 400)
+            self._send_json(400, {"error": "invalid json"})
+            return
+
+        inputs = body.get("input", [])
+        if isinstance(inputs, str):
+            inputs = [inputs]
+
+        status = stub._admit(len(inputs) if self.path == "/api/embed" else 1)
+        if status != 200:
+            stub._record(self.path, status)
+            self._send_json(status, {"error": "stub injected failure"})
+            return
+
+        model = body.get("model", "")
+        dimensions = stub.config.dimensions
+        if self.path == "/api/embeddings":
+            response = {"embedding": stub_embedding(body.get("prompt", ""), model, dimensions)}
+        elif self.path == "/api/embed":
+            response = {
+                "model": model,
+                "embeddings": [stub_embedding(text, model, dimensions) for text in inputs],
+            }
+            stub._record_inputs(len(inputs))
+        elif self.path == "/api/generate":
+            prompt = body.get("prompt", "")
+            response = {
+                "model": model,
+                "response": stub_completion(prompt, model, body.get("format") == "json"),
+                "done": True,
+                "eval_count": len(prompt.split()),
+            }
+        else:
+            stub._record(self.path, 404)
+            self._send_json(404, {"error": "not found"})
+            return
+
+        stub._record(self.path, 200)
+        self._send_json(200, response)
+
+
+class _StubHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, stub: "OllamaStubServer"):
+        super().__init__(address, _StubHandler)
+        self.stub = stub
+
+
+class OllamaStubServer:
+    """
+    Threaded HTTP stand-in for an Ollama host
+
+    Usable as a context manager; `url` is valid once started. `configure()` changes
+    behaviour between benchmark phases and `stats()` reports what the server saw.
+    """
+
+    def __init__(
+        self, config: Optional[OllamaStubConfig] = None, host: str = "127.0.0.1", port: int = 0
+    ):
+        self.config = config or OllamaStubConfig()
+        self._host = host
+        self._port = port
+        self._lock = threading.Lock()
+        self._rng = random.Random(self.config.seed)
+        self._httpd: Optional[_StubHTTPServer] = None
+        self._thread: Optional[threading.Thread] = None
+        self.reset_stats()
+
+    @property
+    def url(self) -> str:
+        if self._httpd is None:
+            raise RuntimeError("Stub server is not running")
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "OllamaStubServer":
+        self._httpd = _StubHTTPServer((self._host, self._port), self)
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        if self._httpd is not None:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+            self._httpd = None
+
+    def __enter__(self) -> "OllamaStubServer":
+        return self.start()
+
+    def __exit__(self, *exc: Any) -> None:
+        self.stop()
+
+    def configure(self, **changes: Any) -> None:
+        """Update config fields in place, e.g. configure(latency_ms=20, error_rate=0.1)"""
+        with self._lock:
+            for name, value in changes.items():
+                if not hasattr(self.config, name):
+                    raise AttributeError(f"Unknown stub setting: {name}")
+                setattr(self.config, name, value)
+            self._rng.seed(self.config.seed)
+
+    def reset_stats(self) -> None:
+        with self._lock:
+            self._requests = 0
+            self._by_path: Dict[str, int] = {}
+            self._by_status: Dict[int, int] = {}
+            self._inputs_embedded = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "requests": self._requests,
+                "by_path": dict(self._by_path),
+                "by_status": dict(self._by_status),
+                "inputs_embedded": self._inputs_embedded,
+                "config": asdict(self.config),
+            }
+
+    def _sample_latency(self, inputs: int) -> float:
+        cfg = self.config
+        base = cfg.latency_ms + cfg.per_input_latency_ms * inputs
+        if cfg.latency_distribution == "uniform":
+            base += self._rng.uniform(-cfg.latency_jitter_ms, cfg.latency_jitter_ms)
+        elif cfg.latency_distribution == "lognormal" and cfg.latency_jitter_ms > 0:
+            # Heavy right tail: median stays near base, occasional slow requests
+            sigma = max(cfg.latency_jitter_ms / max(cfg.latency_ms, 1.0), 0.01)
+            base *= self._rng.lognormvariate(0.0, sigma)
+        return max(base, 0.0) / 1000.0
+
+    def _admit(self, inputs: int) -> int:
+        """Decide the status for a request and sleep for its latency"""
+        with self._lock:
+            self._requests += 1
+            cfg = self.config
+            sequence = self._requests - 1
+            delay = self._sample_latency(inputs)
+            if (
+                cfg.unavailable_every
+                and cfg.unavailable_burst
+                and sequence % cfg.unavailable_every < cfg.unavailable_burst
+                and sequence >= cfg.unavailable_every
+            ):
+                status = 503
+            elif cfg.error_rate and self._rng.random() < cfg.error_rate:
+                status = 500
+            else:
+                status = 200
+        if delay:
+            time.sleep(delay)
+        return status
+
+    def _record(self, path: str, status: int) -> None:
+        with self._lock:
+            self._by_path[path] = self._by_path.get(path, 0) + 1
+            self._by_status[status] = self._by_status.get(status, 0) + 1
+
+    def _record_inputs(self, count: int) -> None:
+        with self._lock:
+            self._inputs_embedded += count
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run a local Ollama stand-in server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11435)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--latency-jitter-ms", type=float, default=0.0)
+    parser.add_argument(
+        "--latency-distribution", choices=["constant", "uniform", "lognormal"], default="constant"
+    )
+    parser.add_argument("--per-input-latency-ms", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--unavailable-every", type=int, default=0)
+    parser.add_argument("--unavailable-burst", type=int, default=0)
+    args = parser.parse_args()
+
+    config = OllamaStubConfig(
+        latency_ms=args.latency_ms,
+        latency_jitter_ms=args.latency_jitter_ms,
+        latency_distribution=args.latency_distribution,
+        per_input_latency_ms=args.per_input_latency_ms,
+        error_rate=args.error_rate,
+        unavailable_every=args.unavailable_every,
+        unavailable_burst=args.unavailable_burst,
+    )
+    server = OllamaStubServer(config, host=args.host, port=args.port).start()
+    print(f"Ollama stub listening on {server.url} (Ctrl+C to stop)")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
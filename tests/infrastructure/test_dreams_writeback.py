@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Tests for the pooled, set-based dreams write-back service.
+"""
+
+import threading
+import time
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from src.services import dreams_writeback_service
+from src.services.dreams_writeback_service import (
+    LONG_TERM_MEMORIES_SQL,
+    WORKING_MEMORY_SQL,
+    DreamsWritebackService,
+)
+
+
+@pytest.fixture
+def pooled_service():
+    """Service whose pool hands out one mock connection"""
+    pool = MagicMock()
+    conn = pool.return_value.getconn.return_value
+    cursor = conn.cursor.return_value.__enter__.return_value
+    cursor.rowcount = 4
+    with patch.object(dreams_writeback_service.psycopg2.pool, "ThreadedConnectionPool", pool):
+        service = DreamsWritebackService(pool_size=3)
+        yield service, pool, conn, cursor
+
+
+class TestSetBasedStages:
+    """Each stage is one INSERT ... SELECT on a pooled connection"""
+
+    def test_stage_runs_one_statement_and_reuses_the_pool(self, pooled_service):
+        service, pool, conn, cursor = pooled_service
+
+        assert service.write_working_memory() == 4
+        assert service.write_short_term_episodes() == 4
+
+        pool.assert_called_once()
+        assert pool.return_value.putconn.call_count == 2
+        sql, params = cursor.execute.call_args_list[0][0]
+        assert sql is WORKING_MEMORY_SQL
+        assert set(params) == {"snapshot_id"}
+        # Stage statement plus its processing_metrics row, each committed
+        assert cursor.execute.call_count == 4
+        assert conn.commit.call_count == 4
+
+    def test_consolidation_marks_attempts_in_the_same_statement(self):
+        assert "UPDATE dreams.short_term_episodes" in LONG_TERM_MEMORIES_SQL
+        assert "INSERT INTO dreams.long_term_memories" in LONG_TERM_MEMORIES_SQL
+
+    def test_failed_stage_rolls_back_and_returns_zero(self, pooled_service):
+        service, pool, conn, cursor = pooled_service
+        cursor.execute.side_effect = RuntimeError("relation does not exist")
+
+        assert service.write_long_term_memories() == 0
+
+        conn.rollback.assert_called_once()
+        pool.return_value.putconn.assert_called_once_with(conn)
+
+    def test_close_releases_the_pool(self, pooled_service):
+        service, pool, _, _ = pooled_service
+        service.extract_insights()
+
+        service.close()
+
+        pool.return_value.closeall.assert_called_once()
+        assert service.pg_pool is None
+
+    def test_concurrent_first_use_creates_one_pool(self, pooled_service):
+        service, pool, _, _ = pooled_service
+        created = pool.return_value
+        barrier = threading.Barrier(3)
+
+        def slow_pool(**kwargs: object) -> MagicMock:
+            time.sleep(0.05)
+            return created
+
+        pool.side_effect = slow_pool
+        pools = []
+
+        def first_use() -> None:
+            barrier.wait()
+            pools.append(service.connect_postgres())
+
+        threads = [threading.Thread(target=first_use) for _ in range(3)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        pool.assert_called_once()
+        assert pools == [created] * 3
+
+
+class TestFullPipeline:
+    """Independent stages overlap; the consolidation chain stays ordered"""
+
+    def test_chain_is_ordered_and_runs_beside_independent_stages(self):
+        service = DreamsWritebackService()
+        order = []
+        threads = {}
+
+        def stage(name):
+            def run():
+                order.append(name)
+                threads[name] = threading.get_ident()
+                return 1
+
+            return run
+
+        with patch.multiple(
+            service,
+            write_working_memory=stage("working"),
+            write_short_term_episodes=stage("short"),
+            write_long_term_memories=stage("long"),
+            write_semantic_network=stage("semantic"),
+            extract_insights=stage("insights"),
+        ):
+            results = service.run_full_pipeline()
+
+        chain = [name for name in order if name in ("short", "long", "semantic")]
+        assert chain == ["short", "long", "semantic"]
+        assert threads["short"] == threads["long"] == threads["semantic"]
+        assert set(results) == {
+            "working_memory",
+            "short_term_episodes",
+            "long_term_memories",
+            "semantic_network",
+            "memory_insights",
+        }
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Tests for the historical dreams populator's semantic network builders.
+"""
+
+import itertools
+import random
+from collections import Counter
+
+import pyarrow as pa
+
+from src.services.populate_dreams_historical import (
+    concept_window_pairs,
+    tag_cooccurrence,
+)
+
+
+def _batches(pairs, size):
+    for start in range(0, len(pairs), size):
+        chunk = pairs[start : start + size]
+        yield pa.table(
+            {
+                "memory_id": pa.array([m for m, _ in chunk], pa.string()),
+                "tag": pa.array([t for _, t in chunk], pa.string()),
+            }
+        )
+
+
+class TestTagCooccurrence:
+    """Test the sparse memory x tag co-occurrence product"""
+
+    def test_matches_brute_force_counts(self):
+        rng = random.Random(7)
+        vocabulary = [f"tag{i}" for i in range(12)]
+        memories = {f"m{i}": rng.sample(vocabulary, rng.randint(1, 5)) for i in range(200)}
+        pairs = [(memory_id, tag) for memory_id, tags in memories.items() for tag in tags]
+
+        # A memory's tags may straddle batch boundaries
+        result = tag_cooccurrence(_batches(pairs, 37), min_count=1)
+
+        expected = Counter(
+            pair for tags in memories.values() for pair in itertools.combinations(sorted(tags), 2)
+        )
+        assert {(a, b): n for a, b, n in result} == dict(expected)
+
+    def test_repeated_tags_count_once_and_threshold_applies(self):
+        pairs = [("m1", "a"), ("m1", "a"), ("m1", "b"), ("m2", "a"), ("m2", "b"), ("m3", "c")]
+
+        assert tag_cooccurrence(_batches(pairs, 10), min_count=2) == [("a", "b", 2)]
+        assert tag_cooccurrence(_batches(pairs, 10), min_count=3) == []
+
+
+class TestConceptWindowPairs:
+    """Test merging long-term memory concept pairs before the bulk upsert"""
+
+    def test_pairs_keep_max_importance_and_occurrences(self):
+        pairs = concept_window_pairs(
+            [
+                ("m1", ["beta", "alpha", "gamma"], 0.4),
+                ("m2", ["alpha", "beta"], 0.9),
+                ("m3", ["alpha", "beta"], None),
+            ]
+        )
+
+        assert pairs[("alpha", "beta")] == (0.9, 3)
+        assert pairs[("beta", "gamma")] == (0.4, 1)
+        assert pairs[("alpha", "gamma")] == (0.4, 1)
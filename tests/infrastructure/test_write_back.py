@@ -16,6 +16,7 @@ Test Coverage:
 - Data consistency validation
 """
 
+import contextlib
 import json
 import os
 import sys
@@ -23,6 +24,7 @@ import tempfile
 import uuid
 from datetime import datetime, timedelta, timezone
 from pathlib import Path
+from unittest.mock import MagicMock, patch
 
 import psycopg2
 import psycopg2.extras
@@ -35,9 +37,13 @@ from src.services.incremental_processor import (
     IncrementalBatch,
     IncrementalProcessor,
     ProcessingState,
+    content_hash_digest,
 )
 from src.services.memory_writeback_service import (
+    PROCESSED_MEMORIES_MERGE,
     MemoryWritebackService,
+    ProcessingMetrics,
+    _copy_field,
 )
 
 # Add src directory to path for imports
@@ -465,6 +471,99 @@ class TestMemoryWritebackService:
         assert metrics.duration_seconds >= 0
 
 
+class TestBulkMerge:
+    """Test the COPY + INSERT ... SELECT merge path shared by all write-back stages"""
+
+    @pytest.fixture
+    def merge_service(self):
+        import logging
+
+        service = MemoryWritebackService.__new__(MemoryWritebackService)
+        service.batch_size = 2
+        service.processing_metrics = {}
+        service.current_session_id = str(uuid.uuid4())
+        service.logger = logging.getLogger("memory_writeback")
+        return service
+
+    def test_copy_field_escapes_text_arrays_and_nulls(self):
+        assert _copy_field(None) == "\\N"
+        assert _copy_field("a\tb\nc\\d") == "a\\tb\\nc\\\\d"
+        assert _copy_field(["x", 'say "hi"', None]) == '{"x","say \\\\"hi\\\\"",NULL}'
+        assert _copy_field({"k": 1}) == '{"k": 1}'
+        assert _copy_field(datetime(2025, 1, 1, tzinfo=timezone.utc)) == "2025-01-01T00:00:00+00:00"
+        assert _copy_field(True) == "true"
+
+    def test_batches_are_staged_then_merged(self, merge_service):
+        pg_conn = MagicMock()
+        cursor = pg_conn.cursor.return_value.__enter__.return_value
+        cursor.rowcount = 2
+        metrics = ProcessingMetrics("session", "batch", "processed_memories")
+        rows = [{"source_memory_id": f"id-{i % 3}", "concepts": ["a"]} for i in range(5)]
+
+        merge_service._bulk_merge(pg_conn, PROCESSED_MEMORIES_MERGE, rows, metrics)
+
+        statements = [c[0][0] for c in cursor.execute.call_args_list]
+        assert statements[0].startswith(
+            "CREATE TEMP TABLE IF NOT EXISTS long_term_memories_merge_staging"
+        )
+        # Duplicate conflict keys collapse to 3 rows -> two batches of at most 2
+        assert cursor.copy_expert.call_count == 2
+        merges = [sql for sql in statements if sql.startswith("INSERT INTO")]
+        assert len(merges) == 2
+        assert "ON CONFLICT (source_memory_id) DO UPDATE" in merges[0]
+        copied = "".join(c[0][1].getvalue() for c in cursor.copy_expert.call_args_list)
+        assert copied.count("\n") == 3
+        assert metrics.successful_writes == 4
+        pg_conn.commit.assert_not_called()
+
+    def test_full_cycle_runs_stages_concurrently(self, merge_service):
+        def stage(name):
+            def write(batch_id):
+                metrics = merge_service.processing_metrics[batch_id]
+                metrics.successful_writes = 10
+                metrics.finish()
+                return {"batch_id": batch_id, "status": "completed"}
+
+            return write
+
+        with patch.object(
+            merge_service, "write_processed_memories", side_effect=stage("m")
+        ), patch.object(
+            merge_service, "write_generated_insights", side_effect=stage("i")
+        ), patch.object(
+            merge_service, "write_memory_associations", side_effect=stage("a")
+        ), patch.object(
+            merge_service, "write_processing_metadata"
+        ) as write_metadata:
+            results = merge_service.run_full_writeback_cycle()
+
+        assert results["overall_status"] == "completed"
+        assert results["stages_completed"] == [
+            "processed_memories",
+            "generated_insights",
+            "memory_associations",
+        ]
+        assert set(results["rows_per_second"]) == set(results["stages_completed"])
+        assert write_metadata.call_count == 3
+
+    def test_failed_stage_does_not_block_the_others(self, merge_service):
+        with patch.object(
+            merge_service, "write_processed_memories", side_effect=RuntimeError("boom")
+        ), patch.object(
+            merge_service,
+            "write_generated_insights",
+            side_effect=lambda batch_id: {"batch_id": batch_id},
+        ), patch.object(
+            merge_service,
+            "write_memory_associations",
+            side_effect=lambda batch_id: {"batch_id": batch_id},
+        ), patch.object(
+            merge_service, "write_processing_metadata"
+        ):
+            with pytest.raises(RuntimeError, match="boom"):
+                merge_service.run_full_writeback_cycle()
+
+
 class TestIncrementalProcessor:
     """Test incremental processing logic"""
 
@@ -601,6 +700,192 @@ class TestIncrementalProcessor:
             abs(test_data[1][1] - 0.6) < 0.001
         )  # Second memory strength (floating point precision)
 
+    def test_incremental_batch_is_arrow_with_content_hash_digest(self, real_incremental_processor):
+        """Test watermark binding, Arrow batch data and the content-hash digest"""
+        import hashlib
+
+        import pyarrow as pa
+
+        processor = real_incremental_processor
+        processor.duckdb_conn.execute(
+            """
+            CREATE TABLE concept_associations (
+                source_concept TEXT,
+                target_concept TEXT,
+                association_strength FLOAT,
+                co_occurrence_count INTEGER,
+                semantic_similarity FLOAT,
+                association_quality TEXT,
+                last_updated_at TIMESTAMP
+            )
+        """
+        )
+        processor.duckdb_conn.execute(
+            """
+            INSERT INTO concept_associations VALUES
+                ('ai', 'python', 0.9, 4, 0.8, 'strong', '2025-01-01 12:00'),
+                ('ai', 'rust', 0.5, 2, 0.4, NULL, '2025-01-01 13:00'),
+                ('o''brien', 'go', 0.7, 1, 0.6, 'weak', '2025-01-01 09:00')
+        """
+        )
+
+        batch = processor.create_incremental_batch(
+            "memory_associations", since_timestamp=datetime(2025, 1, 1, 10, tzinfo=timezone.utc)
+        )
+
+        assert isinstance(batch.data, pa.Table)
+        assert batch.record_count == 2
+        assert batch.data.column("source_concept").to_pylist() == ["ai", "ai"]
+        assert batch.watermark_end == "2025-01-01T13:00:00"
+        hashes = batch.data.column("content_hash").to_pylist()
+        assert batch.batch_hash == hashlib.sha256("".join(hashes).encode()).hexdigest()
+
+        # A sliced column hashes only its own values
+        sliced = batch.data.slice(1)
+        assert content_hash_digest(sliced.column("content_hash")) == (
+            hashlib.sha256(hashes[1].encode()).hexdigest()
+        )
+
+        assert (
+            processor.create_incremental_batch(
+                "memory_associations", since_timestamp=datetime(2025, 1, 2, tzinfo=timezone.utc)
+            )
+            is None
+        )
+
+    def test_keyset_batches_drain_backlog_exactly_once(self, real_incremental_processor):
+        """Test keyset pagination over (timestamp, key) with ties across batch boundaries"""
+        processor = real_incremental_processor
+        processor.duckdb_conn.execute(
+            """
+            CREATE TABLE mvp_memory_insights (
+                memory_id TEXT,
+                content TEXT,
+                suggested_tags TEXT[],
+                related_memories TEXT[],
+                connection_count INTEGER,
+                created_at TIMESTAMP
+            )
+        """
+        )
+        # Five rows share one timestamp so every page boundary falls inside a tie
+        processor.duckdb_conn.execute(
+            """
+            INSERT INTO mvp_memory_insights
+            SELECT 'm' || i, 'insight ' || i, ['tag'], [], i,
+                   TIMESTAMP '2025-01-01 12:00' + INTERVAL (i // 5) HOUR
+            FROM range(7) t(i)
+        """
+        )
+        since = datetime(2025, 1, 1, tzinfo=timezone.utc)
+
+        batches = list(
+            processor.iter_incremental_batches("generated_insights", since, batch_records=2)
+        )
+
+        ids = [mid for batch in batches for mid in batch.data.column("memory_id").to_pylist()]
+        assert ids == [f"m{i}" for i in range(7)]
+        assert [batch.record_count for batch in batches] == [2, 2, 2, 1]
+        state = processor.get_processing_state("generated_insights")
+        assert state.watermark_key == (datetime(2025, 1, 1, 13), "m6")
+
+        # Resuming from state only picks up rows after the stored key
+        processor.duckdb_conn.execute(
+            "INSERT INTO mvp_memory_insights VALUES "
+            "('m5', 'late', [], [], 0, '2025-01-01 13:00'), "
+            "('m7', 'new', [], [], 0, '2025-01-01 13:00')"
+        )
+        resumed = list(processor.iter_incremental_batches("generated_insights"))
+        assert [batch.data.column("memory_id").to_pylist() for batch in resumed] == [["m7"]]
+
+    def test_keyset_state_not_committed_when_consumer_fails(self, real_incremental_processor):
+        """Test that a batch whose processing raised does not advance the watermark"""
+        processor = real_incremental_processor
+        processor.duckdb_conn.execute(
+            """
+            CREATE TABLE concept_associations AS
+            SELECT 'a' || i AS source_concept, 'b' AS target_concept,
+                   0.5 AS association_strength, 1 AS co_occurrence_count,
+                   0.5 AS semantic_similarity, 'weak' AS association_quality,
+                   TIMESTAMP '2025-01-01 12:00' + INTERVAL (i) MINUTE AS last_updated_at
+            FROM range(4) t(i)
+        """
+        )
+        since = datetime(2025, 1, 1, tzinfo=timezone.utc)
+
+        with pytest.raises(RuntimeError):
+            for batch in processor.iter_incremental_batches(
+                "memory_associations", since, batch_records=2
+            ):
+                if batch.watermark_key[1] == "a3":
+                    raise RuntimeError("write failed")
+
+        assert processor.processing_states["memory_associations"].watermark_key == (
+            datetime(2025, 1, 1, 12, 1),
+            "a1",
+            "b",
+        )
+
+    def test_keyset_watermark_survives_restart(self, real_incremental_processor):
+        """Test that the keyset position is persisted and loaded back from PostgreSQL"""
+        processor = real_incremental_processor
+        processor.duckdb_conn.execute(
+            """
+            CREATE TABLE mvp_memory_insights AS
+            SELECT 'm' || i AS memory_id, 'insight ' || i AS content, ['tag'] AS suggested_tags,
+                   []::TEXT[] AS related_memories, i AS connection_count,
+                   TIMESTAMP '2025-01-01 12:00' AS created_at
+            FROM range(4) t(i)
+        """
+        )
+        stored = {}
+
+        def fake_pg_connection() -> contextlib.AbstractContextManager:
+            conn = MagicMock()
+            cursor = conn.cursor.return_value.__enter__.return_value
+
+            def execute(sql: str, params: tuple = ()) -> None:
+                if "INSERT INTO codex_processed.incremental_watermarks" in sql:
+                    stage, end, key, batch_id, records = params
+                    stored[stage] = {
+                        "processing_stage": stage,
+                        "watermark_end": end,
+                        "watermark_key": key,
+                        "batch_id": batch_id,
+                        "records_processed": records,
+                    }
+                elif "FROM codex_processed.incremental_watermarks" in sql:
+                    cursor.fetchone.return_value = stored.get(params[0])
+
+            cursor.execute.side_effect = execute
+            return contextlib.nullcontext(conn)
+
+        since = datetime(2025, 1, 1, tzinfo=timezone.utc)
+        with patch.object(processor, "_get_pg_connection", fake_pg_connection):
+            first = list(
+                processor.iter_incremental_batches("generated_insights", since, batch_records=3)
+            )
+            assert [batch.record_count for batch in first] == [3, 1]
+            assert json.loads(stored["generated_insights"]["watermark_key"]) == [
+                "2025-01-01T12:00:00",
+                "m3",
+            ]
+
+            # A fresh process has no in-memory state and must resume inside the tie
+            processor.processing_states.clear()
+            processor.duckdb_conn.execute(
+                "INSERT INTO mvp_memory_insights VALUES "
+                "('m1', 'late', [], [], 0, '2025-01-01 12:00'), "
+                "('m4', 'new', [], [], 0, '2025-01-01 12:00')"
+            )
+            resumed = list(processor.iter_incremental_batches("generated_insights"))
+
+        assert [batch.data.column("memory_id").to_pylist() for batch in resumed] == [["m4"]]
+        assert processor.processing_states["generated_insights"].watermark_key == (
+            datetime(2025, 1, 1, 12),
+            "m4",
+        )
+
     def test_change_detection(self, real_incremental_processor):
         """Test change detection logic with REAL data"""
         processor = real_incremental_processor
@@ -19,9 +19,12 @@ import json
 import logging
 import os
 import shutil
+import subprocess
+import sys
 
 # Set up path for imports
 import tempfile
+import threading
 import time
 import unittest
 from pathlib import Path
@@ -33,6 +36,7 @@ from src.services import llm_integration_service
 from src.services.llm_integration_service import LLMIntegrationService as OllamaLLMService
 from src.services.llm_integration_service import (
     LLMResponse,
+    LLMResponseCache,
     initialize_llm_service,
     llm_generate_embedding,
     llm_generate_json,
@@ -238,6 +242,90 @@ class TestLLMUDFFunctionIntegration(unittest.TestCase):
                 )
 
 
+class TestVectorizedLLMUDFs(unittest.TestCase):
+    """Test Arrow-vectorized UDFs batch and deduplicate whole column chunks"""
+
+    def setUp(self):
+        """Initialize a service whose HTTP calls are mocked per test"""
+        if llm_integration_service.pa is None:
+            self.skipTest("pyarrow not installed; scalar UDFs are registered instead")
+        self.service = initialize_llm_service(
+            base_url=os.getenv("OLLAMA_URL", "http://localhost:11434"),
+            model_name="gpt-oss:20b",
+        )
+
+    @patch("requests.Session.post")
+    def test_embedding_udf_dedupes_and_returns_fixed_array(self, mock_post):
+        """Duplicate texts in a chunk share one batched /api/embed request"""
+
+        def embed_response(url, json=None, timeout=None):
+            response = Mock()
+            response.raise_for_status.return_value = None
+            response.json.return_value = {
+                "embeddings": [[float(len(text))] * 768 for text in json["input"]]
+            }
+            return response
+
+        mock_post.side_effect = embed_response
+
+        with duckdb.connect(":memory:") as conn:
+            register_llm_functions(conn)
+            conn.execute(
+                """
+                CREATE TABLE memory_content AS
+                SELECT * FROM (VALUES (1, 'aa'), (2, 'bbb'), (3, 'aa'), (4, NULL)) t(id, text)
+            """
+            )
+            rows = conn.execute(
+                """
+                SELECT id, llm_generate_embedding(text, 'nomic-embed-text', 768) AS embedding,
+                       typeof(llm_generate_embedding(text, 'nomic-embed-text', 768)) AS type
+                FROM memory_content ORDER BY id
+            """
+            ).fetchall()
+
+        self.assertEqual(rows[0][2], "FLOAT[768]")
+        self.assertEqual(rows[0][1][0], 2.0)
+        self.assertEqual(rows[1][1][0], 3.0)
+        self.assertEqual(rows[2][1], rows[0][1])
+        self.assertIsNone(rows[3][1])
+        embed_inputs = [c.kwargs["json"]["input"] for c in mock_post.call_args_list]
+        self.assertTrue(all(sorted(batch) == ["aa", "bbb"] for batch in embed_inputs))
+
+    @patch("requests.Session.post")
+    def test_batch_embeddings_use_configured_model(self, mock_post):
+        """generate_embeddings sends EMBEDDING_MODEL rather than a fixed model name"""
+        mock_response = Mock()
+        mock_response.raise_for_status.return_value = None
+        mock_response.json.return_value = {"embeddings": [[0.5] * 768]}
+        mock_post.return_value = mock_response
+
+        with patch.dict(os.environ, {"EMBEDDING_MODEL": "mxbai-embed-large"}):
+            service = OllamaLLMService()
+        service.generate_embeddings(["text"])
+
+        self.assertEqual(mock_post.call_args.kwargs["json"]["model"], "mxbai-embed-large")
+
+    @patch("requests.Session.post")
+    def test_generate_udf_calls_once_per_distinct_prompt(self, mock_post):
+        """Repeated prompts in a chunk are generated once and fanned back out"""
+        mock_response = Mock()
+        mock_response.raise_for_status.return_value = None
+        mock_response.json.return_value = {"response": "insight"}
+        mock_post.return_value = mock_response
+
+        with duckdb.connect(":memory:") as conn:
+            register_llm_functions(conn)
+            rows = conn.execute(
+                """
+                SELECT llm_generate(p) FROM (VALUES ('same'), ('same'), ('other'), ('same')) t(p)
+            """
+            ).fetchall()
+
+        self.assertEqual([r[0] for r in rows], ["insight"] * 4)
+        self.assertEqual(mock_post.call_count, 2)
+
+
 class TestErrorHandlingAndFallbacks(unittest.TestCase):
     """Test comprehensive error handling and fallback mechanisms"""
 
@@ -360,8 +448,8 @@ class TestCachingSystemPerformance(unittest.TestCase):
             "Extract goal from: Working on project plan",  # Duplicate
         ]
 
-        for prompt in test_prompts:
-            service.generate_response(prompt)
+        for test_prompt in test_prompts:
+            service.generate_response(test_prompt)
 
         metrics = service.get_metrics()
 
@@ -398,6 +486,149 @@ class TestCachingSystemPerformance(unittest.TestCase):
         self.assertLess(cache_time, 50.0)  # Should be very fast (< 50ms)
 
 
+class TestBoundedPersistentResponseCache(unittest.TestCase):
+    """Test LRU/TTL bounds and the DuckDB-backed persistent cache tier"""
+
+    def setUp(self):
+        """Create a scratch directory for the persistent cache"""
+        self.test_dir = Path(tempfile.mkdtemp())
+        self.cache_db_path = str(self.test_dir / "test_llm_cache.duckdb")
+
+    def tearDown(self):
+        """Clean up test directory"""
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+
+    def _response(self, content: str) -> LLMResponse:
+        return LLMResponse(content=content, model="gpt-oss:20b", latency_ms=10)
+
+    def test_lru_eviction_by_entry_count(self):
+        """Least recently used entries are evicted first"""
+        cache = LLMResponseCache(max_entries=2)
+        cache.put("a", self._response("A"))
+        cache.put("b", self._response("B"))
+        cache.get("a")  # "b" becomes least recently used
+        cache.put("c", self._response("C"))
+
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("a").content, "A")
+        self.assertEqual(cache.get_stats()["cache_evictions"], 1)
+
+    def test_byte_budget_and_ttl(self):
+        """Entries are bounded by bytes and expire after the TTL"""
+        cache = LLMResponseCache(max_bytes=400, ttl_seconds=60)
+        cache.put("a", self._response("x" * 200))
+        cache.put("b", self._response("y" * 200))
+
+        stats = cache.get_stats()
+        self.assertLessEqual(stats["cache_bytes"], 400)
+        self.assertEqual(stats["cache_entries"], 1)
+
+        with patch(
+            "src.services.llm_integration_service.time.time", return_value=time.time() + 120
+        ):
+            self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get_stats()["cache_expirations"], 1)
+
+    def test_persistent_tier_survives_restart(self):
+        """A new service instance is warmed from cache_db_path"""
+        service = OllamaLLMService(cache_db_path=self.cache_db_path)
+        prompt_hash = service._generate_prompt_hash("persisted prompt", service.model)
+        service._cache_response(prompt_hash, "persisted prompt", self._response("kept"))
+        service.response_cache.close()
+
+        restarted = OllamaLLMService(cache_db_path=self.cache_db_path)
+        cached = restarted._get_cached_response(prompt_hash)
+
+        self.assertIsNotNone(cached)
+        self.assertTrue(cached.cached)
+        self.assertEqual(cached.content, "kept")
+        metrics = restarted.get_metrics()
+        self.assertEqual(metrics["cache_entries"], 1)
+        self.assertGreater(metrics["cache_bytes"], 0)
+        self.assertIn("cache_evictions", metrics)
+        restarted.response_cache.close()
+
+    def test_hits_refresh_last_accessed(self):
+        """Hits are written back to the persistent tier so warm-up keeps hot entries"""
+        cache = LLMResponseCache(db_path=self.cache_db_path)
+        cache.put("a", self._response("A"))
+        cache.put("b", self._response("B"))
+        with patch("src.services.llm_integration_service.time.time", return_value=time.time() + 30):
+            cache.get("a")
+        cache.close()
+
+        restarted = LLMResponseCache(db_path=self.cache_db_path, max_entries=1)
+        self.assertEqual(restarted.get("a").content, "A")
+        self.assertEqual(restarted.get_stats()["cache_persistent_hits"], 0)
+        restarted.close()
+
+    def test_put_prunes_persistent_tier(self):
+        """Expired rows and rows past max_persistent_entries are dropped on put"""
+        cache = LLMResponseCache(
+            db_path=self.cache_db_path, max_entries=1, max_persistent_entries=3, ttl_seconds=60
+        )
+        with patch("src.services.llm_integration_service.CACHE_PRUNE_INTERVAL", 1):
+            with patch(
+                "src.services.llm_integration_service.time.time", return_value=time.time() - 120
+            ):
+                cache.put("expired", self._response("old"))
+            for key in ["a", "b", "c", "d"]:
+                cache.put(key, self._response(key.upper()))
+
+            rows = cache._conn.execute(
+                "SELECT prompt_hash FROM llm_response_cache ORDER BY prompt_hash"
+            ).fetchall()
+        self.assertEqual([row[0] for row in rows], ["b", "c", "d"])
+        cache.close()
+
+    def test_identical_concurrent_prompts_coalesce(self):
+        """Concurrent cache misses for one prompt make a single Ollama call"""
+        service = OllamaLLMService()
+        calls = []
+
+        def slow_call(prompt):
+            calls.append(prompt)
+            time.sleep(0.2)
+            return self._response("shared")
+
+        responses = []
+        with patch.object(service, "_call_ollama_api", side_effect=slow_call):
+            threads = [
+                threading.Thread(
+                    target=lambda: responses.append(service.generate_response("same prompt"))
+                )
+                for _ in range(4)
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        self.assertEqual(calls, ["same prompt"])
+        self.assertEqual([r.content for r in responses], ["shared"] * 4)
+        metrics = service.get_metrics()
+        self.assertEqual(metrics["coalesced_requests"], 3)
+        self.assertEqual(metrics["in_flight_requests"], 0)
+
+    def test_service_import_has_no_side_effects(self):
+        """Importing the service neither configures root logging nor creates cache files"""
+        repo_root = Path(__file__).resolve().parents[2]
+        check = (
+            "import logging, os\n"
+            "from src.services.llm_integration_service import LLMIntegrationService\n"
+            "assert not logging.getLogger().handlers, logging.getLogger().handlers\n"
+            "assert os.listdir('.') == [], os.listdir('.')\n"
+        )
+        result = subprocess.run(
+            [sys.executable, "-c", check],
+            cwd=self.test_dir,
+            env={**os.environ, "PYTHONPATH": str(repo_root)},
+            capture_output=True,
+            text=True,
+        )
+        self.assertEqual(result.returncode, 0, result.stderr)
+
+
 class TestBiologicalMemoryPipelineIntegration(unittest.TestCase):
     """Test integration with biological memory pipeline models"""
 
@@ -35,14 +35,21 @@ class TestWorkingMemoryConfiguration:
             / "wm_active_context.sql"
         )
 
+    @pytest.fixture
+    def ring_buffer_model_path(self):
+        """Path to the ring buffer model that scores and ranks working memory"""
+        return (
+            project_root / "biological_memory" / "models" / "working_memory" / "wm_ring_buffer.sql"
+        )
+
     @pytest.fixture
     def dbt_project_path(self):
         """Path to dbt project configuration"""
         return project_root / "biological_memory" / "dbt_project.yml"
 
-    def test_previous_strength_field_reference_fixed(self, working_memory_model_path):
+    def test_previous_strength_field_reference_fixed(self, ring_buffer_model_path):
         """Test that previous_strength field reference has been removed/fixed"""
-        with open(working_memory_model_path, "r") as f:
+        with open(ring_buffer_model_path, "r") as f:
             content = f.read()
 
         # Should NOT contain references to undefined previous_strength field
@@ -60,7 +67,9 @@ class TestWorkingMemoryConfiguration:
             "activation_strength" in content
         ), "Working memory model should use activation_strength for calculations"
 
-    def test_working_memory_capacity_constraint(self, working_memory_model_path, dbt_project_path):
+    def test_working_memory_capacity_constraint(
+        self, working_memory_model_path, ring_buffer_model_path, dbt_project_path
+    ):
         """Test that Miller's 7±2 capacity constraint is properly implemented"""
 
         # Check dbt_project.yml has correct capacity setting
@@ -72,17 +81,23 @@ class TestWorkingMemoryConfiguration:
             "working_memory_capacity: 7" in dbt_content
         ), "dbt_project.yml should set working_memory_capacity to 7"
 
-        # Check working memory model uses the capacity variable
+        # Check working memory models use the capacity variable
         with open(working_memory_model_path, "r") as f:
             wm_content = f.read()
+        with open(ring_buffer_model_path, "r") as f:
+            ring_buffer_content = f.read()
 
         assert (
             "{{ var('working_memory_capacity') }}" in wm_content
         ), "Working memory model should reference working_memory_capacity variable"
 
+        assert (
+            "{{ var('working_memory_capacity') }}" in ring_buffer_content
+        ), "Ring buffer should reference working_memory_capacity variable"
+
         # Should limit results based on capacity
         assert (
-            "memory_rank" in wm_content and "<=" in wm_content
+            "memory_rank" in ring_buffer_content and "<=" in wm_content
         ), "Working memory model should limit results by memory_rank"
 
     def test_materialization_configuration(self, dbt_project_path, working_memory_model_path):
@@ -139,10 +154,10 @@ class TestWorkingMemoryConfiguration:
             if stripped.endswith("previous_strength,"):
                 pytest.fail(f"Line {i}: Found reference to undefined previous_strength field")
 
-    def test_biological_accuracy_preserved(self, working_memory_model_path):
+    def test_biological_accuracy_preserved(self, ring_buffer_model_path):
         """Test that biological accuracy is preserved after fixes"""
 
-        with open(working_memory_model_path, "r") as f:
+        with open(ring_buffer_model_path, "r") as f:
             content = f.read()
 
         # Should maintain Hebbian learning calculation
@@ -161,10 +176,21 @@ class TestWorkingMemoryConfiguration:
             "recency_score" in content and "frequency_score" in content
         ), "Should preserve recency and frequency scoring"
 
-    def test_null_safety_preserved(self, working_memory_model_path):
+    def test_late_arrivals_are_not_skipped(self, ring_buffer_model_path):
+        """Arrivals are found by anti-join, not a MAX(timestamp) watermark"""
+
+        with open(ring_buffer_model_path, "r") as f:
+            content = f.read()
+
+        # A memory landing after the newest buffered one with an equal or earlier
+        # timestamp would never pass a timestamp watermark
+        assert "MAX(timestamp)" not in content
+        assert "id NOT IN (SELECT memory_id FROM {{ this }})" in content
+
+    def test_null_safety_preserved(self, ring_buffer_model_path):
         """Test that NULL safety patterns are preserved"""
 
-        with open(working_memory_model_path, "r") as f:
+        with open(ring_buffer_model_path, "r") as f:
             content = f.read()
 
         # Should use COALESCE for NULL safety
@@ -0,0 +1,295 @@
+"""
+Offline embedding and LLM throughput benchmarks against the local Ollama stand-in.
+
+Each benchmark drives a real client (generate_embedding, generate_embeddings,
+BatchEmbeddingGenerator, LLMIntegrationService, PostgresTagEmbeddingProcessor)
+against tests.fixtures.ollama_stub and reports:
+- embeddings (or responses) per second
+- p50 / p99 per-call latency
+- cache hit rate and requests seen by the server
+
+Set EMBEDDING_BENCHMARK_OUTPUT=<path.jsonl> to append each report as JSON.
+Tune the workload with EMBEDDING_BENCHMARK_TEXTS and EMBEDDING_BENCHMARK_LATENCY_MS.
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+from unittest.mock import MagicMock, patch
+
+import numpy as np
+import pytest
+
+BIOLOGICAL_MEMORY_DIR = Path(__file__).parent.parent.parent / "biological_memory"
+sys.path.append(str(BIOLOGICAL_MEMORY_DIR / "macros"))
+sys.path.append(str(BIOLOGICAL_MEMORY_DIR / "scripts"))
+
+import ollama_embeddings  # noqa: E402
+
+BENCHMARK_TEXTS = int(os.getenv("EMBEDDING_BENCHMARK_TEXTS", "256"))
+BENCHMARK_LATENCY_MS = float(os.getenv("EMBEDDING_BENCHMARK_LATENCY_MS", "2"))
+BENCHMARK_OUTPUT = os.getenv("EMBEDDING_BENCHMARK_OUTPUT")
+
+
+class ThroughputReport:
+    """Collects per-call latencies and derives the benchmark summary"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.latencies: List[float] = []
+        self.items = 0
+        self.cache_hits = 0
+        self.lookups = 0
+        self.elapsed = 0.0
+        self.server_requests = 0
+
+    def timed(self, fn: Callable, *args, items: int = 1):
+        start = time.perf_counter()
+        result = fn(*args)
+        self.latencies.append(time.perf_counter() - start)
+        self.items += items
+        return result
+
+    def summary(self) -> Dict[str, float]:
+        latencies_ms = np.array(self.latencies) * 1000 if self.latencies else np.zeros(1)
+        return {
+            "benchmark": self.name,
+            "items": self.items,
+            "items_per_second": self.items / self.elapsed if self.elapsed > 0 else 0.0,
+            "p50_ms": float(np.percentile(latencies_ms, 50)),
+            "p99_ms": float(np.percentile(latencies_ms, 99)),
+            "cache_hit_rate": self.cache_hits / self.lookups if self.lookups else 0.0,
+            "server_requests": self.server_requests,
+        }
+
+    def emit(self) -> Dict[str, float]:
+        summary = self.summary()
+        print(
+            f"\n[{summary['benchmark']}] {summary['items_per_second']:.1f} items/s, "
+            f"p50 {summary['p50_ms']:.2f}ms, p99 {summary['p99_ms']:.2f}ms, "
+            f"cache hit rate {summary['cache_hit_rate']:.0%}, "
+            f"{summary['server_requests']} server requests"
+        )
+        if BENCHMARK_OUTPUT:
+            with open(BENCHMARK_OUTPUT, "a") as f:
+                f.write(json.dumps({**summary, "timestamp": time.time()}) + "\n")
+        return summary
+
+
+def _texts(count: int, duplicate_every: int = 0) -> List[str]:
+    """Benchmark corpus; every Nth text repeats an earlier one when duplicate_every > 0"""
+    texts = []
+    for i in range(count):
+        if duplicate_every and i and i % duplicate_every == 0:
+            texts.append(texts[i // 2])
+        else:
+            texts.append(f"Memory {i}: reviewed the consolidation backlog and tagged item {i}")
+    return texts
+
+
+@pytest.fixture
+def stub_embeddings(ollama_stub, tmp_path, monkeypatch):
+    """Point ollama_embeddings at the stand-in with a fresh on-disk cache"""
+    ollama_stub.configure(latency_ms=BENCHMARK_LATENCY_MS)
+    monkeypatch.setattr(ollama_embeddings, "OLLAMA_URL", ollama_stub.url)
+    monkeypatch.setattr(ollama_embeddings, "cache", ollama_embeddings.EmbeddingCache(tmp_path))
+    monkeypatch.setattr(ollama_embeddings, "embedding_flights", ollama_embeddings.SingleFlight())
+    return ollama_stub
+
+
+@pytest.mark.performance
+@pytest.mark.embedding
+class TestEmbeddingThroughput:
+    """Embedding client throughput against the stand-in server"""
+
+    def test_single_text_cold_and_warm(self, stub_embeddings):
+        """generate_embedding: one request per text cold, none once cached"""
+        texts = _texts(BENCHMARK_TEXTS)
+
+        cold = ThroughputReport("generate_embedding.cold")
+        start = time.perf_counter()
+        for text in texts:
+            assert cold.timed(ollama_embeddings.generate_embedding, text) is not None
+        cold.elapsed = time.perf_counter() - start
+        cold.lookups = len(texts)
+        cold.server_requests = stub_embeddings.stats()["requests"]
+        cold.emit()
+
+        stub_embeddings.reset_stats()
+        warm = ThroughputReport("generate_embedding.warm")
+        start = time.perf_counter()
+        for text in texts:
+            warm.timed(ollama_embeddings.generate_embedding, text)
+        warm.elapsed = time.perf_counter() - start
+        warm.lookups = warm.cache_hits = len(texts)
+        warm.server_requests = stub_embeddings.stats()["requests"]
+        summary = warm.emit()
+
+        assert cold.server_requests == len(texts)
+        assert summary["server_requests"] == 0
+        assert summary["items_per_second"] > cold.summary()["items_per_second"]
+
+    def test_batched_embeddings(self, stub_embeddings):
+        """generate_embeddings: packed /api/embed requests, duplicates embedded once"""
+        texts = _texts(BENCHMARK_TEXTS, duplicate_every=5)
+        unique = len(set(texts))
+
+        report = ThroughputReport("generate_embeddings.batched")
+        start = time.perf_counter()
+        vectors = report.timed(ollama_embeddings.generate_embeddings, texts, items=len(texts))
+        report.elapsed = time.perf_counter() - start
+        stats = stub_embeddings.stats()
+        report.server_requests = stats["requests"]
+        report.lookups = len(texts)
+        report.cache_hits = len(texts) - stats["inputs_embedded"]
+        report.emit()
+
+        assert all(v is not None and len(v) == 768 for v in vectors)
+        assert stats["inputs_embedded"] == unique
+        assert stats["requests"] < unique
+
+    def test_concurrent_duplicate_burst(self, stub_embeddings):
+        """Concurrent identical requests are coalesced onto one server call"""
+        stub_embeddings.configure(latency_ms=max(BENCHMARK_LATENCY_MS, 50))
+        report = ThroughputReport("generate_embedding.burst")
+        lock = threading.Lock()
+
+        def call(text):
+            start = time.perf_counter()
+            result = ollama_embeddings.generate_embedding(text)
+            with lock:
+                report.latencies.append(time.perf_counter() - start)
+                report.items += 1
+            return result
+
+        texts = ["repeated template prompt"] * 16 + ["second template"] * 16
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=16) as pool:
+            results = list(pool.map(call, texts))
+        report.elapsed = time.perf_counter() - start
+        report.server_requests = stub_embeddings.stats()["requests"]
+        report.emit()
+
+        assert all(r is not None for r in results)
+        # Waiters share the leader's call; late arrivals are served from the cache
+        assert 2 <= report.server_requests < len(texts) // 4
+
+    def test_recovers_from_503_bursts(self, stub_embeddings):
+        """Retries ride out injected 503 bursts without losing embeddings"""
+        stub_embeddings.configure(unavailable_every=8, unavailable_burst=2)
+        texts = _texts(32)
+
+        report = ThroughputReport("generate_embedding.503_bursts")
+        with patch.object(ollama_embeddings.time, "sleep"):
+            start = time.perf_counter()
+            results = [report.timed(ollama_embeddings.generate_embedding, t) for t in texts]
+            report.elapsed = time.perf_counter() - start
+        stats = stub_embeddings.stats()
+        report.server_requests = stats["requests"]
+        report.emit()
+
+        assert all(r is not None for r in results)
+        assert stats["by_status"].get(503, 0) > 0
+
+    def test_tag_embedding_processor(self, stub_embeddings):
+        """PostgresTagEmbeddingProcessor batch against a mocked PostgreSQL"""
+        import generate_tag_embeddings_postgres
+        from generate_tag_embeddings_postgres import PostgresTagEmbeddingProcessor
+
+        with patch.object(
+            PostgresTagEmbeddingProcessor, "_connect_postgres", return_value=MagicMock()
+        ):
+            processor = PostgresTagEmbeddingProcessor(batch_size=64)
+
+        memories = [(f"id-{i}", [f"tag{i % 16}", f"topic{i % 4}"]) for i in range(BENCHMARK_TEXTS)]
+        report = ThroughputReport("PostgresTagEmbeddingProcessor.batch")
+        start = time.perf_counter()
+        # execute_values renders SQL through a real connection's encoding
+        with patch.object(generate_tag_embeddings_postgres.psycopg2.extras, "execute_values"):
+            for i in range(0, len(memories), processor.batch_size):
+                batch = memories[i : i + processor.batch_size]
+                success, errors = report.timed(
+                    processor.process_tag_embedding_batch, batch, items=len(batch)
+                )
+                assert errors == 0
+        report.elapsed = time.perf_counter() - start
+        stats = stub_embeddings.stats()
+        report.server_requests = stats["requests"]
+        report.lookups = len(memories)
+        report.cache_hits = len(memories) - stats["inputs_embedded"]
+        summary = report.emit()
+
+        assert summary["items"] == len(memories)
+        assert stats["inputs_embedded"] <= 16  # Distinct tag sets only
+
+
+@pytest.mark.performance
+@pytest.mark.llm
+class TestLLMThroughput:
+    """LLMIntegrationService throughput against the stand-in server"""
+
+    def test_generate_response_with_repeated_prompts(self, ollama_stub):
+        from src.services.llm_integration_service import LLMIntegrationService
+
+        ollama_stub.configure(latency_ms=BENCHMARK_LATENCY_MS)
+        service = LLMIntegrationService(base_url=ollama_stub.url, model="gpt-oss:20b")
+        prompts = [f"Summarize memory cluster {i % 32}" for i in range(BENCHMARK_TEXTS)]
+
+        report = ThroughputReport("LLMIntegrationService.generate_response")
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            responses = list(
+                pool.map(lambda p: report.timed(service.generate_response, p), prompts)
+            )
+        report.elapsed = time.perf_counter() - start
+        metrics = service.get_metrics()
+        report.lookups = metrics["cache_hits"] + metrics["cache_misses"]
+        report.cache_hits = metrics["cache_hits"] + metrics["coalesced_requests"]
+        report.server_requests = ollama_stub.stats()["requests"]
+        report.emit()
+
+        assert all(r.content.startswith("Stub insight") for r in responses)
+        assert 32 <= report.server_requests < len(prompts) // 2
+
+
+@pytest.mark.performance
+@pytest.mark.embedding
+def test_batch_embedding_generator(ollama_stub, monkeypatch):
+    """BatchEmbeddingGenerator (aiohttp + redis) against the stand-in server"""
+    pytest.importorskip("aiohttp")
+    pytest.importorskip("redis")
+    monkeypatch.setenv("POSTGRES_DB_URL", os.getenv("POSTGRES_DB_URL", "postgresql://stub/db"))
+    import asyncio
+
+    import batch_embedding_generator as beg
+
+    ollama_stub.configure(latency_ms=BENCHMARK_LATENCY_MS)
+    monkeypatch.setattr(beg, "OLLAMA_URL", ollama_stub.url)
+    requests = [
+        beg.EmbeddingRequest(text_id=f"id-{i}", text=text)
+        for i, text in enumerate(_texts(BENCHMARK_TEXTS, duplicate_every=4))
+    ]
+
+    async def run() -> Optional[List]:
+        async with beg.BatchEmbeddingGenerator() as generator:
+            generator.cache = MagicMock()
+            generator.cache.get_batch = MagicMock(return_value=asyncio.sleep(0, result={}))
+            generator.cache.set_batch = MagicMock(return_value=asyncio.sleep(0))
+            return await generator.generate_embedding_batch(requests), generator
+
+    report = ThroughputReport("BatchEmbeddingGenerator.generate_embedding_batch")
+    start = time.perf_counter()
+    results, generator = asyncio.run(run())
+    report.elapsed = time.perf_counter() - start
+    report.items = len(results)
+    report.latencies = [r.processing_time_ms / 1000 for r in results]
+    report.server_requests = ollama_stub.stats()["requests"]
+    report.emit()
+
+    assert all(r.embedding is not None for r in results)
+    assert generator.get_performance_stats()["coalesced_requests"] > 0
@@ -0,0 +1,147 @@
+"""
+Benchmark for the semantic_network k-NN stage: DuckDB vss HNSW index join vs brute force
+
+The query mirrors the memory_pairs CTE in models/semantic/semantic_network.sql. Without an
+index DuckDB evaluates the lateral ORDER BY ... LIMIT k as a nested loop over every pair;
+with the HNSW index on final_embedding the optimizer rewrites it into an index join.
+
+The benchmark defaults to a CI-sized 2k memories; larger runs are opt-in with
+HNSW_BENCHMARK_SIZES (comma separated, e.g. 10000,100000,1000000; 1M needs ~3GB for the
+vectors alone). Brute force is timed on a sample of query memories and
+extrapolated, since the full 1M x 1M plan does not finish in reasonable time.
+"""
+
+import logging
+import os
+import time
+from typing import Dict, Generator
+
+import duckdb
+import numpy as np
+import pyarrow as pa
+import pytest
+
+DIMENSIONS = 768
+K = 10
+
+BENCHMARK_SIZES = [int(size) for size in os.getenv("HNSW_BENCHMARK_SIZES", "2000").split(",")]
+BRUTE_FORCE_SAMPLE = 200
+
+KNN_SQL = f"""
+SELECT
+    m1.memory_id as memory_id_1,
+    neighbor.memory_id as memory_id_2,
+    (1 - array_cosine_distance(m1.final_embedding, neighbor.final_embedding)) as similarity
+FROM {{queries}} m1
+CROSS JOIN LATERAL (
+    SELECT memory_id, final_embedding
+    FROM memory_embeddings m2
+    ORDER BY array_cosine_distance(m1.final_embedding, m2.final_embedding)
+    LIMIT {K + 1}
+) neighbor
+WHERE neighbor.memory_id != m1.memory_id
+"""
+
+CREATE_INDEX_SQL = """
+CREATE INDEX idx_memory_embeddings_final_embedding_hnsw
+ON memory_embeddings USING HNSW (final_embedding)
+WITH (metric = 'cosine', ef_construction = 128, M = 16)
+"""
+
+
+@pytest.fixture
+def vss_conn() -> Generator[duckdb.DuckDBPyConnection, None, None]:
+    """In-memory DuckDB with the vss extension loaded"""
+    conn = duckdb.connect(":memory:")
+    try:
+        conn.execute("INSTALL vss")
+        conn.execute("LOAD vss")
+    except duckdb.Error as e:
+        conn.close()
+        pytest.skip(f"DuckDB vss extension not available: {e}")
+    yield conn
+    conn.close()
+
+
+def load_embeddings(conn: duckdb.DuckDBPyConnection, count: int, seed: int = 42) -> None:
+    """Clustered unit vectors as memory_embeddings(memory_id, final_embedding FLOAT[768])"""
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((max(count // 100, 1), DIMENSIONS)).astype(np.float32)
+    vectors = centers[rng.integers(0, len(centers), count)]
+    vectors += 0.5 * rng.standard_normal((count, DIMENSIONS)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+
+    table = pa.table(
+        {
+            "memory_id": pa.array([f"m{i:07d}" for i in range(count)]),
+            "final_embedding": pa.FixedSizeListArray.from_arrays(
+                pa.array(vectors.ravel()), DIMENSIONS
+            ),
+        }
+    )
+    conn.register("embeddings_arrow", table)
+    conn.execute("CREATE TABLE memory_embeddings AS SELECT * FROM embeddings_arrow")
+    conn.unregister("embeddings_arrow")
+
+
+def knn_pairs(conn: duckdb.DuckDBPyConnection, queries: str) -> Dict[str, set]:
+    """Neighbour id sets per query memory"""
+    pairs: Dict[str, set] = {}
+    for memory_id_1, memory_id_2, _ in conn.execute(KNN_SQL.format(queries=queries)).fetchall():
+        pairs.setdefault(memory_id_1, set()).add(memory_id_2)
+    return pairs
+
+
+class TestHnswKnnPlan:
+    """The HNSW plan is used and agrees with brute force"""
+
+    def test_index_join_is_planned(self, vss_conn):
+        load_embeddings(vss_conn, 2000)
+        vss_conn.execute(CREATE_INDEX_SQL)
+
+        plan = vss_conn.execute("EXPLAIN " + KNN_SQL.format(queries="memory_embeddings")).fetchall()
+
+        assert "HNSW" in str(plan)
+
+    def test_recall_against_brute_force(self, vss_conn):
+        load_embeddings(vss_conn, 2000)
+        exact = knn_pairs(vss_conn, "memory_embeddings")
+
+        vss_conn.execute(CREATE_INDEX_SQL)
+        approximate = knn_pairs(vss_conn, "memory_embeddings")
+
+        hits = sum(len(exact[memory_id] & approximate.get(memory_id, set())) for memory_id in exact)
+        recall = hits / sum(len(neighbours) for neighbours in exact.values())
+        assert recall >= 0.9, f"HNSW recall {recall:.3f} below 0.9"
+
+
+@pytest.mark.performance
+@pytest.mark.slow
+@pytest.mark.parametrize("memory_count", BENCHMARK_SIZES)
+def test_hnsw_vs_brute_force_benchmark(vss_conn, memory_count):
+    """Time the full k-NN stage with the index against a sampled brute-force estimate"""
+    load_embeddings(vss_conn, memory_count)
+    sample = min(BRUTE_FORCE_SAMPLE, memory_count)
+    vss_conn.execute(
+        f"CREATE TABLE query_sample AS SELECT * FROM memory_embeddings USING SAMPLE {sample} ROWS"
+    )
+
+    start = time.perf_counter()
+    vss_conn.execute(KNN_SQL.format(queries="query_sample")).fetchall()
+    brute_per_query = (time.perf_counter() - start) / sample
+
+    start = time.perf_counter()
+    vss_conn.execute(CREATE_INDEX_SQL)
+    build_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    vss_conn.execute(KNN_SQL.format(queries="memory_embeddings")).fetchall()
+    hnsw_seconds = time.perf_counter() - start
+
+    brute_seconds = brute_per_query * memory_count
+    logging.info(
+        f"k-NN stage at {memory_count} memories: brute force ~{brute_seconds:.1f}s "
+        f"(extrapolated from {sample} queries), HNSW {hnsw_seconds:.1f}s "
+        f"+ {build_seconds:.1f}s index build, speedup {brute_seconds / hnsw_seconds:.1f}x"
+    )
+    assert hnsw_seconds < brute_seconds
@@ -16,12 +16,21 @@ sys.path.append(os.path.join(os.path.dirname(__file__), "../../biological_memory
 
 try:
     from ollama_embeddings import (
+        _split_embedding_batches,
         cosine_similarity,
+        generate_embedding_matrix,
+        generate_embeddings,
         generate_tag_embedding,
+        generate_tag_embeddings,
+        normalize_tags,
+        pool_tag_embeddings,
     )
 except ImportError as e:
     pytest.skip(f"Ollama embeddings module not available: {e}", allow_module_level=True)
 
+# Any constant 768-dim vector normalizes to this; both Ollama endpoints yield unit vectors
+UNIT = [768**-0.5] * 768
+
 
 class TestTagEmbeddingGeneration:
     """Test suite for tag embedding generation"""
@@ -118,9 +127,9 @@ class TestTagEmbeddingIntegration:
         try:
             embedding = generate_tag_embedding(tags)
 
-            if embedding:  # Only test if embedding was successful
-                assert len(embedding) == 768
-                assert all(isinstance(x, float) for x in embedding)
+            if embedding is not None:  # Only test if embedding was successful
+                assert embedding.shape == (768,)
+                assert embedding.dtype == np.float32
 
                 # Test magnitude is reasonable
                 magnitude = np.linalg.norm(embedding)
@@ -143,7 +152,7 @@ class TestTagEmbeddingIntegration:
             embedding1 = generate_tag_embedding(tags1)
             embedding2 = generate_tag_embedding(tags2)
 
-            if embedding1 and embedding2:
+            if embedding1 is not None and embedding2 is not None:
                 similarity = cosine_similarity(embedding1, embedding2)
                 assert similarity > 0.999  # Should be essentially identical
                 print(f"✓ Tag embedding determinism: {similarity:.6f} similarity")
@@ -167,7 +176,8 @@ class TestTagEmbeddingCaching:
             # Should check cache with sorted tag string
             expected_key = "programming | python"
             mock_cache.get.assert_called_once_with(expected_key, "nomic-embed-text")
-            assert result == [0.1] * 768
+            assert result.dtype == np.float32
+            np.testing.assert_allclose(result, UNIT, rtol=1e-6)
 
     def test_cache_miss_and_store(self):
         """Test cache miss leads to generation and storage"""
@@ -188,8 +198,273 @@ class TestTagEmbeddingCaching:
             result = generate_tag_embedding(["python"])
 
             # Should store in cache after generation
-            mock_cache.set.assert_called_once_with("python", "nomic-embed-text", [0.2] * 768)
-            assert result == [0.2] * 768
+            mock_cache.set.assert_called_once()
+            text, model, stored = mock_cache.set.call_args.args
+            assert (text, model) == ("python", "nomic-embed-text")
+            np.testing.assert_allclose(stored, UNIT, rtol=1e-6)
+            np.testing.assert_allclose(result, UNIT, rtol=1e-6)
+
+
+class TestBatchEmbeddingGeneration:
+    """Test multi-input batch embedding requests"""
+
+    def test_split_respects_input_and_char_budget(self):
+        """Batches are bounded by both input count and total characters"""
+        texts = ["a" * 10] * 5 + ["b" * 50]
+
+        assert _split_embedding_batches(texts, max_inputs=2, max_chars=1000) == [
+            ["a" * 10] * 2,
+            ["a" * 10] * 2,
+            ["a" * 10, "b" * 50],
+        ]
+        assert _split_embedding_batches(texts, max_inputs=100, max_chars=30) == [
+            ["a" * 10] * 3,
+            ["a" * 10] * 2,
+            ["b" * 50],
+        ]
+
+    def test_batch_checks_cache_and_writes_back_once(self):
+        """Cached and duplicate texts are not sent; new vectors are cached in one call"""
+        with (
+            patch("ollama_embeddings.cache") as mock_cache,
+            patch("ollama_embeddings.requests.post") as mock_post,
+        ):
+            mock_cache.get_batch.return_value = [[0.5] * 768, None, None]
+
+            mock_response = Mock()
+            mock_response.status_code = 200
+            mock_response.json.return_value = {"embeddings": [[0.2] * 768, [0.3] * 768]}
+            mock_post.return_value = mock_response
+
+            result = generate_embeddings(["cached", "new one", "", "new two", "new one"])
+
+            mock_cache.get_batch.assert_called_once_with(
+                ["cached", "new one", "new two"], "nomic-embed-text"
+            )
+            mock_post.assert_called_once()
+            assert mock_post.call_args.args[0].endswith("/api/embed")
+            assert mock_post.call_args.kwargs["json"]["input"] == ["new one", "new two"]
+            mock_cache.set_batch.assert_called_once()
+            texts, model, stored = mock_cache.set_batch.call_args.args
+            assert (texts, model) == (["new one", "new two"], "nomic-embed-text")
+            assert stored.shape == (2, 768)
+            np.testing.assert_allclose(stored, [UNIT, UNIT], rtol=1e-6)
+
+            assert result[2] is None
+            for row in result[:2] + result[3:]:
+                np.testing.assert_allclose(row, UNIT, rtol=1e-6)
+
+    def test_batch_failure_returns_none_per_text(self):
+        """A failed batch request yields None for each text without raising"""
+        with (
+            patch("ollama_embeddings.cache") as mock_cache,
+            patch("ollama_embeddings.requests.post") as mock_post,
+        ):
+            mock_cache.get_batch.return_value = [None, None]
+            mock_response = Mock()
+            mock_response.status_code = 404
+            mock_post.return_value = mock_response
+
+            assert generate_embeddings(["x", "y"]) == [None, None]
+            mock_post.assert_called_once()
+            mock_cache.set_batch.assert_not_called()
+
+    def test_matrix_keeps_float32_rows_and_validity_mask(self):
+        """The matrix form returns one float32 row per text plus a validity mask"""
+        with (
+            patch("ollama_embeddings.cache") as mock_cache,
+            patch("ollama_embeddings.requests.post") as mock_post,
+        ):
+            mock_cache.get_batch.return_value = [None, None]
+            mock_response = Mock()
+            mock_response.status_code = 200
+            mock_response.json.return_value = {"embeddings": [[0.2] * 768, [float("nan")] * 768]}
+            mock_post.return_value = mock_response
+
+            matrix, valid = generate_embedding_matrix(["good", "bad", ""])
+
+            assert matrix.shape == (3, 768)
+            assert matrix.dtype == np.float32
+            assert valid.tolist() == [True, False, False]
+            np.testing.assert_allclose(matrix[0], UNIT, rtol=1e-6)
+            assert not matrix[1:].any()
+
+    def test_single_and_batch_endpoints_agree(self):
+        """/api/embeddings output is normalized like /api/embed, so cache entries match"""
+        raw = np.arange(1, 769, dtype=np.float32)
+        with (
+            patch("ollama_embeddings.cache") as mock_cache,
+            patch("ollama_embeddings.requests.post") as mock_post,
+        ):
+            mock_cache.get.return_value = None
+            mock_cache.get_batch.return_value = [None]
+            mock_response = Mock()
+            mock_response.status_code = 200
+            mock_response.json.return_value = {
+                "embedding": raw.tolist(),
+                "embeddings": [(raw / np.linalg.norm(raw)).tolist()],
+            }
+            mock_post.return_value = mock_response
+
+            single = generate_tag_embedding(["python"])
+            (batch,) = generate_embeddings(["python"])
+
+            np.testing.assert_allclose(single, batch, rtol=1e-6)
+            assert np.linalg.norm(mock_cache.set.call_args.args[2]) == pytest.approx(1.0)
+
+    def test_raw_cached_vectors_are_normalized_on_read(self):
+        """Entries cached from raw /api/embeddings output come back as unit vectors"""
+        with patch("ollama_embeddings.cache") as mock_cache:
+            mock_cache.get_batch.return_value = [[3.0] + [0.0] * 766 + [4.0]]
+
+            matrix, valid = generate_embedding_matrix(["cached"])
+
+            assert valid.tolist() == [True]
+            assert matrix[0, 0] == pytest.approx(0.6)
+            assert matrix[0, -1] == pytest.approx(0.8)
+
+    def test_tag_embeddings_use_canonical_strings(self):
+        """Batch tag embeddings reuse the sorted ' | ' tag string"""
+        with patch("ollama_embeddings.generate_embeddings") as mock_generate:
+            mock_generate.return_value = [[0.1] * 768, None]
+
+            result = generate_tag_embeddings([["python", "ai"], []])
+
+            mock_generate.assert_called_once_with(["ai | python", None], "nomic-embed-text", 3)
+            assert result == [[0.1] * 768, None]
+
+
+class TestDistinctTagSetProcessing:
+    """Test that the PostgreSQL processor embeds each distinct tag set once"""
+
+    @pytest.fixture
+    def processor_module(self):
+        sys.path.append(os.path.join(os.path.dirname(__file__), "../../biological_memory/scripts"))
+        import generate_tag_embeddings_postgres
+
+        return generate_tag_embeddings_postgres
+
+    def test_identical_tag_sets_share_one_embedding_and_one_update(self, processor_module):
+        memories = [
+            ("00000000-0000-0000-0000-000000000001", ["ai", "python"]),
+            ("00000000-0000-0000-0000-000000000002", [" python", "ai "]),
+            ("00000000-0000-0000-0000-000000000003", ["rust"]),
+            ("00000000-0000-0000-0000-000000000004", ["", None]),
+        ]
+        embedded_texts = []
+
+        def fake_matrix(texts, *args, **kwargs):
+            embedded_texts.extend(texts)
+            return np.ones((len(texts), 768), dtype=np.float32), np.ones(len(texts), dtype=bool)
+
+        processor = processor_module.PostgresTagEmbeddingProcessor.__new__(
+            processor_module.PostgresTagEmbeddingProcessor
+        )
+        processor.strategy = "concat"
+        processor.pg_conn = Mock()
+        cursor = processor.pg_conn.cursor.return_value
+
+        with patch.object(
+            processor_module, "generate_embedding_matrix", side_effect=fake_matrix
+        ), patch.object(processor_module.psycopg2.extras, "execute_values") as execute_values:
+            success, errors = processor.process_tag_embedding_batch(memories)
+
+        assert sorted(embedded_texts) == ["ai | python", "rust"]
+        assert (success, errors) == (3, 0)
+        execute_values.assert_called_once()
+        rows = execute_values.call_args[0][2]
+        assert sorted(len(ids) for ids, _ in rows) == [1, 2]
+        # The memory without usable tags is marked failed in one statement
+        cursor.execute.assert_called_once()
+        assert cursor.execute.call_args[0][1] == (["00000000-0000-0000-0000-000000000004"],)
+
+    def test_pooled_strategy_only_embeds_tags_missing_from_vocabulary(self, processor_module):
+        memories = [
+            ("00000000-0000-0000-0000-000000000001", ["AI", "python"]),
+            ("00000000-0000-0000-0000-000000000002", ["python", "rust"]),
+        ]
+        embedded_texts = []
+
+        def fake_matrix(texts, *args, **kwargs):
+            embedded_texts.extend(texts)
+            return np.ones((len(texts), 768), dtype=np.float32), np.ones(len(texts), dtype=bool)
+
+        processor = processor_module.PostgresTagEmbeddingProcessor.__new__(
+            processor_module.PostgresTagEmbeddingProcessor
+        )
+        processor.strategy = "pooled"
+        processor.pg_conn = Mock()
+        cursor = processor.pg_conn.cursor.return_value
+        stored = "[" + ",".join(["0.5"] * 768) + "]"
+        cursor.fetchall.return_value = [("ai", stored, 1.0), ("python", stored, 1.0)]
+
+        with patch.object(
+            processor_module, "generate_embedding_matrix", side_effect=fake_matrix
+        ), patch.object(processor_module.psycopg2.extras, "execute_values") as execute_values:
+            success, errors = processor.process_tag_embedding_batch(memories)
+
+        assert embedded_texts == ["rust"]
+        assert (success, errors) == (2, 0)
+        assert cursor.execute.call_args_list[0][0][1] == (["ai", "python", "rust"],)
+        # One vocabulary insert for the new tag, then one fan-out update
+        vocabulary_rows = execute_values.call_args_list[0][0][2]
+        assert [tag for tag, _, _ in vocabulary_rows] == ["rust"]
+        assert len(execute_values.call_args_list[1][0][2]) == 2
+
+
+class TestPooledTagEmbeddings:
+    """Test tag-set embeddings pooled from a per-tag vocabulary"""
+
+    def test_pooling_is_normalized_weighted_mean(self):
+        vectors = np.array([[1.0, 0.0], [0.0, 1.0], [1.0, 1.0]], dtype=np.float32)
+        vocabulary = {"ai": 0, "python": 1, "rust": 2}
+
+        matrix, valid = pool_tag_embeddings(
+            [["ai", "python"], ["unknown"], ["python"], ["ai", "python"]],
+            vocabulary,
+            vectors,
+            weights=np.array([3.0, 1.0, 1.0]),
+        )
+
+        assert valid.tolist() == [True, False, True, True]
+        expected = np.array([3.0, 1.0]) / np.linalg.norm([3.0, 1.0])
+        np.testing.assert_allclose(matrix[0], expected, rtol=1e-6)
+        np.testing.assert_allclose(matrix[2], [0.0, 1.0])
+        assert not matrix[1].any()
+
+    def test_unknown_tags_are_skipped(self):
+        vectors = np.array([[2.0, 0.0]], dtype=np.float32)
+
+        matrix, valid = pool_tag_embeddings([["ai", "missing"]], {"ai": 0}, vectors)
+
+        assert valid.tolist() == [True]
+        np.testing.assert_allclose(matrix[0], [1.0, 0.0])
+
+    def test_pooled_strategy_embeds_each_distinct_tag_once(self):
+        embedded_texts = []
+
+        def fake_matrix(texts, *args, **kwargs):
+            embedded_texts.extend(texts)
+            matrix = np.eye(len(texts), 768, dtype=np.float32)
+            return matrix, np.ones(len(texts), dtype=bool)
+
+        with patch("ollama_embeddings.generate_embedding_matrix", side_effect=fake_matrix):
+            results = generate_tag_embeddings(
+                [["AI", "python"], ["python", "ai "], ["rust", "ai"], None], strategy="pooled"
+            )
+
+        assert embedded_texts == ["ai", "python", "rust"]
+        np.testing.assert_allclose(results[0], results[1])
+        assert results[3] is None
+        assert results[0].dtype == np.float32
+
+    def test_unknown_strategy_raises(self):
+        with pytest.raises(ValueError):
+            generate_tag_embeddings([["ai"]], strategy="summed")
+
+    def test_normalize_tags(self):
+        assert normalize_tags([" Python", "ai", "python", "", None]) == ["ai", "python"]
+        assert normalize_tags(None) == []
 
 
 class TestTagEmbeddingQuality:
@@ -6,12 +6,16 @@ import os
 
 # Import the functions to test
 import sys
+import time
 import uuid
+from datetime import datetime, timedelta
+from unittest.mock import MagicMock, patch
 
 from src.generate_insights import (
     call_ollama,
     extract_tags,
     generate_insight,
+    iter_unprocessed_memories,
     process_memories,
 )
 
@@ -160,3 +164,139 @@ class TestFullPipeline:
 
         # At minimum, the function should not crash
         assert True, "Pipeline integration test completed"
+
+
+class TestConcurrentPipeline:
+    """Test the streaming reader, worker pool and batched writer without services"""
+
+    @staticmethod
+    def _memories(count):
+        base = datetime(2025, 1, 1)
+        return [
+            (uuid.UUID(int=i + 1), f"memory content {i}", base + timedelta(minutes=i))
+            for i in range(count)
+        ]
+
+    def test_keyset_reader_seeks_past_last_row(self):
+        """Each page seeks past the previous page's (created_at, id)"""
+        memories = self._memories(5)
+        cursor = MagicMock()
+        cursor.fetchall.side_effect = [memories[:2], memories[2:4], memories[4:]]
+        conn = MagicMock()
+        conn.cursor.return_value.__enter__.return_value = cursor
+
+        rows = list(iter_unprocessed_memories(conn, page_size=2))
+
+        assert rows == memories
+        calls = cursor.execute.call_args_list
+        assert len(calls) == 3
+        assert "(m.created_at, m.id) >" not in calls[0][0][0]
+        assert calls[1][0][1] == [memories[1][2], memories[1][0], 2]
+        assert calls[2][0][1] == [memories[3][2], memories[3][0], 2]
+
+    def test_keyset_reader_respects_limit_and_watermark(self):
+        """The reader starts at the watermark and never fetches past the limit"""
+        memories = self._memories(3)
+        watermark = (datetime(2024, 12, 31), uuid.UUID(int=99))
+        cursor = MagicMock()
+        cursor.fetchall.return_value = memories
+        conn = MagicMock()
+        conn.cursor.return_value.__enter__.return_value = cursor
+
+        rows = list(iter_unprocessed_memories(conn, watermark, page_size=10, limit=3))
+
+        assert rows == memories
+        cursor.execute.assert_called_once()
+        assert cursor.execute.call_args[0][1] == [watermark[0], watermark[1], 3]
+
+    def test_workers_run_concurrently_and_write_in_order(self):
+        """Insights are generated in parallel but batched and committed in input order"""
+        memories = self._memories(7)
+        written = []
+
+        def slow_insight(content, related):
+            # Earlier memories finish last to prove ordering is restored
+            time.sleep(0.05 * (7 - int(content.split()[-1])) / 7)
+            return {
+                "content": f"insight for {content}",
+                "type": "pattern",
+                "tags": ["t"],
+                "confidence": 0.7,
+            }
+
+        def fake_write(cursor, rows):
+            written.append([row[4][0] for row in rows])
+
+        pg_conn = MagicMock()
+        pg_conn.cursor.return_value.fetchone.return_value = ("codex_db", "public")
+        with patch("src.generate_insights.psycopg2.connect", return_value=pg_conn), patch(
+            "src.generate_insights.get_memory_watermark", return_value=None
+        ), patch(
+            "src.generate_insights.iter_unprocessed_memories", return_value=iter(memories)
+        ), patch(
+            "src.generate_insights.generate_insight", side_effect=slow_insight
+        ), patch(
+            "src.generate_insights.write_insights", side_effect=fake_write
+        ):
+            generated = process_memories(max_memories=7, workers=3, commit_every=3)
+
+        assert generated == 7
+        assert written == [[m[0] for m in memories[i : i + 3]] for i in (0, 3, 6)]
+        assert pg_conn.commit.call_count == 3
+
+    def test_write_failure_stops_run(self):
+        """A failed batch rolls back and stops so the watermark does not skip it"""
+        memories = self._memories(6)
+        pg_conn = MagicMock()
+        pg_conn.cursor.return_value.fetchone.return_value = ("codex_db", "public")
+        insight = {"content": "an insight", "type": "pattern", "tags": [], "confidence": 0.7}
+        with patch("src.generate_insights.psycopg2.connect", return_value=pg_conn), patch(
+            "src.generate_insights.get_memory_watermark", return_value=None
+        ), patch(
+            "src.generate_insights.iter_unprocessed_memories", return_value=iter(memories)
+        ), patch(
+            "src.generate_insights.generate_insight", return_value=insight
+        ), patch(
+            "src.generate_insights.write_insights", side_effect=RuntimeError("boom")
+        ) as write:
+            generated = process_memories(max_memories=6, workers=2, commit_every=2)
+
+        assert generated == 0
+        write.assert_called_once()
+        pg_conn.rollback.assert_called_once()
+        pg_conn.commit.assert_not_called()
+
+    def test_failed_insight_stops_watermark_before_it(self):
+        """Memories after a failed insight are not committed, so the next run retries it"""
+        memories = self._memories(6)
+        written = []
+
+        def flaky_insight(content, related):
+            if content.endswith(" 2"):
+                raise RuntimeError("ollama unavailable")
+            return {
+                "content": f"insight for {content}",
+                "type": "pattern",
+                "tags": [],
+                "confidence": 0.7,
+            }
+
+        def fake_write(cursor, rows):
+            written.extend(row[4][0] for row in rows)
+
+        pg_conn = MagicMock()
+        pg_conn.cursor.return_value.fetchone.return_value = ("codex_db", "public")
+        with patch("src.generate_insights.psycopg2.connect", return_value=pg_conn), patch(
+            "src.generate_insights.get_memory_watermark", return_value=None
+        ), patch(
+            "src.generate_insights.iter_unprocessed_memories", return_value=iter(memories)
+        ), patch(
+            "src.generate_insights.generate_insight", side_effect=flaky_insight
+        ), patch(
+            "src.generate_insights.write_insights", side_effect=fake_write
+        ):
+            generated = process_memories(max_memories=6, workers=2, commit_every=10)
+
+        assert generated == 2
+        assert written == [memories[0][0], memories[1][0]]
+        pg_conn.commit.assert_called_once()